@@ -1,148 +1,34 @@
-import sqlite3
 from datetime import date
 import pandas as pd
 import streamlit as st
 
-DB = "finance.db"
+from financas import instrumentacao as instr
+from financas.controle import (
+    ORDENS, agregar_lancamentos, aging, alertas_vencidos, carregar_df, criar_tabelas, extrato_pessoa, inserir_lancamento,
+    liquidar, marcar_alertas_vistos, memo, pagamentos_de, pagar_parcial, pendentes, pessoas, projecao_saldo, resumo_periodo,
+    resumo_periodos, resumo_pessoa, rodar_agendador, total_pessoas
+)
+from financas.periodos import FREQ_LABELS, fmt_periodo, periodo_de, por_periodo
 
 # ================== CONFIG ==================
 st.set_page_config(page_title="Controle Financeiro", page_icon="💰", layout="wide")
-
-
-# ================== BANCO ==================
-def conectar():
-    return sqlite3.connect(DB)
-
-def criar_tabelas():
-    with conectar() as con:
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS lancamentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo TEXT NOT NULL CHECK(tipo IN ('RECEBER','PAGAR')),
-            pessoa TEXT,
-            categoria TEXT,
-            descricao TEXT,
-            valor REAL NOT NULL,
-            vencimento TEXT NOT NULL,
-            status TEXT NOT NULL CHECK(status IN ('PENDENTE','PAGO')) DEFAULT 'PENDENTE',
-            data_pagamento TEXT
-        );
-        """)
-        con.commit()
-
-def inserir_lancamento(tipo, pessoa, categoria, descricao, valor, vencimento_iso):
-    with conectar() as con:
-        con.execute("""
-            INSERT INTO lancamentos
-            (tipo, pessoa, categoria, descricao, valor, vencimento, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'PENDENTE')
-        """, (tipo, pessoa or None, categoria or None, descricao or None, float(valor), vencimento_iso))
-        con.commit()
-
-def marcar_como_pago(lancamento_id, data_pagamento_iso):
-    with conectar() as con:
-        con.execute("""
-            UPDATE lancamentos
-            SET status='PAGO', data_pagamento=?
-            WHERE id=?
-        """, (data_pagamento_iso, int(lancamento_id)))
-        con.commit()
-
-def carregar_df():
-    with conectar() as con:
-        df = pd.read_sql_query("""
-            SELECT id, tipo, pessoa, categoria, descricao,
-                   valor, vencimento, status, data_pagamento
-            FROM lancamentos
-            ORDER BY vencimento ASC, id ASC
-        """, con)
-
-    df["valor"] = pd.to_numeric(df["valor"], errors="coerce").fillna(0.0)
-
-    # ✅ PADRÃO DEFINITIVO: datas internas como datetime (Timestamp) normalizadas
-    df["vencimento_dt"] = pd.to_datetime(df["vencimento"], errors="coerce").dt.normalize()
-    df["data_pagamento_dt"] = pd.to_datetime(df["data_pagamento"], errors="coerce").dt.normalize()
-
-    # Campos texto
-    df["pessoa"] = df["pessoa"].fillna("")
-    df["categoria"] = df["categoria"].fillna("")
-    df["descricao"] = df["descricao"].fillna("")
-    return df
-
-
-# ================== REGRAS ==================
-def periodo_mes(ano: int, mes: int):
-    """
-    Retorna (inicio_dt, fim_dt) como Timestamps.
-    fim_dt é 'fim do dia' para incluir todo o dia.
-    """
-    inicio = pd.Timestamp(year=ano, month=mes, day=1).normalize()
-    fim = (inicio + pd.offsets.MonthEnd(0)).normalize()  # último dia do mês, 00:00
-    fim = fim + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)  # 23:59:59
-    return inicio, fim
-
-def resumo_mes(df, ano, mes):
-    inicio_dt, fim_dt = periodo_mes(ano, mes)
-
-    # Previsto: por vencimento
-    previsto = df[df["vencimento_dt"].notna()]
-    previsto = previsto[(previsto["vencimento_dt"] >= inicio_dt) & (previsto["vencimento_dt"] <= fim_dt)]
-    previsto_receber = float(previsto[previsto["tipo"] == "RECEBER"]["valor"].sum())
-    previsto_pagar = float(previsto[previsto["tipo"] == "PAGAR"]["valor"].sum())
-
-    # Realizado: por data_pagamento
-    realizado = df[(df["status"] == "PAGO") & (df["data_pagamento_dt"].notna())]
-    realizado = realizado[(realizado["data_pagamento_dt"] >= inicio_dt) & (realizado["data_pagamento_dt"] <= fim_dt)]
-    recebido = float(realizado[realizado["tipo"] == "RECEBER"]["valor"].sum())
-    pago = float(realizado[realizado["tipo"] == "PAGAR"]["valor"].sum())
-
-    return {
-        "inicio": inicio_dt.date(),
-        "fim": (fim_dt - pd.Timedelta(seconds=1)).date(),  # só pra exibir bonitinho
-        "previsto_receber": previsto_receber,
-        "previsto_pagar": previsto_pagar,
-        "saldo_previsto": previsto_receber - previsto_pagar,
-        "recebido": recebido,
-        "pago": pago,
-        "saldo_realizado": recebido - pago
-    }
-
-def projecao_saldo(df, dias=60, saldo_inicial=0.0):
-    hoje_dt = pd.Timestamp.today().normalize()
-    fim_dt = hoje_dt + pd.Timedelta(days=int(dias)) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-
-    pend = df[(df["status"] == "PENDENTE") & (df["vencimento_dt"].notna())].copy()
-    pend = pend[(pend["vencimento_dt"] >= hoje_dt) & (pend["vencimento_dt"] <= fim_dt)]
-    pend = pend.sort_values(["vencimento_dt", "id"])
-
-    saldo = float(saldo_inicial)
-    linhas = []
-    for _, r in pend.iterrows():
-        valor = float(r["valor"])
-        saldo += valor if r["tipo"] == "RECEBER" else -valor
-        linhas.append({
-            "Vencimento": r["vencimento_dt"].date(),
-            "Tipo": r["tipo"],
-            "Valor": valor,
-            "Saldo projetado": saldo,
-            "Pessoa": r["pessoa"],
-            "Categoria": r["categoria"],
-            "Descrição": r["descricao"]
-        })
-
-    return pd.DataFrame(linhas)
+instr.iniciar_rerun("app.py")
 
 
 # ================== APP ==================
 criar_tabelas()
+rodar_agendador(date.today().isoformat())  # marca os vencidos do dia (1x por dia)
 st.title("💰 Controle Financeiro")
 
 df = carregar_df()
+# agregados do Resumo no cache do tenant, pela data_version (não a cada rerun)
+agg = memo("agg", lambda: agregar_lancamentos(df))
 
-aba1, aba2, aba3 = st.tabs(["➕ Lançamentos", "📊 Resumo", "📈 Projeções"])
+aba1, aba2, aba3, aba4 = st.tabs(["➕ Lançamentos", "📊 Resumo", "📈 Projeções", "👥 Pessoas"])
 
 # -------- ABA 1 --------
 with aba1:
+    instr.secao("Lançamentos")
     st.subheader("Novo lançamento")
 
     c1, c2, c3, c4 = st.columns(4)
@@ -169,40 +55,95 @@ with aba1:
     st.divider()
     st.subheader("Pendentes")
 
-    pend = df[df["status"] == "PENDENTE"].copy()
-    pend_view = pend[["id","tipo","pessoa","categoria","descricao","valor","vencimento_dt","status"]].copy()
-    pend_view["vencimento"] = pend_view["vencimento_dt"].dt.date
-    pend_view = pend_view.drop(columns=["vencimento_dt"])
-    st.dataframe(pend_view, use_container_width=True, hide_index=True)
+    novos = alertas_vencidos()
+    if not novos.empty:
+        st.warning(f"⏰ {len(novos)} lançamento(s) venceram sem pagamento: "
+                   f"R$ {novos.loc[novos['tipo'] == 'RECEBER', 'valor'].sum():,.2f} a receber e "
+                   f"R$ {novos.loc[novos['tipo'] == 'PAGAR', 'valor'].sum():,.2f} a pagar.")
+        if st.button("Ok, já vi"):
+            marcar_alertas_vistos(novos["id"].tolist())
+            st.rerun()
+
+    # mais atrasado primeiro (consulta pelo índice status/vencimento)
+    pend = pendentes()
+    pend_view = pend[["id", "tipo", "pessoa", "categoria", "descricao", "valor", "em_aberto", "vencimento", "dias",
+                      "faixa"]].copy()
+    pend_view["vencimento"] = pd.to_datetime(pend_view["vencimento"], errors="coerce").dt.date
+    st.dataframe(pend_view, use_container_width=True, hide_index=True,
+                 column_config={"dias": st.column_config.NumberColumn("Dias de atraso"),
+                                "em_aberto": st.column_config.NumberColumn("Em aberto")})
 
     if not pend.empty:
-        st.subheader("Marcar lançamento como pago")
+        st.subheader("Aging (vencidos e a vencer)")
+        por = st.radio("Agrupar por", ["pessoa", "categoria"], horizontal=True,
+                       format_func={"pessoa": "Cliente / Fornecedor", "categoria": "Categoria"}.get)
+        st.dataframe(aging(por).reset_index(), use_container_width=True, hide_index=True)
 
-        col1, col2, col3 = st.columns([2, 2, 3])
-        with col1:
-            lanc_id = st.selectbox("ID", pend["id"].tolist())
-        with col2:
-            data_pg = st.date_input("Data do pagamento", value=date.today())
+    if not pend.empty:
+        st.subheader("Marcar como pago")
+        st.caption("Dica: marque como pago quando realmente entrou/saíu do caixa.")
+
+        modo = st.radio("Quitar", ["Selecionados", "Por filtro"], horizontal=True)
+        col1, col2, col3 = st.columns([3, 2, 2])
+        if modo == "Selecionados":
+            with col1:
+                ids_sel = st.multiselect("IDs", pend["id"].tolist())
+            filtro = {"ids": ids_sel}
+            alvo = pend[pend["id"].isin(ids_sel)]
+        else:
+            with col1:
+                pessoa_f = st.selectbox("Cliente / Fornecedor", sorted(pend["pessoa"].unique()),
+                                        format_func=lambda p: p or "(sem pessoa)")
+            with col2:
+                venc_ate = st.date_input("Vencimento até", value=date.today())
+            filtro = {"pessoa": pessoa_f, "vencimento_ate": venc_ate.isoformat()}
+            alvo = pend[(pend["pessoa"] == pessoa_f) & (pend["vencimento"] <= venc_ate.isoformat())]
         with col3:
-            st.caption("Dica: marque como pago quando realmente entrou/saíu do caixa.")
+            data_pg = st.date_input("Data do pagamento", value=date.today())
 
-        if st.button("Marcar como pago ✅"):
-            marcar_como_pago(lanc_id, data_pg.isoformat())
-            st.success("Pagamento registrado!")
+        st.caption(f"{len(alvo)} lançamento(s), R$ {alvo['em_aberto'].sum():,.2f} em aberto.")
+        if st.button("Marcar como pago ✅", disabled=alvo.empty):
+            r = liquidar(data_pg.isoformat(), **filtro)
+            st.success(f"{r['quantidade']} pagamento(s) registrado(s): R$ {r['total']:,.2f}.")
             st.rerun()
 
+        with st.expander("Pagamento parcial"):
+            p1, p2, p3 = st.columns([2, 2, 2])
+            with p1:
+                parc_id = st.selectbox("ID", pend["id"].tolist(), key="parcial_id")
+            linha = pend[pend["id"] == parc_id].iloc[0]
+            with p2:
+                parc_valor = st.number_input("Valor pago", min_value=0.01, max_value=max(float(linha["em_aberto"]), 0.01),
+                                             value=max(float(linha["em_aberto"]), 0.01), step=50.0)
+            with p3:
+                parc_data = st.date_input("Data", value=date.today(), key="parcial_data")
+            hist = pagamentos_de(parc_id)
+            if hist:
+                st.caption("Já pago: " + ", ".join(f"R$ {v:,.2f} em {d}" for _, d, v in hist))
+            if st.button("Registrar pagamento"):
+                r = pagar_parcial(parc_id, parc_valor, parc_data.isoformat())
+                st.success("Quitado!" if r["status"] == "PAGO" else f"Faltam R$ {r['em_aberto']:,.2f}.")
+                st.rerun()
+
 # -------- ABA 2 --------
 with aba2:
-    st.subheader("Resumo mensal")
+    instr.secao("Resumo")
+    titulo = st.empty()  # depende do período escolhido logo abaixo
 
     hoje = date.today()
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
-        ano = st.number_input("Ano", min_value=2000, max_value=2100, value=hoje.year)
+        freq = st.selectbox("Período", list(FREQ_LABELS), index=1, format_func=FREQ_LABELS.get)
     with col2:
+        ano = st.number_input("Ano", min_value=2000, max_value=2100, value=hoje.year)
+    with col3:
         mes = st.number_input("Mês", min_value=1, max_value=12, value=hoje.month)
 
-    r = resumo_mes(df, int(ano), int(mes))
+    agg_p = memo(f"agg_{freq}", lambda: por_periodo(agg, freq))
+    ref = hoje if (int(ano), int(mes)) == (hoje.year, hoje.month) else date(int(ano), int(mes), 1)
+    periodo = periodo_de(ref, freq)
+    r = resumo_periodo(agg_p, periodo)
+    titulo.subheader(f"Resumo por {FREQ_LABELS[freq].lower()}: {fmt_periodo(periodo)}")
 
     k1, k2, k3, k4 = st.columns(4)
     k1.metric("Previsto a receber", f"R$ {r['previsto_receber']:,.2f}")
@@ -210,10 +151,25 @@ with aba2:
     k3.metric("Saldo previsto", f"R$ {r['saldo_previsto']:,.2f}")
     k4.metric("Saldo realizado", f"R$ {r['saldo_realizado']:,.2f}")
 
+    k5, k6 = st.columns(2)
+    k5.metric("Pendente a receber", f"R$ {r['pendente_receber']:,.2f}")
+    k6.metric("Pendente a pagar", f"R$ {r['pendente_pagar']:,.2f}")
+
     st.caption(f"Período: {r['inicio']} até {r['fim']}")
 
+    hist = memo(f"hist_{freq}", lambda: resumo_periodos(agg_p))
+    if not hist.empty:
+        st.subheader(f"Histórico por {FREQ_LABELS[freq].lower()}")
+        tabela = hist.assign(**{"Período": hist["periodo"].map(fmt_periodo)})  # hist é do cache: não alterar
+        st.dataframe(
+            tabela[["Período", "previsto_receber", "previsto_pagar", "saldo_previsto",
+                    "pendente_receber", "pendente_pagar", "saldo_realizado"]],
+            use_container_width=True, hide_index=True
+        )
+
 # -------- ABA 3 --------
 with aba3:
+    instr.secao("Projeções")
     st.subheader("Projeção de saldo")
 
     col1, col2 = st.columns(2)
@@ -234,3 +190,41 @@ with aba3:
         linha["Vencimento"] = pd.to_datetime(linha["Vencimento"], errors="coerce")
         linha = linha.sort_values("Vencimento").set_index("Vencimento")
         st.line_chart(linha)
+
+# -------- ABA 4 --------
+with aba4:
+    instr.secao("Pessoas")
+    st.subheader("Clientes / Fornecedores")
+
+    ORDEM_LABELS = {"aberto": "Maior valor em aberto", "saldo": "Maior saldo a receber", "nome": "Nome"}
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        busca = st.text_input("Buscar pessoa")
+    with col2:
+        ordem = st.selectbox("Ordenar por", list(ORDENS), format_func=ORDEM_LABELS.get)
+    total = total_pessoas(busca)
+    por_pagina = 100
+    with col3:
+        pagina = st.number_input("Página", min_value=1, max_value=max(1, -(-total // por_pagina)), value=1)
+
+    lista = pessoas(ordem, busca, limite=por_pagina, offset=(int(pagina) - 1) * por_pagina)
+    st.caption(f"{total:,} pessoa(s). Prazo médio = dias entre vencimento e pagamento (negativo = pagou antes).")
+    lista_view = lista.copy()
+    lista_view["pessoa"] = lista_view["pessoa"].replace("", "(sem pessoa)")
+    st.dataframe(lista_view, use_container_width=True, hide_index=True,
+                 column_config={"prazo_medio": st.column_config.NumberColumn("Prazo médio (dias)", format="%.1f")})
+
+    if not lista.empty:
+        escolhida = st.selectbox("Extrato de", lista["pessoa"].tolist(), format_func=lambda p: p or "(sem pessoa)")
+        r = resumo_pessoa(escolhida)
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("A receber", f"R$ {r['a_receber']:,.2f}")
+        k2.metric("A pagar", f"R$ {r['a_pagar']:,.2f}")
+        k3.metric("Recebido / pago", f"R$ {r['recebido']:,.2f} / R$ {r['pago']:,.2f}")
+        k4.metric("Prazo médio", f"{r['prazo_medio']:.1f} dias" if r["prazo_medio"] is not None else "—")
+        st.dataframe(extrato_pessoa(escolhida), use_container_width=True, hide_index=True,
+                     column_config={"dias": st.column_config.NumberColumn("Dias após vencimento")})
+
+instr.secao("")
+instr.painel_streamlit()
+instr.finalizar_rerun()
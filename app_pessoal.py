@@ -1,143 +1,52 @@
-import sqlite3
-from datetime import date
+import functools
+import hmac
+from datetime import date, datetime
+from pathlib import Path
 import pandas as pd
 import streamlit as st
-# --- Helpers PT-BR (mês) ---
-MESES_PT = [
-    "Janeiro","Fevereiro","Março","Abril","Maio","Junho",
-    "Julho","Agosto","Setembro","Outubro","Novembro","Dezembro"
-]
 
-def mes_label_pt(ano: int, mes: int) -> str:
-    return f"{MESES_PT[mes-1]}/{ano}"
-
-def parse_mes_key(key: str) -> tuple[int, int]:
-    # key no formato "YYYY-MM"
-    a, m = key.split("-")
-    return int(a), int(m)
-
-
-
-DB = "finance_pessoal.db"
+from financas import instrumentacao as instr
+from financas.datas import month_range, parse_mes_key, ym_add
+from financas.formatos import (
+    fmt_currency, fmt_date_br, fmt_installments, fmt_month_br, tx_signature
+)
+from financas.pessoal import (
+    account_statement, add_card, add_goal, add_transaction, add_transfer, alerts_for_month, anomalias_mes, antecipar_plano,
+    atualizar_cartao,
+    avaliar_metas, balance_as_of, budget_remaining, budgets_mes, cancel_job, card_credit, card_open_statements, card_statement_detail, card_statement_total,
+    carregar_accounts, carregar_alert_rules, carregar_categorias, carregar_regras_categoria, cash_flow, classificador_atual, carregar_cards, carregar_category_rules, carregar_goals,
+    carregar_holidays, carregar_installment_plans, carregar_long_goals, carregar_recurrences, carregar_transactions, carregar_transfers,
+    conectar, create_installments_on_card, daily_balance_series, dashboard_mes, delete_transactions,
+    delete_transfer, desativar_long_goal, recategorizar, remover_regra_categoria, salvar_regra_categoria, ensure_schema, goal_alerts, installment_plans, installment_schedule,
+    list_jobs, meses_disponiveis, monthly_goals_history, payoff_scenario, registro_atual, remover_budget, remover_feriado, resume_pending_jobs,
+    saldos_atuais, salvar_alert_rule, salvar_budget, salvar_feriado, salvar_long_goal, seed_if_empty, set_transactions_status, submit_job,
+    VersionConflict, what_if, JANELA
+)
+from financas.tenants import set_tenant
 
 st.set_page_config(page_title="Finanças Pessoais", page_icon="💳", layout="wide")
+instr.iniciar_rerun("app_pessoal.py")
 
 
 # =========================
-# Helpers
+# Login (Streamlit Secrets)
 # =========================
-def to_dt(s):
-    return pd.to_datetime(s, errors="coerce")
-
-
-def add_months(year: int, month: int, add: int):
-    m = month + add
-    y = year + (m - 1) // 12
-    m = ((m - 1) % 12) + 1
-    return y, m
-
-
-def ym_add(ym: str, add: int) -> str:
-    y, m = map(int, ym.split("-"))
-    y2, m2 = add_months(y, m, add)
-    return f"{y2:04d}-{m2:02d}"
-
-
-def month_range(ym: str):
-    y, m = map(int, ym.split("-"))
-    start = pd.Timestamp(y, m, 1).date()
-    end = (pd.Timestamp(y, m, 1) + pd.offsets.MonthEnd(0)).date()
-    return start, end
-
-
-def compute_statement_month(purchase_date: date, closing_day: int) -> str:
-    y, m, d = purchase_date.year, purchase_date.month, purchase_date.day
-    if d <= closing_day:
-        return f"{y:04d}-{m:02d}"
-    if m == 12:
-        return f"{y+1:04d}-01"
-    return f"{y:04d}-{m+1:02d}"
-
-
-def months_between(d1: date, d2: date) -> int:
-    return (d2.year - d1.year) * 12 + (d2.month - d1.month) + 1
+def _check_password(pw: str, secret) -> bool:
+    return bool(secret) and hmac.compare_digest(str(pw).encode("utf-8"), str(secret).encode("utf-8"))
 
 
-def fmt_currency(v) -> str:
-    try:
-        return f"R$ {float(v):,.2f}"
-    except Exception:
-        return "R$ 0,00"
-
-
-def fmt_date_br(d) -> str:
-    """15/01/2026"""
-    if d is None or pd.isna(d):
-        return "—"
-    if isinstance(d, pd.Timestamp):
-        d = d.date()
-    if isinstance(d, str):
-        d = pd.to_datetime(d, errors="coerce")
-        if pd.isna(d):
-            return "—"
-        d = d.date()
-    return d.strftime("%d/%m/%Y")
-
-
-def fmt_month_br(ym: str) -> str:
-    """2026-02 -> Fevereiro/2026"""
-    if not ym:
-        return "—"
-    d = pd.to_datetime(f"{ym}-01", errors="coerce")
-    if pd.isna(d):
-        return "—"
-    return d.strftime("%B/%Y").capitalize()
-
-
-def fmt_installment(installment_no, installments_total, ym) -> str:
-    """3ª de 6 • Março"""
-    if pd.isna(installment_no) or pd.isna(installments_total):
-        return "—"
-    month = fmt_month_br(ym).split("/")[0]
-    return f"{int(installment_no)}ª de {int(installments_total)} • {month}"
-
-
-def map_accounts(accounts_df: pd.DataFrame) -> dict:
-    return {int(r["id"]): str(r["name"]) for _, r in accounts_df.iterrows()}
-
-
-def map_cards(cards_df: pd.DataFrame) -> dict:
-    mp = {}
-    for _, r in cards_df.iterrows():
-        last4 = (r.get("last4", "") or "----")
-        mp[int(r["id"])] = f'{r["name"]} •••• {last4}'
-    return mp
-
-
-def tx_signature(dt_, kind, amount, category, description, status, method,
-                 account_id, card_id, statement_month, installments_total):
-    return str((
-        str(dt_), kind, round(float(amount or 0), 2),
-        (category or "").strip().lower(),
-        (description or "").strip().lower(),
-        status, method,
-        int(account_id) if account_id else None,
-        int(card_id) if card_id else None,
-        statement_month or "",
-        int(installments_total) if installments_total else 1
-    ))
-
-
-# =========================
-# Login (Streamlit Secrets)
-# =========================
 def require_login():
+    """
+    Com [users] nos Secrets (usuario = "senha"), cada usuário tem o próprio
+    banco (tenant); só com APP_PASSWORD, um banco único para quem tem a senha.
+    """
+    users = dict(st.secrets.get("users", {}) or {})
     pw_secret = st.secrets.get("APP_PASSWORD", None)
 
     if "auth_ok" not in st.session_state:
         st.session_state.auth_ok = False
 
-    if not pw_secret:
+    if not users and not pw_secret:
         st.warning("⚠️ APP_PASSWORD não configurado nos Secrets. O app ficará sem login.")
         return
 
@@ -145,17 +54,27 @@ def require_login():
         return
 
     st.title("🔐 Acesso")
-    st.caption("Digite a senha para acessar o sistema.")
+    if users:
+        st.caption("Entre com seu usuário e senha.")
+        user = st.text_input("Usuário", key="login_user").strip()
+    else:
+        st.caption("Digite a senha para acessar o sistema.")
+        user = None
     pw = st.text_input("Senha", type="password", key="login_password")
 
     c1, c2 = st.columns([1, 3])
     with c1:
         if st.button("Entrar", use_container_width=True, key="login_btn"):
-            if pw == pw_secret:
+            if users and _check_password(pw, users.get(user)):
+                st.session_state.auth_ok = True
+                st.session_state.tenant = user
+                st.rerun()
+            elif not users and _check_password(pw, pw_secret):
                 st.session_state.auth_ok = True
+                st.session_state.tenant = None
                 st.rerun()
             else:
-                st.error("Senha incorreta.")
+                st.error("Usuário ou senha incorretos." if users else "Senha incorreta.")
     with c2:
         st.success("✅ Acesso protegido por senha (Secrets configurado).")
 
@@ -163,468 +82,80 @@ def require_login():
 
 
 require_login()
+set_tenant(st.session_state.get("tenant"))
+
+
+def _fragment(fn=None, *, run_every=None):
+    """
+    st.fragment que redefine o tenant: o rerun só do fragment roda numa thread
+    nova (ContextVar vazia) e não passa pelo set_tenant do topo do script.
+    Sem suporte a fragments, devolve a função como está.
+    """
+    def deco(fn):
+        if not hasattr(st, "fragment"):
+            return fn
+
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            set_tenant(st.session_state.get("tenant"))
+            return fn(*args, **kwargs)
+        return st.fragment(run_every=run_every)(body)
+    return deco(fn) if fn is not None else deco
 
 top_left, top_right = st.columns([6, 2])
 with top_right:
     mobile_mode = st.toggle("📱 Modo celular", value=False, key="mobile_mode")
     if st.button("Sair 🔒", use_container_width=True, key="logout_btn"):
         st.session_state.auth_ok = False
+        st.session_state.tenant = None
         st.rerun()
 
 
 # =========================
-# DB / Schema
-# =========================
-def conectar():
-    return sqlite3.connect(DB)
-
-
-def table_columns(con, table):
-    rows = con.execute(f"PRAGMA table_info({table});").fetchall()
-    return {r[1] for r in rows}
-
-
-def ensure_schema():
-    with conectar() as con:
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            type TEXT NOT NULL CHECK(type IN ('BANK','CASH')),
-            initial_balance REAL NOT NULL DEFAULT 0
-        );
-        """)
-
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS cards (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            closing_day INTEGER NOT NULL CHECK(closing_day BETWEEN 1 AND 28),
-            due_day INTEGER NOT NULL CHECK(due_day BETWEEN 1 AND 28),
-            pay_account_id INTEGER,
-            FOREIGN KEY(pay_account_id) REFERENCES accounts(id)
-        );
-        """)
-        cols_cards = table_columns(con, "cards")
-        if "last4" not in cols_cards:
-            con.execute("ALTER TABLE cards ADD COLUMN last4 TEXT;")
-
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS goals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            monthly_target REAL NOT NULL DEFAULT 0
-        );
-        """)
-
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            dt TEXT NOT NULL,
-            kind TEXT NOT NULL CHECK(kind IN ('INCOME','EXPENSE')),
-            amount REAL NOT NULL,
-            category TEXT,
-            description TEXT,
-            status TEXT NOT NULL CHECK(status IN ('PENDING','PAID')) DEFAULT 'PAID',
-            method TEXT NOT NULL CHECK(method IN ('BANK','CASH','CARD','CARD_PAYMENT')),
-            account_id INTEGER,
-            card_id INTEGER,
-            statement_month TEXT,
-            FOREIGN KEY(account_id) REFERENCES accounts(id),
-            FOREIGN KEY(card_id) REFERENCES cards(id)
-        );
-        """)
-        cols_tx = table_columns(con, "transactions")
-        if "installments_total" not in cols_tx:
-            con.execute("ALTER TABLE transactions ADD COLUMN installments_total INTEGER;")
-        if "installment_no" not in cols_tx:
-            con.execute("ALTER TABLE transactions ADD COLUMN installment_no INTEGER;")
-        if "recurrence_id" not in cols_tx:
-            con.execute("ALTER TABLE transactions ADD COLUMN recurrence_id INTEGER;")
-
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS recurrences (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            kind TEXT NOT NULL CHECK(kind IN ('INCOME','EXPENSE')),
-            amount REAL NOT NULL,
-            category TEXT,
-            description TEXT,
-            method TEXT NOT NULL CHECK(method IN ('BANK','CASH','CARD')),
-            account_id INTEGER,
-            card_id INTEGER,
-            day_of_month INTEGER NOT NULL CHECK(day_of_month BETWEEN 1 AND 28),
-            active INTEGER NOT NULL DEFAULT 1
-        );
-        """)
-
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS long_goals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            target_amount REAL NOT NULL,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL,
-            start_amount REAL NOT NULL DEFAULT 0,
-            active INTEGER NOT NULL DEFAULT 1
-        );
-        """)
-
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS category_rules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            category TEXT NOT NULL UNIQUE,
-            class TEXT NOT NULL CHECK(class IN ('ESSENTIAL','DISCRETIONARY'))
-        );
-        """)
-
-        # Transferências (Conta -> Conta)
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS transfers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            dt TEXT NOT NULL,
-            amount REAL NOT NULL,
-            from_account_id INTEGER NOT NULL,
-            to_account_id INTEGER NOT NULL,
-            description TEXT,
-            status TEXT NOT NULL CHECK(status IN ('PENDING','PAID')) DEFAULT 'PAID',
-            FOREIGN KEY(from_account_id) REFERENCES accounts(id),
-            FOREIGN KEY(to_account_id) REFERENCES accounts(id)
-        );
-        """)
-
-        con.commit()
-
-
-def seed_if_empty():
-    with conectar() as con:
-        a = con.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
-        g = con.execute("SELECT COUNT(*) FROM goals").fetchone()[0]
-        c = con.execute("SELECT COUNT(*) FROM category_rules").fetchone()[0]
-
-    if a == 0:
-        with conectar() as con:
-            con.execute("INSERT INTO accounts (name,type,initial_balance) VALUES (?,?,?)", ("Conta Principal", "BANK", 0))
-            con.execute("INSERT INTO accounts (name,type,initial_balance) VALUES (?,?,?)", ("Carteira", "CASH", 0))
-            con.commit()
-
-    # cria conta Reserva/Investimentos se não existir
-    with conectar() as con:
-        exists = con.execute(
-            "SELECT COUNT(*) FROM accounts WHERE LOWER(name)=LOWER(?)",
-            ("Reserva/Investimentos",)
-        ).fetchone()[0]
-        if exists == 0:
-            con.execute(
-                "INSERT INTO accounts (name,type,initial_balance) VALUES (?,?,?)",
-                ("Reserva/Investimentos", "BANK", 0)
-            )
-        con.commit()
-
-    if g == 0:
-        with conectar() as con:
-            con.execute("INSERT INTO goals (name, monthly_target) VALUES (?,?)", ("Economia do mês", 0))
-            con.commit()
-
-    if c == 0:
-        default_discretionary = ["delivery", "bar", "compras", "streamings", "jogos"]
-        with conectar() as con:
-            for cat in default_discretionary:
-                con.execute(
-                    "INSERT OR IGNORE INTO category_rules (category, class) VALUES (?,?)",
-                    (cat, "DISCRETIONARY")
-                )
-            con.commit()
-
-
-# =========================
-# Loaders
-# =========================
-def carregar_accounts():
-    with conectar() as con:
-        return pd.read_sql_query("SELECT * FROM accounts ORDER BY id", con)
-
-
-def carregar_cards():
-    with conectar() as con:
-        return pd.read_sql_query("SELECT * FROM cards ORDER BY id", con)
-
-
-def carregar_goals():
-    with conectar() as con:
-        return pd.read_sql_query("SELECT * FROM goals ORDER BY id", con)
-
-
-def carregar_recurrences():
-    with conectar() as con:
-        return pd.read_sql_query("SELECT * FROM recurrences ORDER BY id DESC", con)
-
-
-def carregar_long_goal():
-    with conectar() as con:
-        return pd.read_sql_query("SELECT * FROM long_goals WHERE active=1 ORDER BY id DESC LIMIT 1", con)
-
-
-def carregar_category_rules():
-    with conectar() as con:
-        return pd.read_sql_query("SELECT category, class FROM category_rules ORDER BY category", con)
-
-
-def carregar_transactions():
-    with conectar() as con:
-        df = pd.read_sql_query("SELECT * FROM transactions ORDER BY dt DESC, id DESC", con)
-
-    df["dt"] = to_dt(df["dt"])
-    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
-    for c in ["category", "description", "statement_month"]:
-        df[c] = df[c].fillna("")
-    for c in ["installments_total", "installment_no", "recurrence_id"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    return df
-
-
-def carregar_transfers():
-    with conectar() as con:
-        df = pd.read_sql_query("SELECT * FROM transfers ORDER BY dt DESC, id DESC", con)
-    df["dt"] = to_dt(df["dt"])
-    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
-    df["description"] = df["description"].fillna("")
-    return df
-
-
-# =========================
-# Core functions
+# Tarefas em segundo plano
 # =========================
-def add_transaction(dt_: date, kind: str, amount: float, category: str, description: str,
-                    status: str, method: str, account_id=None, card_id=None, statement_month=None,
-                    installments_total=None, installment_no=None, recurrence_id=None):
-    with conectar() as con:
-        con.execute("""
-            INSERT INTO transactions
-            (dt, kind, amount, category, description, status, method, account_id, card_id, statement_month,
-             installments_total, installment_no, recurrence_id)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """, (
-            dt_.isoformat(),
-            kind,
-            float(amount),
-            category or None,
-            description or None,
-            status,
-            method,
-            int(account_id) if account_id else None,
-            int(card_id) if card_id else None,
-            statement_month or None,
-            int(installments_total) if installments_total else None,
-            int(installment_no) if installment_no else None,
-            int(recurrence_id) if recurrence_id else None,
-        ))
-        con.commit()
-
-
-def delete_transaction(tx_id: int):
-    with conectar() as con:
-        con.execute("DELETE FROM transactions WHERE id=?", (int(tx_id),))
-        con.commit()
-
-
-def add_transfer(dt_: date, amount: float, from_account_id: int, to_account_id: int, description: str, status: str):
-    with conectar() as con:
-        con.execute("""
-            INSERT INTO transfers (dt, amount, from_account_id, to_account_id, description, status)
-            VALUES (?,?,?,?,?,?)
-        """, (dt_.isoformat(), float(amount), int(from_account_id), int(to_account_id), description or None, status))
-        con.commit()
-
-
-def delete_transfer(transfer_id: int):
-    with conectar() as con:
-        con.execute("DELETE FROM transfers WHERE id=?", (int(transfer_id),))
-        con.commit()
-
-
-def atualizar_cartao(card_id: int, name: str, closing_day: int, due_day: int, pay_account_id: int, last4: str):
-    with conectar() as con:
-        con.execute("""
-            UPDATE cards
-            SET name=?, closing_day=?, due_day=?, pay_account_id=?, last4=?
-            WHERE id=?
-        """, (name.strip(), int(closing_day), int(due_day), int(pay_account_id), (last4 or "").strip(), int(card_id)))
-        con.commit()
-
-
-def calc_account_balance(account_id: int, tx: pd.DataFrame, accounts: pd.DataFrame) -> float:
-    init = float(accounts.loc[accounts["id"] == account_id, "initial_balance"].iloc[0])
-    df = tx[tx["status"] == "PAID"].copy()
-
-    df_bank = df[(df["method"].isin(["BANK", "CASH"])) & (df["account_id"] == account_id)]
-    incomes = df_bank[df_bank["kind"] == "INCOME"]["amount"].sum()
-    expenses = df_bank[df_bank["kind"] == "EXPENSE"]["amount"].sum()
-
-    df_pay = df[(df["method"] == "CARD_PAYMENT") & (df["account_id"] == account_id)]
-    pay_out = df_pay["amount"].sum()
-
-    tr = carregar_transfers()
-    tr_paid = tr[tr["status"] == "PAID"]
-    out_tr = tr_paid[tr_paid["from_account_id"] == account_id]["amount"].sum()
-    in_tr = tr_paid[tr_paid["to_account_id"] == account_id]["amount"].sum()
-
-    return init + float(incomes) - float(expenses) - float(pay_out) - float(out_tr) + float(in_tr)
-
-
-def card_statement_detail(card_id: int, statement_month: str, tx: pd.DataFrame) -> pd.DataFrame:
-    return tx[(tx["method"] == "CARD") & (tx["card_id"] == card_id) & (tx["statement_month"] == statement_month)].copy()
-
-
-def card_statement_total(card_id: int, statement_month: str, tx: pd.DataFrame) -> float:
-    return float(card_statement_detail(card_id, statement_month, tx)["amount"].sum())
-
-
-def create_installments_on_card(dt_: date, total_amount: float, n: int, category: str, description: str,
-                                card_id: int, closing_day: int, status: str):
-    # Divide total em n parcelas, ajustando centavos na última
-    per = round(float(total_amount) / int(n), 2)
-    amounts = [per] * n
-    diff = round(float(total_amount) - sum(amounts), 2)
-    amounts[-1] = round(amounts[-1] + diff, 2)
-
-    first_stmt = compute_statement_month(dt_, closing_day)
-    for i in range(1, n + 1):
-        stmt = ym_add(first_stmt, i - 1)
-        add_transaction(
-            dt_=dt_,
-            kind="EXPENSE",
-            amount=amounts[i - 1],
-            category=category,
-            description=f"{description} ({i}/{n})" if description else f"Parcela ({i}/{n})",
-            status=status,
-            method="CARD",
-            card_id=card_id,
-            statement_month=stmt,
-            installments_total=n,
-            installment_no=i
-        )
-
-
-def run_recurrences_for_month(target_ym: str):
-    rec = carregar_recurrences()
-    if rec.empty:
-        return 0
-
-    tx = carregar_transactions()
-    start, end = month_range(target_ym)
-    start_ts = pd.Timestamp(start)
-    end_ts = pd.Timestamp(end) + pd.Timedelta(days=1)  # exclusivo
-
-    existing_ids = set(
-        tx[(tx["dt"] >= start_ts) & (tx["dt"] < end_ts)]["recurrence_id"].dropna().astype(int).tolist()
-    )
-
-    created = 0
-    cards = carregar_cards()
-
-    for _, r in rec[rec["active"] == 1].iterrows():
-        rid = int(r["id"])
-        if rid in existing_ids:
-            continue
-
-        y, m = map(int, target_ym.split("-"))
-        day = int(r["day_of_month"])
-        dt_ = date(y, m, day)
-
-        method = r["method"]
-        kind = r["kind"]
-        amount = float(r["amount"])
-        category = r["category"] or ""
-        desc = r["description"] or r["name"] or "Recorrência"
-
-        if method in ["BANK", "CASH"]:
-            add_transaction(dt_, kind, amount, category, desc, "PAID", method,
-                            account_id=int(r["account_id"]) if r["account_id"] else None,
-                            recurrence_id=rid)
-            created += 1
-        else:
-            if r["card_id"] and not cards.empty:
-                cid = int(r["card_id"])
-                closing_day = int(cards.loc[cards["id"] == cid, "closing_day"].iloc[0])
-                stmt = compute_statement_month(dt_, closing_day)
-                add_transaction(dt_, "EXPENSE", amount, category, desc, "PAID", "CARD",
-                                card_id=cid, statement_month=stmt, recurrence_id=rid)
-                created += 1
-
-    return created
-
+JOB_LABELS = {
+    "recurrences": "Recorrências",
+    "import_csv": "Importação CSV",
+    "rebuild_balances": "Reconstrução de saldos",
+}
+JOB_STATUS = {
+    "QUEUED": "⏳ Na fila",
+    "RUNNING": "⚙️ Executando",
+    "DONE": "✅ Concluída",
+    "FAILED": "❌ Falhou",
+    "CANCELLED": "🚫 Cancelada",
+}
+IMPORT_DIR = Path("imports")
+ADJUST_LABELS = {"NONE": "Mantém o dia", "PREV": "Dia útil anterior", "NEXT": "Próximo dia útil"}
+ADJUST_CAPTION = {"NONE": "", "PREV": ", ou dia útil anterior", "NEXT": ", ou próximo dia útil"}
+ENTRY_LABELS = {"INCOME": "Entrada", "EXPENSE": "Saída", "CARD_PAYMENT": "Pag. Cartão",
+                "TRANSFER_OUT": "Transferência enviada", "TRANSFER_IN": "Transferência recebida"}
+
+
+def render_jobs(kinds: list, key: str):
+    jobs = [j for j in list_jobs(50) if j["kind"] in kinds][:5]
+    if not jobs:
+        return
 
-# =========================
-# Long goal + category rules
-# =========================
-def salvar_long_goal(name: str, target_amount: float, start_date: date, end_date: date, start_amount: float):
-    with conectar() as con:
-        con.execute("UPDATE long_goals SET active=0 WHERE active=1")
-        con.execute("""
-            INSERT INTO long_goals (name, target_amount, start_date, end_date, start_amount, active)
-            VALUES (?,?,?,?,?,1)
-        """, (name.strip(), float(target_amount), start_date.isoformat(), end_date.isoformat(), float(start_amount)))
-        con.commit()
-
-
-def calc_long_goal_plan(goal_row: dict, tx: pd.DataFrame) -> dict:
-    start_date = pd.to_datetime(goal_row["start_date"]).date()
-    end_date = pd.to_datetime(goal_row["end_date"]).date()
-    target_amount = float(goal_row["target_amount"])
-    start_amount = float(goal_row["start_amount"])
-
-    total_months = max(1, months_between(start_date, end_date))
-
-    start_ts = pd.Timestamp(start_date)
-    end_ts = pd.Timestamp(end_date) + pd.Timedelta(days=1)
-    period = tx[(tx["dt"] >= start_ts) & (tx["dt"] < end_ts) & (tx["status"] == "PAID")].copy()
-
-    income = float(period[period["kind"] == "INCOME"]["amount"].sum())
-    out_bank_cash = float(period[(period["kind"] == "EXPENSE") & (period["method"].isin(["BANK", "CASH"]))]["amount"].sum())
-    card_pay = float(period[(period["method"] == "CARD_PAYMENT")]["amount"].sum())
-    saved_so_far = income - out_bank_cash - card_pay
-
-    current_amount = start_amount + saved_so_far
-    remaining = max(0.0, target_amount - current_amount)
-    need_per_month = remaining / total_months if total_months else remaining
-    progress = 0.0 if target_amount <= 0 else min(1.0, max(0.0, current_amount / target_amount))
-
-    return {
-        "start_date": start_date,
-        "end_date": end_date,
-        "total_months": total_months,
-        "target_amount": target_amount,
-        "start_amount": start_amount,
-        "saved_so_far": saved_so_far,
-        "current_amount": current_amount,
-        "remaining": remaining,
-        "need_per_month": need_per_month,
-        "progress": progress
-    }
-
-
-def current_month_savings(tx: pd.DataFrame, ym: str) -> float:
-    start, end = month_range(ym)
-    start_ts = pd.Timestamp(start)
-    end_ts = pd.Timestamp(end) + pd.Timedelta(days=1)
+    st.markdown("##### Tarefas")
+    for j in jobs:
+        c1, c2 = st.columns([5, 1])
+        with c1:
+            st.progress(float(j["progress"] or 0),
+                        text=f"#{j['id']} {JOB_LABELS.get(j['kind'], j['kind'])} — "
+                             f"{JOB_STATUS.get(j['status'], j['status'])} {j['message'] or ''}")
+        with c2:
+            if j["status"] in ("QUEUED", "RUNNING"):
+                st.button("Cancelar", key=f"{key}_cancel_{j['id']}", on_click=cancel_job, args=(j["id"],),
+                          disabled=bool(j["cancel_requested"]), use_container_width=True)
 
-    month_paid = tx[(tx["dt"] >= start_ts) & (tx["dt"] < end_ts) & (tx["status"] == "PAID")].copy()
-    income = float(month_paid[month_paid["kind"] == "INCOME"]["amount"].sum())
-    out_bank_cash = float(month_paid[(month_paid["kind"] == "EXPENSE") & (month_paid["method"].isin(["BANK", "CASH"]))]["amount"].sum())
-    card_pay = float(month_paid[(month_paid["method"] == "CARD_PAYMENT")]["amount"].sum())
-    return income - out_bank_cash - card_pay
+    if any(j["status"] in ("QUEUED", "RUNNING") for j in jobs):
+        st.button("🔄 Atualizar", key=f"{key}_refresh")
 
 
-def is_discretionary(category: str, rules_df: pd.DataFrame) -> bool:
-    cat = (category or "").strip().lower()
-    if not cat or rules_df.empty:
-        return False
-    hit = rules_df[rules_df["category"].str.lower() == cat]
-    if hit.empty:
-        return False
-    return hit.iloc[0]["class"] == "DISCRETIONARY"
+# polling automático onde o Streamlit suporta fragments
+render_jobs = _fragment(render_jobs, run_every=2)
 
 
 # =========================
@@ -633,6 +164,10 @@ def is_discretionary(category: str, rules_df: pd.DataFrame) -> bool:
 ensure_schema()
 seed_if_empty()
 
+if "jobs_resumed" not in st.session_state:
+    resume_pending_jobs()
+    st.session_state.jobs_resumed = True
+
 st.title("💳 Finanças Pessoais")
 st.caption("Contas, cartão de crédito, metas, recorrências, parcelamentos, transferências e relatórios.")
 
@@ -651,20 +186,18 @@ tabs = st.tabs([
 # =========================
 # Dashboard (modelo 1.0)
 # =========================
-with tabs[0]:
-    tx = carregar_transactions()
-    cards = carregar_cards()
-    accounts = carregar_accounts()
+# Cada bloco é um fragment (o rerun de um widget dele refaz só o bloco) e lê
+# cálculos cacheados por (mês, data_version): trocar o mês refaz só os blocos
+# do mês; os saldos não dependem do mês e ficam fora desse rerun.
+BADGE_FMT = {"HIGH": "🔴 Alto ({:.1f}%)", "WARN": "🟡 Atenção ({:.1f}%)", "OK": "🟢 Ok ({:.1f}%)"}
 
-    hoje = date.today()
-    hoje_ym = hoje.strftime("%Y-%m")
+
+@_fragment
+def dash_mes():
+    hoje_ym = date.today().strftime("%Y-%m")
 
     # meses do filtro: meses por dt + meses por statement_month + mês atual
-    all_months = sorted(
-        {d.strftime("%Y-%m") for d in pd.to_datetime(tx["dt"], errors="coerce").dropna()}
-        | set(tx.loc[(tx["method"] == "CARD") & (tx["statement_month"] != ""), "statement_month"].astype(str).tolist())
-        | {hoje_ym}
-    )
+    all_months = sorted(set(meses_disponiveis()) | {hoje_ym})
 
     ym = st.selectbox(
         "📅 Mês",
@@ -674,19 +207,9 @@ with tabs[0]:
         key="dash_month"
     )
 
-    # Fluxo de caixa do mês (por dt)
-    start, end = month_range(ym)
-    start_ts = pd.Timestamp(start)
-    end_ts = pd.Timestamp(end) + pd.Timedelta(days=1)
-
-    month_paid = tx[(tx["status"] == "PAID") & (tx["dt"] >= start_ts) & (tx["dt"] < end_ts)].copy()
-
-    income = float(month_paid[month_paid["kind"] == "INCOME"]["amount"].sum())
-    expense_bank = float(
-        month_paid[(month_paid["kind"] == "EXPENSE") & (month_paid["method"].isin(["BANK", "CASH"]))]["amount"].sum()
-    )
-    card_pay = float(month_paid[month_paid["method"] == "CARD_PAYMENT"]["amount"].sum())
-    economy = income - expense_bank - card_pay
+    # Fluxo de caixa do mês (por dt) e faturas do mês (por statement_month), todas de uma vez
+    d = dashboard_mes(ym)
+    income, expense_bank, card_pay, economy = d["income"], d["expense_bank"], d["card_pay"], d["economy"]
 
     # BLOCO 1 — métricas
     if mobile_mode:
@@ -703,152 +226,188 @@ with tabs[0]:
         c3.metric("💳 Pagamentos de fatura", fmt_currency(card_pay))
         c4.metric("📈 Economia", fmt_currency(economy))
 
+    if economy < 0:
+        st.error("🚨 Você gastou mais do que ganhou neste mês.")
+    elif economy == 0:
+        st.info("ℹ️ Mês zerado. Não houve economia.")
+    else:
+        st.success("✅ Você conseguiu economizar neste mês.")
+
+    # níveis e anomalias já calculados pelo motor (recalculados a cada escrita, não a cada rerun)
+    alerts = alerts_for_month(ym)
+    anomalias = anomalias_mes(ym)
+
+    st.divider()
+    dash_cartoes(d, alerts)
     st.divider()
+    dash_insights(d, alerts, anomalias)
 
+
+@_fragment
+def dash_cartoes(d: dict, alerts: pd.DataFrame):
     # BLOCO 2 — cartões
     st.subheader("💳 Cartões do mês")
-
-    WARN_PCT = 20.0
-    HIGH_PCT = 30.0
+    income = d["income"]
+    card_alerts = {int(r.target): r for r in alerts[alerts["scope"] == "CARD"].itertuples(index=False)}
 
     if income <= 0:
         st.warning("⚠️ Nenhuma renda registrada neste mês (as porcentagens dos cartões ficam desativadas).")
 
-    if cards.empty:
+    if not d["cards"]:
         st.info("Nenhum cartão cadastrado.")
-    else:
-        per_row = 1 if mobile_mode else 3
-        grid = st.columns(per_row)
+        return
 
-        for i, row in enumerate(cards.itertuples(index=False)):
-            total_stmt = card_statement_total(row.id, ym, tx)
-            last4 = getattr(row, "last4", "") or "----"
+    per_row = 1 if mobile_mode else 3
+    grid = st.columns(per_row)
 
-            if income > 0:
-                pct = (total_stmt / income) * 100
-                if pct >= HIGH_PCT:
-                    badge = f"🔴 Alto ({pct:.1f}%)"
-                elif pct >= WARN_PCT:
-                    badge = f"🟡 Atenção ({pct:.1f}%)"
-                else:
-                    badge = f"🟢 Ok ({pct:.1f}%)"
-            else:
-                badge = "⚪ Sem renda"
-
-            with grid[i % per_row]:
-                st.markdown(
-                    f"""
-                    <div style="
-                        border-radius: 16px;
-                        padding: 16px;
-                        border: 1px solid rgba(255,255,255,0.10);
-                        background: rgba(255,255,255,0.035);
-                        margin-bottom: 12px;
-                    ">
-                        <div style="display:flex; justify-content:space-between; align-items:center; gap:10px;">
-                            <div style="font-weight:700; font-size:16px;">💳 {row.name}</div>
-                            <div style="font-size:12px; opacity:0.95;">{badge}</div>
-                        </div>
-                        <div style="opacity:0.70; margin-top:2px;">Final •••• {last4}</div>
-                        <div style="margin-top:10px; font-size:13px; opacity:0.75;">Fatura do mês</div>
-                        <div style="font-size:22px; font-weight:800;">{fmt_currency(total_stmt)}</div>
+    for i, c in enumerate(d["cards"]):
+        alert = card_alerts.get(c["id"])
+        if alert is not None and pd.notna(alert.pct):
+            badge = BADGE_FMT[alert.level].format(alert.pct)
+        else:
+            badge = "⚪ Sem renda" if income <= 0 else "⚪ Sem regra"
+
+        if c.get("limit"):
+            limit_html = (f'<div style="margin-top:8px; font-size:13px; opacity:0.80;">Disponível '
+                          f'<b>{fmt_currency(c["available"])}</b> de {fmt_currency(c["limit"])} '
+                          f'({c["used_pct"]:.0f}% usado)</div>')
+        else:
+            limit_html = ""
+
+        with grid[i % per_row]:
+            st.markdown(
+                f"""
+                <div style="
+                    border-radius: 16px;
+                    padding: 16px;
+                    border: 1px solid rgba(255,255,255,0.10);
+                    background: rgba(255,255,255,0.035);
+                    margin-bottom: 12px;
+                ">
+                    <div style="display:flex; justify-content:space-between; align-items:center; gap:10px;">
+                        <div style="font-weight:700; font-size:16px;">💳 {c["name"]}</div>
+                        <div style="font-size:12px; opacity:0.95;">{badge}</div>
                     </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+                    <div style="opacity:0.70; margin-top:2px;">Final •••• {c["last4"]}</div>
+                    <div style="margin-top:10px; font-size:13px; opacity:0.75;">Fatura do mês</div>
+                    <div style="font-size:22px; font-weight:800;">{fmt_currency(c["total"])}</div>
+                    {limit_html}
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
 
-    st.divider()
 
+@_fragment
+def dash_insights(d: dict, alerts: pd.DataFrame, anomalias: pd.DataFrame):
     # BLOCO 3 — insights
     st.subheader("🧠 Insights do mês (cartões)")
+    income = d["income"]
+    card_alerts = {int(r.target): r for r in alerts[alerts["scope"] == "CARD"].itertuples(index=False)}
 
-    if cards.empty:
+    if not d["cards"]:
         st.info("Cadastre cartões para ver insights.")
     else:
-        rows = []
-        for row in cards.itertuples(index=False):
-            total_stmt = float(card_statement_total(row.id, ym, tx))
-            last4 = getattr(row, "last4", "") or "----"
-            pct = (total_stmt / income) * 100 if income > 0 else None
-            rows.append({
-                "Cartão": f"{row.name} •••• {last4}",
-                "Total": total_stmt,
-                "% da renda": pct
-            })
-
-        df_cards = pd.DataFrame(rows).sort_values("Total", ascending=False)
+        df_cards = pd.DataFrame([
+            {"Cartão": f"{c['name']} •••• {c['last4']}", "Total": c["total"], "% da renda": c["pct"]}
+            for c in d["cards"]
+        ]).sort_values("Total", ascending=False)
         if df_cards["Total"].sum() <= 0:
             st.info("Sem gastos em cartão neste mês.")
         else:
-            top3 = df_cards.head(3).copy()
-            top3_view = top3.copy()
+            top3_view = df_cards.head(3).copy()
             top3_view["Total"] = top3_view["Total"].map(fmt_currency)
             top3_view["% da renda"] = top3_view["% da renda"].map(lambda x: "—" if pd.isna(x) else f"{x:.1f}%")
             st.dataframe(top3_view, use_container_width=True, hide_index=True)
 
             if income > 0:
-                high = df_cards[df_cards["% da renda"] >= HIGH_PCT]
-                warn = df_cards[(df_cards["% da renda"] >= WARN_PCT) & (df_cards["% da renda"] < HIGH_PCT)]
+                card_name = {c["id"]: f"{c['name']} •••• {c['last4']}" for c in d["cards"]}
+                high = [a for a in card_alerts.values() if a.level == "HIGH"]
+                warn = [a for a in card_alerts.values() if a.level == "WARN"]
 
-                if high.empty and warn.empty:
-                    st.success("✅ Seus cartões estão em zona verde/ok (nenhum acima de 20% da renda).")
+                if not high and not warn:
+                    st.success("✅ Seus cartões estão em zona verde/ok (nenhum acima do limite de atenção).")
                 else:
-                    if not high.empty:
-                        st.markdown("**🔴 Cartões em nível Alto (≥ 30%)**")
-                        for _, r in high.iterrows():
-                            limit_high = (HIGH_PCT / 100) * income
-                            limit_warn = (WARN_PCT / 100) * income
-                            reduce_to_high = max(0.0, float(r["Total"]) - limit_high)
-                            reduce_to_warn = max(0.0, float(r["Total"]) - limit_warn)
+                    if high:
+                        st.markdown("**🔴 Cartões em nível Alto**")
+                        for a in high:
+                            reduce_to_high = max(0.0, a.value - a.high_pct / 100 * a.base)
+                            reduce_to_warn = max(0.0, a.value - a.warn_pct / 100 * a.base)
                             st.write(
-                                f"- **{r['Cartão']}**: {r['% da renda']:.1f}% "
-                                f"→ reduzir **{fmt_currency(reduce_to_high)}** para ficar < 30% "
-                                f"(e **{fmt_currency(reduce_to_warn)}** para ficar < 20%)."
+                                f"- **{card_name.get(int(a.target), a.target)}**: {a.pct:.1f}% "
+                                f"→ reduzir **{fmt_currency(reduce_to_high)}** para ficar < {a.high_pct:.0f}% "
+                                f"(e **{fmt_currency(reduce_to_warn)}** para ficar < {a.warn_pct:.0f}%)."
                             )
-                    if not warn.empty:
-                        st.markdown("**🟡 Cartões em Atenção (≥ 20%)**")
-                        for _, r in warn.iterrows():
-                            limit_warn = (WARN_PCT / 100) * income
-                            reduce_to_warn = max(0.0, float(r["Total"]) - limit_warn)
+                    if warn:
+                        st.markdown("**🟡 Cartões em Atenção**")
+                        for a in warn:
+                            reduce_to_warn = max(0.0, a.value - a.warn_pct / 100 * a.base)
                             st.write(
-                                f"- **{r['Cartão']}**: {r['% da renda']:.1f}% "
-                                f"→ reduzir **{fmt_currency(reduce_to_warn)}** para ficar < 20%."
+                                f"- **{card_name.get(int(a.target), a.target)}**: {a.pct:.1f}% "
+                                f"→ reduzir **{fmt_currency(reduce_to_warn)}** para ficar < {a.warn_pct:.0f}%."
                             )
             else:
                 st.info("Lance uma entrada (ex: salário) para habilitar alertas por % da renda.")
 
-    st.divider()
+    cat_alerts = alerts[(alerts["scope"] == "CATEGORY") & (alerts["level"] != "OK")]
+    if not cat_alerts.empty:
+        st.markdown("**🏷️ Categorias acima do limite**")
+        for a in cat_alerts.itertuples(index=False):
+            icon = "🔴" if a.level == "HIGH" else "🟡"
+            st.write(f"- {icon} **{a.target}**: {fmt_currency(a.value)} ({a.pct:.1f}% da renda, limite {a.warn_pct:.0f}%)")
+
+    if not anomalias.empty:
+        st.markdown("**🔎 Gastos fora do padrão**")
+        reg = registro_atual()
+
+        def origem(src: str) -> str:
+            nomes = reg.card_labels if src.startswith("C") else reg.account_names
+            return nomes.get(int(src[1:]), src)
+
+        for a in anomalias.itertuples(index=False):
+            if a.kind == "SPIKE":
+                st.write(f"- 📈 **{a.category or 'sem categoria'}** em {origem(a.source)}: {fmt_currency(a.value)} "
+                         f"({a.score:.1f}× a mediana de {fmt_currency(a.baseline)} dos {JANELA} meses anteriores)")
+            else:
+                st.write(f"- 👯 Possível compra duplicada em {origem(a.source)}: {fmt_currency(a.value)} "
+                         f"({a.detail})")
 
-    # BLOCO 4 — saldos
+
+@_fragment
+def dash_saldos():
+    # BLOCO 4 — saldos (não depende do mês)
     st.subheader("🏦 Saldos das contas")
-    bal_rows = [{"Conta": a["name"], "Tipo": a["type"], "Saldo": calc_account_balance(int(a["id"]), tx, accounts)}
-                for _, a in accounts.iterrows()]
-    df_bal = pd.DataFrame(bal_rows)
-    df_bal["Saldo"] = df_bal["Saldo"].map(fmt_currency)
+    accounts = carregar_accounts()
+    saldos = saldos_atuais()
+    df_bal = pd.DataFrame({
+        "Conta": accounts["name"],
+        "Tipo": accounts["type"],
+        "Saldo": accounts["id"].astype(int).map(saldos).map(fmt_currency),
+    })
     st.dataframe(df_bal, use_container_width=True, hide_index=True)
 
-    # Aviso final do mês
-    if economy < 0:
-        st.error("🚨 Você gastou mais do que ganhou neste mês.")
-    elif economy == 0:
-        st.info("ℹ️ Mês zerado. Não houve economia.")
-    else:
-        st.success("✅ Você conseguiu economizar neste mês.")
+
+with tabs[0]:
+    instr.secao("Dashboard")
+    dash_mes()
+    st.divider()
+    dash_saldos()
 
 
 # =========================
 # Lançamentos + Transferências
 # =========================
 with tabs[1]:
+    instr.secao("Lançamentos")
     st.subheader("Adicionar lançamento")
 
     accounts = carregar_accounts()
     cards = carregar_cards()
-    rules = carregar_category_rules()
     tx = carregar_transactions()
 
-    acc_map = map_accounts(accounts)
-    card_map = map_cards(cards)
+    reg = registro_atual()
+    acc_map = reg.account_names
+    card_map = reg.card_labels
 
     with st.form("form_lancamento", clear_on_submit=False):
         colA, colB, colC, colD = st.columns(4) if not mobile_mode else (st.columns(2) + st.columns(2))
@@ -878,9 +437,26 @@ with tabs[1]:
             with col3:
                 description = st.text_input("Descrição", placeholder="Opcional")
 
-        if (category or "").strip() and is_discretionary(category, rules):
+        if (category or "").strip() and reg.is_discretionary(category):
             st.info("🏷️ Categoria classificada como **Discricionária** (pode gerar alerta na meta por prazo).")
 
+        # sem categoria: a regra de categorização que add_transaction vai aplicar
+        cat_efetiva = category
+        if not (category or "").strip() and (description or "").strip():
+            sugestao = classificador_atual().classificar_um(description, float(amount), kind)
+            if sugestao:
+                cat_efetiva = sugestao.category
+                st.caption(f"🤖 Sem categoria: vai como **{sugestao.category}** (regra de categorização).")
+
+        # envelope da categoria: leitura pela chave (categoria, mês), sem varrer os lançamentos
+        envelope = budget_remaining(cat_efetiva, dt_.strftime("%Y-%m")) if kind == "EXPENSE" else None
+        if envelope:
+            after = envelope["remaining"] - float(amount)
+            msg = (f"💰 Envelope **{envelope['category']}** em {fmt_month_br(dt_.strftime('%Y-%m'))}: "
+                   f"resta **{fmt_currency(envelope['remaining'])}** de {fmt_currency(envelope['available'])}"
+                   f" → após este lançamento: **{fmt_currency(after)}**")
+            (st.warning if after < 0 else st.caption)(msg)
+
         account_id = None
         card_id = None
         statement_month = None
@@ -906,28 +482,21 @@ with tabs[1]:
                     cards["id"].tolist(),
                     format_func=lambda i: card_map.get(int(i), str(i))
                 )
-                closing_day = int(cards.loc[cards["id"] == card_id, "closing_day"].iloc[0])
+                closing_day = reg.card(card_id).closing_day
                 installments_total = st.number_input("Parcelas", min_value=1, max_value=36, value=1, step=1)
-                statement_month = compute_statement_month(dt_, closing_day)
-                st.caption(f"📌 Vai para a fatura: **{fmt_month_br(statement_month)}** (fechamento dia {closing_day})")
-
-        # alerta meta por prazo (gastos discricionários)
-        lg = carregar_long_goal()
-        if kind == "EXPENSE" and status == "PAID" and (category or "").strip() and not lg.empty and is_discretionary(category, rules):
-            goal_row = lg.iloc[0].to_dict()
-            plan = calc_long_goal_plan(goal_row, tx)
-            required_per_month = float(plan["need_per_month"])
-            ym_tx = dt_.strftime("%Y-%m")
-            current_save = current_month_savings(tx, ym_tx)
-
-            if required_per_month > 0 and current_save < required_per_month:
-                gap = required_per_month - current_save
+                statement_month = reg.statement_month(card_id, dt_)
+                st.caption(f"📌 Vai para a fatura: **{fmt_month_br(statement_month)}** (fechamento dia {closing_day}"
+                           f"{ADJUST_CAPTION[reg.card(card_id).closing_adjust]})")
+
+        # alerta metas por prazo (gastos discricionários): consulta ao cache, não recalcula a cada tecla
+        if kind == "EXPENSE" and status == "PAID" and (category or "").strip() and reg.is_discretionary(category):
+            for alert in goal_alerts(dt_.strftime("%Y-%m")):
                 st.warning(
                     f"⚠️ Gasto **discricionário** e você está abaixo do necessário para a meta.\n\n"
-                    f"- Meta: **{goal_row['name']}**\n"
-                    f"- Necessário/mês (média): **{fmt_currency(required_per_month)}**\n"
-                    f"- Economia do mês (estimada): **{fmt_currency(current_save)}**\n"
-                    f"- Falta para bater a média: **{fmt_currency(gap)}**\n\n"
+                    f"- Meta: **{alert['name']}**\n"
+                    f"- Necessário/mês (média): **{fmt_currency(alert['need_per_month'])}**\n"
+                    f"- Economia do mês (estimada): **{fmt_currency(alert['month_savings'])}**\n"
+                    f"- Falta para bater a média: **{fmt_currency(alert['gap'])}**\n\n"
                     f"💡 Sugestão: compense economizando **+{fmt_currency(float(amount))}** até o fim do mês."
                 )
 
@@ -965,7 +534,7 @@ with tabs[1]:
 
     accounts = carregar_accounts()
     tr = carregar_transfers()
-    acc_map = map_accounts(accounts)
+    acc_map = registro_atual().account_names
 
     if accounts.empty or len(accounts) < 2:
         st.warning("Você precisa de pelo menos 2 contas cadastradas para transferir.")
@@ -1043,8 +612,8 @@ with tabs[1]:
     tx = carregar_transactions()
     accounts = carregar_accounts()
     cards = carregar_cards()
-    acc_map = map_accounts(accounts)
-    card_map = map_cards(cards)
+    acc_map = registro_atual().account_names
+    card_map = registro_atual().card_labels
 
     tx_view = tx.copy()
     tx_view["Data"] = tx_view["dt"].apply(fmt_date_br)
@@ -1056,17 +625,13 @@ with tabs[1]:
     tx_view["Conta"] = tx_view["account_id"].fillna(0).astype(int).map(lambda i: acc_map.get(i, "—"))
     tx_view["Cartão"] = tx_view["card_id"].fillna(0).astype(int).map(lambda i: card_map.get(i, "—"))
 
-    tx_view["Parcela"] = tx_view.apply(
-        lambda r: fmt_installment(r.get("installment_no"), r.get("installments_total"), r.get("statement_month")),
-        axis=1
-    )
+    tx_view["Parcela"] = fmt_installments(tx_view["installment_no"], tx_view["installments_total"],
+                                          tx_view["statement_month"])
 
     tx_view["Valor"] = tx_view["amount"].astype(float)
-    tx_view["Total (parcelado)"] = tx_view.apply(
-        lambda r: float(r["amount"]) * int(r["installments_total"])
-        if pd.notna(r.get("installments_total")) and int(r.get("installments_total") or 0) > 1 else float(r["amount"]),
-        axis=1
-    )
+    # total da compra vem do plano de parcelamento; lançamento avulso = o próprio valor
+    plan_total = carregar_installment_plans().set_index("id")["total_amount"]
+    tx_view["Total (parcelado)"] = tx_view["plan_id"].map(plan_total).fillna(tx_view["amount"]).astype(float)
 
     tx_view = tx_view.sort_values(["dt", "id"], ascending=[False, False]).head(200)
 
@@ -1087,46 +652,53 @@ with tabs[1]:
     )
 
     selected_ids = edited.loc[edited["Selecionar"] == True, "id"].astype(int).tolist()
+    # versão de cada linha como foi exibida: se outra sessão mudou no meio, a ação é recusada
+    versions = dict(zip(tx_view["id"].astype(int), tx_view["row_version"].astype(int)))
+
+    def _bulk(action, msg):
+        try:
+            action()
+        except VersionConflict as e:
+            st.error(f"{len(e.ids)} lançamento(s) foram alterados em outra sessão. Nada foi gravado: "
+                     "recarregue a página e confira antes de repetir.")
+            return
+        st.success(msg)
+        st.rerun()
 
     c1, c2, c3 = st.columns(3)
     with c1:
         if st.button("Marcar como pago ✅", use_container_width=True, disabled=(len(selected_ids) == 0), key="btn_paid"):
-            with conectar() as con:
-                con.executemany("UPDATE transactions SET status='PAID' WHERE id=?", [(i,) for i in selected_ids])
-                con.commit()
-            st.success("Atualizado para Pago.")
-            st.rerun()
+            _bulk(lambda: set_transactions_status(selected_ids, "PAID", versions), "Atualizado para Pago.")
 
     with c2:
         if st.button("Marcar como pendente ⏳", use_container_width=True, disabled=(len(selected_ids) == 0), key="btn_pending"):
-            with conectar() as con:
-                con.executemany("UPDATE transactions SET status='PENDING' WHERE id=?", [(i,) for i in selected_ids])
-                con.commit()
-            st.success("Atualizado para Pendente.")
-            st.rerun()
+            _bulk(lambda: set_transactions_status(selected_ids, "PENDING", versions), "Atualizado para Pendente.")
 
     with c3:
         if st.button("Excluir selecionados 🗑️", use_container_width=True, disabled=(len(selected_ids) == 0), key="btn_del"):
-            with conectar() as con:
-                con.executemany("DELETE FROM transactions WHERE id=?", [(i,) for i in selected_ids])
-                con.commit()
-            st.success("Excluídos.")
-            st.rerun()
+            _bulk(lambda: delete_transactions(selected_ids, versions), "Excluídos.")
 
 
 # =========================
 # Cartões (cadastro + edição + faturas)
 # =========================
 with tabs[2]:
+    instr.secao("Cartões")
     st.subheader("💳 Cartões de crédito")
 
     accounts = carregar_accounts()
-    cards = carregar_cards()
 
     st.markdown("### Cadastrar cartão")
     card_name = st.text_input("Nome do cartão", key="card_name")
-    closing_day = st.number_input("Dia de fechamento (1-28)", min_value=1, max_value=28, value=10, key="card_close")
-    due_day = st.number_input("Dia de vencimento (1-28)", min_value=1, max_value=28, value=15, key="card_due")
+    cc1, cc2 = st.columns(2)
+    closing_day = cc1.number_input("Dia de fechamento (1-31; 31 = fim do mês)", min_value=1, max_value=31, value=10,
+                                   key="card_close")
+    closing_adjust = cc2.selectbox("Fechamento em fim de semana/feriado", list(ADJUST_LABELS),
+                                   format_func=ADJUST_LABELS.get, key="card_close_adj")
+    cd1, cd2 = st.columns(2)
+    due_day = cd1.number_input("Dia de vencimento (1-31)", min_value=1, max_value=31, value=15, key="card_due")
+    due_adjust = cd2.selectbox("Vencimento em fim de semana/feriado", list(ADJUST_LABELS),
+                               index=list(ADJUST_LABELS).index("NEXT"), format_func=ADJUST_LABELS.get, key="card_due_adj")
 
     bank_accs = accounts[accounts["type"] == "BANK"]
     pay_acc = None
@@ -1134,10 +706,11 @@ with tabs[2]:
         st.warning("Crie uma conta bancária em 'Contas' primeiro.")
     else:
         pay_acc = st.selectbox("Conta para pagar fatura", bank_accs["id"].tolist(),
-                               format_func=lambda i: bank_accs.loc[bank_accs["id"] == i, "name"].iloc[0],
+                               format_func=lambda i: registro_atual().account_names.get(int(i), str(i)),
                                key="card_pay_acc")
 
     last4 = st.text_input("Final do cartão (4 dígitos)", max_chars=4, placeholder="Ex: 1234", key="card_last4")
+    credit_limit = st.number_input("Limite (0 = não controlar)", min_value=0.0, value=0.0, step=500.0, key="card_limit")
 
     if st.button("Salvar cartão", use_container_width=True, key="card_save"):
         if not card_name.strip():
@@ -1145,71 +718,108 @@ with tabs[2]:
         elif pay_acc is None:
             st.warning("Selecione uma conta bancária para pagar a fatura.")
         else:
-            with conectar() as con:
-                con.execute(
-                    "INSERT INTO cards (name, closing_day, due_day, pay_account_id, last4) VALUES (?,?,?,?,?)",
-                    (card_name.strip(), int(closing_day), int(due_day), int(pay_acc), last4.strip())
-                )
-                con.commit()
+            add_card(card_name, closing_day, due_day, int(pay_acc), last4, closing_adjust, due_adjust, credit_limit)
             st.success("Cartão criado!")
             st.rerun()
 
     st.divider()
     st.markdown("### ✏️ Editar cartão")
 
-    cards = carregar_cards()
-    accounts = carregar_accounts()
-    if cards.empty:
+    reg = registro_atual()
+    if not reg.cards:
         st.info("Nenhum cartão cadastrado.")
     else:
         card_edit_id = st.selectbox(
             "Selecione o cartão",
-            cards["id"].tolist(),
-            format_func=lambda i: cards.loc[cards["id"] == i, "name"].iloc[0],
+            list(reg.cards),
+            format_func=lambda i: reg.cards[i].name,
             key="edit_card_sel"
         )
-        card_row = cards[cards["id"] == card_edit_id].iloc[0]
-
-        new_name = st.text_input("Nome", value=card_row["name"], key="edit_card_name")
-        new_closing = st.number_input("Fechamento", min_value=1, max_value=28,
-                                      value=int(card_row["closing_day"]), key="edit_card_close")
-        new_due = st.number_input("Vencimento", min_value=1, max_value=28,
-                                  value=int(card_row["due_day"]), key="edit_card_due")
-
-        bank_accs = accounts[accounts["type"] == "BANK"].copy()
-        pay_ids = bank_accs["id"].tolist()
-        current_pay = int(card_row["pay_account_id"]) if pd.notna(card_row["pay_account_id"]) else pay_ids[0]
+        card_row = reg.card(card_edit_id)
+
+        new_name = st.text_input("Nome", value=card_row.name, key="edit_card_name")
+        ec1, ec2 = st.columns(2)
+        new_closing = ec1.number_input("Fechamento", min_value=1, max_value=31,
+                                       value=card_row.closing_day, key="edit_card_close")
+        new_closing_adj = ec2.selectbox("Fechamento em fim de semana/feriado", list(ADJUST_LABELS),
+                                        index=list(ADJUST_LABELS).index(card_row.closing_adjust),
+                                        format_func=ADJUST_LABELS.get, key="edit_card_close_adj")
+        ed1, ed2 = st.columns(2)
+        new_due = ed1.number_input("Vencimento", min_value=1, max_value=31,
+                                   value=card_row.due_day, key="edit_card_due")
+        new_due_adj = ed2.selectbox("Vencimento em fim de semana/feriado", list(ADJUST_LABELS),
+                                    index=list(ADJUST_LABELS).index(card_row.due_adjust),
+                                    format_func=ADJUST_LABELS.get, key="edit_card_due_adj")
+
+        pay_ids = [a.id for a in reg.accounts.values() if a.type == "BANK"]
+        current_pay = card_row.pay_account_id if card_row.pay_account_id is not None else pay_ids[0]
         index_pay = pay_ids.index(current_pay) if current_pay in pay_ids else 0
 
         new_pay_acc = st.selectbox(
             "Conta para pagar fatura",
             pay_ids,
             index=index_pay,
-            format_func=lambda i: bank_accs.loc[bank_accs["id"] == i, "name"].iloc[0],
+            format_func=lambda i: reg.account_names[i],
             key="edit_card_pay"
         )
 
-        new_last4 = st.text_input("Final do cartão", value=str(card_row.get("last4", "") or ""), max_chars=4, key="edit_card_last4")
+        new_last4 = st.text_input("Final do cartão", value=card_row.last4, max_chars=4, key="edit_card_last4")
+        new_limit = st.number_input("Limite (0 = não controlar)", min_value=0.0, value=float(card_row.credit_limit or 0),
+                                    step=500.0, key="edit_card_limit")
 
         if st.button("Salvar alterações do cartão 💾", use_container_width=True, key="edit_card_save"):
-            atualizar_cartao(card_edit_id, new_name, new_closing, new_due, int(new_pay_acc), new_last4)
+            atualizar_cartao(card_edit_id, new_name, new_closing, new_due, int(new_pay_acc), new_last4,
+                             new_closing_adj, new_due_adj, new_limit)
             st.success("Cartão atualizado com sucesso!")
             st.rerun()
 
+    with st.expander("📅 Feriados (ajuste de fechamento/vencimento)"):
+        hol = carregar_holidays()
+        if hol.empty:
+            st.caption("Nenhum feriado cadastrado: só sábados e domingos contam como dia não útil.")
+        else:
+            st.dataframe(hol.rename(columns={"dt": "Data", "name": "Feriado"}), use_container_width=True, hide_index=True)
+        h1, h2 = st.columns(2)
+        hol_dt = h1.date_input("Data", value=date.today(), key="hol_dt")
+        hol_name = h2.text_input("Nome", placeholder="Ex: Natal", key="hol_name")
+        b1, b2 = st.columns(2)
+        if b1.button("Adicionar feriado", use_container_width=True, key="hol_add"):
+            salvar_feriado(hol_dt, hol_name)
+            st.rerun()
+        if b2.button("Remover feriado da data", use_container_width=True, key="hol_del"):
+            remover_feriado(hol_dt)
+            st.rerun()
+
     st.divider()
     st.markdown("### Faturas")
 
-    cards = carregar_cards()
     tx = carregar_transactions()
-    accounts = carregar_accounts()
+    reg = registro_atual()
 
-    if cards.empty:
+    if not reg.cards:
         st.info("Cadastre um cartão para ver faturas.")
     else:
-        cid = st.selectbox("Cartão", cards["id"].tolist(),
-                           format_func=lambda i: map_cards(cards).get(int(i), str(i)),
+        cid = st.selectbox("Cartão", list(reg.cards),
+                           format_func=lambda i: reg.card_labels[i],
                            key="stmt_card")
 
+        # limite e em aberto vêm do índice por fatura (mantido a cada escrita), não de uma varredura
+        credit = card_credit()[cid]
+        k1, k2, k3 = st.columns(3)
+        k1.metric("Em aberto (todas as faturas)", fmt_currency(credit["open"]))
+        k2.metric("Limite", fmt_currency(credit["limit"]) if credit["limit"] else "—")
+        k3.metric("Disponível", fmt_currency(credit["available"]) if credit["limit"] else "—",
+                  delta=f"{credit['used_pct']:.0f}% usado" if credit["limit"] else None, delta_color="off")
+        open_stmts = card_open_statements(cid)
+        if open_stmts:
+            with st.expander(f"Faturas com saldo em aberto ({len(open_stmts)})"):
+                st.dataframe(pd.DataFrame([
+                    {"Fatura": fmt_month_br(o["statement_month"]) if o["statement_month"] else "—",
+                     "Compras": fmt_currency(o["charged"]), "Pago": fmt_currency(o["paid"]),
+                     "Em aberto": fmt_currency(o["open"])}
+                    for o in open_stmts
+                ]), use_container_width=True, hide_index=True)
+
         months = sorted(set(tx[(tx["method"] == "CARD") & (tx["card_id"] == cid)]["statement_month"]) - {""})
         stmt = st.selectbox("Fatura", months, index=len(months) - 1, format_func=fmt_month_br, key="stmt_month") if months else None
 
@@ -1220,7 +830,7 @@ with tabs[2]:
             detail = card_statement_detail(cid, stmt, tx).sort_values(["dt", "id"])
             det = detail.copy()
             det["Data"] = det["dt"].apply(fmt_date_br)
-            det["Parcela"] = det.apply(lambda r: fmt_installment(r.get("installment_no"), r.get("installments_total"), r.get("statement_month")), axis=1)
+            det["Parcela"] = fmt_installments(det["installment_no"], det["installments_total"], det["statement_month"])
             det["Valor"] = det["amount"].map(fmt_currency)
 
             st.dataframe(det[["Data", "Valor", "category", "description", "status", "Parcela"]],
@@ -1228,8 +838,8 @@ with tabs[2]:
 
             st.divider()
             st.markdown("### Pagar fatura (lança saída na conta bancária)")
-            pay_acc = int(cards.loc[cards["id"] == cid, "pay_account_id"].iloc[0])
-            acc_name = accounts.loc[accounts["id"] == pay_acc, "name"].iloc[0]
+            pay_acc = reg.card(cid).pay_account_id
+            acc_name = reg.account_names.get(pay_acc, "—")
             st.caption(f"Conta de pagamento configurada: **{acc_name}**")
 
             pay_date = st.date_input("Data do pagamento", value=date.today(), key="pay_date")
@@ -1241,18 +851,91 @@ with tabs[2]:
                 st.success("Pagamento registrado!")
                 st.rerun()
 
+    st.divider()
+    st.markdown("### Parcelamentos")
+    plans = installment_plans()
+    active = plans[plans["remaining_n"] > 0]
+    if active.empty:
+        st.info("Nenhum parcelamento com parcelas a vencer.")
+    else:
+        sched = installment_schedule()
+        piv = sched.pivot(index="card_id", columns="statement_month", values="amount").fillna(0.0)
+        piv.index = [reg.card_labels.get(int(i), str(i)) for i in piv.index]
+        piv.columns = [fmt_month_br(m) for m in piv.columns]
+        st.caption("Compromisso futuro por cartão e fatura (parcelas a vencer, a partir do mês atual).")
+        st.dataframe(piv.map(fmt_currency), use_container_width=True)
+
+        plan_label = {
+            int(r.plan_id): f"{r.description if isinstance(r.description, str) and r.description else 'Parcelado'}"
+                            f" • {fmt_date_br(r.dt)} • {reg.card_labels.get(int(r.card_id), '—')}"
+            for r in active.itertuples(index=False)
+        }
+        st.dataframe(pd.DataFrame({
+            "Compra": active["plan_id"].map(plan_label),
+            "Total": active["total_amount"].map(fmt_currency),
+            "Parcelas a vencer": active["remaining_n"].astype(int).astype(str) + " de " + active["n"].astype(int).astype(str),
+            "Em aberto": active["remaining"].map(fmt_currency),
+            "Próxima": active["next_month"].map(fmt_month_br),
+            "Última": active["last_month"].map(fmt_month_br),
+        }), use_container_width=True, hide_index=True)
+
+        with st.expander("⏩ Simular antecipação (quitação)"):
+            sel = st.multiselect("Parcelamentos (vazio = todos)", list(plan_label), format_func=plan_label.get,
+                                 key="payoff_plans")
+            c1, c2 = st.columns(2)
+            payoff_ym = c1.text_input("Quitar na fatura (YYYY-MM)", value=date.today().strftime("%Y-%m"), key="payoff_ym")
+            taxa = c2.number_input("Desconto por antecipação (% ao mês)", min_value=0.0, max_value=20.0, value=0.0,
+                                   step=0.1, key="payoff_taxa")
+            try:
+                parse_mes_key(payoff_ym)
+            except ValueError:
+                st.error("Mês inválido. Use o formato YYYY-MM.")
+            else:
+                sc = payoff_scenario(sel or None, payoff_ym, taxa)
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Parcelas antecipadas", fmt_currency(sc["nominal"]))
+                m2.metric(f"A pagar em {fmt_month_br(payoff_ym)}", fmt_currency(sc["valor"]))
+                m3.metric("Economia", fmt_currency(sc["economia"]))
+                if sel and sc["nominal"] > 0 and st.button("Aplicar antecipação ✅", use_container_width=True,
+                                                           key="payoff_apply"):
+                    for pid in sel:
+                        antecipar_plano(pid, payoff_ym, taxa)
+                    st.success("Parcelas movidas para a fatura escolhida.")
+                    st.rerun()
+
+    if reg.cards:
+        with st.expander("🤔 E se eu parcelar...?"):
+            c1, c2, c3 = st.columns(3)
+            wi_card = c1.selectbox("Cartão", list(reg.cards), format_func=lambda i: reg.card_labels[i], key="wi_card")
+            wi_amount = c2.number_input("Valor da compra", min_value=0.0, value=0.0, step=50.0, key="wi_amount")
+            wi_n = c3.number_input("Parcelas", min_value=1, max_value=36, value=1, step=1, key="wi_n")
+            if wi_amount > 0:
+                wi = what_if([{"card_id": wi_card, "amount": wi_amount, "n": int(wi_n)}])
+                after = wi["credit"].get(int(wi_card), {})
+                if after.get("available_after") is not None:
+                    st.metric("Limite disponível depois da compra", fmt_currency(after["available_after"]),
+                              delta=fmt_currency(-wi_amount), delta_color="inverse")
+                ws = wi["schedule"][(wi["schedule"]["card_id"] == wi_card) & (wi["schedule"]["novo"] > 0)]
+                st.dataframe(pd.DataFrame({
+                    "Fatura": ws["statement_month"].map(fmt_month_br),
+                    "Parcelas atuais": ws["atual"].map(fmt_currency),
+                    "Nova compra": ws["novo"].map(fmt_currency),
+                    "Total": ws["total"].map(fmt_currency),
+                }), use_container_width=True, hide_index=True)
+
 
 # =========================
 # Recorrências
 # =========================
 with tabs[3]:
+    instr.secao("Recorrências")
     st.subheader("🔁 Recorrências")
     st.caption("Ex: aluguel dia 05, internet dia 10, salário dia 01…")
 
     accounts = carregar_accounts()
     cards = carregar_cards()
-    acc_map = map_accounts(accounts)
-    card_map = map_cards(cards)
+    acc_map = registro_atual().account_names
+    card_map = registro_atual().card_labels
 
     with st.expander("➕ Criar recorrência"):
         r_name = st.text_input("Nome", placeholder="Ex: Aluguel", key="rec_name")
@@ -1306,17 +989,26 @@ with tabs[3]:
 
     st.divider()
     target_ym = st.text_input("Gerar recorrências para o mês", value=date.today().strftime("%Y-%m"), key="rec_target_ym")
-    st.caption("Use o formato YYYY-MM (ex: 2026-01).")
+    rec_months = st.number_input("Quantidade de meses", min_value=1, max_value=24, value=1, step=1, key="rec_n_months")
+    st.caption("Use o formato YYYY-MM (ex: 2026-01). A geração roda em segundo plano; pode continuar usando o app.")
     if st.button("Gerar recorrências do mês ✅", use_container_width=True, key="rec_run_btn"):
-        created = run_recurrences_for_month(target_ym)
-        st.success(f"Criados {created} lançamentos recorrentes para {fmt_month_br(target_ym)}.")
-        st.rerun()
+        try:
+            parse_mes_key(target_ym)
+        except ValueError:
+            st.error("Mês inválido. Use o formato YYYY-MM.")
+        else:
+            months = [ym_add(target_ym, i) for i in range(int(rec_months))]
+            job_id = submit_job("recurrences", {"months": months}, dedupe_key=f"recurrences:{months[0]}:{months[-1]}")
+            st.success(f"Tarefa #{job_id} enviada: recorrências de {fmt_month_br(months[0])} a {fmt_month_br(months[-1])}.")
+
+    render_jobs(["recurrences"], key="rec_jobs")
 
 
 # =========================
 # Relatórios
 # =========================
 with tabs[4]:
+    instr.secao("Relatórios")
     st.subheader("📊 Relatórios")
 
     tx = carregar_transactions()
@@ -1324,9 +1016,7 @@ with tabs[4]:
     cards = carregar_cards()
 
     hoje = date.today()
-    all_months = sorted(
-        {d.strftime("%Y-%m") for d in pd.to_datetime(tx["dt"], errors="coerce").dropna()} | {hoje.strftime("%Y-%m")}
-    )
+    all_months = sorted(set(meses_disponiveis()) | {hoje.strftime("%Y-%m")})
     ym = st.selectbox(
         "Mês (filtro)",
         options=all_months,
@@ -1348,12 +1038,14 @@ with tabs[4]:
         st.info("Sem despesas pagas nesse mês.")
     else:
         if group == "Categoria":
-            key_series = f_exp["category"].replace("", "Sem categoria")
+            # pelo category_id: grafias diferentes do mesmo nome caem numa barra só
+            mp = carregar_categorias().set_index("id")["name"]
+            key_series = f_exp["category_id"].fillna(0).astype(int).map(mp).fillna("Sem categoria")
         elif group == "Conta":
-            mp = map_accounts(accounts)
+            mp = registro_atual().account_names
             key_series = f_exp["account_id"].fillna(0).astype(int).map(lambda i: mp.get(i, "—"))
         else:
-            mp = map_cards(cards)
+            mp = registro_atual().card_labels
             key_series = f_exp["card_id"].fillna(0).astype(int).map(lambda i: mp.get(i, "—"))
 
         tab = f_exp.groupby(key_series)["amount"].sum().sort_values(ascending=False)
@@ -1378,6 +1070,7 @@ with tabs[4]:
 # Contas
 # =========================
 with tabs[5]:
+    instr.secao("Contas")
     st.subheader("🏦 Contas")
 
     st.markdown("### Cadastrar conta")
@@ -1402,25 +1095,75 @@ with tabs[5]:
     st.markdown("### Saldos (pagos)")
 
     accounts = carregar_accounts()
-    tx = carregar_transactions()
-    rows = [{"Conta": a["name"], "Tipo": a["type"], "Saldo": calc_account_balance(int(a["id"]), tx, accounts)}
+    acc_map = registro_atual().account_names
+
+    # só leitura: os checkpoints são gravados pelo job rebuild_balances (Exportar/Backup) e pela CLI
+    bal_series = daily_balance_series(accounts)
+
+    # última linha da série = todos os movimentos pagos (inclusive datas futuras)
+    last_bal = bal_series.iloc[-1] if not bal_series.empty else pd.Series(dtype=float)
+    rows = [{"Conta": a["name"], "Tipo": a["type"], "Saldo": float(last_bal.get(int(a["id"]), a["initial_balance"]))}
             for _, a in accounts.iterrows()]
     df = pd.DataFrame(rows)
     df["Saldo"] = df["Saldo"].map(fmt_currency)
     st.dataframe(df, use_container_width=True, hide_index=True)
 
+    if not accounts.empty:
+        st.divider()
+        st.markdown("### 📈 Saldo ao longo do tempo")
+
+        chart_acc = st.selectbox("Conta", accounts["id"].astype(int).tolist(),
+                                 format_func=lambda i: acc_map.get(int(i), str(i)), key="bal_chart_acc")
+        chart = bal_series[[chart_acc]].rename(columns={chart_acc: acc_map.get(chart_acc, str(chart_acc))})
+        st.line_chart(chart)
+
+        as_of = st.date_input("Saldo em", value=date.today(), key="bal_as_of")
+        st.metric(f"Saldo de {acc_map.get(chart_acc, chart_acc)} em {fmt_date_br(as_of)}",
+                  fmt_currency(balance_as_of(chart_acc, as_of)))
+
+        st.divider()
+        st.markdown("### 🧾 Extrato")
+        c1, c2 = st.columns(2)
+        stmt_start = c1.date_input("De", value=date.today().replace(day=1), key="acc_stmt_start")
+        stmt_end = c2.date_input("Até", value=date.today(), key="acc_stmt_end")
+        extrato = account_statement(chart_acc, stmt_start, stmt_end)
+        st.caption(f"Saldo anterior: **{fmt_currency(extrato.attrs['opening'])}**")
+        if extrato.empty:
+            st.info("Nenhum movimento pago no período.")
+        else:
+            st.dataframe(pd.DataFrame({
+                "Data": extrato["dt"].apply(fmt_date_br),
+                "Movimento": extrato["entry"].map(ENTRY_LABELS),
+                "Descrição": extrato["description"].replace("", "—"),
+                "Categoria": extrato["category"].replace("", "—"),
+                "Valor": extrato["amount"].map(fmt_currency),
+                "Saldo": extrato["balance"].map(fmt_currency),
+            }), use_container_width=True, hide_index=True)
+
+        st.markdown("### 💸 Fluxo de caixa (pago, por mês)")
+        fc = cash_flow(month_range(ym_add(date.today().strftime("%Y-%m"), -11))[0], date.today())
+        if not fc.empty:
+            fc_tot = fc.groupby("month")[["inflow", "outflow", "transfers", "net"]].sum()
+            fc_tot.index = [fmt_month_br(m) for m in fc_tot.index]
+            fc_tot.columns = ["Entradas", "Saídas", "Transferências (líq.)", "Variação"]
+            st.caption("Todas as contas; transferências entre contas do app se anulam no total.")
+            st.dataframe(fc_tot.map(fmt_currency), use_container_width=True)
+
 
 # =========================
 # Metas
 # =========================
 with tabs[6]:
+    instr.secao("Metas")
     st.subheader("🎯 Metas")
 
     goals = carregar_goals()
-    tx = carregar_transactions()
+    hoje_ym = date.today().strftime("%Y-%m")
 
-    goal = goals.iloc[0]
-    st.markdown(f"### 🗓️ Meta mensal — {goal['name']}")
+    st.markdown("### 🗓️ Metas mensais")
+    goal_map = {int(r.id): r.name for r in goals.itertuples(index=False)}
+    goal_id = st.selectbox("Meta", list(goal_map), format_func=lambda i: goal_map[i], key="goal_sel")
+    goal = goals[goals["id"] == goal_id].iloc[0]
 
     new_target = st.number_input("Meta mensal (R$)", min_value=0.0, value=float(goal["monthly_target"]), step=50.0, key="goal_target")
     if st.button("Salvar meta mensal", use_container_width=True, key="goal_save"):
@@ -1430,11 +1173,30 @@ with tabs[6]:
         st.success("Meta mensal atualizada!")
         st.rerun()
 
+    with st.expander("➕ Nova meta mensal"):
+        ng_name = st.text_input("Nome", key="ng_name")
+        ng_target = st.number_input("Meta mensal (R$)", min_value=0.0, step=50.0, key="ng_target")
+        if st.button("Criar meta mensal", use_container_width=True, key="ng_save"):
+            if not ng_name.strip():
+                st.warning("Informe o nome da meta.")
+            else:
+                add_goal(ng_name, ng_target)
+                st.success("Meta mensal criada!")
+                st.rerun()
+
+    hist = monthly_goals_history([ym_add(hoje_ym, -i) for i in range(5, -1, -1)], goals)
+    if not hist.empty:
+        view = hist.pivot(index="name", columns="month", values="saved")
+        hits = hist.pivot(index="name", columns="month", values="hit")
+        view = view.apply(lambda col: [f"{'✅' if hits.at[n, col.name] else '❌'} {fmt_currency(v)}" for n, v in col.items()])
+        view.columns = [fmt_month_br(c) for c in view.columns]
+        st.caption("Economia do mês x meta (últimos 6 meses)")
+        st.dataframe(view, use_container_width=True)
+
     st.divider()
-    st.subheader("📅 Meta por prazo (ex: 1 ano)")
+    st.subheader("📅 Metas por prazo (ex: 1 ano)")
 
-    lg = carregar_long_goal()
-    with st.expander("➕ Criar/atualizar meta por prazo"):
+    with st.expander("➕ Criar meta por prazo"):
         g_name = st.text_input("Nome da meta", value="Reserva / Objetivo", key="lg_name")
         g_target = st.number_input("Valor alvo (R$)", min_value=0.0, step=100.0, key="lg_target")
         g_start_amount = st.number_input("Já tenho (R$)", min_value=0.0, step=100.0, key="lg_start_amount")
@@ -1450,29 +1212,74 @@ with tabs[6]:
                 st.success("Meta por prazo salva!")
                 st.rerun()
 
-    lg = carregar_long_goal()
-    if lg.empty:
+    plans = avaliar_metas()
+    if not plans:
         st.info("Nenhuma meta por prazo ativa ainda. Crie uma acima.")
-    else:
-        goal_row = lg.iloc[0].to_dict()
-        plan = calc_long_goal_plan(goal_row, tx)
 
-        st.markdown(f"**Meta ativa:** {goal_row['name']}")
-        st.write(f"Período: **{fmt_date_br(plan['start_date'])}** até **{fmt_date_br(plan['end_date'])}**  |  Meses: **{plan['total_months']}**")
+    for plan in plans:
+        with st.container(border=True):
+            st.markdown(f"**{plan['name']}**")
+            st.write(f"Período: **{fmt_date_br(plan['start_date'])}** até **{fmt_date_br(plan['end_date'])}**  |  Meses: **{plan['total_months']}**")
 
-        if mobile_mode:
-            st.metric("Valor alvo", fmt_currency(plan["target_amount"]))
-            st.metric("Valor atual estimado", fmt_currency(plan["current_amount"]))
-            st.metric("Falta", fmt_currency(plan["remaining"]))
-        else:
-            c1, c2, c3 = st.columns(3)
-            c1.metric("Valor alvo", fmt_currency(plan["target_amount"]))
-            c2.metric("Valor atual estimado", fmt_currency(plan["current_amount"]))
-            c3.metric("Falta", fmt_currency(plan["remaining"]))
+            if mobile_mode:
+                st.metric("Valor alvo", fmt_currency(plan["target_amount"]))
+                st.metric("Valor atual estimado", fmt_currency(plan["current_amount"]))
+                st.metric("Falta", fmt_currency(plan["remaining"]))
+            else:
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Valor alvo", fmt_currency(plan["target_amount"]))
+                c2.metric("Valor atual estimado", fmt_currency(plan["current_amount"]))
+                c3.metric("Falta", fmt_currency(plan["remaining"]))
+
+            st.progress(plan["progress"])
+            st.caption(f"{plan['progress']*100:.1f}% da meta")
+            st.info(f"📌 Para bater a meta, você precisa poupar em média **{fmt_currency(plan['need_per_month'])} / mês** daqui pra frente.")
+            if st.button("Encerrar meta", type="secondary", key=f"lg_off_{plan['id']}"):
+                desativar_long_goal(plan["id"])
+                st.rerun()
+
+    st.divider()
+    st.subheader("💰 Envelopes por categoria")
+    st.caption("Orçamento mensal por categoria. Com rollover, a sobra (ou o estouro) passa para o mês seguinte.")
+
+    env_ym = st.selectbox("Mês", [ym_add(hoje_ym, -i) for i in range(0, 12)], format_func=fmt_month_br, key="env_mes")
+    envs = budgets_mes(env_ym)
+    if envs.empty:
+        st.info("Nenhum envelope ativo nesse mês. Crie um abaixo.")
+    else:
+        st.dataframe(pd.DataFrame({
+            "Categoria": envs["category"],
+            "Mensal": envs["monthly_amount"].map(fmt_currency),
+            "Rollover": envs["rollover"].map({True: "Sim", False: "Não"}),
+            "Saldo anterior": envs["carryover"].map(fmt_currency),
+            "Disponível": envs["available"].map(fmt_currency),
+            "Gasto": envs["spent"].map(fmt_currency),
+            "Resta": envs["remaining"].map(fmt_currency),
+            "% usado": envs["pct"].map(lambda v: "—" if pd.isna(v) else f"{v:.1f}%"),
+        }), use_container_width=True, hide_index=True)
+
+    with st.expander("➕ Adicionar/alterar envelope"):
+        env_cat = st.text_input("Categoria", placeholder="Ex: mercado, lazer", key="env_cat").strip().lower()
+        c1, c2 = st.columns(2)
+        env_amount = c1.number_input("Valor mensal (R$)", min_value=0.0, step=50.0, key="env_amount")
+        env_start = c2.selectbox("Início", [ym_add(hoje_ym, -i) for i in range(0, 24)], format_func=fmt_month_br,
+                                 key="env_start")
+        env_roll = st.checkbox("Rollover (sobra/estouro passa para o mês seguinte)", key="env_roll")
+        if st.button("Salvar envelope", use_container_width=True, key="env_save"):
+            if not env_cat:
+                st.warning("Informe a categoria.")
+            else:
+                salvar_budget(env_cat, env_amount, env_roll, env_start)
+                st.success("Envelope salvo!")
+                st.rerun()
 
-        st.progress(plan["progress"])
-        st.caption(f"{plan['progress']*100:.1f}% da meta")
-        st.info(f"📌 Para bater a meta, você precisa poupar em média **{fmt_currency(plan['need_per_month'])} / mês** daqui pra frente.")
+    if not envs.empty:
+        with st.expander("🗑️ Remover envelope"):
+            env_del = st.selectbox("Escolha o envelope", envs["category"].tolist(), key="env_del_sel")
+            if st.button("Remover", type="secondary", use_container_width=True, key="env_del_btn"):
+                remover_budget(env_del)
+                st.success("Removido.")
+                st.rerun()
 
     st.divider()
     st.subheader("🏷️ Categorias: Essenciais x Discricionários")
@@ -1507,11 +1314,98 @@ with tabs[6]:
                 st.success("Removida.")
                 st.rerun()
 
+    st.divider()
+    st.subheader("🤖 Regras de categorização")
+    st.caption("Lançamentos sem categoria (digitados ou importados) recebem a da primeira regra que casar com a "
+               "descrição, na ordem da prioridade. Acentos e maiúsculas não importam.")
+
+    cat_rules = carregar_regras_categoria()
+    if cat_rules.empty:
+        st.info("Nenhuma regra ainda. Crie uma abaixo.")
+    else:
+        st.dataframe(pd.DataFrame({
+            "Prioridade": cat_rules["priority"],
+            "Tipo": cat_rules["match"].map({"KEYWORD": "Palavras-chave", "REGEX": "Regex"}),
+            "Padrão": cat_rules["pattern"],
+            "Categoria": cat_rules["category"],
+            "Só": cat_rules["kind"].map({"INCOME": "Entradas", "EXPENSE": "Saídas"}).fillna("—"),
+            "Valor": [
+                "—" if pd.isna(lo) and pd.isna(hi)
+                else f"{'' if pd.isna(lo) else fmt_currency(lo)} a {'' if pd.isna(hi) else fmt_currency(hi)}"
+                for lo, hi in zip(cat_rules["min_amount"], cat_rules["max_amount"])
+            ],
+        }), use_container_width=True, hide_index=True)
+
+    with st.expander("➕ Nova regra"):
+        c1, c2 = st.columns(2)
+        cr_match = c1.selectbox("Tipo", ["KEYWORD", "REGEX"],
+                                format_func=lambda x: "Palavras-chave" if x == "KEYWORD" else "Regex", key="cr_match")
+        cr_pattern = c2.text_input("Padrão", placeholder="Ex: mercado, supermercado  |  uber\\s*eats", key="cr_pattern")
+        c1, c2, c3 = st.columns(3)
+        cr_cat = c1.text_input("Categoria", placeholder="Ex: Mercado", key="cr_cat")
+        cr_kind = c2.selectbox("Só para", [None, "EXPENSE", "INCOME"],
+                               format_func=lambda x: {None: "Entradas e saídas", "EXPENSE": "Saídas", "INCOME": "Entradas"}[x],
+                               key="cr_kind")
+        cr_priority = c3.number_input("Prioridade (menor vem antes)", min_value=0, value=100, step=10, key="cr_priority")
+        c1, c2 = st.columns(2)
+        cr_min = c1.number_input("Valor mínimo (0 = sem)", min_value=0.0, step=10.0, key="cr_min")
+        cr_max = c2.number_input("Valor máximo (0 = sem)", min_value=0.0, step=10.0, key="cr_max")
+        if st.button("Salvar regra", use_container_width=True, key="cr_save"):
+            try:
+                salvar_regra_categoria(cr_match, cr_pattern, cr_cat, cr_kind, cr_min or None, cr_max or None, cr_priority)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success("Regra salva!")
+                st.rerun()
+
+    if not cat_rules.empty:
+        with st.expander("🗑️ Remover regra"):
+            cr_labels = {int(r.id): f"{r.pattern} → {r.category}" for r in cat_rules.itertuples(index=False)}
+            cr_del = st.selectbox("Escolha a regra", list(cr_labels), format_func=lambda i: cr_labels[i], key="cr_del_sel")
+            if st.button("Remover", type="secondary", use_container_width=True, key="cr_del_btn"):
+                remover_regra_categoria(cr_del)
+                st.success("Removida.")
+                st.rerun()
+
+        if st.button("Aplicar regras aos lançamentos sem categoria", use_container_width=True, key="cr_apply"):
+            st.success(f"{recategorizar()} lançamento(s) categorizado(s).")
+            st.rerun()
+
+    st.divider()
+    st.subheader("🔔 Limites de alerta (% da renda do mês)")
+    st.caption("Regra sem alvo vale para todos os cartões / todas as categorias discricionárias.")
+
+    alert_rules = carregar_alert_rules()
+    st.dataframe(alert_rules.drop(columns=["active"]), use_container_width=True, hide_index=True)
+
+    with st.expander("➕ Adicionar/alterar limite"):
+        ar_scope = st.selectbox("Escopo", ["CARD", "CATEGORY"],
+                                format_func=lambda x: "Cartão" if x == "CARD" else "Categoria", key="ar_scope")
+        if ar_scope == "CARD":
+            labels = registro_atual().card_labels
+            ar_target = st.selectbox("Cartão", [None] + list(labels),
+                                     format_func=lambda i: "Todos (padrão)" if i is None else labels[i],
+                                     key="ar_target_card")
+        else:
+            ar_target = st.text_input("Categoria (vazio = padrão das discricionárias)", key="ar_target_cat").strip().lower()
+        c1, c2 = st.columns(2)
+        ar_warn = c1.number_input("Atenção a partir de (%)", min_value=0.0, value=20.0, step=1.0, key="ar_warn")
+        ar_high = c2.number_input("Alto a partir de (%)", min_value=0.0, value=30.0, step=1.0, key="ar_high")
+        if st.button("Salvar limite", use_container_width=True, key="ar_save"):
+            if ar_high < ar_warn:
+                st.error("O limite alto precisa ser maior ou igual ao de atenção.")
+            else:
+                salvar_alert_rule(ar_scope, ar_target, ar_warn, ar_high)
+                st.success("Limite salvo!")
+                st.rerun()
+
 
 # =========================
 # Export / Backup
 # =========================
 with tabs[7]:
+    instr.secao("Exportar/Backup")
     st.subheader("⚙️ Exportar / Backup")
     st.caption("Baixe seus dados em CSV (recomendado fazer 1x por mês).")
 
@@ -1520,7 +1414,7 @@ with tabs[7]:
     accounts = carregar_accounts()
     cards = carregar_cards()
     rules = carregar_category_rules()
-    lg = carregar_long_goal()
+    lg = carregar_long_goals()
     tr = carregar_transfers()
 
     st.download_button("⬇️ Lançamentos (CSV)", tx.to_csv(index=False).encode("utf-8"),
@@ -1538,5 +1432,27 @@ with tabs[7]:
     st.download_button("⬇️ Meta por prazo (CSV)", lg.to_csv(index=False).encode("utf-8"),
                        file_name="meta_prazo.csv", mime="text/csv", use_container_width=True, key="dl_lg")
 
+    st.divider()
+    st.markdown("### Importar lançamentos (CSV)")
+    st.caption("Mesmo formato do 'Lançamentos (CSV)' acima. A importação roda em segundo plano e pode ser cancelada.")
+    up = st.file_uploader("Arquivo CSV", type=["csv"], key="imp_file")
+    if st.button("Importar ✅", use_container_width=True, disabled=up is None, key="imp_btn"):
+        IMPORT_DIR.mkdir(exist_ok=True)
+        path = IMPORT_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{Path(up.name).name}"
+        path.write_bytes(up.getvalue())
+        job_id = submit_job("import_csv", {"path": str(path)}, dedupe_key=f"import_csv:{path.name}")
+        st.success(f"Tarefa #{job_id} enviada.")
+
+    st.markdown("### Manutenção")
+    if st.button("Reconstruir saldos históricos 🔧", use_container_width=True, key="rebuild_bal_btn"):
+        job_id = submit_job("rebuild_balances", dedupe_key="rebuild_balances")
+        st.success(f"Tarefa #{job_id} enviada.")
+
+    render_jobs(["import_csv", "rebuild_balances"], key="bk_jobs")
+
     st.divider()
     st.warning("⚠️ No Streamlit Cloud o armazenamento pode resetar em updates. Faça backup com frequência.")
+
+instr.secao("")
+instr.painel_streamlit()
+instr.finalizar_rerun()
@@ -0,0 +1 @@
+"""Benchmarks dos dois apps (gerador de dados sintéticos + medição das funções centrais)."""
@@ -0,0 +1,116 @@
+"""
+Teste de carga da API (financas.api) contra uma instância local.
+
+Sem --url, sobe a API nesta mesma máquina (thread separada) sobre os
+bancos sintéticos de bench/data/<tamanho> e dispara as requisições com
+N clientes concorrentes. Mostra req/s e p50/p95/p99 por rota.
+
+Uso:
+    python -m bench.carga_api                                # 10k, 16 clientes, 2000 requisições
+    python -m bench.carga_api --tamanho 100k --clientes 32 --requisicoes 5000
+    python -m bench.carga_api --url http://127.0.0.1:8765 --token abc
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from bench.gerar_dados import gerar, parse_tamanho
+from bench.run_bench import BENCH_DIR
+from financas import controle, pessoal
+
+
+def rotas(hoje: date, card_id: int) -> list:
+    ym = hoje.strftime("%Y-%m")
+    return [
+        "/health",
+        f"/dashboard?month={ym}",
+        "/accounts/balances",
+        f"/cards/{card_id}/statements/{ym}",
+        f"/transactions?month={ym}&limit=100",
+        "/goals/long",
+        f"/controle/resumo?ano={hoje.year}&mes={hoje.month}",
+    ]
+
+
+def _get(url: str, token: str = None):
+    req = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as r:
+            r.read()
+            status = r.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, (time.perf_counter() - t0) * 1000
+
+
+def _pct(vals: list, p: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(round(p / 100 * (len(vals) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="API já rodando (senão sobe uma local)")
+    ap.add_argument("--token", help="Bearer token, se a API exigir")
+    ap.add_argument("--tamanho", default="10k", help="dados sintéticos da API local")
+    ap.add_argument("--clientes", type=int, default=16)
+    ap.add_argument("--requisicoes", type=int, default=2000)
+    args = ap.parse_args()
+
+    srv = None
+    base = args.url.rstrip("/") if args.url else None
+    if base is None:
+        from financas.api import criar_servidor
+
+        paths = gerar(BENCH_DIR / "data" / args.tamanho.lower(), parse_tamanho(args.tamanho))
+        controle.usar_banco(paths["app.py"])
+        pessoal.usar_banco(paths["app_pessoal.py"])
+        controle.criar_tabelas()
+        pessoal.ensure_schema()
+        srv = criar_servidor(porta=0, tokens={}, silencioso=True)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{srv.server_address[1]}"
+        card_id = int(pessoal.carregar_cards()["id"].iloc[0])
+    else:
+        card_id = 1
+
+    lista = rotas(date.today(), card_id)
+    for r in lista:  # aquecimento: primeira carga dos loaders/cache
+        _get(base + r, args.token)
+
+    tempos = defaultdict(list)
+    erros = defaultdict(int)
+
+    def um(i: int):
+        r = lista[i % len(lista)]
+        status, ms = _get(base + r, args.token)
+        tempos[r.split("?")[0]].append(ms)
+        if status >= 400:
+            erros[r.split("?")[0]] += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clientes) as ex:
+        list(ex.map(um, range(args.requisicoes)))
+    total_s = time.perf_counter() - t0
+
+    print(f"{base}  {args.requisicoes} requisições, {args.clientes} clientes: "
+          f"{args.requisicoes / total_s:,.0f} req/s em {total_s:.2f} s")
+    print(f"  {'rota':<36} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'média':>9} {'erros':>6}")
+    for r, vals in sorted(tempos.items()):
+        print(f"  {r:<36} {len(vals):>6} {_pct(vals, 50):>9.1f} {_pct(vals, 95):>9.1f} {_pct(vals, 99):>9.1f}"
+              f" {statistics.mean(vals):>9.1f} {erros[r]:>6}")
+
+    if srv is not None:
+        srv.shutdown()
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
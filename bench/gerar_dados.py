@@ -0,0 +1,267 @@
+"""
+Gerador de bancos sintéticos com o mesmo schema de finance.db e finance_pessoal.db.
+
+O schema vem do próprio motor (controle.criar_tabelas / pessoal.ensure_schema),
+então o banco gerado acompanha qualquer migração feita nele.
+
+Uso:
+    python -m bench.gerar_dados --tamanho 1m --destino bench/data/1m
+"""
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from financas import controle, pessoal
+
+TAMANHOS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+CATEGORIAS = [
+    "Moradia", "Mercado", "Transporte", "Saúde", "Educação", "Lazer", "delivery", "bar",
+    "compras", "streamings", "jogos", "Salário", "Freelance", "Internet", "Energia", "Água",
+]
+PESSOAS_POR_LINHA = 100  # 1 pessoa (cliente/fornecedor) a cada 100 lançamentos
+ANOS = 5
+CHUNK = 200_000
+
+
+def parse_tamanho(txt: str) -> int:
+    return TAMANHOS.get(txt.lower()) or int(txt)
+
+
+def _datas(rng, n: int, fim: pd.Timestamp) -> pd.DatetimeIndex:
+    inicio = fim - pd.DateOffset(years=ANOS)
+    dias = (fim - inicio).days
+    return pd.DatetimeIndex(inicio + pd.to_timedelta(rng.integers(0, dias + 1, n), unit="D"))
+
+
+def _inserir(con, table: str, df: pd.DataFrame):
+    cols = ",".join(df.columns)
+    marks = ",".join("?" * len(df.columns))
+    sql = f"INSERT INTO {table} ({cols}) VALUES ({marks})"
+    for i in range(0, len(df), CHUNK):
+        part = df.iloc[i:i + CHUNK].astype(object).where(df.iloc[i:i + CHUNK].notna(), None)
+        con.executemany(sql, part.itertuples(index=False, name=None))
+
+
+def _statement_month(datas: pd.DatetimeIndex, closing: np.ndarray) -> np.ndarray:
+    """compute_statement_month vetorizado (closing_day 1-28)."""
+    per = datas.to_period("M")
+    per = per + (datas.day > closing).astype(int)
+    return per.strftime("%Y-%m").to_numpy()
+
+
+def gerar_finance(db: Path, n: int, seed: int = 0):
+    """finance.db (app.py): lançamentos a receber/pagar com pessoa, vencimento e pagamento."""
+    rng = np.random.default_rng(seed)
+    controle.usar_banco(db)
+    controle.criar_tabelas()
+
+    fim = pd.Timestamp.today().normalize() + pd.DateOffset(months=6)
+    venc = _datas(rng, n, fim)
+    pago = (rng.random(n) < 0.7) & (venc <= pd.Timestamp.today())
+    pag = venc + pd.to_timedelta(rng.integers(-5, 45, n), unit="D")
+
+    n_pessoas = max(10, n // PESSOAS_POR_LINHA)
+    df = pd.DataFrame({
+        "tipo": np.where(rng.random(n) < 0.45, "RECEBER", "PAGAR"),
+        "pessoa": pd.Series(rng.integers(0, n_pessoas, n)).map(lambda i: f"Pessoa {i:06d}"),
+        "categoria": rng.choice(CATEGORIAS, n),
+        "descricao": "",
+        "valor": np.round(rng.gamma(2.0, 150.0, n), 2),
+        "vencimento": venc.strftime("%Y-%m-%d"),
+        "status": np.where(pago, "PAGO", "PENDENTE"),
+        "data_pagamento": pd.Series(pag.strftime("%Y-%m-%d")).where(pago, None).to_numpy(),
+    })
+
+    with sqlite3.connect(db) as con:
+        con.execute("PRAGMA journal_mode=OFF;")
+        con.execute("PRAGMA synchronous=OFF;")
+        _inserir(con, "lancamentos", df)
+        con.commit()
+
+
+def gerar_pessoal(db: Path, n: int, seed: int = 0):
+    """
+    finance_pessoal.db (app_pessoal.py): contas, cartões, recorrências,
+    metas, transferências e `n` transações (à vista, cartão com parcelas,
+    pagamentos de fatura e lançamentos de recorrência).
+    """
+    rng = np.random.default_rng(seed)
+    pessoal.usar_banco(db)
+    pessoal.ensure_schema()
+    pessoal.seed_if_empty()
+
+    hoje = pd.Timestamp.today().normalize()
+    with sqlite3.connect(db) as con:
+        con.execute("PRAGMA journal_mode=OFF;")
+        con.execute("PRAGMA synchronous=OFF;")
+
+        con.executemany("INSERT INTO accounts (name,type,initial_balance) VALUES (?,?,?)",
+                        [("Conta Salário", "BANK", 1500.0), ("Poupança", "BANK", 10000.0)])
+        acc = pd.read_sql_query("SELECT id, type FROM accounts ORDER BY id", con)
+        bank_ids = acc.loc[acc["type"] == "BANK", "id"].to_numpy()
+        cash_ids = acc.loc[acc["type"] == "CASH", "id"].to_numpy()
+
+        closing = [5, 10, 20, 28]
+        con.executemany(
+            "INSERT INTO cards (name, closing_day, due_day, pay_account_id, last4) VALUES (?,?,?,?,?)",
+            [(f"Cartão {i + 1}", c, min(28, c + 7), int(bank_ids[0]), f"{1000 + i}") for i, c in enumerate(closing)]
+        )
+        cards = pd.read_sql_query("SELECT id, closing_day FROM cards ORDER BY id", con)
+        card_ids = cards["id"].to_numpy()
+        closing_by_card = dict(zip(cards["id"], cards["closing_day"]))
+
+        n_rec = 20
+        rec_method = rng.choice(["BANK", "CASH", "CARD"], n_rec, p=[0.6, 0.1, 0.3])
+        recs = pd.DataFrame({
+            "name": [f"Recorrência {i + 1}" for i in range(n_rec)],
+            "kind": np.where(np.arange(n_rec) < 3, "INCOME", "EXPENSE"),
+            "amount": np.round(rng.gamma(2.0, 200.0, n_rec), 2),
+            "category": rng.choice(CATEGORIAS, n_rec),
+            "description": None,
+            "method": rec_method,
+            "account_id": np.where(rec_method == "BANK", rng.choice(bank_ids, n_rec),
+                                   np.where(rec_method == "CASH", rng.choice(cash_ids, n_rec), None)),
+            "card_id": np.where(rec_method == "CARD", rng.choice(card_ids, n_rec), None),
+            "day_of_month": rng.integers(1, 29, n_rec),
+            "active": 1,
+        })
+        _inserir(con, "recurrences", recs)
+
+        con.execute("""
+            INSERT INTO long_goals (name, target_amount, start_date, end_date, start_amount, active)
+            VALUES (?,?,?,?,?,1)
+        """, ("Reserva", 50000.0, (hoje - pd.DateOffset(months=6)).date().isoformat(),
+              (hoje + pd.DateOffset(months=6)).date().isoformat(), 5000.0))
+
+        # --- transações ---
+        n_card = int(n * 0.35)
+        n_pay = int(n * 0.03)
+        n_bank = n - n_card - n_pay
+
+        # à vista (BANK/CASH), uma parte ligada a recorrências
+        dt_bank = _datas(rng, n_bank, hoje)
+        method_bank = np.where(rng.random(n_bank) < 0.85, "BANK", "CASH")
+        is_income = rng.random(n_bank) < 0.2
+        bank = pd.DataFrame({
+            "dt": dt_bank.strftime("%Y-%m-%d"),
+            "kind": np.where(is_income, "INCOME", "EXPENSE"),
+            "amount": np.round(np.where(is_income, rng.gamma(4.0, 900.0, n_bank), rng.gamma(2.0, 80.0, n_bank)), 2),
+            "category": rng.choice(CATEGORIAS, n_bank),
+            "description": None,
+            "status": np.where(rng.random(n_bank) < 0.95, "PAID", "PENDING"),
+            "method": method_bank,
+            "account_id": np.where(method_bank == "BANK", rng.choice(bank_ids, n_bank), rng.choice(cash_ids, n_bank)),
+            "card_id": None,
+            "statement_month": None,
+            "installments_total": None,
+            "installment_no": None,
+            "recurrence_id": np.where(rng.random(n_bank) < 0.05, rng.integers(1, n_rec + 1, n_bank), None),
+        })
+
+        # cartão: compras à vista e planos parcelados (n parcelas = n linhas)
+        sizes = []
+        total = 0
+        while total < n_card:
+            k = int(rng.choice([1, 1, 1, 2, 3, 6, 10, 12]))
+            k = min(k, n_card - total)
+            sizes.append(k)
+            total += k
+        sizes = np.array(sizes)
+        n_plans = len(sizes)
+        plan_dt = _datas(rng, n_plans, hoje)
+        plan_card = rng.choice(card_ids, n_plans)
+        plan_first = pd.PeriodIndex(_statement_month(plan_dt, np.vectorize(closing_by_card.get)(plan_card)), freq="M")
+        plan_amount = np.round(rng.gamma(2.0, 120.0, n_plans), 2)
+
+        rep = np.repeat(np.arange(n_plans), sizes)
+        inst_no = np.arange(n_card) - np.repeat(np.cumsum(sizes) - sizes, sizes) + 1
+        multi = sizes[rep] > 1
+        card = pd.DataFrame({
+            "dt": plan_dt[rep].strftime("%Y-%m-%d"),
+            "kind": "EXPENSE",
+            "amount": plan_amount[rep],
+            "category": rng.choice(CATEGORIAS, n_plans)[rep],
+            "description": np.where(multi, [f"Compra ({i}/{t})" for i, t in zip(inst_no, sizes[rep])], None),
+            "status": "PAID",
+            "method": "CARD",
+            "account_id": None,
+            "card_id": plan_card[rep],
+            "statement_month": (plan_first[rep] + (inst_no - 1)).strftime("%Y-%m"),
+            "installments_total": np.where(multi, sizes[rep], None),
+            "installment_no": np.where(multi, inst_no, None),
+            "recurrence_id": None,
+        })
+
+        # pagamentos de fatura
+        dt_pay = _datas(rng, n_pay, hoje)
+        pay_card = rng.choice(card_ids, n_pay)
+        pay = pd.DataFrame({
+            "dt": dt_pay.strftime("%Y-%m-%d"),
+            "kind": "EXPENSE",
+            "amount": np.round(rng.gamma(3.0, 400.0, n_pay), 2),
+            "category": "Cartão",
+            "description": "Pagamento fatura",
+            "status": "PAID",
+            "method": "CARD_PAYMENT",
+            "account_id": int(bank_ids[0]),
+            "card_id": pay_card,
+            "statement_month": dt_pay.to_period("M").strftime("%Y-%m"),
+            "installments_total": None,
+            "installment_no": None,
+            "recurrence_id": None,
+        })
+
+        tx = pd.concat([bank, card, pay], ignore_index=True)
+        tx = tx.iloc[np.argsort(tx["dt"].to_numpy(), kind="stable")]
+        _inserir(con, "transactions", tx)
+
+        # transferências
+        n_tr = max(10, n // 50)
+        src = rng.choice(bank_ids, n_tr)
+        dst = np.where(src == bank_ids[0], bank_ids[-1], bank_ids[0])
+        transfers = pd.DataFrame({
+            "dt": _datas(rng, n_tr, hoje).strftime("%Y-%m-%d"),
+            "amount": np.round(rng.gamma(2.0, 300.0, n_tr), 2),
+            "from_account_id": src,
+            "to_account_id": dst,
+            "description": "Aporte",
+            "status": np.where(rng.random(n_tr) < 0.97, "PAID", "PENDING"),
+        })
+        _inserir(con, "transfers", transfers)
+        con.commit()
+
+
+def gerar(destino: Path, n: int, seed: int = 0) -> dict:
+    """Gera (se ainda não existem) finance.db e finance_pessoal.db com `n` linhas cada."""
+    destino.mkdir(parents=True, exist_ok=True)
+    paths = {"app.py": destino / "finance.db", "app_pessoal.py": destino / "finance_pessoal.db"}
+    for fn, path in [(gerar_finance, paths["app.py"]), (gerar_pessoal, paths["app_pessoal.py"])]:
+        if path.exists():
+            continue
+        t0 = time.perf_counter()
+        tmp = path.with_suffix(".tmp")
+        tmp.unlink(missing_ok=True)
+        fn(tmp, n, seed)
+        tmp.rename(path)
+        print(f"  gerado {path} ({n:,} linhas) em {time.perf_counter() - t0:.1f}s")
+    return paths
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tamanho", default="10k", help="10k, 100k, 1m, 10m ou um inteiro")
+    ap.add_argument("--destino", default=None, help="pasta de saída (padrão: bench/data/<tamanho>)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    destino = Path(args.destino) if args.destino else Path(__file__).resolve().parent / "data" / args.tamanho.lower()
+    gerar(destino, parse_tamanho(args.tamanho), args.seed)
+
+
+if __name__ == "__main__":
+    main()
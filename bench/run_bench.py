@@ -0,0 +1,267 @@
+"""
+Mede as funções centrais dos dois apps sobre bancos sintéticos e registra o resultado.
+
+Cada execução acrescenta uma linha JSON por (tamanho, função) em
+bench/resultados.jsonl e compara com a última medição registrada.
+
+A comparação usa o mínimo das repetições (o menos afetado por ruído),
+dividido pela calibração: uma carga fixa de pandas/sqlite medida antes de
+cada repetição, que absorve a diferença de velocidade da máquina entre uma
+execução e outra. Só é REGRESSÃO o que ficou mais de LIMITE_REGRESSAO mais
+lento além da faixa de ruído (mediana/mínimo) das duas medições.
+Casos em lote informam também a vazão (linhas_por_s, pela mediana).
+
+Caso novo em casos(): grave a base dele no mesmo commit (sem --nao-gravar),
+nos tamanhos já registrados; caso sem base aparece como "sem base".
+
+Uso:
+    python -m bench.run_bench                      # 10k
+    python -m bench.run_bench --tamanhos 10k 1m 10m --repeticoes 3
+    python -m bench.run_bench --so resumo_mes classificar_1m --nao-gravar
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bench.gerar_dados import gerar, parse_tamanho
+from financas import controle, pessoal
+from financas.calendario import meses_da_fatura
+from financas.datas import month_range, to_dt, ym_add
+from financas.formatos import fmt_installments, fmt_month_br
+from financas.periodos import periodos_disponiveis
+from financas.pessoal.categorizacao import Classificador, Regra
+from financas.tenants import CACHE
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+RESULTADOS = BENCH_DIR / "resultados.jsonl"
+LIMITE_REGRESSAO = 0.20
+
+
+def _tempo(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def medir(fn, repeticoes: int) -> dict:
+    """
+    Mede fn `repeticoes` vezes, cada uma logo depois de uma medição da carga fixa
+    (calibracao_s = o mínimo delas): as duas pegam o mesmo estado da máquina.
+    """
+    tempos, cal = [], []
+    for _ in range(repeticoes):
+        cal.append(_tempo(_carga_fixa))
+        tempos.append(_tempo(fn))
+    return {"calibracao_s": min(cal), "min_s": min(tempos), "mediana_s": statistics.median(tempos),
+            "repeticoes": repeticoes}
+
+
+def _carga_fixa():
+    """Carga de referência da calibração: groupby, sort e to_datetime do pandas e um GROUP BY no sqlite."""
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({"k": rng.integers(0, 1000, 50_000), "v": rng.random(50_000)})
+    df.groupby("k")["v"].agg(["sum", "count"])
+    df.sort_values(["k", "v"])
+    pd.to_datetime(pd.Series(np.datetime_as_string(
+        np.datetime64("2020-01-01") + rng.integers(0, 3650, 20_000), unit="D")), format="%Y-%m-%d")
+    con = sqlite3.connect(":memory:")
+    con.execute("CREATE TABLE t (k INTEGER, v REAL)")
+    con.executemany("INSERT INTO t VALUES (?, ?)", zip(df["k"].tolist()[:10_000], df["v"].tolist()[:10_000]))
+    con.execute("SELECT k, SUM(v) FROM t GROUP BY k").fetchall()
+    con.close()
+
+
+def _ruido(r: dict) -> float:
+    return r["mediana_s"] / r["min_s"] - 1 if r["min_s"] > 0 else 0.0
+
+
+def comparar(r: dict, ant: dict):
+    """
+    (delta, limite) de r contra a base `ant`: delta = variação do mínimo calibrado,
+    limite = LIMITE_REGRESSAO + o ruído das duas medições. Base sem calibração: None.
+    """
+    if not ant.get("calibracao_s") or ant["min_s"] <= 0:
+        return None
+    delta = (r["min_s"] / r["calibracao_s"]) / (ant["min_s"] / ant["calibracao_s"]) - 1
+    return delta, LIMITE_REGRESSAO + max(_ruido(r), _ruido(ant))
+
+
+def casos(paths: dict) -> list:
+    """(app, função, callable[, linhas]) para cada função central, com os dados já carregados."""
+    controle.usar_banco(paths["app.py"])
+    pessoal.usar_banco(paths["app_pessoal.py"])
+    # bancos gerados por versões anteriores: aplica as migrações antes de medir
+    controle.criar_tabelas()
+    pessoal.ensure_schema()
+
+    df = controle.carregar_df()
+    tx = pessoal.carregar_transactions()
+    accounts = pessoal.carregar_accounts()
+    cards = pessoal.carregar_cards()
+    goal_row = pessoal.carregar_long_goal().iloc[0].to_dict()
+    ledger = pessoal.ledger_atual()
+    agg_m = pessoal.agregado_mensal_atual()  # o mesmo agregado do Dashboard (já no cache na leitura)
+
+    hoje = date.today()
+    ym = hoje.strftime("%Y-%m")
+    acc_id = int(accounts["id"].iloc[0])
+    card_id = int(cards["id"].iloc[0])
+    # mês sem lançamentos: a 1ª repetição cria, as demais medem o caminho idempotente
+    rec_ym = f"{hoje.year + 1:04d}-{hoje.month:02d}"
+    # calendário de faturas sobre 1M de datas (último dia útil, com feriados), independente do tamanho
+    datas_1m = np.datetime64("2020-01-01") + np.random.default_rng(0).integers(0, 3650, 1_000_000)
+    # helpers de mês sobre 1M de linhas (tabela de meses), também independentes do tamanho
+    rng = np.random.default_rng(1)
+    yms_1m = pd.Series(np.datetime_as_string(
+        np.datetime64("2015-01") + rng.integers(0, 180, 1_000_000).astype("timedelta64[M]"), unit="M"))
+    yms_lista = yms_1m.tolist()
+    parcelas_1m = pd.Series(rng.integers(1, 13, 1_000_000), dtype=float)
+    datas_txt_1m = pd.Series(np.datetime_as_string(datas_1m, unit="D"))
+    # envelope com rollover desde o 1º mês da base: o pior caso da leitura (acumulado de todo o histórico)
+    cats = tx["category"].fillna("").str.strip().str.lower()
+    env_cat = cats[cats != ""].value_counts().index[0]
+    pessoal.salvar_budget(env_cat, 500.0, rollover=True, start_month=tx["dt"].min().strftime("%Y-%m"))
+    # categorização de 1M de linhas importadas: ~50k descrições distintas, 24 regras (palavra-chave, regex, faixa)
+    lojas = ["Supermercado Dia", "Mercado Livre", "UBER *TRIP", "Uber Eats", "iFood", "Farmácia São Paulo",
+             "Posto Shell", "Netflix.com", "Spotify", "PIX enviado", "Padaria Pão Quente", "Drogasil",
+             "Amazon Marketplace", "Estacionamento Centro", "Academia Smart", "Loja Qualquer"]
+    descricoes_1m = pd.Series(np.array(lojas, dtype=object)[rng.integers(0, len(lojas), 1_000_000)]
+                              + " " + rng.integers(0, 3200, 1_000_000).astype(str))
+    valores_1m = rng.gamma(2.0, 60.0, 1_000_000).round(2)
+    tipos_1m = np.where(rng.random(1_000_000) < 0.9, "EXPENSE", "INCOME").astype(object)
+    regras = [
+        ("KEYWORD", "supermercado, mercado, padaria, hortifruti", "Mercado", "EXPENSE", None, None),
+        ("REGEX", r"uber\s*\*?\s*trip|99\s*pop|cabify", "Transporte", None, None, None),
+        ("KEYWORD", "uber eats, ifood, rappi", "Delivery", None, None, None),
+        ("KEYWORD", "farmacia, drogasil, droga raia", "Saúde", None, None, None),
+        ("KEYWORD", "posto, shell, ipiranga", "Combustível", None, 20, None),
+        ("REGEX", r"netflix|spotify|disney\+?|prime video", "Streamings", None, None, None),
+        ("KEYWORD", "pix", "Transferências", None, None, 50),
+        ("KEYWORD", "amazon, magalu, shopee", "Compras", None, None, None),
+        ("KEYWORD", "estacionamento, sem parar", "Transporte", None, None, None),
+        ("KEYWORD", "academia, smart fit", "Saúde", None, None, None),
+    ] + [("KEYWORD", f"palavra{i}, outra{i}", f"Extra {i}", None, None, None) for i in range(14)]
+    clf = Classificador(Regra(i, m, pat, i, cat, k, lo, hi) for i, (m, pat, cat, k, lo, hi) in enumerate(regras))
+    feriados = ("2025-01-01", "2025-04-21", "2025-05-01", "2025-09-07", "2025-10-12", "2025-11-02", "2025-12-25")
+
+    # loaders medidos sem o cache: a leitura do banco, não o acerto de cache
+    return [
+        ("app.py", "carregar_df", lambda: (CACHE.clear(), controle.carregar_df())),
+        ("app.py", "resumo_mes", lambda: controle.resumo_mes(df, hoje.year, hoje.month)),
+        ("app.py", "projecao_saldo", lambda: controle.projecao_saldo(df, dias=180)),
+        ("app_pessoal.py", "carregar_transactions", lambda: (CACHE.clear(), pessoal.carregar_transactions())),
+        ("app_pessoal.py", "calc_account_balance", lambda: pessoal.calc_account_balance(acc_id, accounts)),
+        ("app_pessoal.py", "card_statement_total", lambda: pessoal.card_statement_total(card_id, ym, tx)),
+        ("app_pessoal.py", "calc_long_goal_plan", lambda: pessoal.calc_long_goal_plan(goal_row, tx)),
+        ("app_pessoal.py", "plan_from_ledger", lambda: pessoal.plan_from_ledger(goal_row, ledger)),
+        ("app_pessoal.py", "run_recurrences_for_month", lambda: pessoal.run_recurrences_for_month(rec_ym)),
+        ("app_pessoal.py", "meses_da_fatura_1m", lambda: meses_da_fatura(datas_1m, 31, "PREV", feriados)),
+        ("app_pessoal.py", "fmt_month_br_1m", lambda: yms_1m.map(fmt_month_br)),
+        ("app_pessoal.py", "fmt_installments_1m", lambda: fmt_installments(parcelas_1m, parcelas_1m + 1, yms_1m)),
+        ("app_pessoal.py", "month_range_ym_add_1m", lambda: [(month_range(m), ym_add(m, 1)) for m in yms_lista]),
+        ("app_pessoal.py", "to_dt_1m", lambda: to_dt(datas_txt_1m)),
+        # meses do filtro de Relatórios: antes, strftime por linha; hoje, os períodos do agregado mensal
+        ("app_pessoal.py", "meses_relatorio_antigo",
+         lambda: sorted({d.strftime("%Y-%m") for d in pd.to_datetime(tx["dt"], errors="coerce").dropna()} | {ym})),
+        ("app_pessoal.py", "meses_relatorio",
+         lambda: sorted({str(p) for p in periodos_disponiveis(agg_m)} | {ym})),
+        # anomalias de todo o histórico a frio (loader + agregado mensal + janelas móveis)
+        ("app_pessoal.py", "detectar_anomalias", lambda: (CACHE.clear(), pessoal.detectar_anomalias())),
+        ("app_pessoal.py", "budget_remaining", lambda: pessoal.budget_remaining(env_cat, ym)),
+        ("app_pessoal.py", "classificar_1m", lambda: (pessoal.chave_categoria.cache_clear(),
+                                                      clf.classificar(descricoes_1m, valores_1m, tipos_1m)), 1_000_000),
+        # todas as parcelas de todos os planos numa passada (antecipação para o mês atual)
+        ("app_pessoal.py", "payoff_scenario", lambda: pessoal.payoff_scenario(payoff_month=ym, taxa_mes=1.0,
+                                                                               as_of="2000-01")),
+    ]
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or "?"
+    except OSError:
+        return "?"
+
+
+def ultimos_resultados() -> dict:
+    ult = {}
+    if RESULTADOS.exists():
+        for line in RESULTADOS.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                r = json.loads(line)
+                ult[(r["tamanho"], r["app"], r["funcao"])] = r
+    return ult
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tamanhos", nargs="+", default=["10k"], help="10k, 100k, 1m, 10m ou inteiros")
+    ap.add_argument("--repeticoes", type=int, default=5)
+    ap.add_argument("--so", nargs="+", metavar="FUNCAO", help="mede só estes casos")
+    ap.add_argument("--nao-gravar", action="store_true", help="só mostra, não acrescenta em resultados.jsonl")
+    args = ap.parse_args()
+
+    anteriores = ultimos_resultados()
+    meta = {
+        "ts": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+
+    novos = []
+    regressoes = sem_base = 0
+    for tamanho in args.tamanhos:
+        tamanho = tamanho.lower()
+        print(f"== {tamanho} ({parse_tamanho(tamanho):,} linhas) ==")
+        paths = gerar(BENCH_DIR / "data" / tamanho, parse_tamanho(tamanho))
+
+        for app, nome, fn, *linhas in casos(paths):
+            if args.so and nome not in args.so:
+                continue
+            r = {**meta, "tamanho": tamanho, "app": app, "funcao": nome, **medir(fn, args.repeticoes)}
+            if linhas:
+                r["linhas_por_s"] = round(linhas[0] / r["mediana_s"])
+            novos.append(r)
+
+            ant = anteriores.get((tamanho, app, nome))
+            cmp = comparar(r, ant) if ant else None
+            if cmp is None:
+                nota = "sem base"
+                sem_base += 1
+            else:
+                delta, limite = cmp
+                nota = f"{delta:+.0%} vs {ant['commit']} (limite {limite:+.0%})"
+                if delta > limite:
+                    nota += "  <-- REGRESSÃO"
+                    regressoes += 1
+            print(f"  {app:<15} {nome:<26} mediana {r['mediana_s'] * 1000:10.2f} ms"
+                  f"  min {r['min_s'] * 1000:10.2f} ms  {nota}"
+                  + (f"  ({r['linhas_por_s']:,} linhas/s)" if "linhas_por_s" in r else ""))
+
+    if not args.nao_gravar:
+        with RESULTADOS.open("a", encoding="utf-8") as f:
+            for r in novos:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"\n{len(novos)} medições gravadas em {RESULTADOS.relative_to(ROOT)}")
+
+    if sem_base and args.nao_gravar:
+        print(f"{sem_base} caso(s) sem base: rode sem --nao-gravar para registrá-la.")
+    if regressoes:
+        print(f"{regressoes} regressão(ões) acima de {LIMITE_REGRESSAO:.0%} + ruído.")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
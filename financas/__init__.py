@@ -0,0 +1,17 @@
+"""
+Motor de finanças compartilhado por app.py e app_pessoal.py.
+
+Nada aqui importa Streamlit, e pandas só é importado pelos submódulos
+que trabalham com DataFrames, então o import é barato para CLI/batch:
+
+    from financas import pessoal
+    pessoal.usar_banco("finance_pessoal.db")
+    tx = pessoal.carregar_transactions()
+
+Submódulos:
+- datas / formatos: helpers de mês ("YYYY-MM") e de exibição
+- periodos: agregação por eixos de data (caixa x competência)
+- instrumentacao: profiling opcional (FINANCAS_PROFILE=1)
+- pessoal: motor do app_pessoal.py
+- controle: motor do app.py
+"""
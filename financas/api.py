@@ -0,0 +1,617 @@
+"""
+API HTTP/JSON sobre o motor (sem Streamlit): ThreadingHTTPServer da stdlib,
+uma thread por requisição, os mesmos loaders e o mesmo cache por tenant.
+
+Uso:
+    python -m financas.api --porta 8765
+    python -m financas.api --host 0.0.0.0 --db-pessoal finance_pessoal.db --db-controle finance.db
+
+Autenticação: FINANCAS_API_TOKENS="token1:alice,token2:bob" faz cada
+`Authorization: Bearer <token>` usar os bancos (pessoal e controle) do
+tenant correspondente.
+Sem a variável, não há login e tudo vai para os bancos padrão (uso local).
+
+Rotas (GET salvo indicação):
+    /health
+    /transactions?month=YYYY-MM&kind=&method=&status=&limit=
+    POST /transactions            corpo: dt, kind, amount, method, ... (mesmos campos da tabela)
+    PATCH /transactions/<id>      corpo: {"status": "PAID" | "PENDING"} e/ou {"category": "..."}
+    DELETE /transactions/<id>
+    /accounts/balances?as_of=YYYY-MM-DD
+    /accounts/<id>/statement?start=YYYY-MM-DD&end=YYYY-MM-DD   extrato pago com saldo corrido
+    /accounts/cash-flow?start=&end=   entradas/saídas/transferências por mês e conta
+    /cards                        cartões com limite, em aberto e disponível
+    /cards/<id>/statements/<YYYY-MM>
+    /installments/plans?as_of=YYYY-MM&card_id=
+    /installments/schedule?as_of=YYYY-MM   compromisso futuro por cartão e fatura
+    POST /installments/payoff     corpo: {"plan_ids": [...], "payoff_month", "taxa_mes"} (simulação)
+    /dashboard?month=YYYY-MM      métricas, alertas e anomalias (gastos fora do padrão) do mês
+    /goals?month=YYYY-MM          todas as metas (por prazo e mensais) + alertas do mês
+    /goals/long
+    /budgets?month=YYYY-MM        envelopes por categoria: disponível, gasto e quanto resta no mês
+    /budgets/<categoria>?month=YYYY-MM
+    /categories                   dimensão de categorias (id, chave normalizada, nome) e regras de categorização
+    POST /categories/classify     corpo: {"rows": [{"description", "amount", "kind"}]} -> categoria por linha
+    /controle/resumo?ano=&mes=
+    /controle/projecao?dias=&saldo_inicial=
+    /controle/aging?por=pessoa|categoria   pendentes por faixa de atraso / a vencer
+    /controle/pessoas?ordem=aberto|saldo|nome&busca=&limite=&offset=
+    /controle/pessoas/extrato?pessoa=
+    POST /controle/liquidar       corpo: {"data", "ids": [...]} e/ou filtro {"pessoa", "vencimento_ate", "tipo"}
+    POST /controle/lancamentos/<id>/pagamentos   corpo: {"valor", "data"} (pagamento parcial)
+"""
+import argparse
+import json
+import math
+import os
+import re
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pandas as pd
+
+from financas import controle, pessoal
+from financas.periodos import periodo_de, por_periodo
+from financas.tenants import set_tenant
+
+MAX_BODY = 1_000_000
+KINDS = ("INCOME", "EXPENSE")
+METHODS = ("BANK", "CASH", "CARD", "CARD_PAYMENT")
+STATUSES = ("PAID", "PENDING")
+
+ROTAS = []
+
+_schema_ok = set()
+_schema_lock = threading.Lock()
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+def rota(metodo: str, padrao: str):
+    """Registra o handler de `metodo` + regex do caminho (grupos nomeados viram kwargs)."""
+    def deco(fn):
+        ROTAS.append((metodo, re.compile(f"^{padrao}$"), fn))
+        return fn
+    return deco
+
+
+def carregar_tokens() -> dict:
+    tokens = {}
+    for par in os.environ.get("FINANCAS_API_TOKENS", "").split(","):
+        token, _, tenant = par.strip().partition(":")
+        if token and tenant:
+            tokens[token] = tenant
+    return tokens
+
+
+def _preparar_banco():
+    """ensure_schema/criar_tabelas uma vez por arquivo (cada tenant novo ganha o schema e a carga inicial)."""
+    db_pessoal, db_controle = pessoal.db_atual(), controle.db_atual()
+    if db_pessoal in _schema_ok and db_controle in _schema_ok:
+        return
+    with _schema_lock:
+        if db_pessoal not in _schema_ok:
+            pessoal.ensure_schema()
+            pessoal.seed_if_empty()
+            _schema_ok.add(db_pessoal)
+        if db_controle not in _schema_ok:
+            controle.criar_tabelas()
+            _schema_ok.add(db_controle)
+
+
+def _json_default(v):
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    if hasattr(v, "item"):  # escalares numpy
+        return v.item()
+    if hasattr(v, "isoformat"):  # pd.Timestamp
+        return v.isoformat()
+    return str(v)
+
+
+def _limpo(v):
+    """NaN/NaT viram null (json.dumps geraria NaN, que não é JSON válido)."""
+    if isinstance(v, dict):
+        return {k: _limpo(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_limpo(x) for x in v]
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    if v is not None and type(v).__name__ in ("NaTType", "NAType"):
+        return None
+    return v
+
+
+def registros(df, colunas=None) -> list:
+    if colunas is not None:
+        df = df[colunas]
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _param(query: dict, nome: str, tipo=str, padrao=None):
+    vals = query.get(nome)
+    if not vals or vals[0] == "":
+        return padrao
+    try:
+        return tipo(vals[0])
+    except (TypeError, ValueError):
+        raise ApiError(400, f"Parâmetro inválido: {nome}")
+
+
+def _data(txt: str, nome: str) -> date:
+    try:
+        return date.fromisoformat(str(txt))
+    except ValueError:
+        raise ApiError(400, f"Data inválida em {nome} (use YYYY-MM-DD).")
+
+
+def _ym(txt: str, nome: str = "month") -> str:
+    if not re.fullmatch(r"\d{4}-\d{2}", txt or "") or not 1 <= int(txt[5:]) <= 12:
+        raise ApiError(400, f"Mês inválido em {nome} (use YYYY-MM).")
+    return txt
+
+
+# =========================
+# Rotas
+# =========================
+@rota("GET", "/health")
+def _health(query, corpo):
+    return {"ok": True, "data_version": pessoal.data_version()}
+
+
+TX_PUBLIC = [
+    "id", "dt", "kind", "amount", "category", "description", "status", "method", "account_id", "card_id",
+    "statement_month", "installments_total", "installment_no", "recurrence_id", "plan_id",
+]
+
+
+@rota("GET", "/transactions")
+def _listar_transactions(query, corpo):
+    tx = pessoal.carregar_transactions()
+    month = _param(query, "month")
+    if month:
+        month = _ym(month)
+        inicio = periodo_de(month, "mes").start_time
+        tx = tx[(tx["dt"] >= inicio) & (tx["dt"] < inicio + pd.offsets.MonthBegin(1))]
+    for campo in ("kind", "method", "status"):
+        v = _param(query, campo)
+        if v:
+            tx = tx[tx[campo] == v.upper()]
+    limit = max(1, min(_param(query, "limit", int, 500), 10_000))
+    tx = tx.sort_values(["dt", "id"], ascending=False).head(limit)
+    cols = [c for c in TX_PUBLIC if c in tx.columns]
+    out = registros(tx, cols)
+    for r in out:
+        r["dt"] = r["dt"].date().isoformat() if r["dt"] is not None else None
+    return {"total": len(out), "transactions": out}
+
+
+@rota("POST", "/transactions")
+def _criar_transaction(query, corpo):
+    faltando = [c for c in ("dt", "kind", "amount", "method") if corpo.get(c) in (None, "")]
+    if faltando:
+        raise ApiError(400, f"Campos obrigatórios: {', '.join(faltando)}")
+    kind, method = str(corpo["kind"]).upper(), str(corpo["method"]).upper()
+    status = str(corpo.get("status") or "PAID").upper()
+    if kind not in KINDS or method not in METHODS or status not in STATUSES:
+        raise ApiError(400, "kind/method/status inválido.")
+    try:
+        amount = float(corpo["amount"])
+    except (TypeError, ValueError):
+        raise ApiError(400, "amount inválido.")
+    dt_ = _data(corpo["dt"], "dt")
+
+    statement_month = corpo.get("statement_month")
+    if method == "CARD":
+        if not corpo.get("card_id"):
+            raise ApiError(400, "card_id é obrigatório para method=CARD.")
+        if statement_month:
+            _ym(statement_month, "statement_month")
+        else:
+            reg = pessoal.registro_atual()
+            if int(corpo["card_id"]) not in reg.cards:
+                raise ApiError(404, "Cartão não encontrado.")
+            statement_month = reg.statement_month(int(corpo["card_id"]), dt_)
+    elif not corpo.get("account_id"):
+        raise ApiError(400, "account_id é obrigatório para este method.")
+
+    tx_id = pessoal.add_transaction(
+        dt_=dt_, kind=kind, amount=amount, category=corpo.get("category"), description=corpo.get("description"),
+        status=status, method=method, account_id=corpo.get("account_id"), card_id=corpo.get("card_id"),
+        statement_month=statement_month,
+    )
+    return 201, {"id": tx_id, "statement_month": statement_month}
+
+
+@rota("PATCH", r"/transactions/(?P<tx_id>\d+)")
+def _atualizar_transaction(query, corpo, tx_id):
+    changes = {k: corpo[k] for k in ("status", "category") if k in corpo}
+    if not changes:
+        raise ApiError(400, "Informe status e/ou category.")
+    if "status" in changes:
+        changes["status"] = str(changes["status"] or "").upper()
+        if changes["status"] not in STATUSES:
+            raise ApiError(400, "status deve ser PAID ou PENDING.")
+    if not isinstance(changes.get("category", ""), (str, type(None))):
+        raise ApiError(400, "category deve ser texto.")
+    # status e categoria numa transação só: ou entram os dois, ou nenhum
+    if not pessoal.update_transactions([int(tx_id)], changes):
+        raise ApiError(404, "Lançamento não encontrado.")
+    return {"id": int(tx_id), **changes}
+
+
+@rota("DELETE", r"/transactions/(?P<tx_id>\d+)")
+def _excluir_transaction(query, corpo, tx_id):
+    if not pessoal.delete_transactions([int(tx_id)]):
+        raise ApiError(404, "Lançamento não encontrado.")
+    return 204, None
+
+
+@rota("GET", "/accounts/balances")
+def _saldos(query, corpo):
+    accounts = pessoal.carregar_accounts()
+    as_of = _param(query, "as_of")
+    if as_of:
+        dia = _data(as_of, "as_of")
+        saldos = {int(a): pessoal.balance_as_of(int(a), dia) for a in accounts["id"]}
+    else:
+        saldos = pessoal.saldos_atuais()
+    return {
+        "as_of": as_of,
+        "accounts": [
+            {"id": int(r.id), "name": r.name, "balance": saldos[int(r.id)]}
+            for r in accounts.itertuples(index=False)
+        ],
+    }
+
+
+@rota("GET", r"/accounts/(?P<account_id>\d+)/statement")
+def _extrato(query, corpo, account_id):
+    if int(account_id) not in pessoal.registro_atual().accounts:
+        raise ApiError(404, "Conta não encontrada.")
+    hoje = date.today()
+    start = _data(_param(query, "start", padrao=hoje.replace(day=1).isoformat()), "start")
+    end = _data(_param(query, "end", padrao=hoje.isoformat()), "end")
+    ext = pessoal.account_statement(int(account_id), start, end)
+    itens = registros(ext)
+    for r in itens:
+        r["dt"] = r["dt"].date().isoformat() if r["dt"] is not None else None
+    return {"account_id": int(account_id), "start": start, "end": end, "opening": ext.attrs["opening"], "items": itens}
+
+
+@rota("GET", "/accounts/cash-flow")
+def _fluxo_caixa(query, corpo):
+    start, end = _param(query, "start"), _param(query, "end")
+    start = _data(start, "start") if start else None
+    end = _data(end, "end") if end else None
+    return {"start": start, "end": end, "months": registros(pessoal.cash_flow(start, end))}
+
+
+@rota("GET", "/cards")
+def _cartoes(query, corpo):
+    credit = pessoal.card_credit()
+    return {"cards": [
+        {"id": c.id, "name": c.name, "last4": c.last4, "closing_day": c.closing_day, "due_day": c.due_day,
+         "closing_adjust": c.closing_adjust, "due_adjust": c.due_adjust, **credit[c.id]}
+        for c in pessoal.registro_atual().cards.values()
+    ]}
+
+
+@rota("GET", r"/cards/(?P<card_id>\d+)/statements/(?P<ym>\d{4}-\d{2})")
+def _fatura(query, corpo, card_id, ym):
+    ym = _ym(ym)
+    tx = pessoal.carregar_transactions()
+    det = pessoal.card_statement_detail(int(card_id), ym, tx).sort_values(["dt", "id"])
+    itens = registros(det, [c for c in TX_PUBLIC if c in det.columns])
+    for r in itens:
+        r["dt"] = r["dt"].date().isoformat() if r["dt"] is not None else None
+    return {"card_id": int(card_id), "statement_month": ym, "total": float(det["amount"].sum()), "items": itens}
+
+
+@rota("GET", "/installments/plans")
+def _parcelamentos(query, corpo):
+    as_of = _param(query, "as_of")
+    card_id = _param(query, "card_id", int)
+    plans = pessoal.installment_plans(_ym(as_of, "as_of") if as_of else None, card_id)
+    return {"as_of": as_of, "plans": registros(plans)}
+
+
+@rota("GET", "/installments/schedule")
+def _cronograma_parcelas(query, corpo):
+    as_of = _param(query, "as_of")
+    return {"as_of": as_of, "schedule": registros(pessoal.installment_schedule(_ym(as_of, "as_of") if as_of else None))}
+
+
+@rota("POST", "/installments/payoff")
+def _simular_quitacao(query, corpo):
+    payoff_month = corpo.get("payoff_month")
+    try:
+        plan_ids = [int(i) for i in corpo["plan_ids"]] if corpo.get("plan_ids") else None
+        taxa = float(corpo.get("taxa_mes") or 0)
+    except (TypeError, ValueError):
+        raise ApiError(400, "plan_ids/taxa_mes inválido.")
+    sc = pessoal.payoff_scenario(plan_ids, _ym(payoff_month, "payoff_month") if payoff_month else None, taxa)
+    return {k: registros(v) if isinstance(v, pd.DataFrame) else v for k, v in sc.items()}
+
+
+@rota("GET", "/dashboard")
+def _dashboard(query, corpo):
+    ym = _ym(_param(query, "month", padrao=date.today().strftime("%Y-%m")))
+    m = {k: v for k, v in pessoal.dashboard_mes(ym).items() if k != "cards"}
+    m["stmt_totals"] = {str(k): v for k, v in m["stmt_totals"].items()}
+    return {"month": ym, **m, "alerts": registros(pessoal.alerts_for_month(ym)),
+            "anomalies": registros(pessoal.anomalias_mes(ym))}
+
+
+@rota("GET", "/goals/long")
+def _meta_longa(query, corpo):
+    lg = pessoal.carregar_long_goal()
+    if lg.empty:
+        raise ApiError(404, "Nenhuma meta de longo prazo ativa.")
+    goal = lg.iloc[0].to_dict()
+    return {"goal": goal, "plan": pessoal.plan_from_ledger(goal, pessoal.ledger_atual())}
+
+
+@rota("GET", "/goals")
+def _metas(query, corpo):
+    ym = _ym(_param(query, "month", padrao=date.today().strftime("%Y-%m")))
+    mensais = pessoal.monthly_goals_history([ym])
+    return {
+        "month": ym,
+        "long_goals": pessoal.avaliar_metas(),
+        "monthly_goals": registros(mensais),
+        "alerts": pessoal.goal_alerts(ym),
+    }
+
+
+@rota("GET", "/budgets")
+def _envelopes(query, corpo):
+    ym = _ym(_param(query, "month", padrao=date.today().strftime("%Y-%m")))
+    return {"month": ym, "budgets": registros(pessoal.budgets_mes(ym))}
+
+
+@rota("GET", r"/budgets/(?P<categoria>[^/]+)")
+def _envelope(query, corpo, categoria):
+    ym = _ym(_param(query, "month", padrao=date.today().strftime("%Y-%m")))
+    categoria = unquote(categoria)
+    env = pessoal.budget_remaining(categoria, ym)
+    if env is None:
+        raise ApiError(404, f"Nenhum envelope ativo para {categoria!r} em {ym}.")
+    return {"month": ym, "budget": env}
+
+
+@rota("GET", "/categories")
+def _categorias(query, corpo):
+    return {"categories": registros(pessoal.carregar_categorias()),
+            "rules": registros(pessoal.carregar_regras_categoria())}
+
+
+@rota("POST", "/categories/classify")
+def _classificar(query, corpo):
+    rows = corpo.get("rows")
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ApiError(400, "rows deve ser uma lista de objetos.")
+    try:
+        amounts = [None if r.get("amount") is None else float(r["amount"]) for r in rows]
+    except (TypeError, ValueError):
+        raise ApiError(400, "amount inválido.")
+    clf = pessoal.classificador_atual()
+    idx = clf.classificar([r.get("description") for r in rows], amounts,
+                          [str(r["kind"]).upper() if r.get("kind") else None for r in rows]).tolist()
+    return {"rows": [
+        {"category_id": clf.regras[i].category_id, "category": clf.regras[i].category, "rule_id": clf.regras[i].id}
+        if i >= 0 else {"category_id": None, "category": None, "rule_id": None}
+        for i in idx
+    ]}
+
+
+@rota("GET", "/controle/resumo")
+def _controle_resumo(query, corpo):
+    hoje = date.today()
+    ano = _param(query, "ano", int, hoje.year)
+    mes = _param(query, "mes", int, hoje.month)
+    if not 1 <= mes <= 12:
+        raise ApiError(400, "mes deve estar entre 1 e 12.")
+    agg_m = controle.memo("agg_mes", lambda: por_periodo(controle.agregar_lancamentos(controle.carregar_df()), "mes"))
+    return {"ano": ano, "mes": mes, **controle.resumo_periodo(agg_m, periodo_de(f"{ano:04d}-{mes:02d}", "mes"))}
+
+
+@rota("GET", "/controle/aging")
+def _controle_aging(query, corpo):
+    por = _param(query, "por", padrao="pessoa")
+    if por not in ("pessoa", "categoria"):
+        raise ApiError(400, "por deve ser pessoa ou categoria.")
+    tab = controle.aging(por).reset_index()
+    return {"por": por, "faixas": [f for f in controle.FAIXAS if f in tab.columns], "linhas": registros(tab),
+            "alertas": registros(controle.alertas_vencidos())}
+
+
+@rota("GET", "/controle/pessoas")
+def _controle_pessoas(query, corpo):
+    ordem = _param(query, "ordem", padrao="aberto")
+    if ordem not in controle.ORDENS:
+        raise ApiError(400, f"ordem deve ser {', '.join(controle.ORDENS)}.")
+    busca = _param(query, "busca")
+    limite = min(_param(query, "limite", int, 200), 1000)
+    lista = controle.pessoas(ordem, busca, limite=limite, offset=_param(query, "offset", int, 0))
+    return {"total": controle.total_pessoas(busca), "pessoas": registros(lista)}
+
+
+@rota("GET", "/controle/pessoas/extrato")
+def _controle_extrato_pessoa(query, corpo):
+    pessoa = _param(query, "pessoa", padrao="")
+    resumo = controle.resumo_pessoa(pessoa)
+    if not resumo:
+        raise ApiError(404, "Pessoa sem lançamentos.")
+    return {**resumo, "lancamentos": registros(controle.extrato_pessoa(pessoa))}
+
+
+@rota("POST", "/controle/liquidar")
+def _controle_liquidar(query, corpo):
+    data = _data(corpo.get("data") or date.today().isoformat(), "data")
+    tipo = str(corpo["tipo"]).upper() if corpo.get("tipo") else None
+    if tipo not in (None, "RECEBER", "PAGAR"):
+        raise ApiError(400, "tipo deve ser RECEBER ou PAGAR.")
+    try:
+        ids = [int(i) for i in corpo["ids"]] if corpo.get("ids") is not None else None
+    except (TypeError, ValueError):
+        raise ApiError(400, "ids inválido.")
+    venc = _data(corpo["vencimento_ate"], "vencimento_ate").isoformat() if corpo.get("vencimento_ate") else None
+    return controle.liquidar(data.isoformat(), ids=ids, pessoa=corpo.get("pessoa"), vencimento_ate=venc, tipo=tipo)
+
+
+@rota("POST", r"/controle/lancamentos/(?P<lancamento_id>\d+)/pagamentos")
+def _controle_pagamento(query, corpo, lancamento_id):
+    try:
+        valor = float(corpo["valor"])
+    except (KeyError, TypeError, ValueError):
+        raise ApiError(400, "valor inválido.")
+    data = _data(corpo.get("data") or date.today().isoformat(), "data")
+    return 201, controle.pagar_parcial(int(lancamento_id), valor, data.isoformat())
+
+
+@rota("GET", "/controle/projecao")
+def _controle_projecao(query, corpo):
+    dias = max(1, min(_param(query, "dias", int, 60), 3650))
+    saldo_inicial = _param(query, "saldo_inicial", float, 0.0)
+    proj = controle.projecao_saldo(controle.carregar_df(), dias=dias, saldo_inicial=saldo_inicial)
+    return {"dias": dias, "saldo_inicial": saldo_inicial, "projecao": registros(proj)}
+
+
+# =========================
+# Servidor
+# =========================
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "FinancasAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    tokens = {}
+    silencioso = False
+
+    def _tenant(self):
+        if not self.tokens:
+            return None
+        auth = self.headers.get("Authorization", "")
+        token = auth[7:].strip() if auth.startswith("Bearer ") else ""
+        tenant = self.tokens.get(token)
+        if tenant is None:
+            raise ApiError(401, "Token ausente ou inválido.")
+        return tenant
+
+    def _corpo(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        if n > MAX_BODY:
+            raise ApiError(413, "Corpo grande demais.")
+        if n == 0:
+            return {}
+        try:
+            corpo = json.loads(self.rfile.read(n).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ApiError(400, "JSON inválido.")
+        if not isinstance(corpo, dict):
+            raise ApiError(400, "O corpo deve ser um objeto JSON.")
+        return corpo
+
+    def _responder(self, status: int, dados):
+        body = b"" if dados is None else json.dumps(_limpo(dados), default=_json_default, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _despachar(self, metodo: str):
+        url = urlparse(self.path)
+        try:
+            set_tenant(self._tenant())
+            handler, kwargs, metodo_ok = None, {}, False
+            for m, padrao, fn in ROTAS:
+                hit = padrao.match(url.path.rstrip("/") or "/")
+                if hit:
+                    metodo_ok = True
+                    if m == metodo:
+                        handler, kwargs = fn, hit.groupdict()
+                        break
+            if handler is None:
+                raise ApiError(405 if metodo_ok else 404, "Método não permitido." if metodo_ok else "Rota não encontrada.")
+
+            _preparar_banco()
+            res = handler(parse_qs(url.query), self._corpo() if metodo in ("POST", "PATCH") else {}, **kwargs)
+            status, dados = res if isinstance(res, tuple) else (200, res)
+            self._responder(status, dados)
+        except ApiError as e:
+            self._responder(e.status, {"erro": e.mensagem})
+        except ValueError as e:
+            self._responder(400, {"erro": str(e)})
+        except Exception as e:
+            self._responder(500, {"erro": f"{type(e).__name__}: {e}"})
+        finally:
+            set_tenant(None)
+
+    def do_GET(self):
+        self._despachar("GET")
+
+    def do_POST(self):
+        self._despachar("POST")
+
+    def do_PATCH(self):
+        self._despachar("PATCH")
+
+    def do_DELETE(self):
+        self._despachar("DELETE")
+
+    def log_message(self, fmt, *args):
+        if not self.silencioso:
+            super().log_message(fmt, *args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # o padrão (5) derruba conexões em rajada e o cliente espera 1 s pelo SYN de novo
+
+
+def criar_servidor(host: str = "127.0.0.1", porta: int = 8765, tokens: dict = None, silencioso: bool = False):
+    """Servidor pronto para serve_forever (porta 0 = qualquer porta livre)."""
+    handler = type("Handler", (ApiHandler,), {
+        "tokens": carregar_tokens() if tokens is None else tokens,
+        "silencioso": silencioso,
+    })
+    return ApiServer((host, porta), handler)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--porta", type=int, default=8765)
+    ap.add_argument("--db-pessoal", help="arquivo do finance_pessoal.db (padrão: o do app)")
+    ap.add_argument("--db-controle", help="arquivo do finance.db (padrão: o do app)")
+    ap.add_argument("--silencioso", action="store_true", help="não loga cada requisição")
+    args = ap.parse_args()
+
+    if args.db_pessoal:
+        pessoal.usar_banco(args.db_pessoal)
+    if args.db_controle:
+        controle.usar_banco(args.db_controle)
+    controle.criar_tabelas()
+
+    srv = criar_servidor(args.host, args.porta, silencioso=args.silencioso)
+    modo = f"{len(srv.RequestHandlerClass.tokens)} token(s)" if srv.RequestHandlerClass.tokens else "sem autenticação"
+    print(f"API em http://{args.host}:{srv.server_address[1]} ({modo})")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Calendário de faturas: mês da fatura e vencimento de arrays inteiros de
+datas (numpy), pelas regras de fechamento de cada cartão.
+
+Regra de um cartão:
+- closing_day / due_day de 1 a 31; em mês mais curto vale o último dia
+  (31 = fecha no fim do mês).
+- ajuste (closing_adjust / due_adjust) quando o dia cai em fim de semana
+  ou feriado: NONE (fica no dia), PREV (dia útil anterior) ou NEXT
+  (próximo dia útil). "Último dia útil" = dia 31 + PREV.
+- feriados: datas locais (tabela holidays do finance_pessoal.db).
+
+A compra do dia D vai para a fatura do mês M se D <= fechamento efetivo
+de M. Com NEXT o fechamento pode cair no mês seguinte: a compra feita
+antes dele, já no mês novo, ainda entra na fatura anterior.
+
+O vencimento fica no mês da fatura se due_day > closing_day, senão no
+mês seguinte (mesma regra de statement_due_date).
+
+Os fechamentos de cada (regra, intervalo de meses) ficam memoizados;
+as datas são comparadas de uma vez contra essa tabela.
+"""
+import functools
+from datetime import date
+
+import numpy as np
+
+AJUSTES = ("NONE", "PREV", "NEXT")
+_ROLL = {"PREV": "backward", "NEXT": "forward"}
+
+
+@functools.lru_cache(maxsize=64)
+def _calendario_util(feriados: tuple) -> np.busdaycalendar:
+    return np.busdaycalendar(holidays=np.array(feriados, dtype="datetime64[D]"))
+
+
+def _dia_no_mes(meses: np.ndarray, dia: int, ajuste: str, feriados: tuple) -> np.ndarray:
+    """`dia` (limitado ao fim do mês) de cada mês em `meses` (datetime64[M]), já com o ajuste de dia útil."""
+    ok = ~np.isnat(meses)
+    out = np.full(meses.shape, np.datetime64("NaT"), dtype="datetime64[D]")
+    m = meses[ok]
+    out[ok] = np.minimum(m.astype("datetime64[D]") + (int(dia) - 1), (m + 1).astype("datetime64[D]") - 1)
+    if ajuste != "NONE":
+        out[ok] = np.busday_offset(out[ok], 0, roll=_ROLL[ajuste], busdaycal=_calendario_util(feriados))
+    return out
+
+
+@functools.lru_cache(maxsize=256)
+def _fechamentos(closing_day: int, ajuste: str, feriados: tuple, m0: int, m1: int) -> np.ndarray:
+    """Fechamento efetivo de cada mês de m0 a m1 (meses desde 1970-01, inclusive)."""
+    return _dia_no_mes(np.arange(m0, m1 + 1).astype("datetime64[M]"), closing_day, ajuste, feriados)
+
+
+def _validar(dia: int, ajuste: str):
+    if not 1 <= int(dia) <= 31:
+        raise ValueError(f"Dia {dia} fora de 1-31.")
+    if ajuste not in AJUSTES:
+        raise ValueError(f"Ajuste {ajuste!r} inválido (use {', '.join(AJUSTES)}).")
+
+
+def meses_da_fatura(datas, closing_day: int, ajuste: str = "NONE", feriados: tuple = ()) -> np.ndarray:
+    """Mês da fatura (datetime64[M]) de cada data de compra; NaT continua NaT."""
+    _validar(closing_day, ajuste)
+    d = np.asarray(datas, dtype="datetime64[D]")
+    ok = ~np.isnat(d)
+    out = np.full(d.shape, np.datetime64("NaT"), dtype="datetime64[M]")
+    if not ok.any():
+        return out
+
+    mi = d[ok].astype("datetime64[M]").astype(np.int64)
+    m0, m1 = int(mi.min()) - 1, int(mi.max())
+    fech = _fechamentos(int(closing_day), ajuste, tuple(feriados), m0, m1)
+    k = mi - m0
+    out[ok] = (mi + (d[ok] > fech[k]) - (d[ok] <= fech[k - 1])).astype("datetime64[M]")
+    return out
+
+
+def vencimentos(meses_fatura, closing_day: int, due_day: int, ajuste: str = "NONE",
+                feriados: tuple = ()) -> np.ndarray:
+    """Vencimento (datetime64[D]) de cada mês de fatura."""
+    _validar(due_day, ajuste)
+    m = np.asarray(meses_fatura, dtype="datetime64[M]")
+    return _dia_no_mes(m if int(due_day) > int(closing_day) else m + 1, due_day, ajuste, tuple(feriados))
+
+
+@functools.lru_cache(maxsize=4096)
+def fechamento(closing_day: int, ajuste: str, feriados: tuple, ym: str) -> date:
+    """Fechamento efetivo da fatura `ym` de uma regra (memoizado por regra e mês)."""
+    _validar(closing_day, ajuste)
+    return _dia_no_mes(np.array([ym], dtype="datetime64[M]"), closing_day, ajuste, feriados)[0].item()
+
+
+def mes_da_fatura(d: date, closing_day: int, ajuste: str = "NONE", feriados: tuple = ()) -> str:
+    """Versão escalar de meses_da_fatura (formulário, recorrências): 'YYYY-MM'."""
+    from financas.datas import ym_add
+
+    ym = f"{d.year:04d}-{d.month:02d}"
+    if ajuste == "NONE":
+        return ym if d.day <= closing_day else ym_add(ym, 1)
+    feriados = tuple(feriados)
+    if ajuste == "NEXT" and d <= fechamento(closing_day, ajuste, feriados, ym_add(ym, -1)):
+        return ym_add(ym, -1)
+    if d <= fechamento(closing_day, ajuste, feriados, ym):
+        return ym
+    return ym_add(ym, 1)
+
+
+def vencimento(ym: str, closing_day: int, due_day: int, ajuste: str = "NONE", feriados: tuple = ()) -> date:
+    return vencimentos(np.array([ym], dtype="datetime64[M]"), closing_day, due_day, ajuste, tuple(feriados))[0].item()
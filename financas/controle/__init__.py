@@ -0,0 +1,31 @@
+"""
+Motor do app.py (finance.db: lançamentos a receber/pagar), importável sem Streamlit.
+
+Mesma ideia de `financas.pessoal`: nomes reexportados sob demanda.
+"""
+import importlib
+
+_EXPORTS = {
+    "db": [
+        "DB", "usar_banco", "db_atual", "conectar", "data_version", "criar_tabelas", "inserir_lancamento", "marcar_como_pago",
+        "liquidar", "pagar_parcial", "pagamentos_de", "marcar_vencidos", "rodar_agendador", "marcar_alertas_vistos", "reconstruir_pessoas",
+    ],
+    "loaders": ["memo", "carregar_df", "carregar_pagamentos"],
+    "regras": ["periodo_mes", "agregar_lancamentos", "resumo_periodo", "resumo_periodos", "resumo_mes", "projecao_saldo"],
+    "vencimentos": ["FAIXAS", "pendentes", "aging", "alertas_vencidos"],
+    "razao": ["ORDENS", "pessoas", "total_pessoas", "resumo_pessoa", "extrato_pessoa"],
+}
+_ONDE = {nome: mod for mod, nomes in _EXPORTS.items() for nome in nomes}
+
+__all__ = sorted(_ONDE)
+
+
+def __getattr__(nome):
+    mod = _ONDE.get(nome)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    return getattr(importlib.import_module(f"{__name__}.{mod}"), nome)
+
+
+def __dir__():
+    return __all__
@@ -0,0 +1,375 @@
+"""Conexão, schema e escritas do finance.db (sem pandas)."""
+import sqlite3
+from pathlib import Path
+
+from financas.eventos import assinantes_em, emitir
+from financas.tenants import POOL, PooledConnection, tenant_atual, tenant_db_path
+
+DB = "finance.db"
+
+# Cache de carregar_df atualizado só nas linhas tocadas por uma liquidação (ver controle.loaders)
+assinantes_em("financas.controle.loaders")
+# Pagamentos suficientes para quitar: valor_pago >= valor - TOLERANCIA
+TOLERANCIA = 0.005
+
+def usar_banco(path: str):
+    """Aponta o motor para outro arquivo (benchmarks, CLI, testes manuais)."""
+    global DB
+    DB = str(path)
+
+# Razão por pessoa: contribuição de uma linha {r} a cada coluna de pessoas_saldo.
+# Prazo = dias entre vencimento e data_pagamento (negativo = pagou antes), só dos PAGO com data.
+_PRAZO = "julianday({r}.data_pagamento) - julianday({r}.vencimento)"
+PESSOA_COLUNAS = {
+    # em aberto = valor - pagamentos parciais; realizado = valor (PAGO) ou o que já foi pago (PENDENTE)
+    "a_receber": "CASE WHEN {r}.status = 'PENDENTE' AND {r}.tipo = 'RECEBER' THEN {r}.valor - {r}.valor_pago ELSE 0 END",
+    "a_pagar": "CASE WHEN {r}.status = 'PENDENTE' AND {r}.tipo = 'PAGAR' THEN {r}.valor - {r}.valor_pago ELSE 0 END",
+    "recebido": "CASE WHEN {r}.tipo = 'RECEBER' THEN "
+                "CASE WHEN {r}.status = 'PAGO' THEN {r}.valor ELSE {r}.valor_pago END ELSE 0 END",
+    "pago": "CASE WHEN {r}.tipo = 'PAGAR' THEN "
+            "CASE WHEN {r}.status = 'PAGO' THEN {r}.valor ELSE {r}.valor_pago END ELSE 0 END",
+    "n_pendentes": "({r}.status = 'PENDENTE')",
+    "n_pagos": "({r}.status = 'PAGO')",
+    "dias_soma": f"COALESCE(CASE WHEN {{r}}.status = 'PAGO' THEN {_PRAZO} END, 0)",
+    "dias_n": f"(CASE WHEN {{r}}.status = 'PAGO' AND {_PRAZO} IS NOT NULL THEN 1 ELSE 0 END)",
+}
+
+def _pessoa_upsert(r, sinal=""):
+    """Soma (sinal "") ou retira (sinal "-") a linha NEW/OLD do razão da pessoa."""
+    cols = ", ".join(PESSOA_COLUNAS)
+    vals = ", ".join(f"{sinal}({e.format(r=r)})" for e in PESSOA_COLUNAS.values())
+    sets = ", ".join(f"{c} = {c} + excluded.{c}" for c in PESSOA_COLUNAS)
+    return f"""
+        INSERT INTO pessoas_saldo (pessoa, {cols})
+        SELECT COALESCE({r}.pessoa, ''), {vals} WHERE 1
+        ON CONFLICT(pessoa) DO UPDATE SET {sets};
+    """
+
+def reconstruir_pessoas(con=None):
+    """Recalcula pessoas_saldo do zero (criação da tabela, conferência)."""
+    def run(c):
+        c.execute("DELETE FROM pessoas_saldo")
+        somas = ", ".join(f"SUM({e.format(r='l')})" for e in PESSOA_COLUNAS.values())
+        return c.execute(f"""
+            INSERT INTO pessoas_saldo (pessoa, {", ".join(PESSOA_COLUNAS)})
+            SELECT COALESCE(l.pessoa, ''), {somas} FROM lancamentos l GROUP BY COALESCE(l.pessoa, '')
+        """).rowcount
+
+    if con is not None:
+        return run(con)
+    with conectar() as c:
+        n = run(c)
+        c.commit()
+    return n
+
+def db_atual() -> str:
+    """Arquivo do tenant do contexto atual; sem tenant, o banco padrão (DB)."""
+    tenant = tenant_atual()
+    return tenant_db_path(tenant, Path(DB).name) if tenant else DB
+
+def conectar():
+    """Conexão do pool por arquivo (o mesmo do pessoal), medida pela instrumentação."""
+    return PooledConnection(POOL, db_atual())
+
+def data_version():
+    """Contador mantido por trigger em lancamentos (None antes do criar_tabelas)."""
+    with conectar() as con:
+        try:
+            row = con.execute("SELECT version FROM data_version WHERE id=1").fetchone()
+        except sqlite3.OperationalError:
+            return None
+    return int(row[0]) if row else None
+
+def criar_tabelas():
+    with conectar() as con:
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS lancamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL CHECK(tipo IN ('RECEBER','PAGAR')),
+            pessoa TEXT,
+            categoria TEXT,
+            descricao TEXT,
+            valor REAL NOT NULL,
+            vencimento TEXT NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('PENDENTE','PAGO')) DEFAULT 'PENDENTE',
+            data_pagamento TEXT
+        );
+        """)
+        # Pendentes por urgência (Pendentes, aging, agendador) sem varrer a tabela
+        con.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_status_venc ON lancamentos(status, vencimento);")
+
+        # Pagamentos (parciais ou a quitação): valor_pago é a soma deles, mantida por trigger.
+        # PAGO anteriores aos pagamentos ficam com valor_pago = 0 (quitados, sem histórico).
+        cols = {r[1] for r in con.execute("PRAGMA table_info(lancamentos)")}
+        novo_valor_pago = "valor_pago" not in cols
+        if novo_valor_pago:
+            con.execute("ALTER TABLE lancamentos ADD COLUMN valor_pago REAL NOT NULL DEFAULT 0")
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS pagamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lancamento_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            valor REAL NOT NULL,
+            criado_em TEXT NOT NULL DEFAULT (datetime('now')),
+            FOREIGN KEY(lancamento_id) REFERENCES lancamentos(id)
+        );
+        """)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_pagamentos_lancamento ON pagamentos(lancamento_id, data);")
+        con.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_pagamentos_ins AFTER INSERT ON pagamentos
+        BEGIN
+            UPDATE lancamentos SET valor_pago = valor_pago + NEW.valor WHERE id = NEW.lancamento_id;
+        END;
+        """)
+        con.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_pagamentos_del AFTER DELETE ON pagamentos
+        BEGIN
+            UPDATE lancamentos SET valor_pago = valor_pago - OLD.valor WHERE id = OLD.lancamento_id;
+        END;
+        """)
+
+        # Alerta por lançamento que passou do vencimento ainda PENDENTE (gravado pelo agendador diário)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS alertas_vencidos (
+            lancamento_id INTEGER PRIMARY KEY,
+            vencimento TEXT NOT NULL,
+            detectado_em TEXT NOT NULL,
+            visto INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(lancamento_id) REFERENCES lancamentos(id)
+        );
+        """)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS agendador (
+            tarefa TEXT PRIMARY KEY,
+            ultima_execucao TEXT NOT NULL
+        );
+        """)
+        # pago ou excluído deixa de estar vencido
+        con.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_lancamentos_pago_alerta AFTER UPDATE OF status ON lancamentos
+        WHEN NEW.status = 'PAGO'
+        BEGIN
+            DELETE FROM alertas_vencidos WHERE lancamento_id = NEW.id;
+        END;
+        """)
+        con.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_lancamentos_del_alerta AFTER DELETE ON lancamentos
+        BEGIN
+            DELETE FROM alertas_vencidos WHERE lancamento_id = OLD.id;
+        END;
+        """)
+
+        # Razão por pessoa (cliente/fornecedor): saldos em aberto, realizado e prazo de pagamento,
+        # mantido por trigger a cada escrita em lancamentos. '' = lançamentos sem pessoa.
+        has_pessoas = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='pessoas_saldo'"
+        ).fetchone()
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS pessoas_saldo (
+            pessoa TEXT PRIMARY KEY,
+            a_receber REAL NOT NULL DEFAULT 0,
+            a_pagar REAL NOT NULL DEFAULT 0,
+            recebido REAL NOT NULL DEFAULT 0,
+            pago REAL NOT NULL DEFAULT 0,
+            n_pendentes INTEGER NOT NULL DEFAULT 0,
+            n_pagos INTEGER NOT NULL DEFAULT 0,
+            dias_soma REAL NOT NULL DEFAULT 0,
+            dias_n INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_pessoas_saldo_aberto ON pessoas_saldo(a_receber + a_pagar, pessoa);")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_pessoas_saldo_liquido ON pessoas_saldo(a_receber - a_pagar, pessoa);")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_pessoa_venc ON lancamentos(pessoa, vencimento);")
+        if not has_pessoas:
+            reconstruir_pessoas(con)
+        if novo_valor_pago:
+            # triggers de antes do valor_pago (o saldo não muda: valor_pago = 0 em todas as linhas)
+            for op in ("ins", "del", "upd"):
+                con.execute(f"DROP TRIGGER IF EXISTS trg_lancamentos_{op}_pessoa")
+        novo = _pessoa_upsert("NEW")
+        velho = _pessoa_upsert("OLD", "-") + """
+            DELETE FROM pessoas_saldo
+            WHERE pessoa = COALESCE(OLD.pessoa, '') AND n_pendentes = 0 AND n_pagos = 0;
+        """
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_lancamentos_ins_pessoa AFTER INSERT ON lancamentos BEGIN {novo} END;")
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_lancamentos_del_pessoa AFTER DELETE ON lancamentos BEGIN {velho} END;")
+        con.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_lancamentos_upd_pessoa
+        AFTER UPDATE OF tipo, pessoa, valor, valor_pago, vencimento, status, data_pagamento ON lancamentos
+        BEGIN {velho} {novo} END;
+        """)
+
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK(id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        con.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);")
+        for op in ["INSERT", "UPDATE", "DELETE"]:
+            con.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_lancamentos_{op.lower()}_version AFTER {op} ON lancamentos
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE id = 1;
+            END;
+            """)
+        con.commit()
+
+def inserir_lancamento(tipo, pessoa, categoria, descricao, valor, vencimento_iso):
+    with conectar() as con:
+        con.execute("""
+            INSERT INTO lancamentos
+            (tipo, pessoa, categoria, descricao, valor, vencimento, status)
+            VALUES (?, ?, ?, ?, ?, ?, 'PENDENTE')
+        """, (tipo, pessoa or None, categoria or None, descricao or None, float(valor), vencimento_iso))
+        con.commit()
+
+def marcar_vencidos(hoje_iso):
+    """Cria o alerta dos PENDENTE com vencimento antes de hoje que ainda não têm um; devolve quantos novos."""
+    with conectar() as con:
+        cur = con.execute("""
+            INSERT OR IGNORE INTO alertas_vencidos (lancamento_id, vencimento, detectado_em)
+            SELECT id, vencimento, ? FROM lancamentos
+            WHERE status = 'PENDENTE' AND vencimento < ?
+        """, (hoje_iso, hoje_iso))
+        con.commit()
+        return cur.rowcount
+
+def rodar_agendador(hoje_iso, forcar=False):
+    """
+    Tarefas diárias (hoje: marcar_vencidos). Roda no máximo uma vez por dia por banco;
+    o app chama a cada abertura e o cron pode chamar via `finance.py --app controle vencidos`.
+    Devolve {"executou": bool, "novos": int}.
+    """
+    with conectar() as con:
+        row = con.execute("SELECT ultima_execucao FROM agendador WHERE tarefa='vencidos'").fetchone()
+    if row and row[0] >= hoje_iso and not forcar:
+        return {"executou": False, "novos": 0}
+    novos = marcar_vencidos(hoje_iso)
+    with conectar() as con:
+        con.execute("INSERT OR REPLACE INTO agendador (tarefa, ultima_execucao) VALUES ('vencidos', ?)", (hoje_iso,))
+        con.commit()
+    return {"executou": True, "novos": novos}
+
+def marcar_alertas_vistos(ids=None):
+    """Marca como vistos os alertas de vencidos (todos se ids for None)."""
+    with conectar() as con:
+        if ids is None:
+            con.execute("UPDATE alertas_vencidos SET visto=1 WHERE visto=0")
+        else:
+            con.executemany("UPDATE alertas_vencidos SET visto=1 WHERE lancamento_id=?", [(int(i),) for i in ids])
+        con.commit()
+
+def _escrever(fn):
+    """
+    Roda fn(con) numa transação só (BEGIN IMMEDIATE) e devolve (resultado, (v0, v1)):
+    data_version antes e depois, lidas dentro da transação, para o cache de
+    carregar_df aplicar só as linhas tocadas (nenhuma outra escrita entre v0 e v1).
+    """
+    with conectar() as con:  # commit no fim; exceção desfaz
+        con.execute("BEGIN IMMEDIATE")
+        v0 = con.execute("SELECT version FROM data_version WHERE id=1").fetchone()[0]
+        out = fn(con)
+        v1 = con.execute("SELECT version FROM data_version WHERE id=1").fetchone()[0]
+    return out, (int(v0), int(v1))
+
+def liquidar(data_pagamento_iso, ids=None, pessoa=None, vencimento_ate=None, tipo=None):
+    """
+    Quita de uma vez os PENDENTE escolhidos por `ids` e/ou filtro (pessoa, vencimento
+    até, tipo), numa transação só: grava o pagamento do que falta de cada um e marca PAGO.
+    Sem ids nem filtro não quita nada (ValueError).
+    Devolve {"ids", "quantidade", "total"} (total = soma dos pagamentos gravados agora).
+    """
+    if ids is None and pessoa is None and vencimento_ate is None and tipo is None:
+        raise ValueError("Informe os lançamentos ou um filtro (pessoa, vencimento até, tipo).")
+    where, params = ["status = 'PENDENTE'"], []
+    if ids is not None:
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {"ids": [], "quantidade": 0, "total": 0.0}
+        where.append(f"id IN ({','.join('?' * len(ids))})")
+        params += ids
+    if pessoa is not None:
+        where.append("COALESCE(pessoa, '') = ?")
+        params.append(pessoa)
+    if vencimento_ate is not None:
+        where.append("vencimento <= ?")
+        params.append(vencimento_ate)
+    if tipo is not None:
+        where.append("tipo = ?")
+        params.append(tipo)
+
+    def run(con):
+        rows = con.execute(f"""
+            SELECT id, ROUND(valor - valor_pago, 2) FROM lancamentos
+            WHERE {" AND ".join(where)}
+            ORDER BY vencimento, id
+        """, params).fetchall()
+        con.executemany(
+            "INSERT INTO pagamentos (lancamento_id, data, valor) VALUES (?, ?, ?)",
+            [(i, data_pagamento_iso, v) for i, v in rows if v > TOLERANCIA],
+        )
+        con.executemany(
+            "UPDATE lancamentos SET status='PAGO', data_pagamento=? WHERE id=?",
+            [(data_pagamento_iso, i) for i, _ in rows],
+        )
+        return rows
+
+    rows, versoes = _escrever(run)
+    out = [i for i, _ in rows]
+    if out:
+        emitir("lancamentos", "update", ids=out, versoes=versoes)
+    return {
+        "ids": out,
+        "quantidade": len(out),
+        "total": round(sum(v for _, v in rows if v > TOLERANCIA), 2),
+    }
+
+def pagar_parcial(lancamento_id, valor, data_pagamento_iso):
+    """
+    Registra um pagamento parcial; se cobrir o que falta, o lançamento vira PAGO
+    nessa data. Devolve {"id", "valor_pago", "em_aberto", "status"}.
+    """
+    lancamento_id, valor = int(lancamento_id), round(float(valor), 2)
+    if valor <= 0:
+        raise ValueError("O valor do pagamento deve ser maior que zero.")
+
+    def run(con):
+        row = con.execute(
+            "SELECT valor, valor_pago, status FROM lancamentos WHERE id=?", (lancamento_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Lançamento {lancamento_id} não encontrado.")
+        total, pago, status = row
+        if status != "PENDENTE":
+            raise ValueError(f"Lançamento {lancamento_id} já está pago.")
+        em_aberto = round(total - pago, 2)
+        if valor > em_aberto + TOLERANCIA:
+            raise ValueError(f"Pagamento de {valor:.2f} maior que o valor em aberto ({em_aberto:.2f}).")
+        con.execute(
+            "INSERT INTO pagamentos (lancamento_id, data, valor) VALUES (?, ?, ?)",
+            (lancamento_id, data_pagamento_iso, valor),
+        )
+        pago = round(pago + valor, 2)
+        if pago >= total - TOLERANCIA:
+            status = "PAGO"
+            con.execute(
+                "UPDATE lancamentos SET status='PAGO', data_pagamento=? WHERE id=?",
+                (data_pagamento_iso, lancamento_id),
+            )
+        return {"id": lancamento_id, "valor_pago": pago, "em_aberto": round(max(total - pago, 0.0), 2), "status": status}
+
+    out, versoes = _escrever(run)
+    emitir("lancamentos", "update", ids=[lancamento_id], versoes=versoes)
+    return out
+
+def pagamentos_de(lancamento_id):
+    """Pagamentos de um lançamento, do mais antigo ao mais recente: [(id, data, valor)]."""
+    with conectar() as con:
+        return con.execute(
+            "SELECT id, data, valor FROM pagamentos WHERE lancamento_id=? ORDER BY data, id", (int(lancamento_id),)
+        ).fetchall()
+
+def marcar_como_pago(lancamento_id, data_pagamento_iso):
+    """Quita um lançamento (atalho de liquidar para um id)."""
+    return liquidar(data_pagamento_iso, ids=[lancamento_id])
@@ -0,0 +1,86 @@
+"""Loader do finance.db."""
+import json
+
+import pandas as pd
+
+from financas import eventos
+from financas import instrumentacao as instr
+from financas.controle.db import conectar, data_version, db_atual
+from financas.tenants import CACHE, cached_loader
+
+
+def memo(nome, compute):
+    """Derivados do finance.db no cache do tenant, pela data_version do controle."""
+    version = data_version()
+    if version is None:
+        return compute()
+    return CACHE.get_or_compute((db_atual(), nome), version, compute)
+
+
+def _ler(con, where: str = "", params=()) -> pd.DataFrame:
+    df = pd.read_sql_query(f"""
+        SELECT id, tipo, pessoa, categoria, descricao,
+               valor, valor_pago, vencimento, status, data_pagamento
+        FROM lancamentos
+        {where}
+        ORDER BY vencimento ASC, id ASC
+    """, con, params=params)
+
+    df["valor"] = pd.to_numeric(df["valor"], errors="coerce").fillna(0.0)
+    df["valor_pago"] = pd.to_numeric(df["valor_pago"], errors="coerce").fillna(0.0)
+
+    # ✅ PADRÃO DEFINITIVO: datas internas como datetime (Timestamp) normalizadas
+    df["vencimento_dt"] = pd.to_datetime(df["vencimento"], errors="coerce").dt.normalize()
+    df["data_pagamento_dt"] = pd.to_datetime(df["data_pagamento"], errors="coerce").dt.normalize()
+
+    # Campos texto
+    df["pessoa"] = df["pessoa"].fillna("")
+    df["categoria"] = df["categoria"].fillna("")
+    df["descricao"] = df["descricao"].fillna("")
+    return df
+
+
+@instr.medido("loader")
+@cached_loader(db_atual, data_version)
+def carregar_df():
+    with conectar() as con:
+        return _ler(con)
+
+
+@instr.medido("loader")
+@cached_loader(db_atual, data_version)
+def carregar_pagamentos():
+    """Pagamentos gravados (parciais e quitações) com tipo e status do lançamento, e data_dt."""
+    with conectar() as con:
+        df = pd.read_sql_query("""
+            SELECT p.lancamento_id, l.tipo, l.status, p.data, p.valor
+            FROM pagamentos p JOIN lancamentos l ON l.id = p.lancamento_id
+            ORDER BY p.data ASC, p.id ASC
+        """, con)
+    df["valor"] = pd.to_numeric(df["valor"], errors="coerce").fillna(0.0)
+    df["data_dt"] = pd.to_datetime(df["data"], errors="coerce").dt.normalize()
+    return df
+
+
+@eventos.assinar
+def _on_write(evs: list):
+    """
+    Liquidação/pagamento: se o cache de carregar_df está na versão de antes da escrita,
+    troca só as linhas tocadas e o guarda na versão de depois, sem reler a tabela.
+    """
+    chave = (db_atual(), "carregar_df")
+    for e in evs:
+        if e["tabela"] != "lancamentos" or not e.get("versoes"):
+            continue
+        v0, v1 = e["versoes"]
+        hit = CACHE.peek(chave)
+        if hit is None or hit[0] != v0:
+            continue
+        ids = [int(i) for i in e["ids"]]
+        with conectar() as con:
+            novas = _ler(con, "WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))
+        antigo = hit[1]
+        novas = novas.astype(antigo.dtypes.to_dict())  # lote só com NULL não muda o dtype da coluna
+        df = pd.concat([antigo[~antigo["id"].isin(ids)], novas], ignore_index=True)
+        df = df.sort_values(["vencimento", "id"], kind="mergesort", ignore_index=True)
+        CACHE.put(chave, v1, df)
@@ -0,0 +1,80 @@
+"""
+Razão por pessoa (cliente/fornecedor) do finance.db.
+
+Os totais vêm da tabela pessoas_saldo, mantida por trigger a cada escrita
+em lancamentos: listar e ordenar as pessoas é uma consulta paginada pelo
+índice da ordem escolhida, sem agrupar os lançamentos. O extrato de uma
+pessoa usa o índice (pessoa, vencimento).
+"""
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.controle.db import conectar
+
+# ordem -> expressão indexada (idx_pessoas_saldo_*) e direção
+ORDENS = {
+    "aberto": ("a_receber + a_pagar", "DESC"),
+    "saldo": ("a_receber - a_pagar", "DESC"),
+    "nome": ("pessoa", "ASC"),  # chave primária
+}
+
+# somas incrementais acumulam resíduo de ponto flutuante: arredonda na leitura
+_COLUNAS = """
+    pessoa, ROUND(a_receber, 2) AS a_receber, ROUND(a_pagar, 2) AS a_pagar, ROUND(a_receber - a_pagar, 2) AS saldo,
+    ROUND(recebido, 2) AS recebido, ROUND(pago, 2) AS pago, n_pendentes, n_pagos,
+    CASE WHEN dias_n > 0 THEN ROUND(dias_soma / dias_n, 1) END AS prazo_medio
+"""
+
+
+@instr.medido("calc")
+def pessoas(ordem: str = "aberto", busca: str = None, limite: int = 200, offset: int = 0) -> pd.DataFrame:
+    """
+    Uma linha por pessoa: a_receber/a_pagar (PENDENTE), saldo (a receber - a pagar),
+    recebido/pago, contagens e prazo_medio (dias após o vencimento; negativo = antes).
+    """
+    if ordem not in ORDENS:
+        raise ValueError(f"Ordem {ordem!r} inválida (use {', '.join(ORDENS)}).")
+    expr, direcao = ORDENS[ordem]
+    order = f"{expr} {direcao}" if expr == "pessoa" else f"{expr} {direcao}, pessoa {direcao}"
+    where, params = "", []
+    if busca:
+        where = "WHERE pessoa LIKE ?"
+        params.append(f"%{busca.strip()}%")
+    with conectar() as con:
+        return pd.read_sql_query(
+            f"SELECT {_COLUNAS} FROM pessoas_saldo {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            con, params=[*params, int(limite), int(offset)],
+        )
+
+
+def total_pessoas(busca: str = None) -> int:
+    with conectar() as con:
+        if busca:
+            return con.execute("SELECT COUNT(*) FROM pessoas_saldo WHERE pessoa LIKE ?",
+                               (f"%{busca.strip()}%",)).fetchone()[0]
+        return con.execute("SELECT COUNT(*) FROM pessoas_saldo").fetchone()[0]
+
+
+def resumo_pessoa(pessoa: str) -> dict:
+    """Totais de uma pessoa ({} se não houver lançamentos)."""
+    with conectar() as con:
+        cur = con.execute(f"SELECT {_COLUNAS} FROM pessoas_saldo WHERE pessoa = ?", (pessoa or "",))
+        row = cur.fetchone()
+        return dict(zip([c[0] for c in cur.description], row)) if row else {}
+
+
+@instr.medido("calc")
+def extrato_pessoa(pessoa: str) -> pd.DataFrame:
+    """Lançamentos da pessoa por vencimento, com `dias` entre vencimento e pagamento (PAGO)."""
+    filtro = "pessoa = ?" if pessoa else "(pessoa IS NULL OR pessoa = '')"
+    with conectar() as con:
+        df = pd.read_sql_query(f"""
+            SELECT id, tipo, categoria, descricao, valor, valor_pago, vencimento, status, data_pagamento,
+                   CAST(julianday(data_pagamento) - julianday(vencimento) AS INTEGER) AS dias
+            FROM lancamentos WHERE {filtro}
+            ORDER BY vencimento, id
+        """, con, params=[pessoa] if pessoa else [])
+    df["categoria"] = df["categoria"].fillna("")
+    df["descricao"] = df["descricao"].fillna("")
+    df["dias"] = df["dias"].astype("Int64")
+    return df
@@ -0,0 +1,129 @@
+"""Regras de app.py: resumo por período e projeção de saldo."""
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.controle.db import TOLERANCIA
+from financas.controle.loaders import carregar_pagamentos
+from financas.datas import mes_ts
+from financas.periodos import agregar_eixos, limites_periodo, periodo_de, periodos_disponiveis, por_periodo, somar
+
+_FIM_DO_DIA = pd.Timedelta(days=1) - pd.Timedelta(seconds=1)  # 23:59:59
+
+
+def periodo_mes(ano: int, mes: int):
+    """
+    Retorna (inicio_dt, fim_dt) como Timestamps.
+    fim_dt é 'fim do dia' para incluir todo o dia.
+    """
+    inicio, fim = mes_ts(f"{int(ano):04d}-{int(mes):02d}")  # último dia do mês, 00:00
+    return inicio, fim + _FIM_DO_DIA
+
+@instr.medido("calc")
+def agregar_lancamentos(df, pagamentos=None):
+    """
+    Agregado diário dos três eixos:
+    - previsto: todas as linhas por vencimento, pelo valor cheio
+    - aberto: o que falta dos PENDENTE (valor - valor_pago), por vencimento
+    - realizado: cada pagamento (parcial ou quitação) na sua data; PAGO quitados
+      antes da tabela de pagamentos entram pelo que falta, na data_pagamento
+    `pagamentos` é o de carregar_pagamentos() (padrão: o do banco atual).
+    """
+    if pagamentos is None:
+        pagamentos = carregar_pagamentos()
+    chaves = ["tipo", "status"]
+    pago = df["status"] == "PAGO"
+    # aberto e realizado somam o mesmo `resto`: o que falta de cada lançamento e, embaixo, cada pagamento
+    resto = pd.concat([
+        df[chaves].assign(resto=(df["valor"] - df["valor_pago"]).round(2),
+                          aberto=df["vencimento_dt"].where(~pago), realizado=df["data_pagamento_dt"].where(pago)),
+        pagamentos[chaves].astype(df[chaves].dtypes.to_dict()).assign(
+            resto=pagamentos["valor"], aberto=pd.Series(pd.NaT, pagamentos.index, "datetime64[ns]"),
+            realizado=pagamentos["data_dt"]),
+    ], ignore_index=True)
+    resto["realizado"] = resto["realizado"].where(resto["resto"].abs() > TOLERANCIA)
+    return pd.concat([
+        agregar_eixos(df, {"previsto": df["vencimento_dt"]}, valor="valor", chaves=chaves),
+        agregar_eixos(resto, {"aberto": resto["aberto"], "realizado": resto["realizado"]}, valor="resto", chaves=chaves),
+    ], ignore_index=True)
+
+def resumo_periodo(agg_p, periodo):
+    """Resumo de um período (qualquer frequência) a partir do agregado de `por_periodo`."""
+    inicio, fim = limites_periodo(periodo)
+
+    previsto_receber = somar(agg_p, "previsto", periodo, tipo="RECEBER")
+    previsto_pagar = somar(agg_p, "previsto", periodo, tipo="PAGAR")
+    pendente_receber = somar(agg_p, "aberto", periodo, tipo="RECEBER")
+    pendente_pagar = somar(agg_p, "aberto", periodo, tipo="PAGAR")
+    recebido = somar(agg_p, "realizado", periodo, tipo="RECEBER")
+    pago = somar(agg_p, "realizado", periodo, tipo="PAGAR")
+
+    return {
+        "inicio": inicio.date(),
+        "fim": fim.date(),
+        "previsto_receber": previsto_receber,
+        "previsto_pagar": previsto_pagar,
+        "saldo_previsto": previsto_receber - previsto_pagar,
+        "pendente_receber": pendente_receber,
+        "pendente_pagar": pendente_pagar,
+        "recebido": recebido,
+        "pago": pago,
+        "saldo_realizado": recebido - pago
+    }
+
+_COLUNAS_RESUMO = {
+    "previsto_receber": ("previsto", "RECEBER"), "previsto_pagar": ("previsto", "PAGAR"),
+    "pendente_receber": ("aberto", "RECEBER"), "pendente_pagar": ("aberto", "PAGAR"),
+    "recebido": ("realizado", "RECEBER"), "pago": ("realizado", "PAGAR"),
+}
+
+@instr.medido("calc")
+def resumo_periodos(agg_p, periodos=None):
+    """
+    resumo_periodo de vários períodos numa pivot só (histórico do Resumo):
+    uma linha por período, com as mesmas chaves de resumo_periodo.
+    `periodos` padrão: todos os do agregado (periodos_disponiveis).
+    """
+    if periodos is None:
+        periodos = periodos_disponiveis(agg_p)
+    tab = agg_p.pivot_table(index="periodo", columns=["eixo", "tipo"], values="total", aggfunc="sum", fill_value=0.0)
+    tab = tab.reindex(pd.Index(periodos, name="periodo"), fill_value=0.0)
+    out = pd.DataFrame({
+        col: tab[chave].astype(float) if chave in tab.columns else 0.0 for col, chave in _COLUNAS_RESUMO.items()
+    }, index=tab.index)
+    out.insert(0, "fim", [p.end_time.normalize().date() for p in out.index])
+    out.insert(0, "inicio", [p.start_time.normalize().date() for p in out.index])
+    out["saldo_previsto"] = out["previsto_receber"] - out["previsto_pagar"]
+    out["saldo_realizado"] = out["recebido"] - out["pago"]
+    return out.reset_index()
+
+@instr.medido("calc")
+def resumo_mes(df, ano, mes, agg=None):
+    if agg is None:
+        agg = agregar_lancamentos(df)
+    return resumo_periodo(por_periodo(agg, "mes"), periodo_de(f"{int(ano):04d}-{int(mes):02d}", "mes"))
+
+@instr.medido("calc")
+def projecao_saldo(df, dias=60, saldo_inicial=0.0):
+    hoje_dt = pd.Timestamp.today().normalize()
+    fim_dt = hoje_dt + pd.Timedelta(days=int(dias)) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+
+    pend = df[(df["status"] == "PENDENTE") & (df["vencimento_dt"].notna())].copy()
+    pend = pend[(pend["vencimento_dt"] >= hoje_dt) & (pend["vencimento_dt"] <= fim_dt)]
+    pend = pend.sort_values(["vencimento_dt", "id"])
+
+    saldo = float(saldo_inicial)
+    linhas = []
+    for _, r in pend.iterrows():
+        valor = float(r["valor"]) - float(r.get("valor_pago", 0.0))  # em aberto (descontados os parciais)
+        saldo += valor if r["tipo"] == "RECEBER" else -valor
+        linhas.append({
+            "Vencimento": r["vencimento_dt"].date(),
+            "Tipo": r["tipo"],
+            "Valor": valor,
+            "Saldo projetado": saldo,
+            "Pessoa": r["pessoa"],
+            "Categoria": r["categoria"],
+            "Descrição": r["descricao"]
+        })
+
+    return pd.DataFrame(linhas)
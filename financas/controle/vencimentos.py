@@ -0,0 +1,88 @@
+"""
+Pendentes por urgência: aging (faixas de atraso / a vencer) e alertas de vencidos.
+
+As consultas partem do índice (status, vencimento): só os PENDENTE são
+lidos, já na ordem do mais atrasado para o mais distante, sem filtrar o
+DataFrame inteiro de carregar_df().
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.controle.db import conectar
+from financas.controle.loaders import memo
+
+# dias > 0 = vencido há N dias; dias <= 0 = vence em -N dias (hoje conta como a vencer)
+FAIXAS = ("Vencido 60+", "Vencido 31–60", "Vencido 0–30", "A vencer 0–30", "A vencer 31–60", "A vencer 60+")
+
+
+def _faixas(dias: np.ndarray) -> np.ndarray:
+    return np.select(
+        [dias > 60, dias > 30, dias > 0, dias >= -30, dias >= -60],
+        FAIXAS[:5],
+        default=FAIXAS[5],
+    )
+
+
+def pendentes(hoje: date = None) -> pd.DataFrame:
+    """
+    PENDENTE do mais atrasado ao mais distante, com `em_aberto` (valor - pagamentos parciais),
+    `dias` (atraso; negativo = faltam) e `faixa`.
+    """
+    hoje = hoje or date.today()
+
+    def compute():
+        with conectar() as con:
+            df = pd.read_sql_query("""
+                SELECT id, tipo, pessoa, categoria, descricao, valor, valor_pago,
+                       ROUND(valor - valor_pago, 2) AS em_aberto, vencimento
+                FROM lancamentos
+                WHERE status = 'PENDENTE'
+                ORDER BY vencimento, id
+            """, con)
+        df["pessoa"] = df["pessoa"].fillna("")
+        df["categoria"] = df["categoria"].fillna("")
+        df["descricao"] = df["descricao"].fillna("")
+        venc = pd.to_datetime(df["vencimento"], errors="coerce").to_numpy(dtype="datetime64[D]")
+        df["dias"] = (np.datetime64(hoje, "D") - venc).astype(np.int64)
+        df["faixa"] = _faixas(df["dias"].to_numpy())
+        return df
+
+    return memo(("pendentes", hoje.isoformat()), compute).copy(deep=False)
+
+
+@instr.medido("calc")
+def aging(por: str = "pessoa", hoje: date = None) -> pd.DataFrame:
+    """
+    Valor em aberto por faixa: linhas (tipo, `por`), colunas = FAIXAS presentes + Total.
+    `por`: "pessoa" ou "categoria".
+    """
+    if por not in ("pessoa", "categoria"):
+        raise ValueError(f"Agrupamento {por!r} inválido (use pessoa ou categoria).")
+    hoje = hoje or date.today()
+
+    def compute():
+        p = pendentes(hoje)
+        tab = p.pivot_table(index=["tipo", por], columns="faixa", values="em_aberto", aggfunc="sum", fill_value=0.0)
+        tab = tab.reindex(columns=[f for f in FAIXAS if f in tab.columns])
+        tab["Total"] = tab.sum(axis=1)
+        # mais atrasado primeiro: ordena pelas faixas de vencido, depois pelo total
+        vencido = [f for f in FAIXAS[:3] if f in tab.columns]
+        return tab.sort_values(["tipo", *vencido, "Total"], ascending=[True] + [False] * (len(vencido) + 1))
+
+    return memo(("aging", por, hoje.isoformat()), compute)
+
+
+def alertas_vencidos(apenas_novos: bool = True) -> pd.DataFrame:
+    """Alertas gravados pelo agendador (ainda PENDENTE), do vencimento mais antigo ao mais recente."""
+    with conectar() as con:
+        return pd.read_sql_query(f"""
+            SELECT a.lancamento_id AS id, l.tipo, l.pessoa, l.categoria, l.descricao, l.valor,
+                   ROUND(l.valor - l.valor_pago, 2) AS em_aberto,
+                   a.vencimento, a.detectado_em, a.visto
+            FROM alertas_vencidos a JOIN lancamentos l ON l.id = a.lancamento_id
+            {"WHERE a.visto = 0" if apenas_novos else ""}
+            ORDER BY a.vencimento, a.lancamento_id
+        """, con)
@@ -0,0 +1,176 @@
+"""
+Datas e aritmética de meses ("YYYY-MM").
+
+Os meses de ANO_MIN a ANO_MAX ficam numa tabela montada uma vez (na
+primeira consulta): cada "YYYY-MM" aponta para um registro Mes com
+início/fim, rótulo PT-BR, vizinhos e trimestre. month_range, ym_add e
+os rótulos viram acesso a dict, sem parse de string nem criação de
+datas; dim_meses() é a mesma tabela como DataFrame, para join vetorizado
+com colunas "YYYY-MM" (ex: serie.map(dim_meses()["rotulo"])).
+Fora do intervalo, o registro é calculado na hora.
+"""
+import calendar
+import functools
+from datetime import date
+
+# --- Helpers PT-BR (mês) ---
+MESES_PT = [
+    "Janeiro","Fevereiro","Março","Abril","Maio","Junho",
+    "Julho","Agosto","Setembro","Outubro","Novembro","Dezembro"
+]
+
+
+# Intervalo da tabela de meses; `indice` = meses desde 1970-01 (mesma escala de datetime64[M])
+ANO_MIN, ANO_MAX = 1900, 2199
+_INDICE_MIN = (ANO_MIN - 1970) * 12
+
+
+class Mes:
+    __slots__ = ("ym", "ano", "mes", "indice", "trimestre", "inicio", "fim", "nome", "rotulo")
+
+    def __init__(self, ano: int, mes: int):
+        if not 1 <= mes <= 12:
+            raise ValueError(f"Mês inválido: {ano}-{mes}")
+        self.ym = f"{ano:04d}-{mes:02d}"
+        self.ano = ano
+        self.mes = mes
+        self.indice = (ano - 1970) * 12 + mes - 1
+        self.trimestre = (mes - 1) // 3 + 1
+        self.inicio = date(ano, mes, 1)
+        self.fim = date(ano, mes, calendar.monthrange(ano, mes)[1])
+        self.nome = MESES_PT[mes - 1]
+        self.rotulo = f"{self.nome}/{ano}"
+
+    @property
+    def anterior(self) -> str:
+        return _do_indice(self.indice - 1).ym
+
+    @property
+    def proximo(self) -> str:
+        return _do_indice(self.indice + 1).ym
+
+    def __repr__(self):
+        return f"Mes({self.ym!r})"
+
+
+@functools.lru_cache(maxsize=1)
+def _tabela() -> tuple:
+    """(dict ym -> Mes, lista por índice) de ANO_MIN-01 a ANO_MAX-12."""
+    lista = [Mes(ano, m) for ano in range(ANO_MIN, ANO_MAX + 1) for m in range(1, 13)]
+    return {m.ym: m for m in lista}, lista
+
+
+def _do_indice(indice: int) -> Mes:
+    lista = _tabela()[1]
+    i = indice - _INDICE_MIN
+    if 0 <= i < len(lista):
+        return lista[i]
+    y, m = divmod(indice, 12)
+    return Mes(1970 + y, m + 1)
+
+
+def mes(ym: str) -> Mes:
+    """Registro do mês "YYYY-MM" (ValueError se inválido)."""
+    hit = _tabela()[0].get(ym)
+    return hit if hit is not None else Mes(*parse_mes_key(ym))
+
+
+@functools.lru_cache(maxsize=1)
+def dim_meses():
+    """
+    Tabela de meses como DataFrame indexado por ym: ano, mes, indice, trimestre,
+    inicio/fim (datetime64, fim = último dia 00:00), nome, rotulo, anterior, proximo.
+    Compartilhada: não altere o DataFrame devolvido.
+    """
+    import pandas as pd  # lazy: o resto do módulo não precisa de pandas
+
+    lista = _tabela()[1]
+    dim = pd.DataFrame({
+        "ano": [m.ano for m in lista],
+        "mes": [m.mes for m in lista],
+        "indice": [m.indice for m in lista],
+        "trimestre": [m.trimestre for m in lista],
+        "inicio": pd.to_datetime([m.inicio for m in lista]),
+        "fim": pd.to_datetime([m.fim for m in lista]),
+        "nome": [m.nome for m in lista],
+        "rotulo": [m.rotulo for m in lista],
+    }, index=pd.Index([m.ym for m in lista], name="ym"))
+    dim["anterior"] = [_do_indice(m.indice - 1).ym for m in lista]
+    dim["proximo"] = [_do_indice(m.indice + 1).ym for m in lista]
+    return dim
+
+
+@functools.lru_cache(maxsize=1)
+def _limites_ts() -> dict:
+    dim = dim_meses()
+    return dict(zip(dim.index, zip(dim["inicio"], dim["fim"])))
+
+
+def mes_ts(ym: str):
+    """(início, último dia) do mês como pd.Timestamp (00:00), da tabela de meses."""
+    hit = _limites_ts().get(ym)
+    if hit is not None:
+        return hit
+    import pandas as pd
+
+    m = mes(ym)
+    return pd.Timestamp(m.inicio), pd.Timestamp(m.fim)
+
+
+def mes_label_pt(ano: int, mes: int) -> str:
+    return _do_indice((int(ano) - 1970) * 12 + int(mes) - 1).rotulo
+
+
+def parse_mes_key(key: str) -> tuple[int, int]:
+    # key no formato "YYYY-MM"
+    a, m = key.split("-")
+    return int(a), int(m)
+
+
+def to_dt(s):
+    import numpy as np
+    import pandas as pd  # lazy: o resto do módulo não precisa de pandas
+
+    if not isinstance(s, pd.Series) or s.dtype.kind in "iufmM":
+        return pd.to_datetime(s, errors="coerce")
+    # colunas de data repetem poucos valores: converte cada texto distinto uma vez só
+    codigos, unicos = pd.factorize(s)
+    valores = pd.to_datetime(unicos, errors="coerce").to_numpy()
+    # código -1 (nulo) cai no NaT acrescentado no fim
+    return pd.Series(np.append(valores, np.datetime64("NaT"))[codigos], index=s.index, name=s.name)
+
+
+def add_months(year: int, month: int, add: int):
+    m = month + add
+    y = year + (m - 1) // 12
+    m = ((m - 1) % 12) + 1
+    return y, m
+
+
+def ym_add(ym: str, add: int) -> str:
+    return _do_indice(mes(ym).indice + int(add)).ym
+
+
+def yms(indices):
+    """'YYYY-MM' de cada índice (meses desde 1970-01, a escala de Mes.indice), vetorizado."""
+    import numpy as np
+
+    return np.datetime_as_string(np.asarray(indices, dtype=np.int64).astype("datetime64[M]"), unit="M")
+
+
+def month_range(ym: str):
+    m = mes(ym)
+    return m.inicio, m.fim
+
+
+def compute_statement_month(purchase_date: date, closing_day: int) -> str:
+    y, m, d = purchase_date.year, purchase_date.month, purchase_date.day
+    if d <= closing_day:
+        return f"{y:04d}-{m:02d}"
+    if m == 12:
+        return f"{y+1:04d}-01"
+    return f"{y:04d}-{m+1:02d}"
+
+
+def months_between(d1: date, d2: date) -> int:
+    return (d2.year - d1.year) * 12 + (d2.month - d1.month) + 1
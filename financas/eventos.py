@@ -0,0 +1,75 @@
+"""
+Eventos de escrita (in-process, síncronos).
+
+As escritas do motor chamam `emitir(tabela, op, **dados)`; quem assinou
+(`assinar`) recebe a lista de eventos logo depois do commit. Dentro de
+`with lote():` os eventos são acumulados e entregues uma vez no fim
+(ex: 12 parcelas de um parcelamento viram uma entrega só).
+
+Módulos assinantes podem ser declarados por nome (`assinantes_em`) e só
+são importados na primeira entrega: quem escreve não paga o import de
+quem escuta até haver o que entregar.
+
+Falha de um assinante é registrada no log e não desfaz a escrita.
+"""
+import importlib
+import logging
+import threading
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+_assinantes = []
+_modulos = []
+_estado = threading.local()
+_lock = threading.Lock()
+
+
+def assinar(fn):
+    """Registra fn(eventos: list[dict]); usável como decorator."""
+    if fn not in _assinantes:
+        _assinantes.append(fn)
+    return fn
+
+
+def assinantes_em(*modulos: str):
+    """Módulos que registram assinantes ao serem importados (importados na 1ª entrega)."""
+    for m in modulos:
+        if m not in _modulos:
+            _modulos.append(m)
+
+
+def emitir(tabela: str, op: str, **dados):
+    evento = {"tabela": tabela, "op": op, **dados}
+    pendentes = getattr(_estado, "pendentes", None)
+    if pendentes is not None:
+        pendentes.append(evento)
+        return
+    _entregar([evento])
+
+
+@contextmanager
+def lote():
+    if getattr(_estado, "pendentes", None) is not None:  # aninhado: o lote de fora entrega
+        yield
+        return
+    _estado.pendentes = []
+    try:
+        yield
+    finally:
+        eventos, _estado.pendentes = _estado.pendentes, None
+        if eventos:
+            _entregar(eventos)
+
+
+def _entregar(eventos: list):
+    if _modulos:
+        with _lock:
+            pendentes, _modulos[:] = list(_modulos), []
+        for m in pendentes:
+            importlib.import_module(m)
+    for fn in list(_assinantes):
+        try:
+            fn(eventos)
+        except Exception:
+            log.exception("assinante %s falhou ao processar %d evento(s)", getattr(fn, "__name__", fn), len(eventos))
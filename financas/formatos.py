@@ -0,0 +1,78 @@
+"""Formatação para exibição (moeda, datas, parcelas) e mapas id -> rótulo."""
+import numpy as np
+import pandas as pd
+
+from financas.datas import mes
+
+
+def fmt_currency(v) -> str:
+    try:
+        return f"R$ {float(v):,.2f}"
+    except Exception:
+        return "R$ 0,00"
+
+
+def fmt_date_br(d) -> str:
+    """15/01/2026"""
+    if d is None or pd.isna(d):
+        return "—"
+    if isinstance(d, pd.Timestamp):
+        d = d.date()
+    if isinstance(d, str):
+        d = pd.to_datetime(d, errors="coerce")
+        if pd.isna(d):
+            return "—"
+        d = d.date()
+    return d.strftime("%d/%m/%Y")
+
+
+def fmt_month_br(ym: str) -> str:
+    """2026-02 -> Fevereiro/2026"""
+    if not ym or not isinstance(ym, str):
+        return "—"
+    try:
+        return mes(ym).rotulo
+    except ValueError:
+        return "—"
+
+
+def fmt_installment(installment_no, installments_total, ym) -> str:
+    """3ª de 6 • Março"""
+    if pd.isna(installment_no) or pd.isna(installments_total):
+        return "—"
+    month = fmt_month_br(ym).split("/")[0]
+    return f"{int(installment_no)}ª de {int(installments_total)} • {month}"
+
+
+def fmt_installments(installment_no: pd.Series, installments_total: pd.Series, ym: pd.Series) -> pd.Series:
+    """fmt_installment de colunas inteiras: formata cada combinação distinta uma vez só."""
+    grupos = pd.DataFrame({"no": installment_no, "total": installments_total, "ym": ym}).groupby(
+        ["no", "total", "ym"], sort=False, dropna=False)
+    rotulos = np.array([fmt_installment(no, total, m) for no, total, m in grupos.size().index], dtype=object)
+    return pd.Series(rotulos[grupos.ngroup().to_numpy()], index=installment_no.index)
+
+
+def map_accounts(accounts_df: pd.DataFrame) -> dict:
+    return dict(zip(accounts_df["id"].astype(int).tolist(), accounts_df["name"].astype(str).tolist()))
+
+
+def map_cards(cards_df: pd.DataFrame) -> dict:
+    last4 = cards_df["last4"].tolist() if "last4" in cards_df.columns else [None] * len(cards_df)
+    return {
+        int(i): f"{name} •••• {l4 or '----'}"
+        for i, name, l4 in zip(cards_df["id"].tolist(), cards_df["name"].tolist(), last4)
+    }
+
+
+def tx_signature(dt_, kind, amount, category, description, status, method,
+                 account_id, card_id, statement_month, installments_total):
+    return str((
+        str(dt_), kind, round(float(amount or 0), 2),
+        (category or "").strip().lower(),
+        (description or "").strip().lower(),
+        status, method,
+        int(account_id) if account_id else None,
+        int(card_id) if card_id else None,
+        statement_month or "",
+        int(installments_total) if installments_total else 1
+    ))
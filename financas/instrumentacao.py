@@ -0,0 +1,236 @@
+"""
+Instrumentação dos caminhos quentes (queries, loaders e cálculos).
+
+Desligada por padrão. Liga com a variável de ambiente FINANCAS_PROFILE=1
+(lida no import): desligada, `medido` devolve a própria função e
+`conectar` devolve um sqlite3.connect comum, ou seja, custo zero.
+
+Ligada, cada chamada vira um registro (rerun, seção, tipo, nome, ms,
+linhas, bytes) no coletor da thread do rerun atual. `finalizar_rerun`
+fecha o rerun, guarda um resumo no histórico e, se FINANCAS_PROFILE_LOG
+apontar para um arquivo, acrescenta os registros em JSON lines.
+"""
+import functools
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+ATIVO = os.environ.get("FINANCAS_PROFILE", "").strip().lower() in ("1", "true", "sim", "on")
+LOG_PATH = os.environ.get("FINANCAS_PROFILE_LOG", "").strip() or None
+
+_estado = threading.local()
+_seq = itertools.count(1)
+_lock = threading.Lock()
+HISTORICO = deque(maxlen=200)  # resumo dos últimos reruns (todas as sessões)
+
+
+def _coletor() -> dict:
+    c = getattr(_estado, "coletor", None)
+    if c is None:
+        c = _estado.coletor = {"rerun": 0, "app": "", "secao": "", "inicio": time.perf_counter(), "registros": []}
+    return c
+
+
+def iniciar_rerun(app: str):
+    if not ATIVO:
+        return
+    _estado.coletor = {"rerun": next(_seq), "app": app, "secao": "", "inicio": time.perf_counter(), "registros": []}
+
+
+def secao(nome: str):
+    """Marca a aba/bloco atual; os registros seguintes são atribuídos a ela."""
+    if ATIVO:
+        _coletor()["secao"] = nome
+
+
+def registrar(tipo: str, nome: str, ms: float, linhas=None, nbytes=None) -> dict:
+    c = _coletor()
+    reg = {
+        "rerun": c["rerun"],
+        "app": c["app"],
+        "secao": c["secao"],
+        "tipo": tipo,
+        "nome": nome,
+        "ms": ms,
+        "linhas": linhas,
+        "bytes": nbytes,
+    }
+    c["registros"].append(reg)
+    return reg
+
+
+def _tamanho(resultado):
+    """(linhas, bytes) de DataFrame/Series; None para escalares."""
+    if hasattr(resultado, "memory_usage") and hasattr(resultado, "__len__"):
+        mem = resultado.memory_usage(index=True)
+        return len(resultado), int(mem.sum() if hasattr(mem, "sum") else mem)
+    return None, None
+
+
+def medido(tipo: str = "calc", nome: str = None):
+    """Decorator de tempo/linhas/bytes. Com a instrumentação desligada devolve `fn` intacta."""
+    def deco(fn):
+        if not ATIVO:
+            return fn
+        label = nome or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            res = fn(*args, **kwargs)
+            linhas, nbytes = _tamanho(res)
+            registrar(tipo, label, (time.perf_counter() - t0) * 1000, linhas, nbytes)
+            return res
+
+        return wrapper
+
+    return deco
+
+
+def _sql_nome(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()[:80]
+
+
+class _CursorMedido(sqlite3.Cursor):
+    _reg = None
+
+    def execute(self, sql, params=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._reg = registrar("query", _sql_nome(sql), (time.perf_counter() - t0) * 1000,
+                                  self.rowcount if self.rowcount >= 0 else None)
+
+    def executemany(self, sql, seq):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq)
+        finally:
+            self._reg = registrar("query", _sql_nome(sql), (time.perf_counter() - t0) * 1000,
+                                  self.rowcount if self.rowcount >= 0 else None)
+
+    def _fetch(self, fn, *args):
+        t0 = time.perf_counter()
+        rows = fn(*args)
+        if self._reg is not None:
+            self._reg["ms"] += (time.perf_counter() - t0) * 1000
+            n = len(rows) if isinstance(rows, list) else int(rows is not None)
+            self._reg["linhas"] = (self._reg["linhas"] or 0) + n
+        return rows
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+
+class _ConexaoMedida(sqlite3.Connection):
+    def cursor(self, factory=_CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+
+def conectar(db: str, **kwargs) -> sqlite3.Connection:
+    if not ATIVO:
+        return sqlite3.connect(db, **kwargs)
+    return sqlite3.connect(db, factory=_ConexaoMedida, **kwargs)
+
+
+def registros() -> list:
+    return list(_coletor()["registros"]) if ATIVO else []
+
+
+def finalizar_rerun():
+    """Fecha o rerun atual: guarda o resumo no histórico e grava o JSON lines (se configurado)."""
+    if not ATIVO:
+        return None
+    c = _coletor()
+    regs = c["registros"]
+    resumo = {
+        "rerun": c["rerun"],
+        "app": c["app"],
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "total_ms": (time.perf_counter() - c["inicio"]) * 1000,
+        "queries": sum(1 for r in regs if r["tipo"] == "query"),
+        "query_ms": sum(r["ms"] for r in regs if r["tipo"] == "query"),
+        "bytes_carregados": sum(r["bytes"] or 0 for r in regs if r["tipo"] == "loader"),
+    }
+    with _lock:
+        HISTORICO.append(resumo)
+        if LOG_PATH:
+            exportar_jsonl(LOG_PATH, regs)
+    return resumo
+
+
+def exportar_jsonl(path: str, regs: list = None):
+    regs = registros() if regs is None else regs
+    with open(path, "a", encoding="utf-8") as f:
+        for r in regs:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+def resumo_por_secao(regs: list = None):
+    """DataFrame com chamadas/ms/linhas/bytes por (seção, tipo, nome), mais lentos primeiro."""
+    import pandas as pd
+
+    regs = registros() if regs is None else regs
+    df = pd.DataFrame(regs, columns=["rerun", "app", "secao", "tipo", "nome", "ms", "linhas", "bytes"])
+    if df.empty:
+        return df
+    return (
+        df.groupby(["secao", "tipo", "nome"], dropna=False)
+        .agg(chamadas=("ms", "size"), ms=("ms", "sum"), linhas=("linhas", "sum"), bytes=("bytes", "sum"))
+        .reset_index()
+        .sort_values("ms", ascending=False)
+    )
+
+
+def painel_streamlit():
+    """Painel de debug do rerun atual (só aparece com FINANCAS_PROFILE=1)."""
+    if not ATIVO:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    regs = registros()
+    total_ms = (time.perf_counter() - _coletor()["inicio"]) * 1000
+    with st.expander("🛠️ Profiling do rerun (debug)"):
+        por_secao = resumo_por_secao(regs)
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Rerun (até aqui)", f"{total_ms:,.0f} ms")
+        c2.metric("Queries", sum(1 for r in regs if r["tipo"] == "query"))
+        c3.metric("Carregado", f"{sum(r['bytes'] or 0 for r in regs if r['tipo'] == 'loader') / 1e6:,.2f} MB")
+
+        if not por_secao.empty:
+            st.markdown("**Por aba**")
+            st.dataframe(por_secao.groupby("secao")[["ms"]].sum().sort_values("ms", ascending=False),
+                         use_container_width=True)
+            st.markdown("**Por chamada**")
+            st.dataframe(por_secao, use_container_width=True, hide_index=True)
+
+        with _lock:
+            hist = list(HISTORICO)
+        if hist:
+            st.markdown("**Últimos reruns**")
+            st.dataframe(pd.DataFrame(hist[::-1]), use_container_width=True, hide_index=True)
+
+        st.download_button(
+            "⬇️ Registros (JSON lines)",
+            "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in regs).encode("utf-8"),
+            file_name="profiling.jsonl", mime="application/x-ndjson", key="dl_profiling"
+        )
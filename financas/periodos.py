@@ -0,0 +1,120 @@
+"""
+Motor de períodos.
+
+Os dois apps olham o mesmo lançamento por mais de um eixo de tempo:
+- app.py: previsto por `vencimento` x realizado por `data_pagamento`
+- app_pessoal.py: caixa por `dt` x fatura por `statement_month`
+
+Em vez de um filtro no DataFrame inteiro para cada visão, cada linha é
+agregada por dia em todos os eixos numa passada só (`agregar_eixos`).
+Qualquer período (semana, mês, trimestre, ano) sai desse agregado
+compacto (`por_periodo`), sem voltar às linhas originais.
+"""
+import pandas as pd
+
+from financas.instrumentacao import medido
+
+FREQUENCIAS = {
+    "semana": "W-SUN",
+    "mes": "M",
+    "trimestre": "Q",
+    "ano": "Y",
+}
+
+FREQ_LABELS = {
+    "semana": "Semana",
+    "mes": "Mês",
+    "trimestre": "Trimestre",
+    "ano": "Ano",
+}
+
+
+def _freq(freq: str) -> str:
+    return FREQUENCIAS.get(freq, freq)
+
+
+def periodo_de(valor, freq: str = "mes") -> pd.Period:
+    """'2026-02', date ou Timestamp -> pd.Period na frequência pedida."""
+    if isinstance(valor, pd.Period):
+        valor = valor.start_time
+    return pd.Period(pd.Timestamp(valor), _freq(freq))
+
+
+def limites_periodo(periodo: pd.Period):
+    """Retorna (inicio, fim) como Timestamps normalizados (fim = último dia)."""
+    return periodo.start_time.normalize(), periodo.end_time.normalize()
+
+
+def fmt_periodo(periodo: pd.Period) -> str:
+    freq = periodo.freqstr
+    if freq.startswith("W"):
+        inicio, fim = limites_periodo(periodo)
+        return f"{inicio:%d/%m} a {fim:%d/%m/%Y}"
+    if freq.startswith("Q"):
+        return f"{periodo.quarter}º tri/{periodo.year}"
+    if freq.startswith("Y") or freq.startswith("A"):
+        return str(periodo.year)
+    return f"{periodo.month:02d}/{periodo.year}"
+
+
+@medido("calc")
+def agregar_eixos(df: pd.DataFrame, eixos: dict, valor: str, chaves=()) -> pd.DataFrame:
+    """
+    Agrega `valor` por (eixo, dia, *chaves) numa única groupby.
+
+    `eixos` mapeia nome do eixo -> Series de datas alinhada com `df`;
+    NaT significa "a linha não entra nesse eixo" (ex: data_pagamento só
+    vale para PAGO, statement_month só para CARD).
+    """
+    chaves = list(chaves)
+    base = df[chaves + [valor]]
+    partes = []
+    for nome, datas in eixos.items():
+        if getattr(datas, "dtype", None) is None or datas.dtype.kind != "M":
+            datas = pd.to_datetime(datas, errors="coerce")  # já datetime: pula a inferência do to_datetime
+        dia = datas.dt.normalize()
+        ok = dia.notna().to_numpy()
+        parte = base[ok].copy()
+        parte.insert(0, "dia", dia[ok].to_numpy())
+        parte.insert(0, "eixo", nome)
+        partes.append(parte)
+
+    if not partes:
+        return pd.DataFrame(columns=["eixo", "dia"] + chaves + ["total", "qtd"])
+
+    longo = pd.concat(partes, ignore_index=True)
+    agg = (
+        longo.groupby(["eixo", "dia"] + chaves, dropna=False, sort=True)[valor]
+        .agg(total="sum", qtd="count")
+        .reset_index()
+    )
+    return agg
+
+
+@medido("calc")
+def por_periodo(agg: pd.DataFrame, freq: str = "mes") -> pd.DataFrame:
+    """Rola o agregado diário para semana/mês/trimestre/ano."""
+    chaves = [c for c in agg.columns if c not in ("eixo", "dia", "total", "qtd")]
+    out = agg.drop(columns=["dia"]).copy()
+    out.insert(1, "periodo", pd.to_datetime(agg["dia"]).dt.to_period(_freq(freq)))
+    return (
+        out.groupby(["eixo", "periodo"] + chaves, dropna=False, sort=True)[["total", "qtd"]]
+        .sum()
+        .reset_index()
+    )
+
+
+def somar(agg_p: pd.DataFrame, eixo: str, periodo: pd.Period, **filtros) -> float:
+    """Soma `total` de um eixo/período; filtros aceitam valor único ou lista."""
+    m = (agg_p["eixo"] == eixo) & (agg_p["periodo"] == periodo)
+    for col, val in filtros.items():
+        if isinstance(val, (list, tuple, set)):
+            m &= agg_p[col].isin(list(val))
+        else:
+            m &= agg_p[col] == val
+    return float(agg_p.loc[m, "total"].sum())
+
+
+def periodos_disponiveis(agg_p: pd.DataFrame, eixos=None) -> list:
+    f = agg_p if eixos is None else agg_p[agg_p["eixo"].isin(list(eixos))]
+    return sorted(set(f["periodo"].dropna()))
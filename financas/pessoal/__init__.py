@@ -0,0 +1,68 @@
+"""
+Motor do app_pessoal.py (finance_pessoal.db), importável sem Streamlit.
+
+Os nomes são reexportados sob demanda: `from financas.pessoal import
+calc_account_balance` importa só o submódulo necessário, e pandas só
+entra quando algum loader/cálculo é usado de fato.
+"""
+import importlib
+
+_EXPORTS = {
+    "db": [
+        "DB", "usar_banco", "db_atual", "conectar", "data_version", "table_columns", "ensure_schema", "seed_if_empty",
+        "add_transaction", "delete_transaction", "delete_transactions", "update_transactions",
+        "set_transactions_status", "set_transactions_category", "add_transfer", "delete_transfer",
+        "atualizar_cartao", "salvar_long_goal", "desativar_long_goal", "add_goal", "VersionConflict",
+        "add_card", "salvar_feriado", "remover_feriado", "rebuild_card_balances",
+        "add_installment_plan", "backfill_installment_plans", "antecipar_plano", "rebuild_journal", "rebuild_budget_spend",
+        "last_change_seq", "changes_since", "prune_tx_changes",
+    ],
+    "loaders": [
+        "memo", "carregar_accounts", "carregar_cards", "carregar_goals", "carregar_recurrences", "carregar_long_goal",
+        "carregar_long_goals", "carregar_category_rules", "carregar_holidays",
+        "carregar_installment_plans", "carregar_transactions", "carregar_transfers",
+        "carregar_journal", "carregar_categorias",
+    ],
+    "saldos": [
+        "account_movements", "daily_balance_series", "save_balance_checkpoints", "rebuild_balance_checkpoints",
+        "balance_as_of",
+        "calc_account_balance", "saldos_atuais", "account_statement", "cash_flow",
+    ],
+    "cartoes": [
+        "card_statement_detail", "card_statement_total", "create_installments_on_card", "statement_due_date",
+        "close_card_statement", "fill_statement_months",
+        "card_credit", "card_open_statements",
+    ],
+    "parcelamentos": ["installment_plans", "installment_schedule", "payoff_scenario", "what_if"],
+    "relatorios": ["agregar_transactions", "agregado_atual", "agregado_mensal_atual", "metricas_mes",
+                   "meses_disponiveis", "dashboard_mes"],
+    "recorrencias": ["run_recurrences_for_month"],
+    "metas": [
+        "calc_long_goal_plan", "current_month_savings", "is_discretionary", "savings_ledger", "ledger_atual",
+        "saved_between", "month_savings", "plan_from_ledger", "avaliar_metas", "monthly_goals_history", "goal_alerts",
+    ],
+    "alertas": ["carregar_alert_rules", "salvar_alert_rule", "evaluate_month", "refresh_month", "alerts_for_month"],
+    "anomalias": ["JANELA", "detectar_anomalias", "refresh_anomalias", "atualizar_anomalias", "anomalias_mes"],
+    "orcamentos": ["carregar_budgets", "salvar_budget", "remover_budget", "budget_remaining", "budgets_mes"],
+    "categorizacao": [
+        "chave_categoria", "ids_categorias", "backfill_category_ids", "Regra", "Classificador", "classificador_atual",
+        "categorizar", "carregar_regras_categoria", "salvar_regra_categoria", "remover_regra_categoria", "recategorizar",
+    ],
+    "registro": ["registro_atual", "Registro"],
+    "importacao": ["read_transactions_csv", "insert_transactions"],
+    "jobs": ["submit_job", "cancel_job", "resume_pending_jobs", "list_jobs"],
+}
+_ONDE = {nome: mod for mod, nomes in _EXPORTS.items() for nome in nomes}
+
+__all__ = sorted(_ONDE)
+
+
+def __getattr__(nome):
+    mod = _ONDE.get(nome)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    return getattr(importlib.import_module(f"{__name__}.{mod}"), nome)
+
+
+def __dir__():
+    return __all__
@@ -0,0 +1,173 @@
+"""
+Alertas pré-calculados (cartão e categoria em % da renda do mês).
+
+- Regras em `alert_rules`: escopo CARD ou CATEGORY, alvo (id do cartão /
+  nome da categoria; NULL = padrão para todos os cartões / todas as
+  categorias discricionárias) e limites warn_pct/high_pct.
+- `refresh_month` avalia as regras de um mês e grava o resultado em
+  `alerts` (uma linha por alvo, nível OK/WARN/HIGH) e, em `alerts_state`,
+  a chave do estado usado: último seq do log de lançamentos do mês +
+  versões de ALERTAS_TABELAS (loaders.chave_meses). Escrita em outro mês
+  não deixa o mês desatualizado.
+- Cada escrita do motor emite um evento (financas.eventos); o assinante
+  daqui recalcula na hora os meses tocados e, quando muda regra ou cartão,
+  o mês atual.
+- `alerts_for_month` lê a tabela; se o mês ficou para trás (escrita por
+  outro caminho: outro processo, SQL direto), recalcula antes de devolver.
+"""
+from datetime import date, datetime
+
+import pandas as pd
+
+from financas import eventos
+from financas.eventos import emitir
+from financas import instrumentacao as instr
+from financas.periodos import periodo_de, somar
+from financas.pessoal.categorizacao import chave_categoria
+from financas.pessoal.db import conectar, data_version
+from financas.pessoal.loaders import (
+    carregar_cards, carregar_categorias, carregar_category_rules, carregar_transactions, chave_meses, memo
+)
+
+LEVELS = ("OK", "WARN", "HIGH")
+# Tabelas (além dos lançamentos do mês) de que o resultado de um mês depende
+ALERTAS_TABELAS = ("alert_rules", "cards", "category_rules")
+
+
+def carregar_alert_rules() -> pd.DataFrame:
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM alert_rules WHERE active=1 ORDER BY id", con)
+
+
+def salvar_alert_rule(scope: str, target, warn_pct: float, high_pct: float):
+    """Cria/atualiza a regra de (scope, target); target None = regra padrão do escopo (categoria pela chave normalizada)."""
+    if target in (None, ""):
+        target = None
+    else:
+        target = chave_categoria(str(target)) if scope == "CATEGORY" else str(target).strip().lower()
+    with conectar() as con:
+        hit = con.execute("SELECT id FROM alert_rules WHERE scope=? AND target IS ?", (scope, target)).fetchone()
+        if hit:
+            con.execute("UPDATE alert_rules SET warn_pct=?, high_pct=?, active=1 WHERE id=?",
+                        (float(warn_pct), float(high_pct), int(hit[0])))
+        else:
+            con.execute("INSERT INTO alert_rules (scope, target, warn_pct, high_pct) VALUES (?,?,?,?)",
+                        (scope, target, float(warn_pct), float(high_pct)))
+        con.commit()
+    emitir("alert_rules", "update")
+
+
+def _category_month_spend() -> pd.DataFrame:
+    """Gasto por (mês do dt, category_id), cacheado por data_version."""
+    def compute():
+        tx = carregar_transactions()
+        exp = tx[(tx["kind"] == "EXPENSE") & (tx["method"] != "CARD_PAYMENT") & tx["dt"].notna() & (tx["category_id"] > 0)]
+        return exp.assign(month=exp["dt"].dt.strftime("%Y-%m")).groupby(["month", "category_id"])["amount"].sum()
+    return memo("category_month_spend", compute)
+
+
+def _level(pct, warn_pct: float, high_pct: float) -> str:
+    if pct is None:
+        return "OK"
+    if pct >= high_pct:
+        return "HIGH"
+    if pct >= warn_pct:
+        return "WARN"
+    return "OK"
+
+
+@instr.medido("calc")
+def evaluate_month(ym: str) -> list:
+    """Avalia todas as regras ativas no mês: [{scope, target, level, value, base, pct, warn_pct, high_pct}]."""
+    from financas.pessoal.relatorios import agregado_mensal_atual
+
+    rules = carregar_alert_rules()
+    agg_m = agregado_mensal_atual()
+    per = periodo_de(ym, "mes")
+    income = somar(agg_m, "caixa", per, status="PAID", kind="INCOME")
+
+    def row(scope, target, value, rule):
+        pct = value / income * 100 if income > 0 else None
+        return {
+            "scope": scope, "target": str(target), "level": _level(pct, rule["warn_pct"], rule["high_pct"]),
+            "value": float(value), "base": float(income), "pct": pct,
+            "warn_pct": float(rule["warn_pct"]), "high_pct": float(rule["high_pct"]),
+        }
+
+    out = []
+    card_rules = {r["target"]: r for r in rules[rules["scope"] == "CARD"].to_dict("records")}
+    for cid in carregar_cards()["id"]:
+        rule = card_rules.get(str(int(cid)), card_rules.get(None))
+        if rule is not None:
+            out.append(row("CARD", int(cid), somar(agg_m, "fatura", per, card_id=int(cid)), rule))
+
+    cat_rules = {
+        chave_categoria(r["target"]) or None: r
+        for r in rules[rules["scope"] == "CATEGORY"].to_dict("records")
+    }
+    if cat_rules:
+        spend = _category_month_spend()
+        month_spend = spend.xs(ym, level="month") if ym in spend.index.get_level_values("month") else pd.Series(dtype=float)
+        cats = carregar_categorias().set_index("id")
+        cr = carregar_category_rules()
+        discretionary = set(cr.loc[cr["class"] == "DISCRETIONARY", "category"].map(chave_categoria))
+        for cid, value in month_spend.items():
+            key = cats.at[cid, "key"]
+            rule = cat_rules.get(key) or (cat_rules.get(None) if key in discretionary else None)
+            if rule is not None:
+                out.append(row("CATEGORY", cats.at[cid, "name"], value, rule))
+    return out
+
+
+def _chave(ym: str) -> str:
+    return chave_meses([ym], ALERTAS_TABELAS)
+
+
+def refresh_month(ym: str) -> list:
+    """Recalcula e grava os alertas do mês; `since` só muda quando o nível muda."""
+    version = data_version()
+    key = _chave(ym) if version is not None else None  # antes de avaliar: escrita no meio fica para a próxima
+    rows = evaluate_month(ym)
+    now = datetime.now().isoformat(timespec="seconds")
+    with conectar() as con:
+        con.executemany("""
+            INSERT INTO alerts (month, scope, target, level, value, base, pct, warn_pct, high_pct, since, updated_at)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?)
+            ON CONFLICT(month, scope, target) DO UPDATE SET
+                since = CASE WHEN alerts.level = excluded.level THEN alerts.since ELSE excluded.since END,
+                level = excluded.level, value = excluded.value, base = excluded.base, pct = excluded.pct,
+                warn_pct = excluded.warn_pct, high_pct = excluded.high_pct, updated_at = excluded.updated_at
+        """, [(ym, r["scope"], r["target"], r["level"], r["value"], r["base"], r["pct"],
+               r["warn_pct"], r["high_pct"], now, now) for r in rows])
+        keep = {(r["scope"], r["target"]) for r in rows}
+        stale = [(ym, s, t) for s, t in con.execute("SELECT scope, target FROM alerts WHERE month=?", (ym,))
+                 if (s, t) not in keep]
+        con.executemany("DELETE FROM alerts WHERE month=? AND scope=? AND target=?", stale)
+        if version is not None:
+            con.execute("INSERT OR REPLACE INTO alerts_state (month, version, key) VALUES (?,?,?)",
+                        (ym, int(version), key))
+        con.commit()
+    return rows
+
+
+def alerts_for_month(ym: str) -> pd.DataFrame:
+    """Alertas do mês direto da tabela (recalcula só se o mês ou as regras mudaram desde o último cálculo)."""
+    with conectar() as con:
+        st = con.execute("SELECT key FROM alerts_state WHERE month=?", (ym,)).fetchone()
+    if data_version() is None or st is None or st[0] != _chave(ym):
+        refresh_month(ym)
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM alerts WHERE month=? ORDER BY pct DESC", con, params=(ym,))
+
+
+@eventos.assinar
+def _on_write(evs: list):
+    """
+    Escrita em lançamentos: recalcula na hora os meses tocados. Regra ou cartão: o mês atual
+    (os demais ficam para a leitura, que vê a chave antiga).
+    """
+    months = {m for e in evs if e["tabela"] == "transactions" for m in e.get("months") or []}
+    if any(e["tabela"] in ALERTAS_TABELAS for e in evs):
+        months.add(date.today().strftime("%Y-%m"))
+    for ym in sorted(months):
+        refresh_month(ym)
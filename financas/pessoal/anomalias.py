@@ -0,0 +1,296 @@
+"""
+Gastos fora do padrão (anomalias) por mês.
+
+- SPIKE: gasto de uma categoria numa origem (conta ou cartão) bem acima da
+  própria mediana dos JANELA meses anteriores. O agregado mensal categoria
+  × origem vira uma matriz densa (meses × séries) e as janelas de todos os
+  meses pedidos são avaliadas de uma vez (mediana e desvio absoluto
+  mediano vetorizados), sem laço por categoria.
+- DUPLICATE: compra no cartão com o mesmo valor e descrição de outra feita
+  no mesmo cartão até DIAS_DUPLICADA dias antes (parcelas e recorrências
+  ficam de fora).
+
+Mesmo esquema de alertas.py: o resultado fica em `anomalies` e a chave do
+estado usado em `anomalies_state`: o último seq do log de lançamentos nos
+meses de que o mês depende (ele e os JANELA anteriores). O assinante de
+eventos recalcula os meses cuja janela uma escrita tocou (M..M+JANELA),
+`anomalias_mes` recalcula na leitura o mês que ficou para trás e
+`atualizar_anomalias` (`finance.py anomalias`, cron) processa numa passada
+só os meses ainda sem resultado ou desatualizados.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from financas import eventos
+from financas import instrumentacao as instr
+from financas.datas import mes, ym_add, yms
+from financas.pessoal.db import conectar, data_version
+from financas.pessoal.loaders import carregar_categorias, carregar_transactions, chave_meses, memo
+
+KINDS = ("SPIKE", "DUPLICATE")
+JANELA = 6            # meses anteriores que formam a base de cada mês
+MIN_MESES = 3         # meses com histórico na janela para avaliar a série
+FATOR = 2.0           # gasto >= FATOR x mediana
+MIN_EXCESSO = 100.0   # e pelo menos R$ 100 acima dela
+Z_MIN = 3.5           # desvio robusto: (gasto - mediana) / (1.4826 x MAD)
+DIAS_DUPLICADA = 3
+
+_COLUNAS = ["month", "kind", "target", "category", "source", "value", "baseline", "score", "tx_id", "ref_id", "detail"]
+
+
+def _codigos(s: pd.Series) -> tuple:
+    """
+    (código por linha, textos distintos) de strip().lower(): cada texto distinto é
+    normalizado uma vez só; nulo e vazio têm o código de "".
+    """
+    codigos, unicos = pd.factorize(s)
+    norm = pd.Index(np.append(np.asarray(unicos, dtype=object), "")).str.strip().str.lower()
+    norm_codigos, textos = pd.factorize(norm)
+    return norm_codigos[codigos], np.asarray(textos, dtype=object)  # código -1 (nulo) cai no "" do fim
+
+
+def _categorias(ids: pd.Series) -> tuple:
+    """(código por linha, nomes) pelo category_id: as grafias já vêm unificadas pela dimensão; 0 = sem categoria ("")."""
+    codigos, unicos = pd.factorize(ids)
+    nomes = carregar_categorias().set_index("id")["name"].reindex(unicos).fillna("")
+    return codigos, np.asarray(nomes, dtype=object)
+
+
+def _iguais(s: pd.Series, *valores: str) -> list:
+    """[s == v para cada v], pelos códigos de um factorize só (mais barato que comparar texto linha a linha)."""
+    codigos, unicos = pd.factorize(s)
+    unicos = list(unicos)
+    return [codigos == unicos.index(v) if v in unicos else np.zeros(len(codigos), dtype=bool) for v in valores]
+
+
+def _despesas() -> dict:
+    """
+    Despesas (sem pagamento de fatura) como arrays numéricos, uma vez por data_version:
+    id, dia/m (dias/meses desde 1970-01-01), cat/desc (códigos normalizados; textos em
+    "cats"/"descs"), cartao, src (cartão ou conta), centavos, avulsa (compra no cartão fora
+    de parcelamento e recorrência).
+    """
+    def compute():
+        tx = carregar_transactions()
+        dt = tx["dt"].to_numpy().astype("datetime64[D]")
+        (despesa,) = _iguais(tx["kind"], "EXPENSE")
+        cartao, pag_fatura = _iguais(tx["method"], "CARD", "CARD_PAYMENT")
+        ok = despesa & ~pag_fatura & ~np.isnat(dt)
+        e = tx[ok]
+        dia = dt[ok]
+        cartao = cartao[ok]
+        cat, cats = _categorias(e["category_id"])
+        desc, descs = _codigos(e["description"])
+        return {
+            "id": e["id"].to_numpy(dtype=np.int64),
+            "dia": dia.astype(np.int64),
+            "m": dia.astype("datetime64[M]").astype(np.int64),
+            "cat": cat, "cats": cats, "desc": desc, "descs": descs,
+            "cartao": cartao,
+            "src": np.where(cartao, e["card_id"].fillna(0), e["account_id"].fillna(0)).astype(np.int64),
+            "amount": e["amount"].to_numpy(dtype=float),
+            "centavos": np.round(e["amount"].to_numpy(dtype=float) * 100).astype(np.int64),
+            "avulsa": cartao & e["plan_id"].isna().to_numpy() & e["recurrence_id"].isna().to_numpy()
+                      & (e["installments_total"].fillna(1).to_numpy() <= 1),
+        }
+    return memo("anomalias_despesas", compute)
+
+
+def _mediana(x: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """Mediana no último eixo ignorando NaN, com k = valores válidos (NaN vão para o fim no sort)."""
+    x = np.sort(x, axis=-1)
+    lo = np.clip((k - 1) // 2, 0, None)[..., None]
+    hi = np.clip(k // 2, 0, None)[..., None]
+    med = (np.take_along_axis(x, lo, -1) + np.take_along_axis(x, hi, -1))[..., 0] / 2
+    return np.where(k > 0, med, np.nan)
+
+
+def _matriz() -> dict:
+    """
+    Gasto mensal categoria × origem como matriz densa: "valores" (meses × séries; NaN antes
+    do 1º gasto da série, 0 nos meses sem gasto depois dele), "m0" (1º mês, meses desde
+    1970-01), "categoria" e "origem" ('C<id>' cartão / 'A<id>' conta) de cada série.
+    """
+    def compute():
+        d = _despesas()
+        m, src = d["m"], d["src"]
+        if not len(m):
+            return {"valores": np.empty((0, 0)), "m0": 0, "categoria": np.array([], dtype=object),
+                    "origem": np.array([], dtype=object)}
+
+        # série = (categoria, cartão?, origem) como um inteiro; célula = (mês, série)
+        n_src = int(src.max()) + 1
+        serie, chaves = pd.factorize((d["cat"].astype(np.int64) * 2 + d["cartao"]) * n_src + src)
+        m0 = int(m.min())
+        forma = (int(m.max()) - m0 + 1, len(chaves))
+        celula = (m - m0) * forma[1] + serie
+        valores = np.bincount(celula, weights=d["amount"], minlength=forma[0] * forma[1]).reshape(forma)
+        tem = np.bincount(celula, minlength=forma[0] * forma[1]).reshape(forma) > 0
+        valores[np.cumsum(tem, axis=0) == 0] = np.nan
+
+        origem = np.where((chaves // n_src) % 2 == 1, "C", "A").astype(object) + (chaves % n_src).astype(str).astype(object)
+        return {"valores": valores, "m0": m0, "categoria": d["cats"][chaves // n_src // 2], "origem": origem}
+    return memo("anomalias_matriz", compute)
+
+
+def _picos(meses: np.ndarray = None) -> pd.DataFrame:
+    """SPIKE dos meses pedidos (meses desde 1970-01; None = todos), numa passada sobre a matriz."""
+    mz = _matriz()
+    valores = mz["valores"]
+    n = valores.shape[0]
+    linhas = np.arange(n) if meses is None else np.asarray(meses, dtype=np.int64) - mz["m0"]
+    linhas = linhas[(linhas >= 0) & (linhas < n)]
+    if not len(linhas) or not valores.shape[1]:
+        return pd.DataFrame(columns=_COLUNAS)
+
+    # janela da linha t = linhas t-JANELA..t-1 (o preenchimento de NaN cobre o início do histórico)
+    base = np.vstack([np.full((JANELA, valores.shape[1]), np.nan), valores])
+    jan = sliding_window_view(base, JANELA, axis=0)[linhas]          # (meses, séries, JANELA)
+    v = valores[linhas]
+    n_hist = (~np.isnan(jan)).sum(axis=-1)
+    med = _mediana(jan, n_hist)
+    mad = _mediana(np.abs(jan - med[..., None]), n_hist)
+    excesso = v - med
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(mad > 0, excesso / (1.4826 * mad), np.inf)
+        flag = (n_hist >= MIN_MESES) & (med > 0) & (v >= FATOR * med) & (excesso >= MIN_EXCESSO) & (z >= Z_MIN)
+
+    li, si = np.nonzero(flag)
+    cat, origem = mz["categoria"][si], mz["origem"][si]
+    return pd.DataFrame({
+        "month": yms(linhas[li] + mz["m0"]),
+        "kind": "SPIKE",
+        "target": cat + "|" + origem,
+        "category": cat,
+        "source": origem,
+        "value": np.round(v[li, si], 2),
+        "baseline": np.round(med[li, si], 2),
+        "score": np.round(v[li, si] / med[li, si], 2),
+        "tx_id": None,
+        "ref_id": None,
+        "detail": "",
+    })
+
+
+def _duplicadas() -> pd.DataFrame:
+    """DUPLICATE de todo o histórico (cacheado por data_version; cada mês filtra o seu)."""
+    def compute():
+        d = _despesas()
+        a = np.flatnonzero(d["avulsa"])
+        a = a[np.argsort(d["id"][a], kind="stable")]  # ordem de id: empate no dia fica estável no lexsort
+        vazia = d["descs"][d["desc"][a]] == ""
+        # sem descrição, compara pela categoria (códigos negativos para não colidir)
+        chave = np.where(vazia, -1 - d["cat"][a], d["desc"][a])
+        card, centavos, dia, ids, cat = d["src"][a], d["centavos"][a], d["dia"][a], d["id"][a], d["cat"][a]
+        nome = np.where(vazia, d["cats"][cat], d["descs"][d["desc"][a]])
+
+        # (cartão, chave, valor) num inteiro só
+        chave_c, chaves = pd.factorize(chave)
+        valor_c, valores = pd.factorize(centavos)
+        grupo = (card * len(chaves) + chave_c) * len(valores) + valor_c
+        o = np.lexsort((dia, grupo))
+        grupo, card, centavos, dia, ids, cat, nome = grupo[o], card[o], centavos[o], dia[o], ids[o], cat[o], nome[o]
+        dup = np.zeros(len(o), dtype=bool)
+        dup[1:] = (grupo[1:] == grupo[:-1]) & (dia[1:] - dia[:-1] <= DIAS_DUPLICADA)
+        i = np.nonzero(dup)[0]
+        data, data_ref = (np.datetime_as_string(x.astype("datetime64[D]")) for x in (dia[i], dia[i - 1]))
+        return pd.DataFrame({
+            "month": np.array([s[:7] for s in data], dtype=object),
+            "kind": "DUPLICATE",
+            "target": np.array([f"tx:{t}" for t in ids[i]], dtype=object),
+            "category": d["cats"][cat[i]],
+            "source": np.array([f"C{c}" for c in card[i]], dtype=object),
+            "value": centavos[i] / 100,
+            "baseline": centavos[i - 1] / 100,
+            "score": None,
+            "tx_id": ids[i],
+            "ref_id": ids[i - 1],
+            "detail": np.array([f"{n}: {_br(r)} e {_br(t)}" for n, r, t in zip(nome[i], data_ref, data)],
+                               dtype=object),
+        })
+    return memo("anomalias_duplicadas", compute)
+
+
+def _br(iso: str) -> str:
+    return f"{iso[8:10]}/{iso[5:7]}/{iso[:4]}"
+
+
+@instr.medido("calc")
+def detectar_anomalias(months: list = None) -> pd.DataFrame:
+    """Anomalias dos meses 'YYYY-MM' pedidos (None = todo o histórico), sem gravar nada."""
+    ms = None if months is None else np.array([mes(ym).indice for ym in months], dtype=np.int64)
+    dup = _duplicadas()
+    if months is not None:
+        dup = dup[dup["month"].isin(set(months))]
+    partes = [p for p in (_picos(ms), dup) if len(p)]
+    if not partes:
+        return pd.DataFrame(columns=_COLUNAS)
+    return pd.concat(partes, ignore_index=True)[_COLUNAS]
+
+
+def _chave(ym: str) -> str:
+    """Estado de que o mês depende: lançamentos dele e dos JANELA anteriores (a DUPLICATE olha até o anterior)."""
+    return chave_meses([ym_add(ym, -k) for k in range(JANELA + 1)])
+
+
+def refresh_anomalias(months: list) -> int:
+    """Recalcula e grava as anomalias dos meses (uma passada para todos); devolve quantas há."""
+    months = sorted(set(months))
+    if not months:
+        return 0
+    version = data_version()
+    keys = [_chave(ym) for ym in months] if version is not None else []  # antes de calcular
+    df = detectar_anomalias(months)
+    now = datetime.now().isoformat(timespec="seconds")
+    rows = [
+        (r.month, r.kind, r.target, r.category, r.source, float(r.value),
+         None if pd.isna(r.baseline) else float(r.baseline), None if pd.isna(r.score) else float(r.score),
+         None if pd.isna(r.tx_id) else int(r.tx_id), None if pd.isna(r.ref_id) else int(r.ref_id), r.detail, now)
+        for r in df.itertuples(index=False)
+    ]
+    with conectar() as con:
+        con.executemany("DELETE FROM anomalies WHERE month=?", [(ym,) for ym in months])
+        con.executemany("""
+            INSERT INTO anomalies (month, kind, target, category, source, value, baseline, score,
+                                   tx_id, ref_id, detail, updated_at)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+        """, rows)
+        if version is not None:
+            con.executemany("INSERT OR REPLACE INTO anomalies_state (month, version, key) VALUES (?,?,?)",
+                            [(ym, int(version), key) for ym, key in zip(months, keys)])
+        con.commit()
+    return len(rows)
+
+
+def atualizar_anomalias() -> dict:
+    """Grava os meses do histórico sem resultado ou desatualizados. Devolve {"meses", "anomalias"}."""
+    mz = _matriz()
+    todos = list(yms(np.arange(mz["valores"].shape[0]) + mz["m0"]))
+    todos = sorted(set(todos) | set(_duplicadas()["month"]))
+    with conectar() as con:
+        salvas = dict(con.execute("SELECT month, key FROM anomalies_state"))
+    pendentes = [m for m in todos if data_version() is None or salvas.get(m) != _chave(m)]
+    return {"meses": len(pendentes), "anomalias": refresh_anomalias(pendentes)}
+
+
+def anomalias_mes(ym: str) -> pd.DataFrame:
+    """Anomalias do mês direto da tabela (recalcula só se os lançamentos da janela do mês mudaram)."""
+    with conectar() as con:
+        st = con.execute("SELECT key FROM anomalies_state WHERE month=?", (ym,)).fetchone()
+    if data_version() is None or st is None or st[0] != _chave(ym):
+        refresh_anomalias([ym])
+    with conectar() as con:
+        return pd.read_sql_query(
+            "SELECT * FROM anomalies WHERE month=? ORDER BY kind DESC, score DESC, value DESC", con, params=(ym,)
+        )
+
+
+@eventos.assinar
+def _on_write(evs: list):
+    """Escrita em lançamentos do mês M: recalcula na hora M..M+JANELA (os meses com M na janela)."""
+    months = {m for e in evs if e["tabela"] == "transactions" for m in e.get("months") or []}
+    if months:
+        refresh_anomalias([ym_add(m, k) for m in months for k in range(JANELA + 1)])
@@ -0,0 +1,147 @@
+"""Faturas de cartão e parcelamentos."""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.eventos import lote
+from financas.calendario import mes_da_fatura, vencimento
+from financas.datas import month_range, ym_add
+from financas.pessoal.db import add_installment_plan, add_transaction, conectar
+from financas.pessoal.loaders import carregar_transactions, memo
+from financas.pessoal.registro import registro_atual
+
+
+def card_statement_detail(card_id: int, statement_month: str, tx: pd.DataFrame) -> pd.DataFrame:
+    return tx[(tx["method"] == "CARD") & (tx["card_id"] == card_id) & (tx["statement_month"] == statement_month)].copy()
+
+
+@instr.medido("calc")
+def card_statement_total(card_id: int, statement_month: str, tx: pd.DataFrame) -> float:
+    return float(card_statement_detail(card_id, statement_month, tx)["amount"].sum())
+
+
+@instr.medido("calc")
+def create_installments_on_card(dt_: date, total_amount: float, n: int, category: str, description: str,
+                                card_id: int, closing_day: int, status: str) -> int:
+    """Cria o plano de parcelamento e as n parcelas (uma por fatura); devolve o id do plano."""
+    # Divide total em n parcelas, ajustando centavos na última
+    per = round(float(total_amount) / int(n), 2)
+    amounts = [per] * n
+    diff = round(float(total_amount) - sum(amounts), 2)
+    amounts[-1] = round(amounts[-1] + diff, 2)
+
+    reg = registro_atual()
+    card = reg.cards.get(int(card_id))
+    first_stmt = mes_da_fatura(dt_, int(closing_day), card.closing_adjust if card else "NONE", reg.holidays)
+    with lote():
+        plan_id = add_installment_plan(card_id, dt_, description, category, total_amount, n)
+        for i in range(1, n + 1):
+            stmt = ym_add(first_stmt, i - 1)
+            add_transaction(
+                dt_=dt_,
+                kind="EXPENSE",
+                amount=amounts[i - 1],
+                category=category,
+                description=f"{description} ({i}/{n})" if description else f"Parcela ({i}/{n})",
+                status=status,
+                method="CARD",
+                card_id=card_id,
+                statement_month=stmt,
+                installments_total=n,
+                installment_no=i,
+                plan_id=plan_id,
+            )
+    return plan_id
+
+
+def statement_due_date(statement_month: str, closing_day: int, due_day: int, due_adjust: str = "NONE",
+                       holidays: tuple = ()) -> date:
+    """Vencimento da fatura: due_day no mês da fatura, ou no seguinte se vence antes do fechamento."""
+    if due_adjust != "NONE":
+        return vencimento(statement_month, closing_day, due_day, due_adjust, holidays)
+    ym = statement_month if int(due_day) > int(closing_day) else ym_add(statement_month, 1)
+    start, end = month_range(ym)
+    return start.replace(day=min(int(due_day), end.day))
+
+
+def close_card_statement(card_id: int, statement_month: str, pay_date: date = None) -> dict:
+    """
+    Fecha a fatura: lança o CARD_PAYMENT do valor em aberto na conta de pagamento do cartão.
+    Pagamentos já lançados para a fatura são descontados, então rodar de novo não paga duas vezes.
+    """
+    reg = registro_atual()
+    card = reg.card(card_id)
+
+    tx = carregar_transactions()
+    total = card_statement_total(int(card_id), statement_month, tx)
+    paid = float(tx[(tx["method"] == "CARD_PAYMENT") & (tx["card_id"] == int(card_id))
+                    & (tx["statement_month"] == statement_month) & (tx["status"] == "PAID")]["amount"].sum())
+    open_amount = round(total - paid, 2)
+
+    out = {"card_id": int(card_id), "statement_month": statement_month, "total": total, "paid": paid, "payment": 0.0}
+    if open_amount <= 0:
+        return out
+
+    pay_date = pay_date or reg.due_date(card.id, statement_month)
+    add_transaction(pay_date, "EXPENSE", open_amount, "Cartão", f"Pagamento fatura {statement_month}", "PAID",
+                    "CARD_PAYMENT", account_id=card.pay_account_id, card_id=card.id,
+                    statement_month=statement_month)
+    out["payment"] = open_amount
+    out["pay_date"] = pay_date.isoformat()
+    return out
+
+
+def fill_statement_months(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Preenche statement_month das linhas CARD que vieram sem fatura (importação),
+    um cartão por vez sobre o array de datas inteiro.
+    """
+    reg = registro_atual()
+    missing = (df["method"] == "CARD") & df["statement_month"].isna() & df["card_id"].notna()
+    if not missing.any():
+        return df
+    df = df.copy()
+    for cid, part in df[missing].groupby("card_id"):
+        if int(cid) not in reg.cards:
+            continue
+        months = reg.statement_months(int(cid), pd.to_datetime(part["dt"]).to_numpy(dtype="datetime64[D]"))
+        df.loc[part.index, "statement_month"] = np.datetime_as_string(months, unit="M")
+    return df
+
+
+def card_credit() -> dict:
+    """
+    {card_id: {limit, open, available, used_pct}} de todos os cartões. O valor em aberto
+    (compras, inclusive parcelas de faturas futuras, menos pagamentos) vem do índice
+    card_statement_balances mantido por trigger, sem varrer os lançamentos.
+    """
+    def compute():
+        with conectar() as con:
+            open_by_card = dict(con.execute(
+                "SELECT card_id, ROUND(SUM(charged) - SUM(paid), 2) FROM card_statement_balances GROUP BY card_id"
+            ).fetchall())
+        out = {}
+        for cid, c in registro_atual().cards.items():
+            open_amount = float(open_by_card.get(cid) or 0.0)
+            limit = c.credit_limit
+            out[cid] = {
+                "limit": limit,
+                "open": open_amount,
+                "available": None if limit is None else round(limit - open_amount, 2),
+                "used_pct": open_amount / limit * 100 if limit else None,
+            }
+        return out
+    return memo("card_credit", compute)
+
+
+def card_open_statements(card_id: int) -> list:
+    """Faturas do cartão com saldo em aberto: [{statement_month, charged, paid, open}] em ordem de mês."""
+    with conectar() as con:
+        rows = con.execute("""
+            SELECT statement_month, charged, paid, ROUND(charged - paid, 2)
+            FROM card_statement_balances WHERE card_id=? AND ROUND(charged - paid, 2) <> 0
+            ORDER BY statement_month
+        """, (int(card_id),)).fetchall()
+    return [{"statement_month": m, "charged": c, "paid": p, "open": o} for m, c, p, o in rows]
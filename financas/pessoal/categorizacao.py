@@ -0,0 +1,293 @@
+"""
+Categorias normalizadas e categorização automática por regras.
+
+- `categories` é a dimensão: uma linha por chave (sem acento, minúsculas,
+  espaços colapsados) com o nome como foi digitado da primeira vez.
+  "Mercado", "mercado " e "MERCADO" são a mesma categoria; cada lançamento
+  guarda o category_id e os relatórios agrupam por ele.
+- `categorization_rules`: palavra-chave (lista separada por vírgula, casa
+  como trecho da descrição) ou regex, opcionalmente restrita a tipo e faixa
+  de valor. Ganha a de menor prioridade que casar (empate: a mais antiga).
+  Descrição e padrões são comparados sem acento e sem caixa.
+- Classificador compila as regras uma vez por data_version. `classificar`
+  resolve um lote inteiro numa passada: cada descrição distinta é
+  normalizada e testada uma vez só, e cada regra só olha as descrições que
+  as anteriores não resolveram.
+- Lançamento sem categoria recebe a da regra: add_transaction (digitado) e
+  insert_transactions / job de importação (lote). Quem já tem categoria só
+  é normalizado para a dimensão.
+
+numpy/pandas só entram no caminho de lote; db.py usa o de um lançamento só.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from financas.eventos import emitir
+from financas.pessoal.db import conectar, data_version, db_atual
+from financas.tenants import CACHE
+
+MATCHES = ("KEYWORD", "REGEX")
+
+
+def _sem_acento(texto: str) -> str:
+    if texto.isascii():
+        return texto
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=65536)
+def chave_categoria(texto) -> str:
+    """Chave de comparação de categoria/descrição: sem acento, casefold, espaços colapsados ("" se vazio)."""
+    if not isinstance(texto, str):
+        return ""
+    return " ".join(_sem_acento(texto).casefold().split())
+
+
+def ids_categorias(con, nomes) -> dict:
+    """{nome: category_id} dos nomes não vazios, criando na dimensão as chaves que faltam (sem commit)."""
+    por_chave = {}
+    for nome in set(nomes):
+        k = chave_categoria(nome)
+        if k:
+            por_chave.setdefault(k, []).append(nome)
+    chaves = list(por_chave)
+    con.executemany(
+        "INSERT INTO categories (key, name) VALUES (?,?) ON CONFLICT(key) DO NOTHING",
+        [(k, " ".join(por_chave[k][0].split())) for k in chaves],
+    )
+    out = {}
+    for i in range(0, len(chaves), 500):
+        part = chaves[i:i + 500]
+        for cid, k in con.execute(f"SELECT id, key FROM categories WHERE key IN ({','.join('?' * len(part))})", part):
+            for nome in por_chave[k]:
+                out[nome] = int(cid)
+    return out
+
+
+def backfill_category_ids(con) -> int:
+    """Preenche category_id de quem tem categoria e ainda não tem id (migração, UPDATE direto da categoria)."""
+    rows = con.execute(
+        "SELECT id, category FROM transactions WHERE category_id IS NULL AND trim(category) <> ''"
+    ).fetchall()
+    if not rows:
+        return 0
+    ids = ids_categorias(con, [c for _, c in rows])
+    return con.executemany("UPDATE transactions SET category_id=? WHERE id=?", [(ids[c], i) for i, c in rows]).rowcount
+
+
+class Regra:
+    """Regra compilada: `rx` roda sobre a descrição já sem acento e em minúsculas."""
+    __slots__ = ("id", "match", "pattern", "rx", "category_id", "category", "kind", "min_amount", "max_amount")
+
+    def __init__(self, id, match: str, pattern: str, category_id, category: str, kind=None,
+                 min_amount=None, max_amount=None):
+        self.id = id
+        self.match = match
+        self.pattern = pattern
+        self.rx = _compilar(match, pattern)
+        self.category_id = category_id
+        self.category = category
+        self.kind = kind or None
+        self.min_amount = None if min_amount is None else float(min_amount)
+        self.max_amount = None if max_amount is None else float(max_amount)
+
+    def casa(self, chave_desc: str, amount=None, kind=None) -> bool:
+        if self.kind is not None and kind != self.kind:
+            return False
+        # sem valor, regra com faixa não casa (mesmo resultado do NaN em classificar)
+        if self.min_amount is not None and not (amount is not None and amount >= self.min_amount):
+            return False
+        if self.max_amount is not None and not (amount is not None and amount <= self.max_amount):
+            return False
+        return self.rx.search(chave_desc) is not None
+
+
+def _compilar(match: str, pattern: str):
+    if match not in MATCHES:
+        raise ValueError(f"Tipo de regra {match!r} inválido (use {' ou '.join(MATCHES)}).")
+    if match == "KEYWORD":
+        palavras = sorted({k for k in map(chave_categoria, (pattern or "").split(",")) if k}, key=len, reverse=True)
+        if not palavras:
+            raise ValueError("Informe ao menos uma palavra-chave.")
+        return re.compile("|".join(map(re.escape, palavras)))
+    try:
+        return re.compile(_sem_acento(pattern or ""), re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Regex inválida: {e}") from None
+
+
+class Classificador:
+    """Regras ativas em ordem de aplicação; a primeira que casa define a categoria."""
+    __slots__ = ("regras",)
+
+    def __init__(self, regras):
+        self.regras = tuple(regras)
+
+    @classmethod
+    def do_banco(cls, con) -> "Classificador":
+        return cls(
+            Regra(*r) for r in con.execute("""
+                SELECT r.id, r.match, r.pattern, r.category_id, c.name, r.kind, r.min_amount, r.max_amount
+                FROM categorization_rules r JOIN categories c ON c.id = r.category_id
+                WHERE r.active = 1
+                ORDER BY r.priority, r.id
+            """)
+        )
+
+    def classificar_um(self, description: str, amount=None, kind=None):
+        """Regra que categoriza um lançamento (ou None)."""
+        k = chave_categoria(description)
+        if not k:
+            return None
+        return next((r for r in self.regras if r.casa(k, amount, kind)), None)
+
+    def classificar(self, descriptions, amounts=None, kinds=None):
+        """
+        Índice da regra (em self.regras) de cada linha, -1 sem regra. Numa passada:
+        as descrições são fatoradas, e cada regra testa só as distintas ainda em aberto.
+        """
+        import numpy as np
+        import pandas as pd
+
+        codigos, unicos = pd.factorize(pd.Series(descriptions, dtype=object), use_na_sentinel=False)
+        textos = [chave_categoria(u) for u in unicos]
+        n = len(codigos)
+        out = np.full(n, -1, dtype=np.int64)
+        livre = np.fromiter((bool(t) for t in textos), dtype=bool, count=len(textos))[codigos]
+        amounts = None if amounts is None else np.asarray(amounts, dtype=float)
+        kind_codigos, kind_unicos = pd.factorize(pd.Series(kinds, dtype=object)) if kinds is not None else (None, [])
+        kind_unicos = list(kind_unicos)
+
+        for i, r in enumerate(self.regras):
+            m = livre.copy()
+            if r.kind is not None:
+                m &= kind_codigos == kind_unicos.index(r.kind) if r.kind in kind_unicos else False
+            if amounts is not None and r.min_amount is not None:
+                m &= amounts >= r.min_amount
+            if amounts is not None and r.max_amount is not None:
+                m &= amounts <= r.max_amount
+            if not m.any():
+                continue
+            # só as descrições distintas que ainda podem casar com esta regra
+            casa = np.zeros(len(textos), dtype=bool)
+            casa[codigos[m]] = True
+            abertos = np.flatnonzero(casa)
+            search = r.rx.search
+            casa[abertos] = [search(textos[u]) is not None for u in abertos]
+            m &= casa[codigos]
+            out[m] = i
+            livre &= ~m
+            if not livre.any():
+                break
+        return out
+
+
+def classificador_atual() -> Classificador:
+    """Regras ativas do banco atual, compiladas uma vez por data_version."""
+    def compute():
+        with conectar() as con:
+            return Classificador.do_banco(con)
+
+    version = data_version()
+    if version is None:
+        return compute()
+    return CACHE.get_or_compute((db_atual(), "classificador"), version, compute)
+
+
+def categorizar(df, con=None, classificador: Classificador = None):
+    """
+    Cópia de `df` (description, amount, kind, category) com as linhas sem categoria
+    categorizadas pelas regras e a coluna category_id (Int64, nulo = sem categoria).
+    Cria na dimensão as categorias novas: na `con` recebida (sem commit) ou numa própria.
+    """
+    import numpy as np
+    import pandas as pd
+
+    out = df.copy()
+    codigos, unicos = pd.factorize(out["category"].astype(object), use_na_sentinel=False)
+    vazia = np.fromiter((not chave_categoria(u) for u in unicos), dtype=bool, count=len(unicos))[codigos]
+    if vazia.any():
+        clf = classificador or classificador_atual()
+        idx = clf.classificar(
+            out["description"].to_numpy(dtype=object)[vazia],
+            out["amount"].to_numpy(dtype=float)[vazia],
+            out["kind"].to_numpy(dtype=object)[vazia],
+        )
+        nomes = np.array([r.category for r in clf.regras], dtype=object)
+        cat = out["category"].to_numpy(dtype=object).copy()
+        cat[np.flatnonzero(vazia)[idx >= 0]] = nomes[idx[idx >= 0]]
+        out["category"] = cat
+        codigos, unicos = pd.factorize(out["category"].astype(object), use_na_sentinel=False)
+
+    def resolver(c):
+        ids = ids_categorias(c, list(unicos))
+        return np.array([ids.get(u) for u in unicos], dtype=object)
+
+    if con is not None:
+        por_codigo = resolver(con)
+    else:
+        with conectar() as c:
+            por_codigo = resolver(c)
+            c.commit()
+    out["category_id"] = pd.array(por_codigo[codigos], dtype="Int64")
+    return out
+
+
+def carregar_regras_categoria():
+    import pandas as pd
+
+    with conectar() as con:
+        return pd.read_sql_query("""
+            SELECT r.id, r.priority, r.match, r.pattern, c.name AS category, r.kind, r.min_amount, r.max_amount
+            FROM categorization_rules r JOIN categories c ON c.id = r.category_id
+            WHERE r.active = 1
+            ORDER BY r.priority, r.id
+        """, con)
+
+
+def salvar_regra_categoria(match: str, pattern: str, category: str, kind: str = None,
+                           min_amount: float = None, max_amount: float = None, priority: int = 100) -> int:
+    """Cria uma regra; ValueError se o padrão não compila, faltar a categoria ou a faixa de valor for inválida."""
+    _compilar(match, pattern)
+    if not chave_categoria(category):
+        raise ValueError("Informe a categoria da regra.")
+    if min_amount is not None and max_amount is not None and float(max_amount) < float(min_amount):
+        raise ValueError("O valor máximo precisa ser maior ou igual ao mínimo.")
+    with conectar() as con:
+        cid = ids_categorias(con, [category])[category]
+        cur = con.execute("""
+            INSERT INTO categorization_rules (match, pattern, category_id, kind, min_amount, max_amount, priority)
+            VALUES (?,?,?,?,?,?,?)
+        """, (match, pattern.strip(), cid, kind or None,
+              None if min_amount is None else float(min_amount),
+              None if max_amount is None else float(max_amount), int(priority)))
+        con.commit()
+    return int(cur.lastrowid)
+
+
+def remover_regra_categoria(rule_id: int):
+    with conectar() as con:
+        con.execute("UPDATE categorization_rules SET active=0 WHERE id=?", (int(rule_id),))
+        con.commit()
+
+
+def recategorizar() -> int:
+    """Aplica as regras aos lançamentos já gravados sem categoria; devolve quantos ganharam uma."""
+    clf = classificador_atual()
+    with conectar() as con:
+        rows = con.execute("""
+            SELECT id, description, amount, kind, dt, statement_month FROM transactions
+            WHERE COALESCE(trim(category), '') = '' AND COALESCE(trim(description), '') <> ''
+        """).fetchall()
+        if not rows or not clf.regras:
+            return 0
+        idx = clf.classificar([r[1] for r in rows], [r[2] for r in rows], [r[3] for r in rows])
+        hits = [(clf.regras[j], r) for j, r in zip(idx.tolist(), rows) if j >= 0]
+        con.executemany("UPDATE transactions SET category=?, category_id=? WHERE id=?",
+                        [(regra.category, regra.category_id, r[0]) for regra, r in hits])
+        con.commit()
+    if hits:
+        emitir("transactions", "update", ids=[r[0] for _, r in hits],
+               months=sorted({m for _, r in hits for m in (str(r[4])[:7], r[5]) if m}))
+    return len(hits)
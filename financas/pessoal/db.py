@@ -0,0 +1,1077 @@
+"""Conexão, schema e escritas do finance_pessoal.db (sem pandas)."""
+import sqlite3
+from datetime import date
+from pathlib import Path
+
+from financas.eventos import assinantes_em, emitir
+from financas.tenants import POOL, PooledConnection, tenant_atual, tenant_db_path
+
+DB = "finance_pessoal.db"
+
+# Tabelas de dados do usuário: qualquer escrita nelas incrementa data_version
+# Alertas recalculados a cada escrita em lançamentos (ver pessoal.alertas); poda do log de mudanças (loaders)
+assinantes_em("financas.pessoal.alertas", "financas.pessoal.anomalias", "financas.pessoal.loaders")
+
+VERSIONED_TABLES = [
+    "accounts", "cards", "goals", "transactions", "recurrences", "long_goals", "category_rules", "transfers",
+    "alert_rules", "holidays", "installment_plans", "budgets", "categories", "categorization_rules",
+]
+
+# Lançamentos do diário a partir de uma linha {r} (NEW no trigger, alias t na reconstrução)
+JOURNAL_INSERT = "INSERT INTO journal (source, source_id, leg, account_id, dt, amount, status, entry) "
+JOURNAL_TX = """
+SELECT 'T', {r}.id, 0, {r}.account_id, {r}.dt,
+       CASE WHEN {r}.method IN ('BANK','CASH') AND {r}.kind = 'INCOME' THEN {r}.amount ELSE -{r}.amount END,
+       {r}.status,
+       CASE WHEN {r}.method = 'CARD_PAYMENT' THEN 'CARD_PAYMENT' ELSE {r}.kind END
+FROM {src}
+WHERE {r}.account_id IS NOT NULL AND {r}.method IN ('BANK','CASH','CARD_PAYMENT')
+"""
+JOURNAL_TR = """
+SELECT 'X', {r}.id, {leg},
+       CASE {leg} WHEN 0 THEN {r}.from_account_id ELSE {r}.to_account_id END, {r}.dt,
+       CASE {leg} WHEN 0 THEN -{r}.amount ELSE {r}.amount END,
+       {r}.status,
+       CASE {leg} WHEN 0 THEN 'TRANSFER_OUT' ELSE 'TRANSFER_IN' END
+FROM {src}
+"""
+# Colunas que mudam o diário (e os saldos e checkpoints que saem dele)
+JOURNAL_COLUMNS = {
+    "transactions": "dt, kind, amount, status, method, account_id",
+    "transfers": "dt, amount, status, from_account_id, to_account_id",
+}
+
+# Lançamentos que consomem envelope (budget_spend), a partir de uma linha {r}
+BUDGET_SPEND_WHERE = (
+    "{r}.kind = 'EXPENSE' AND {r}.method <> 'CARD_PAYMENT' AND {r}.dt IS NOT NULL AND {r}.category_id IS NOT NULL"
+)
+
+# Dias 29-31 valem o último dia do mês; *_adjust: NONE/PREV/NEXT (dia útil), ver financas.calendario
+CARDS_DDL = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    closing_day INTEGER NOT NULL CHECK(closing_day BETWEEN 1 AND 31),
+    due_day INTEGER NOT NULL CHECK(due_day BETWEEN 1 AND 31),
+    pay_account_id INTEGER,
+    last4 TEXT,
+    closing_adjust TEXT NOT NULL DEFAULT 'NONE' CHECK(closing_adjust IN ('NONE','PREV','NEXT')),
+    due_adjust TEXT NOT NULL DEFAULT 'NONE' CHECK(due_adjust IN ('NONE','PREV','NEXT')),
+    credit_limit REAL CHECK(credit_limit IS NULL OR credit_limit >= 0),
+    FOREIGN KEY(pay_account_id) REFERENCES accounts(id)
+);
+"""
+
+
+class VersionConflict(Exception):
+    """Lançamentos alterados/excluídos por outra sessão depois de lidos (ids em .ids)."""
+
+    def __init__(self, ids: list):
+        self.ids = sorted(int(i) for i in ids)
+        super().__init__(f"Lançamentos alterados por outra sessão: {self.ids}")
+
+
+def usar_banco(path: str):
+    """Aponta o motor para outro arquivo (benchmarks, CLI, testes manuais)."""
+    global DB
+    DB = str(path)
+
+
+def db_atual() -> str:
+    """Arquivo do tenant do contexto atual; sem tenant, o banco padrão (DB)."""
+    tenant = tenant_atual()
+    return tenant_db_path(tenant, Path(DB).name) if tenant else DB
+
+
+def conectar():
+    return PooledConnection(POOL, db_atual())
+
+
+def data_version():
+    """
+    Contador incrementado por trigger a cada escrita nos dados do usuário.
+    None se o banco ainda não passou por ensure_schema (sem versão, sem cache).
+    """
+    with conectar() as con:
+        try:
+            row = con.execute("SELECT version FROM data_version WHERE id=1").fetchone()
+        except sqlite3.OperationalError:
+            return None
+    return int(row[0]) if row else None
+
+
+def table_columns(con, table):
+    rows = con.execute(f"PRAGMA table_info({table});").fetchall()
+    return {r[1] for r in rows}
+
+
+def _trigger(con, name: str, ddl: str):
+    """CREATE TRIGGER `name` `ddl`; se o do banco tem outra definição (versão antiga), recria."""
+    sql = f"CREATE TRIGGER {name} {ddl.strip().rstrip(';').strip()}"
+    row = con.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (name,)).fetchone()
+    if row is not None and row[0] == sql:
+        return
+    con.execute(f"DROP TRIGGER IF EXISTS {name};")
+    con.execute(sql)
+
+
+def ensure_schema():
+    from financas.pessoal.categorizacao import backfill_category_ids, chave_categoria  # importa este módulo
+
+    with conectar() as con:
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL CHECK(type IN ('BANK','CASH')),
+            initial_balance REAL NOT NULL DEFAULT 0
+        );
+        """)
+
+        # cards antigo (CHECK 1-28, sem ajuste de dia útil): o SQLite não altera CHECK, então recria a tabela
+        old_cards = con.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='cards'").fetchone()
+        migrated_cards = bool(old_cards) and "BETWEEN 1 AND 28" in old_cards[0]
+        if migrated_cards:
+            cols_cards = table_columns(con, "cards")
+            keep = [c for c in ["id", "name", "closing_day", "due_day", "pay_account_id", "last4"] if c in cols_cards]
+            con.execute(CARDS_DDL.format(name="cards_new"))
+            con.execute(f"INSERT INTO cards_new ({', '.join(keep)}) SELECT {', '.join(keep)} FROM cards")
+            con.execute("DROP TABLE cards")
+            con.execute("ALTER TABLE cards_new RENAME TO cards")
+        con.execute(CARDS_DDL.format(name="cards"))
+        if "credit_limit" not in table_columns(con, "cards"):
+            con.execute("ALTER TABLE cards ADD COLUMN credit_limit REAL;")
+
+        # Feriados locais (fechamento/vencimento com ajuste de dia útil)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS holidays (
+            dt TEXT PRIMARY KEY,
+            name TEXT
+        );
+        """)
+
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            monthly_target REAL NOT NULL DEFAULT 0
+        );
+        """)
+
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dt TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK(kind IN ('INCOME','EXPENSE')),
+            amount REAL NOT NULL,
+            category TEXT,
+            description TEXT,
+            status TEXT NOT NULL CHECK(status IN ('PENDING','PAID')) DEFAULT 'PAID',
+            method TEXT NOT NULL CHECK(method IN ('BANK','CASH','CARD','CARD_PAYMENT')),
+            account_id INTEGER,
+            card_id INTEGER,
+            statement_month TEXT,
+            FOREIGN KEY(account_id) REFERENCES accounts(id),
+            FOREIGN KEY(card_id) REFERENCES cards(id)
+        );
+        """)
+        cols_tx = table_columns(con, "transactions")
+        if "installments_total" not in cols_tx:
+            con.execute("ALTER TABLE transactions ADD COLUMN installments_total INTEGER;")
+        if "installment_no" not in cols_tx:
+            con.execute("ALTER TABLE transactions ADD COLUMN installment_no INTEGER;")
+        if "recurrence_id" not in cols_tx:
+            con.execute("ALTER TABLE transactions ADD COLUMN recurrence_id INTEGER;")
+        if "row_version" not in cols_tx:
+            con.execute("ALTER TABLE transactions ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1;")
+
+        # Parcelamentos: um plano por compra parcelada; as parcelas apontam para ele (plan_id)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS installment_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            card_id INTEGER NOT NULL,
+            dt TEXT NOT NULL,
+            description TEXT,
+            category TEXT,
+            total_amount REAL NOT NULL,
+            n INTEGER NOT NULL CHECK(n >= 1),
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')),
+            FOREIGN KEY(card_id) REFERENCES cards(id)
+        );
+        """)
+        if "plan_id" not in cols_tx:
+            con.execute("ALTER TABLE transactions ADD COLUMN plan_id INTEGER REFERENCES installment_plans(id);")
+            backfill_installment_plans(con)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_transactions_plan ON transactions(plan_id, installment_no);")
+
+        # Categorias: dimensão normalizada (ver pessoal.categorizacao) e regras de categorização automática
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL
+        );
+        """)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS categorization_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match TEXT NOT NULL CHECK(match IN ('KEYWORD','REGEX')),
+            pattern TEXT NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            kind TEXT CHECK(kind IN ('INCOME','EXPENSE')),
+            min_amount REAL,
+            max_amount REAL,
+            priority INTEGER NOT NULL DEFAULT 100,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        """)
+        if "category_id" not in cols_tx:
+            con.execute("ALTER TABLE transactions ADD COLUMN category_id INTEGER REFERENCES categories(id);")
+        # só quem falta resolver (migração, categoria alterada por SQL direto): a conferência a cada início
+        # e a cada data_version nova (carregar_transactions) é um seek
+        con.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_sem_categoria ON transactions(id)
+        WHERE category_id IS NULL AND trim(category) <> '';
+        """)
+        _trigger(con, "trg_transactions_category_id", """
+        AFTER UPDATE OF category ON transactions
+        WHEN NEW.category IS NOT OLD.category AND NEW.category_id IS OLD.category_id AND OLD.category_id IS NOT NULL
+        BEGIN
+            UPDATE transactions SET category_id = NULL WHERE id = NEW.id;
+        END;
+        """)
+
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS recurrences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK(kind IN ('INCOME','EXPENSE')),
+            amount REAL NOT NULL,
+            category TEXT,
+            description TEXT,
+            method TEXT NOT NULL CHECK(method IN ('BANK','CASH','CARD')),
+            account_id INTEGER,
+            card_id INTEGER,
+            day_of_month INTEGER NOT NULL CHECK(day_of_month BETWEEN 1 AND 28),
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        """)
+
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS long_goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            target_amount REAL NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            start_amount REAL NOT NULL DEFAULT 0,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        """)
+
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS category_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL UNIQUE,
+            class TEXT NOT NULL CHECK(class IN ('ESSENTIAL','DISCRETIONARY'))
+        );
+        """)
+
+        # Transferências (Conta -> Conta)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS transfers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dt TEXT NOT NULL,
+            amount REAL NOT NULL,
+            from_account_id INTEGER NOT NULL,
+            to_account_id INTEGER NOT NULL,
+            description TEXT,
+            status TEXT NOT NULL CHECK(status IN ('PENDING','PAID')) DEFAULT 'PAID',
+            FOREIGN KEY(from_account_id) REFERENCES accounts(id),
+            FOREIGN KEY(to_account_id) REFERENCES accounts(id)
+        );
+        """)
+
+        # Saldo de fechamento por conta/mês (checkpoint para consultas "saldo em")
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS balance_checkpoints (
+            account_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            balance REAL NOT NULL,
+            PRIMARY KEY(account_id, month),
+            FOREIGN KEY(account_id) REFERENCES accounts(id)
+        );
+        """)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_transactions_account_dt ON transactions(account_id, dt);")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_transfers_from_dt ON transfers(from_account_id, dt);")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_transfers_to_dt ON transfers(to_account_id, dt);")
+
+        # Escrita que muda o diário invalida os checkpoints das contas envolvidas a partir do mês
+        # afetado; as outras contas ficam. balance_as_of regrava os que faltam (ver pessoal.saldos).
+        ckpt_contas = {"transactions": ["account_id"], "transfers": ["from_account_id", "to_account_id"]}
+        for table, contas in ckpt_contas.items():
+            def ckpt_delete(*rows):
+                conds = " OR ".join(f"(account_id = {r}.{c} AND month >= substr({r}.dt, 1, 7))" for r in rows for c in contas)
+                return f"DELETE FROM balance_checkpoints WHERE {conds};"
+
+            _trigger(con, f"trg_{table}_ins_ckpt", f"AFTER INSERT ON {table} BEGIN {ckpt_delete('NEW')} END;")
+            _trigger(con, f"trg_{table}_upd_ckpt",
+                     f"AFTER UPDATE OF {JOURNAL_COLUMNS[table]} ON {table} BEGIN {ckpt_delete('OLD', 'NEW')} END;")
+            _trigger(con, f"trg_{table}_del_ckpt", f"AFTER DELETE ON {table} BEGIN {ckpt_delete('OLD')} END;")
+        # saldo inicial muda todos os fechamentos da conta
+        _trigger(con, "trg_accounts_ckpt", """
+        AFTER UPDATE OF initial_balance ON accounts
+        BEGIN
+            DELETE FROM balance_checkpoints WHERE account_id = OLD.id;
+        END;
+        """)
+        _trigger(con, "trg_accounts_del_ckpt", """
+        AFTER DELETE ON accounts
+        BEGIN
+            DELETE FROM balance_checkpoints WHERE account_id = OLD.id;
+        END;
+        """)
+
+        # Saldo em aberto por cartão e fatura, mantido por trigger a cada escrita em lançamentos:
+        # charged = compras CARD (qualquer status), paid = CARD_PAYMENT pagos. Em aberto = charged - paid.
+        has_card_balances = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='card_statement_balances'"
+        ).fetchone()
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS card_statement_balances (
+            card_id INTEGER NOT NULL,
+            statement_month TEXT NOT NULL,
+            charged REAL NOT NULL DEFAULT 0,
+            paid REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY(card_id, statement_month)
+        );
+        """)
+        if not has_card_balances:
+            rebuild_card_balances(con)
+        charged = "CASE WHEN {r}.method = 'CARD' THEN {r}.amount ELSE 0 END"
+        paid = "CASE WHEN {r}.method = 'CARD_PAYMENT' AND {r}.status = 'PAID' THEN {r}.amount ELSE 0 END"
+        add = """
+            INSERT INTO card_statement_balances (card_id, statement_month, charged, paid)
+            SELECT {r}.card_id, COALESCE({r}.statement_month, ''), {sign}({c}), {sign}({p})
+            WHERE {r}.card_id IS NOT NULL AND {r}.method IN ('CARD', 'CARD_PAYMENT')
+            ON CONFLICT(card_id, statement_month) DO UPDATE SET
+                charged = charged + excluded.charged, paid = paid + excluded.paid;
+        """
+        new = add.format(r="NEW", sign="", c=charged.format(r="NEW"), p=paid.format(r="NEW"))
+        old = add.format(r="OLD", sign="-", c=charged.format(r="OLD"), p=paid.format(r="OLD"))
+        old += """
+            DELETE FROM card_statement_balances
+            WHERE card_id = OLD.card_id AND statement_month = COALESCE(OLD.statement_month, '')
+              AND round(charged, 2) = 0 AND round(paid, 2) = 0;
+        """
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_ins_cardbal AFTER INSERT ON transactions BEGIN {new} END;")
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_del_cardbal AFTER DELETE ON transactions BEGIN {old} END;")
+        con.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_upd_cardbal
+        AFTER UPDATE OF amount, status, method, card_id, statement_month ON transactions
+        BEGIN {old} {new} END;
+        """)
+
+        # Envelopes: orçamento mensal por categoria (com ou sem rollover) e o gasto por (category_id, mês do dt),
+        # mantido por trigger para toda categoria (criar um envelope não exige reconstrução). spent_cum é o
+        # acumulado da categoria até o mês, então o saldo com rollover sai de duas buscas pela chave.
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL UNIQUE,
+            monthly_amount REAL NOT NULL,
+            rollover INTEGER NOT NULL DEFAULT 0,
+            start_month TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        """)
+        has_budget_spend = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='budget_spend'"
+        ).fetchone()
+        if has_budget_spend and "category_id" not in table_columns(con, "budget_spend"):
+            # versão chaveada pelo texto da categoria: recria pela dimensão
+            for op in ("ins", "del", "upd"):
+                con.execute(f"DROP TRIGGER IF EXISTS trg_transactions_{op}_budget;")
+            con.execute("DROP TABLE budget_spend;")
+            has_budget_spend = None
+            con.executemany("UPDATE OR IGNORE budgets SET category=? WHERE id=?", [
+                (chave_categoria(c), i) for i, c in con.execute("SELECT id, category FROM budgets").fetchall()
+            ])
+        backfill_category_ids(con)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS budget_spend (
+            category_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            spent REAL NOT NULL DEFAULT 0,
+            spent_cum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY(category_id, month)
+        );
+        """)
+        if not has_budget_spend:
+            rebuild_budget_spend(con)
+        # mesma regra de gasto dos alertas por categoria: EXPENSE fora CARD_PAYMENT, qualquer status
+        add = """
+            INSERT INTO budget_spend (category_id, month, spent, spent_cum)
+            SELECT {cat}, {m}, 0, COALESCE((
+                SELECT spent_cum FROM budget_spend WHERE category_id = {cat} AND month < {m}
+                ORDER BY month DESC LIMIT 1
+            ), 0)
+            WHERE {cond}
+            ON CONFLICT(category_id, month) DO NOTHING;
+            UPDATE budget_spend
+            SET spent = spent + CASE WHEN month = {m} THEN {sign}{r}.amount ELSE 0 END,
+                spent_cum = spent_cum + {sign}{r}.amount
+            WHERE {cond} AND category_id = {cat} AND month >= {m};
+        """
+        fmt = {
+            r: dict(r=r, cat=f"{r}.category_id", m=f"substr({r}.dt, 1, 7)",
+                    cond=BUDGET_SPEND_WHERE.format(r=r))
+            for r in ("NEW", "OLD")
+        }
+        new = add.format(sign="", **fmt["NEW"])
+        old = add.format(sign="-", **fmt["OLD"])
+        # mês zerado sai: o acumulado dele é o do mês anterior, que continua na tabela
+        old += """
+            DELETE FROM budget_spend
+            WHERE {cond} AND category_id = {cat} AND month = {m} AND round(spent, 2) = 0;
+        """.format(**fmt["OLD"])
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_ins_budget AFTER INSERT ON transactions BEGIN {new} END;")
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_del_budget AFTER DELETE ON transactions BEGIN {old} END;")
+        con.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_upd_budget
+        AFTER UPDATE OF kind, amount, category_id, dt, method ON transactions
+        BEGIN {old} {new} END;
+        """)
+
+        # Diário: um lançamento assinado por movimento de conta (partida dobrada das contas do app).
+        # Origem T = transactions (BANK/CASH pelo kind, CARD_PAYMENT sempre saída), X = transfers
+        # (perna 0 sai da origem, perna 1 entra no destino). Mantido por trigger; saldos, extratos
+        # e fluxo de caixa são agregados dele pelo índice (account_id, dt).
+        has_journal = con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='journal'").fetchone()
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS journal (
+            source TEXT NOT NULL CHECK(source IN ('T','X')),
+            source_id INTEGER NOT NULL,
+            leg INTEGER NOT NULL DEFAULT 0,
+            account_id INTEGER NOT NULL,
+            dt TEXT NOT NULL,
+            amount REAL NOT NULL,
+            status TEXT NOT NULL,
+            entry TEXT NOT NULL CHECK(entry IN ('INCOME','EXPENSE','CARD_PAYMENT','TRANSFER_OUT','TRANSFER_IN')),
+            PRIMARY KEY(source, source_id, leg)
+        );
+        """)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_journal_account_dt ON journal(account_id, dt);")
+        if not has_journal:
+            rebuild_journal(con)
+        post_tx = JOURNAL_INSERT + JOURNAL_TX.format(r="NEW", src="(SELECT 1)") + ";"
+        post_tr = "".join(
+            JOURNAL_INSERT + JOURNAL_TR.format(r="NEW", src="(SELECT 1)", leg=leg) + ";" for leg in (0, 1)
+        )
+        for table, src, post in [("transactions", "T", post_tx), ("transfers", "X", post_tr)]:
+            unpost = f"DELETE FROM journal WHERE source='{src}' AND source_id=OLD.id;"
+            con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_ins_journal AFTER INSERT ON {table} BEGIN {post} END;")
+            con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_del_journal AFTER DELETE ON {table} BEGIN {unpost} END;")
+            con.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_upd_journal AFTER UPDATE OF {JOURNAL_COLUMNS[table]} ON {table}
+            BEGIN {unpost} {post} END;
+            """)
+
+        # Log de mudanças (CDC) dos lançamentos: seq monotônico, só acrescenta (podado por
+        # prune_tx_changes). Toda escrita do motor incrementa row_version; o UPDATE por fora que não
+        # incrementa é incrementado pelo trigger. O log sai do UPDATE de fora, uma linha por alteração,
+        # com OLD.dt/OLD.statement_month de antes da escrita. Os UPDATEs aninhados não entram:
+        # - o incremento do trigger só grava row_version, que fica fora do UPDATE OF;
+        # - a limpeza do category_id (trg_transactions_category_id) é reconhecida pelo WHEN.
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS tx_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tx_id INTEGER NOT NULL,
+            op TEXT NOT NULL CHECK(op IN ('I','U','D')),
+            row_version INTEGER,
+            dt TEXT,
+            statement_month TEXT,
+            old_dt TEXT,
+            old_statement_month TEXT,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime'))
+        );
+        """)
+        tx_cols = ", ".join(sorted(table_columns(con, "transactions") - {"row_version"}))
+        limpa_categoria = """(NEW.row_version = OLD.row_version AND NEW.category IS OLD.category
+                  AND NEW.category_id IS NULL AND OLD.category_id IS NOT NULL)"""
+        _trigger(con, "trg_transactions_row_version", f"""
+        AFTER UPDATE OF {tx_cols} ON transactions
+        WHEN NEW.row_version = OLD.row_version AND NOT {limpa_categoria}
+        BEGIN
+            UPDATE transactions SET row_version = OLD.row_version + 1 WHERE id = NEW.id;
+        END;
+        """)
+        con.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_cdc_ins AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO tx_changes (tx_id, op, row_version, dt, statement_month)
+            VALUES (NEW.id, 'I', NEW.row_version, NEW.dt, NEW.statement_month);
+        END;
+        """)
+        _trigger(con, "trg_transactions_cdc_upd", f"""
+        AFTER UPDATE OF {tx_cols} ON transactions
+        WHEN NOT {limpa_categoria}
+        BEGIN
+            INSERT INTO tx_changes (tx_id, op, row_version, dt, statement_month, old_dt, old_statement_month)
+            VALUES (NEW.id, 'U', CASE WHEN NEW.row_version = OLD.row_version THEN OLD.row_version + 1
+                                      ELSE NEW.row_version END,
+                    NEW.dt, NEW.statement_month, OLD.dt, OLD.statement_month);
+        END;
+        """)
+        con.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_cdc_del AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO tx_changes (tx_id, op, row_version, old_dt, old_statement_month)
+            VALUES (OLD.id, 'D', OLD.row_version, OLD.dt, OLD.statement_month);
+        END;
+        """)
+
+        # Tarefas em segundo plano (recorrências, importações, reconstrução de agregados)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL DEFAULT '{}',
+            dedupe_key TEXT,
+            status TEXT NOT NULL CHECK(status IN ('QUEUED','RUNNING','DONE','FAILED','CANCELLED')) DEFAULT 'QUEUED',
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            checkpoint TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        );
+        """)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(dedupe_key, status);")
+
+        # Alertas: regras (limites por cartão/categoria) e resultado pré-calculado por mês
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS alert_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scope TEXT NOT NULL CHECK(scope IN ('CARD','CATEGORY')),
+            target TEXT,
+            warn_pct REAL NOT NULL,
+            high_pct REAL NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            UNIQUE(scope, target)
+        );
+        """)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS alerts (
+            month TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            target TEXT NOT NULL,
+            level TEXT NOT NULL CHECK(level IN ('OK','WARN','HIGH')),
+            value REAL NOT NULL,
+            base REAL NOT NULL,
+            pct REAL,
+            warn_pct REAL NOT NULL,
+            high_pct REAL NOT NULL,
+            since TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY(month, scope, target)
+        );
+        """)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS alerts_state (
+            month TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        """)
+        if "key" not in table_columns(con, "alerts_state"):
+            con.execute("ALTER TABLE alerts_state ADD COLUMN key TEXT;")
+
+        # Anomalias de gasto (picos por categoria/origem, compras duplicadas), pré-calculadas por mês
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS anomalies (
+            month TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK(kind IN ('SPIKE','DUPLICATE')),
+            target TEXT NOT NULL,
+            category TEXT,
+            source TEXT,
+            value REAL NOT NULL,
+            baseline REAL,
+            score REAL,
+            tx_id INTEGER,
+            ref_id INTEGER,
+            detail TEXT,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY(month, kind, target)
+        );
+        """)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS anomalies_state (
+            month TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        """)
+        if "key" not in table_columns(con, "anomalies_state"):
+            con.execute("ALTER TABLE anomalies_state ADD COLUMN key TEXT;")
+
+        # Versão dos dados (chave dos caches por tenant)
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK(id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        con.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);")
+        # ...e uma versão por tabela, para estados que dependem de poucas tabelas (alerts_state,
+        # anomalies_state). transactions fica de fora: a versão por mês sai do log tx_changes.
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        for table in VERSIONED_TABLES:
+            por_tabela = "" if table == "transactions" else f"""
+                    INSERT INTO table_versions (name, version) VALUES ('{table}', 1)
+                    ON CONFLICT(name) DO UPDATE SET version = version + 1;"""
+            for op in ["INSERT", "UPDATE", "DELETE"]:
+                _trigger(con, f"trg_{table}_{op.lower()}_version", f"""
+                AFTER {op} ON {table}
+                BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE id = 1;{por_tabela}
+                END;
+                """)
+        if migrated_cards:  # recriada sem os triggers: invalida os caches explicitamente
+            con.execute("UPDATE data_version SET version = version + 1 WHERE id = 1;")
+
+        con.commit()
+
+
+def rebuild_journal(con=None) -> int:
+    """Recria o diário do zero a partir de transactions e transfers (criação da tabela, conferência)."""
+    def run(c):
+        c.execute("DELETE FROM journal")
+        n = c.execute(JOURNAL_INSERT + JOURNAL_TX.format(r="t", src="transactions t")).rowcount
+        for leg in (0, 1):
+            n += c.execute(JOURNAL_INSERT + JOURNAL_TR.format(r="t", src="transfers t", leg=leg)).rowcount
+        return n
+
+    if con is not None:
+        return run(con)
+    with conectar() as c:
+        n = run(c)
+        c.commit()
+    return n
+
+
+def rebuild_card_balances(con=None) -> int:
+    """Recalcula card_statement_balances do zero (criação da tabela, conferência)."""
+    def run(c):
+        c.execute("DELETE FROM card_statement_balances")
+        return c.execute("""
+            INSERT INTO card_statement_balances (card_id, statement_month, charged, paid)
+            SELECT card_id, COALESCE(statement_month, ''),
+                   SUM(CASE WHEN method = 'CARD' THEN amount ELSE 0 END),
+                   SUM(CASE WHEN method = 'CARD_PAYMENT' AND status = 'PAID' THEN amount ELSE 0 END)
+            FROM transactions
+            WHERE card_id IS NOT NULL AND method IN ('CARD', 'CARD_PAYMENT')
+            GROUP BY card_id, COALESCE(statement_month, '')
+        """).rowcount
+
+    if con is not None:
+        return run(con)
+    with conectar() as c:
+        n = run(c)
+        c.commit()
+    return n
+
+
+def rebuild_budget_spend(con=None) -> int:
+    """Recalcula budget_spend (gasto e acumulado por categoria e mês) do zero."""
+    def run(c):
+        c.execute("DELETE FROM budget_spend")
+        return c.execute(f"""
+            INSERT INTO budget_spend (category_id, month, spent, spent_cum)
+            SELECT category_id, month, spent, SUM(spent) OVER (PARTITION BY category_id ORDER BY month)
+            FROM (
+                SELECT t.category_id, substr(t.dt, 1, 7) AS month, SUM(t.amount) AS spent
+                FROM transactions t
+                WHERE {BUDGET_SPEND_WHERE.format(r="t")}
+                GROUP BY 1, 2
+            )
+        """).rowcount
+
+    if con is not None:
+        return run(con)
+    with conectar() as c:
+        n = run(c)
+        c.commit()
+    return n
+
+
+def backfill_installment_plans(con) -> int:
+    """
+    Agrupa em planos as parcelas soltas de antes de installment_plans: mesma compra = mesmo
+    cartão, data, nº de parcelas, categoria e descrição sem o sufixo "(i/n)". Compras idênticas
+    no mesmo dia viram planos separados pela ordem de id dentro de cada nº de parcela.
+    """
+    rows = con.execute("""
+        SELECT id, card_id, dt, description, category, amount, installments_total, installment_no
+        FROM transactions
+        WHERE plan_id IS NULL AND method = 'CARD' AND card_id IS NOT NULL AND installments_total > 1
+        ORDER BY id
+    """).fetchall()
+    groups, seen = {}, {}
+    for tx_id, card_id, dt_, desc, cat, amount, n, no in rows:
+        suffix = f" ({no}/{n})"
+        base = desc[:-len(suffix)] if desc and desc.endswith(suffix) else desc
+        if base == "Parcela":  # sem descrição (ver create_installments_on_card)
+            base = None
+        key = (card_id, dt_, int(n), cat, base)
+        occ = seen.get((key, no), 0)
+        seen[(key, no)] = occ + 1
+        groups.setdefault((key, occ), []).append((tx_id, amount))
+
+    for (key, _), items in groups.items():
+        card_id, dt_, n, cat, base = key
+        cur = con.execute(
+            "INSERT INTO installment_plans (card_id, dt, description, category, total_amount, n) VALUES (?,?,?,?,?,?)",
+            (card_id, dt_, base, cat, round(sum(a for _, a in items), 2), n),  # total = parcelas que restaram
+        )
+        con.executemany("UPDATE transactions SET plan_id=? WHERE id=?", [(cur.lastrowid, t) for t, _ in items])
+    return len(groups)
+
+
+def seed_if_empty():
+    with conectar() as con:
+        a = con.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+        g = con.execute("SELECT COUNT(*) FROM goals").fetchone()[0]
+        c = con.execute("SELECT COUNT(*) FROM category_rules").fetchone()[0]
+
+    if a == 0:
+        with conectar() as con:
+            con.execute("INSERT INTO accounts (name,type,initial_balance) VALUES (?,?,?)", ("Conta Principal", "BANK", 0))
+            con.execute("INSERT INTO accounts (name,type,initial_balance) VALUES (?,?,?)", ("Carteira", "CASH", 0))
+            con.commit()
+
+    # cria conta Reserva/Investimentos se não existir
+    with conectar() as con:
+        exists = con.execute(
+            "SELECT COUNT(*) FROM accounts WHERE LOWER(name)=LOWER(?)",
+            ("Reserva/Investimentos",)
+        ).fetchone()[0]
+        if exists == 0:
+            con.execute(
+                "INSERT INTO accounts (name,type,initial_balance) VALUES (?,?,?)",
+                ("Reserva/Investimentos", "BANK", 0)
+            )
+        con.commit()
+
+    if g == 0:
+        with conectar() as con:
+            con.execute("INSERT INTO goals (name, monthly_target) VALUES (?,?)", ("Economia do mês", 0))
+            con.commit()
+
+    with conectar() as con:
+        if con.execute("SELECT COUNT(*) FROM alert_rules").fetchone()[0] == 0:
+            # mesmos limites do Dashboard: cartão >= 20% da renda = atenção, >= 30% = alto
+            con.execute("INSERT INTO alert_rules (scope, target, warn_pct, high_pct) VALUES ('CARD', NULL, 20, 30)")
+            con.execute("INSERT INTO alert_rules (scope, target, warn_pct, high_pct) VALUES ('CATEGORY', NULL, 10, 15)")
+            con.commit()
+
+    if c == 0:
+        default_discretionary = ["delivery", "bar", "compras", "streamings", "jogos"]
+        with conectar() as con:
+            for cat in default_discretionary:
+                con.execute(
+                    "INSERT OR IGNORE INTO category_rules (category, class) VALUES (?,?)",
+                    (cat, "DISCRETIONARY")
+                )
+            con.commit()
+
+
+def add_transaction(dt_: date, kind: str, amount: float, category: str, description: str,
+                    status: str, method: str, account_id=None, card_id=None, statement_month=None,
+                    installments_total=None, installment_no=None, recurrence_id=None, plan_id=None) -> int:
+    """Sem categoria, usa a da primeira regra de categorização que casar com a descrição."""
+    from financas.pessoal.categorizacao import classificador_atual, ids_categorias
+
+    if not (category or "").strip():
+        regra = classificador_atual().classificar_um(description, float(amount), kind)
+        category = regra.category if regra else category
+    with conectar() as con:
+        category_id = ids_categorias(con, [category]).get(category)
+        cur = con.execute("""
+            INSERT INTO transactions
+            (dt, kind, amount, category, description, status, method, account_id, card_id, statement_month,
+             installments_total, installment_no, recurrence_id, plan_id, category_id)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """, (
+            dt_.isoformat(),
+            kind,
+            float(amount),
+            category or None,
+            description or None,
+            status,
+            method,
+            int(account_id) if account_id else None,
+            int(card_id) if card_id else None,
+            statement_month or None,
+            int(installments_total) if installments_total else None,
+            int(installment_no) if installment_no else None,
+            int(recurrence_id) if recurrence_id else None,
+            int(plan_id) if plan_id else None,
+            category_id,
+        ))
+        con.commit()
+    tx_id = int(cur.lastrowid)
+    emitir("transactions", "insert", ids=[tx_id], months=_tx_months([(dt_.isoformat(), statement_month)]))
+    return tx_id
+
+
+def add_installment_plan(card_id: int, dt_: date, description: str, category: str, total_amount: float, n: int) -> int:
+    with conectar() as con:
+        cur = con.execute(
+            "INSERT INTO installment_plans (card_id, dt, description, category, total_amount, n) VALUES (?,?,?,?,?,?)",
+            (int(card_id), dt_.isoformat(), description or None, category or None, round(float(total_amount), 2), int(n)),
+        )
+        con.commit()
+    return int(cur.lastrowid)
+
+
+def _tx_months(rows) -> list:
+    """Meses afetados: o do dt e, no cartão, o da fatura."""
+    return sorted({m for dt_, stmt in rows for m in (str(dt_)[:7], stmt) if m})
+
+
+def _tx_rows(con, tx_ids: list) -> list:
+    ids = [int(i) for i in tx_ids]
+    return [
+        r for i in range(0, len(ids), 500)
+        for r in con.execute(
+            f"SELECT dt, statement_month FROM transactions WHERE id IN ({','.join('?' * len(ids[i:i + 500]))})",
+            ids[i:i + 500]
+        ).fetchall()
+    ]
+
+
+def delete_transaction(tx_id: int):
+    delete_transactions([tx_id])
+
+
+def _write_versioned(con, sql: str, params: list, tx_ids: list, expected_versions) -> int:
+    """
+    Executa `sql` (terminando em "WHERE id=?") para cada id. Com expected_versions
+    ({id: row_version lido}), só grava se a versão ainda for a lida; se algum id
+    não bater, nada é gravado (rollback na saída do `with conectar()`).
+    """
+    if expected_versions is None:
+        return con.executemany(sql, [(*params, int(i)) for i in tx_ids]).rowcount
+    n, stale = 0, []
+    for i in tx_ids:
+        cur = con.execute(sql + " AND row_version=?", (*params, int(i), int(expected_versions[i])))
+        n += cur.rowcount
+        if cur.rowcount == 0:
+            stale.append(i)
+    if stale:
+        raise VersionConflict(stale)
+    return n
+
+
+def delete_transactions(tx_ids: list, expected_versions: dict = None) -> int:
+    with conectar() as con:
+        months = _tx_months(_tx_rows(con, tx_ids))
+        n = _write_versioned(con, "DELETE FROM transactions WHERE id=?", [], tx_ids, expected_versions)
+        con.commit()
+    emitir("transactions", "delete", ids=[int(i) for i in tx_ids], months=months)
+    return n
+
+
+def update_transactions(tx_ids: list, changes: dict, expected_versions: dict = None) -> int:
+    """
+    Muda status e/ou category (chaves de `changes`) em bloco, numa transação só; a categoria
+    leva o category_id da dimensão, resolvido na mesma transação (vazia = sem categoria).
+    Com expected_versions, falha com VersionConflict se outra sessão alterou antes.
+    """
+    from financas.pessoal.categorizacao import ids_categorias  # importa este módulo
+
+    desconhecidas = set(changes) - {"status", "category"}
+    if not changes or desconhecidas:
+        raise ValueError(f"Campos alteráveis: status, category (recebido: {sorted(changes)}).")
+    with conectar() as con:
+        months = _tx_months(_tx_rows(con, tx_ids))
+        sets, params = [], []
+        if "status" in changes:
+            sets.append("status=?")
+            params.append(changes["status"])
+        if "category" in changes:
+            category = " ".join((changes["category"] or "").split()) or None
+            sets += ["category=?", "category_id=?"]
+            params += [category, ids_categorias(con, [category]).get(category) if category else None]
+        n = _write_versioned(
+            con, f"UPDATE transactions SET {', '.join(sets)}, row_version=row_version+1 WHERE id=?", params, tx_ids,
+            expected_versions,
+        )
+        con.commit()
+    emitir("transactions", "update", ids=[int(i) for i in tx_ids], months=months)
+    return n
+
+
+def set_transactions_status(tx_ids: list, status: str, expected_versions: dict = None) -> int:
+    """Muda o status em bloco; com expected_versions, falha com VersionConflict se outra sessão alterou antes."""
+    return update_transactions(tx_ids, {"status": status}, expected_versions)
+
+
+def set_transactions_category(tx_ids: list, category: str, expected_versions: dict = None) -> int:
+    """
+    Muda a categoria em bloco com o category_id da dimensão resolvido na mesma transação
+    (gasto dos envelopes, alertas e anomalias já saem na categoria nova). Vazia = sem categoria.
+    """
+    return update_transactions(tx_ids, {"category": category}, expected_versions)
+
+
+def antecipar_plano(plan_id: int, payoff_month: str, taxa_mes: float = 0.0) -> dict:
+    """
+    Antecipa as parcelas do plano com fatura depois de `payoff_month`: todas passam para essa
+    fatura, cada uma trazida a valor presente (taxa_mes % ao mês pelos meses antecipados).
+    """
+    py, pm = map(int, payoff_month.split("-"))
+    with conectar() as con:
+        rows = con.execute(
+            "SELECT id, amount, statement_month, dt FROM transactions "
+            "WHERE plan_id=? AND method='CARD' AND statement_month > ? ORDER BY installment_no",
+            (int(plan_id), payoff_month),
+        ).fetchall()
+        updates = []
+        for tx_id, amount, stmt, _ in rows:
+            y, m = map(int, stmt.split("-"))
+            k = (y - py) * 12 + (m - pm)
+            updates.append((round(float(amount) / (1 + float(taxa_mes) / 100) ** k, 2), payoff_month, tx_id))
+        con.executemany(
+            "UPDATE transactions SET amount=?, statement_month=?, row_version=row_version+1 WHERE id=?", updates
+        )
+        con.commit()
+    nominal = round(sum(float(r[1]) for r in rows), 2)
+    paid = round(sum(u[0] for u in updates), 2)
+    if rows:
+        emitir("transactions", "update", ids=[r[0] for r in rows],
+               months=_tx_months([(r[3], r[2]) for r in rows] + [(payoff_month, payoff_month)]))
+    return {"plan_id": int(plan_id), "parcelas": len(rows), "nominal": nominal, "valor": paid,
+            "economia": round(nominal - paid, 2)}
+
+
+def last_change_seq() -> int:
+    """Último seq do log de mudanças dos lançamentos (0 se vazio)."""
+    with conectar() as con:
+        return int(con.execute("SELECT COALESCE(MAX(seq), 0) FROM tx_changes").fetchone()[0])
+
+
+def prune_tx_changes(upto_seq: int) -> int:
+    """
+    Apaga do log as mudanças com seq <= `upto_seq`, menos a última (MAX(seq) continua sendo o
+    último seq). Quem guardou um seq anterior ao que sobrou relê tudo (ver carregar_transactions).
+    """
+    with conectar() as con:
+        n = con.execute(
+            "DELETE FROM tx_changes WHERE seq <= ? AND seq < (SELECT MAX(seq) FROM tx_changes)", (int(upto_seq),)
+        ).rowcount
+        con.commit()
+    return n
+
+
+def changes_since(seq: int, limit: int = None) -> list:
+    """Mudanças em lançamentos depois de `seq`, em ordem: [{seq, tx_id, op, row_version, dt, ...}]."""
+    sql = "SELECT * FROM tx_changes WHERE seq > ? ORDER BY seq"
+    params = [int(seq)]
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    with conectar() as con:
+        cur = con.execute(sql, params)
+        cols = [c[0] for c in cur.description]
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+
+def add_transfer(dt_: date, amount: float, from_account_id: int, to_account_id: int, description: str, status: str):
+    with conectar() as con:
+        con.execute("""
+            INSERT INTO transfers (dt, amount, from_account_id, to_account_id, description, status)
+            VALUES (?,?,?,?,?,?)
+        """, (dt_.isoformat(), float(amount), int(from_account_id), int(to_account_id), description or None, status))
+        con.commit()
+    emitir("transfers", "insert", months=[dt_.strftime("%Y-%m")])
+
+
+def delete_transfer(transfer_id: int):
+    with conectar() as con:
+        con.execute("DELETE FROM transfers WHERE id=?", (int(transfer_id),))
+        con.commit()
+    emitir("transfers", "delete", ids=[int(transfer_id)])
+
+
+def _limit(credit_limit):
+    return float(credit_limit) if credit_limit not in (None, "") and float(credit_limit) > 0 else None
+
+
+def atualizar_cartao(card_id: int, name: str, closing_day: int, due_day: int, pay_account_id: int, last4: str,
+                     closing_adjust: str = "NONE", due_adjust: str = "NONE", credit_limit: float = None):
+    with conectar() as con:
+        con.execute("""
+            UPDATE cards
+            SET name=?, closing_day=?, due_day=?, pay_account_id=?, last4=?, closing_adjust=?, due_adjust=?,
+                credit_limit=?
+            WHERE id=?
+        """, (name.strip(), int(closing_day), int(due_day), int(pay_account_id), (last4 or "").strip(),
+              closing_adjust, due_adjust, _limit(credit_limit), int(card_id)))
+        con.commit()
+    emitir("cards", "update", ids=[int(card_id)])
+
+
+def add_card(name: str, closing_day: int, due_day: int, pay_account_id: int, last4: str,
+             closing_adjust: str = "NONE", due_adjust: str = "NONE", credit_limit: float = None) -> int:
+    """credit_limit None/0 = sem limite cadastrado."""
+    with conectar() as con:
+        cur = con.execute("""
+            INSERT INTO cards (name, closing_day, due_day, pay_account_id, last4, closing_adjust, due_adjust, credit_limit)
+            VALUES (?,?,?,?,?,?,?,?)
+        """, (name.strip(), int(closing_day), int(due_day), int(pay_account_id), (last4 or "").strip(),
+              closing_adjust, due_adjust, _limit(credit_limit)))
+        con.commit()
+    emitir("cards", "insert", ids=[int(cur.lastrowid)])
+    return int(cur.lastrowid)
+
+
+def salvar_feriado(dt_: date, name: str = None):
+    with conectar() as con:
+        con.execute("INSERT OR REPLACE INTO holidays (dt, name) VALUES (?,?)", (dt_.isoformat(), (name or "").strip() or None))
+        con.commit()
+
+
+def remover_feriado(dt_: date):
+    with conectar() as con:
+        con.execute("DELETE FROM holidays WHERE dt=?", (dt_.isoformat(),))
+        con.commit()
+
+
+def salvar_long_goal(name: str, target_amount: float, start_date: date, end_date: date, start_amount: float):
+    """Cria uma meta por prazo ativa; as outras metas continuam ativas (várias em paralelo)."""
+    with conectar() as con:
+        con.execute("""
+            INSERT INTO long_goals (name, target_amount, start_date, end_date, start_amount, active)
+            VALUES (?,?,?,?,?,1)
+        """, (name.strip(), float(target_amount), start_date.isoformat(), end_date.isoformat(), float(start_amount)))
+        con.commit()
+
+
+def desativar_long_goal(goal_id: int):
+    with conectar() as con:
+        con.execute("UPDATE long_goals SET active=0 WHERE id=?", (int(goal_id),))
+        con.commit()
+
+
+def add_goal(name: str, monthly_target: float):
+    with conectar() as con:
+        con.execute("INSERT INTO goals (name, monthly_target) VALUES (?,?)", (name.strip(), float(monthly_target)))
+        con.commit()
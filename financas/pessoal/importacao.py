@@ -0,0 +1,60 @@
+"""Importação em lote de lançamentos (CSV no mesmo formato do "Lançamentos (CSV)" exportado)."""
+import pandas as pd
+
+from financas.pessoal.categorizacao import categorizar
+
+TX_COLUMNS = [
+    "dt", "kind", "amount", "category", "description", "status", "method", "account_id", "card_id",
+    "statement_month", "installments_total", "installment_no", "recurrence_id",
+]
+REQUIRED = ["dt", "kind", "amount", "method"]
+
+
+def read_transactions_csv(path: str) -> pd.DataFrame:
+    """Lê e normaliza o CSV; linhas com data/valor inválidos são descartadas."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"CSV sem as colunas obrigatórias: {', '.join(missing)}")
+
+    for c in TX_COLUMNS:
+        if c not in df.columns:
+            df[c] = ""
+    df = df[TX_COLUMNS].copy()
+
+    df["dt"] = pd.to_datetime(df["dt"], errors="coerce").dt.strftime("%Y-%m-%d")
+    df["amount"] = pd.to_numeric(df["amount"].str.replace(",", ".", regex=False), errors="coerce")
+    df["kind"] = df["kind"].str.strip().str.upper()
+    df["method"] = df["method"].str.strip().str.upper()
+    df["status"] = df["status"].str.strip().str.upper().replace("", "PAID")
+
+    ok = (
+        df["dt"].notna() & df["amount"].notna()
+        & df["kind"].isin(["INCOME", "EXPENSE"])
+        & df["method"].isin(["BANK", "CASH", "CARD", "CARD_PAYMENT"])
+        & df["status"].isin(["PAID", "PENDING"])
+    )
+    df = df[ok].reset_index(drop=True)
+
+    for c in ["account_id", "card_id", "installments_total", "installment_no", "recurrence_id"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
+    for c in ["category", "description", "statement_month"]:
+        df[c] = df[c].str.strip().replace("", None)
+    return df
+
+
+def insert_transactions(con, df: pd.DataFrame) -> int:
+    """
+    INSERT em lote na conexão recebida (quem chama decide o commit). Sem a coluna
+    category_id, o lote passa antes por categorizar (regras + dimensão de categorias).
+    """
+    if "category_id" not in df.columns:
+        df = categorizar(df, con)
+    cols = TX_COLUMNS + ["category_id"]
+    df = df[cols]
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    cur = con.executemany(
+        f"INSERT INTO transactions ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+        rows
+    )
+    return cur.rowcount
@@ -0,0 +1,265 @@
+"""
+Tarefas em segundo plano com estado persistido na tabela `jobs`.
+
+- submit_job grava a tarefa (QUEUED) e agenda no pool de threads;
+  uma tarefa ativa com o mesmo dedupe_key é reaproveitada.
+- O handler recebe um JobContext: reporta progresso, salva checkpoint
+  e consulta cancelamento entre um passo e outro.
+- resume_pending_jobs reagenda o que ficou QUEUED/RUNNING (ex: processo
+  reiniciado); cada handler retoma do checkpoint, então rodar de novo não
+  duplica o que já foi feito.
+
+Cada tarefa roda no tenant de quem a submeteu (o banco do usuário).
+A UI só submete e consulta (list_jobs); nada aqui depende de Streamlit.
+"""
+import json
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from financas.eventos import emitir
+from financas.pessoal.db import backfill_installment_plans, conectar, data_version
+from financas.tenants import set_tenant, tenant_atual
+
+MAX_WORKERS = 2
+ACTIVE = ("QUEUED", "RUNNING")
+
+HANDLERS = {}
+
+_pool = None
+_pool_lock = threading.Lock()
+_scheduled = set()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="financas-job")
+        return _pool
+
+
+def job_handler(kind: str):
+    """Registra a função que executa tarefas do tipo `kind`."""
+    def deco(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return deco
+
+
+class JobContext:
+    def __init__(self, job_id: int, params: dict, checkpoint):
+        self.job_id = job_id
+        self.params = params
+        self.checkpoint = checkpoint
+
+    def progress(self, fraction: float, message: str = None):
+        with conectar() as con:
+            con.execute("UPDATE jobs SET progress=?, message=COALESCE(?, message) WHERE id=?",
+                        (max(0.0, min(1.0, float(fraction))), message, self.job_id))
+            con.commit()
+
+    def save_checkpoint(self, state, con=None):
+        """Grava o checkpoint; passando `con`, entra na mesma transação do passo (exatamente uma vez)."""
+        self.checkpoint = state
+        sql = "UPDATE jobs SET checkpoint=? WHERE id=?"
+        args = (json.dumps(state), self.job_id)
+        if con is not None:
+            con.execute(sql, args)
+            return
+        with conectar() as c:
+            c.execute(sql, args)
+            c.commit()
+
+    def cancelled(self) -> bool:
+        with conectar() as con:
+            return bool(con.execute("SELECT cancel_requested FROM jobs WHERE id=?", (self.job_id,)).fetchone()[0])
+
+    def check_cancel(self):
+        if self.cancelled():
+            raise JobCancelled()
+
+
+def submit_job(kind: str, params: dict = None, dedupe_key: str = None) -> int:
+    if kind not in HANDLERS:
+        raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+
+    with conectar() as con:
+        if dedupe_key:
+            row = con.execute(
+                "SELECT id FROM jobs WHERE dedupe_key=? AND status IN ('QUEUED','RUNNING') ORDER BY id DESC LIMIT 1",
+                (dedupe_key,)
+            ).fetchone()
+            if row:
+                _schedule(int(row[0]))
+                return int(row[0])
+        cur = con.execute(
+            "INSERT INTO jobs (kind, params, dedupe_key, status, created_at) VALUES (?,?,?,'QUEUED',?)",
+            (kind, json.dumps(params or {}), dedupe_key, _now())
+        )
+        con.commit()
+        job_id = int(cur.lastrowid)
+
+    _schedule(job_id)
+    return job_id
+
+
+def cancel_job(job_id: int):
+    """Pede o cancelamento; QUEUED cancela na hora, RUNNING para no próximo passo."""
+    with conectar() as con:
+        con.execute("UPDATE jobs SET cancel_requested=1 WHERE id=? AND status IN ('QUEUED','RUNNING')", (int(job_id),))
+        con.execute("""
+            UPDATE jobs SET status='CANCELLED', finished_at=?
+            WHERE id=? AND status='QUEUED'
+        """, (_now(), int(job_id)))
+        con.commit()
+
+
+def resume_pending_jobs() -> int:
+    """Reagenda tarefas QUEUED/RUNNING que não estão no pool deste processo."""
+    with conectar() as con:
+        ids = [int(r[0]) for r in con.execute("SELECT id FROM jobs WHERE status IN ('QUEUED','RUNNING') ORDER BY id")]
+    for job_id in ids:
+        _schedule(job_id)
+    return len(ids)
+
+
+def list_jobs(limit: int = 20) -> list:
+    with conectar() as con:
+        con.row_factory = _dict_row
+        return con.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+
+
+def _dict_row(cursor, row):
+    return {d[0]: v for d, v in zip(cursor.description, row)}
+
+
+def _schedule(job_id: int):
+    key = (tenant_atual(), job_id)
+    with _pool_lock:
+        if key in _scheduled:
+            return
+        _scheduled.add(key)
+    _get_pool().submit(_run, job_id, key[0])
+
+
+def _finish(job_id: int, status: str, message: str = None, result=None):
+    with conectar() as con:
+        con.execute("""
+            UPDATE jobs SET status=?, message=COALESCE(?, message), result=?, finished_at=?,
+                            progress=CASE WHEN ?='DONE' THEN 1 ELSE progress END
+            WHERE id=?
+        """, (status, message, json.dumps(result) if result is not None else None, _now(), status, job_id))
+        con.commit()
+
+
+def _run(job_id: int, tenant):
+    set_tenant(tenant)
+    try:
+        with conectar() as con:
+            row = con.execute("""
+                SELECT kind, params, checkpoint, status, cancel_requested FROM jobs WHERE id=?
+            """, (job_id,)).fetchone()
+            if row is None or row[3] not in ACTIVE:
+                return
+            if row[4]:
+                con.execute("UPDATE jobs SET status='CANCELLED', finished_at=? WHERE id=?", (_now(), job_id))
+                con.commit()
+                return
+            con.execute("UPDATE jobs SET status='RUNNING', started_at=COALESCE(started_at, ?) WHERE id=?",
+                        (_now(), job_id))
+            con.commit()
+
+        kind, params, checkpoint = row[0], json.loads(row[1] or "{}"), json.loads(row[2]) if row[2] else None
+        ctx = JobContext(job_id, params, checkpoint)
+        try:
+            result = HANDLERS[kind](ctx)
+        except JobCancelled:
+            _finish(job_id, "CANCELLED", "Cancelada.")
+        except Exception as e:
+            _finish(job_id, "FAILED", f"{type(e).__name__}: {e}", {"traceback": traceback.format_exc()})
+        else:
+            _finish(job_id, "DONE", None, result)
+    finally:
+        with _pool_lock:
+            _scheduled.discard((tenant, job_id))
+
+
+# =========================
+# Handlers
+# =========================
+@job_handler("recurrences")
+def _job_recurrences(ctx: JobContext):
+    """params: {"months": ["YYYY-MM", ...]}; checkpoint: quantos meses já foram gerados."""
+    from financas.pessoal.recorrencias import run_recurrences_for_month
+
+    months = list(ctx.params["months"])
+    done = int((ctx.checkpoint or {}).get("done", 0))
+    created = int((ctx.checkpoint or {}).get("created", 0))
+
+    for i in range(done, len(months)):
+        ctx.check_cancel()
+        ctx.progress(i / len(months), f"Gerando {months[i]}…")
+        # run_recurrences_for_month pula recorrências já lançadas no mês: repetir é seguro
+        created += run_recurrences_for_month(months[i])
+        ctx.save_checkpoint({"done": i + 1, "created": created})
+
+    return {"created": created, "months": months}
+
+
+@job_handler("import_csv")
+def _job_import_csv(ctx: JobContext):
+    """params: {"path": arquivo CSV, "chunk": linhas por passo}; checkpoint: linhas já inseridas."""
+    from financas.pessoal.cartoes import fill_statement_months
+    from financas.pessoal.categorizacao import categorizar
+    from financas.pessoal.importacao import insert_transactions, read_transactions_csv
+
+    # o arquivo inteiro categorizado numa passada; os passos só inserem
+    df = categorizar(fill_statement_months(read_transactions_csv(ctx.params["path"])))
+    chunk = int(ctx.params.get("chunk", 5000))
+    done = int((ctx.checkpoint or {}).get("rows", 0))
+    total = len(df)
+
+    while done < total:
+        ctx.check_cancel()
+        part = df.iloc[done:done + chunk]
+        with conectar() as con:
+            insert_transactions(con, part)
+            ctx.save_checkpoint({"rows": done + len(part)}, con=con)
+            con.commit()
+        emitir("transactions", "insert", months=sorted(set(part["dt"].str[:7]) | set(part["statement_month"].dropna())))
+        done += len(part)
+        ctx.progress(done / total, f"{done:,} de {total:,} linhas")
+
+    # parcelas importadas (installments_total > 1) viram planos de parcelamento
+    with conectar() as con:
+        plans = backfill_installment_plans(con)
+        con.commit()
+    return {"rows": total, "plans": plans}
+
+
+@job_handler("rebuild_balances")
+def _job_rebuild_balances(ctx: JobContext):
+    """Recria os checkpoints de saldo (balance_checkpoints) do zero."""
+    from financas.pessoal.loaders import carregar_accounts, carregar_journal
+    from financas.pessoal.saldos import rebuild_balance_checkpoints
+
+    ctx.progress(0.1, "Carregando diário…")
+    version = data_version()
+    accounts, jr = carregar_accounts(), carregar_journal()
+    ctx.check_cancel()
+
+    ctx.progress(0.5, "Calculando saldos…")
+    n = rebuild_balance_checkpoints(accounts, jr, version=version)
+    if n == 0 and data_version() != version:
+        raise RuntimeError("Lançamentos alterados durante a reconstrução; rode de novo.")
+    return {"checkpoints": n}
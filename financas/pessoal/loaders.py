@@ -0,0 +1,260 @@
+"""
+Loaders: tabelas do finance_pessoal.db como DataFrames.
+
+Os resultados ficam no cache do tenant atual, válidos enquanto
+data_version não muda; cada chamada devolve uma cópia rasa, então
+colunas novas no chamador não contaminam o cache.
+
+carregar_transactions é incremental: quando a versão muda, relê só os
+lançamentos que aparecem no log de mudanças (tx_changes) depois do seq
+guardado com o DataFrame. O log é podado até TX_LOG_RETER mudanças antes
+desse seq; quem guardou um seq já podado (outro processo) relê a tabela.
+"""
+import pandas as pd
+
+from financas import eventos
+from financas import instrumentacao as instr
+from financas.datas import to_dt
+from financas.pessoal.categorizacao import backfill_category_ids
+from financas.pessoal.db import conectar, data_version, db_atual, prune_tx_changes
+from financas.tenants import CACHE, cached_loader
+
+_cached = cached_loader(db_atual, data_version)
+
+
+def memo(nome, compute):
+    """Derivados (agregados, saldos, metas) no cache do tenant, pela mesma data_version dos loaders."""
+    version = data_version()
+    if version is None:
+        return compute()
+    return CACHE.get_or_compute((db_atual(), nome), version, compute)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_accounts():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM accounts ORDER BY id", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_cards():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM cards ORDER BY id", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_goals():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM goals ORDER BY id", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_recurrences():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM recurrences ORDER BY id DESC", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_long_goal():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM long_goals WHERE active=1 ORDER BY id DESC LIMIT 1", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_long_goals():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM long_goals WHERE active=1 ORDER BY end_date, id", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_holidays():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT dt, name FROM holidays ORDER BY dt", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_installment_plans():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT * FROM installment_plans ORDER BY id", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_categorias():
+    """Dimensão de categorias: id, key (chave normalizada), name."""
+    with conectar() as con:
+        return pd.read_sql_query("SELECT id, key, name FROM categories ORDER BY key", con)
+
+
+@instr.medido("loader")
+@_cached
+def carregar_category_rules():
+    with conectar() as con:
+        return pd.read_sql_query("SELECT category, class FROM category_rules ORDER BY category", con)
+
+
+# Acima disso é mais barato reler a tabela do que aplicar o delta
+TX_DELTA_MAX = 2000
+# Mudanças mantidas no log antes do seq em cache; a poda roda quando passam do dobro
+TX_LOG_RETER = 10000
+
+
+@instr.medido("loader")
+def carregar_transactions():
+    version = data_version()
+    if version is None:
+        with conectar() as con:
+            return _normalize_tx(pd.read_sql_query("SELECT * FROM transactions ORDER BY dt DESC, id DESC", con))
+
+    key = (db_atual(), "carregar_transactions")
+    hit = CACHE.peek(key)
+    if hit is not None and hit[0] == version:
+        return hit[1][1].copy(deep=False)
+    if _resolver_categorias():
+        version = data_version()
+
+    with conectar() as con:
+        # seq lido antes dos dados: uma escrita concorrente no meio é reaplicada na próxima vez
+        seq, primeiro = con.execute("SELECT COALESCE(MAX(seq), 0), MIN(seq) FROM tx_changes").fetchone()
+        seq, ids = int(seq), []
+        if hit is not None and primeiro is not None and primeiro > hit[1][0] + 1:
+            hit = None  # o log foi podado depois do seq guardado: o delta está incompleto
+        if hit is not None:
+            base_seq, base = hit[1]
+            ids = [r[0] for r in con.execute(
+                "SELECT DISTINCT tx_id FROM tx_changes WHERE seq > ? AND seq <= ? LIMIT ?",
+                (base_seq, seq, TX_DELTA_MAX + 1),
+            )]
+        if hit is None or len(ids) > TX_DELTA_MAX:
+            df = _normalize_tx(pd.read_sql_query("SELECT * FROM transactions ORDER BY dt DESC, id DESC", con))
+        elif not ids:
+            df = base
+        else:
+            changed = pd.concat([
+                pd.read_sql_query(
+                    f"SELECT * FROM transactions WHERE id IN ({','.join('?' * len(ids[i:i + 500]))})",
+                    con, params=ids[i:i + 500],
+                )
+                for i in range(0, len(ids), 500)
+            ], ignore_index=True)
+            changed = _normalize_tx(changed)
+            for c in changed.columns:  # poucas linhas inferem outro tipo (ex.: só NULL vira object)
+                # base lida sem linhas não tem tipo a impor (amount de uma tabela vazia vem int64)
+                if len(base) and c in base.columns and changed[c].dtype != base[c].dtype:
+                    try:
+                        changed[c] = changed[c].astype(base[c].dtype)
+                    except (TypeError, ValueError):  # ex.: NULL numa coluna int; o concat sobe para float
+                        pass
+            parts = [p for p in (base[~base["id"].isin(ids)], changed) if len(p)]
+            df = pd.concat(parts, ignore_index=True) if parts else base.iloc[0:0]
+            df = df.sort_values(["dt", "id"], ascending=False, kind="mergesort").reset_index(drop=True)
+
+    CACHE.put(key, version, (seq, df))
+    return df.copy(deep=False)
+
+
+def _resolver_categorias() -> int:
+    """
+    A cada data_version nova: categoria alterada por fora do motor (category_id limpo pelo trigger)
+    ganha o id antes da leitura. A conferência é um seek no índice parcial; só grava se houver o que resolver.
+    """
+    with conectar() as con:
+        if con.execute(
+            "SELECT 1 FROM transactions WHERE category_id IS NULL AND trim(category) <> '' LIMIT 1"
+        ).fetchone() is None:
+            return 0
+        n = backfill_category_ids(con)
+        con.commit()
+    return n
+
+
+def _seq_por_mes() -> dict:
+    """{mês: último seq do log que tocou o mês} (dt ou fatura, de antes e depois da escrita), por data_version."""
+    def compute():
+        with conectar() as con:
+            return dict(con.execute("""
+                SELECT m, MAX(seq) FROM (
+                    SELECT seq, substr(dt, 1, 7) AS m FROM tx_changes
+                    UNION ALL SELECT seq, statement_month FROM tx_changes
+                    UNION ALL SELECT seq, substr(old_dt, 1, 7) FROM tx_changes
+                    UNION ALL SELECT seq, old_statement_month FROM tx_changes
+                )
+                WHERE m IS NOT NULL AND m <> ''
+                GROUP BY m
+            """))
+    return memo("seq_por_mes", compute)
+
+
+def _versoes_tabelas() -> dict:
+    def compute():
+        with conectar() as con:
+            return dict(con.execute("SELECT name, version FROM table_versions"))
+    return memo("versoes_tabelas", compute)
+
+
+def chave_meses(months, tabelas=()) -> str:
+    """
+    Chave de estado de um resultado que depende dos lançamentos de `months` e das `tabelas`:
+    só muda com escrita num desses meses ou tabelas (a data_version muda com qualquer escrita).
+    """
+    seqs, versoes = _seq_por_mes(), _versoes_tabelas()
+    return ";".join([str(max((seqs.get(m, 0) for m in months), default=0))]
+                    + [f"{t}={versoes.get(t, 0)}" for t in tabelas])
+
+
+@eventos.assinar
+def _on_write(evs: list):
+    """Poda o log de mudanças quando passa de 2 x TX_LOG_RETER antes do seq em cache."""
+    if not any(e["tabela"] == "transactions" for e in evs):
+        return
+    hit = CACHE.peek((db_atual(), "carregar_transactions"))
+    if hit is None:
+        return
+    with conectar() as con:
+        primeiro = con.execute("SELECT MIN(seq) FROM tx_changes").fetchone()[0]
+    if primeiro is not None and primeiro <= hit[1][0] - 2 * TX_LOG_RETER:
+        prune_tx_changes(hit[1][0] - TX_LOG_RETER)
+
+
+def _normalize_tx(df: pd.DataFrame) -> pd.DataFrame:
+    df["dt"] = to_dt(df["dt"])
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
+    for c in ["category", "description", "statement_month"]:
+        df[c] = df[c].fillna("")
+    if "category_id" in df.columns:  # 0 = sem categoria
+        df["category_id"] = pd.to_numeric(df["category_id"], errors="coerce").fillna(0).astype("int64")
+    for c in ["installments_total", "installment_no", "recurrence_id", "plan_id"]:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+@instr.medido("loader")
+@_cached
+def carregar_journal():
+    """Diário (um movimento assinado por conta): account_id, dt, amount, status, entry, source, source_id."""
+    with conectar() as con:
+        df = pd.read_sql_query(
+            "SELECT account_id, dt, amount, status, entry, source, source_id FROM journal ORDER BY account_id, dt", con
+        )
+    df["dt"] = to_dt(df["dt"])
+    return df
+
+
+@instr.medido("loader")
+@_cached
+def carregar_transfers():
+    with conectar() as con:
+        df = pd.read_sql_query("SELECT * FROM transfers ORDER BY dt DESC, id DESC", con)
+    df["dt"] = to_dt(df["dt"])
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
+    df["description"] = df["description"].fillna("")
+    return df
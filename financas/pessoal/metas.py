@@ -0,0 +1,184 @@
+"""
+Metas (mensais e por prazo), economia do mês e regras de categoria.
+
+calc_long_goal_plan / current_month_savings filtram o histórico inteiro a
+cada chamada. O motor de metas parte do agregado diário (o mesmo do
+Dashboard) e monta um razão de economia: economia por dia e acumulado.
+A economia de qualquer janela sai de duas buscas binárias no acumulado,
+então avaliar todas as metas custa O(metas × log dias), e o razão só é
+refeito quando data_version muda.
+"""
+import numpy as np
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.datas import month_range, months_between
+from financas.pessoal.categorizacao import chave_categoria
+from financas.pessoal.loaders import carregar_goals, carregar_long_goals, memo
+
+
+@instr.medido("calc")
+def calc_long_goal_plan(goal_row: dict, tx: pd.DataFrame) -> dict:
+    start_date = pd.to_datetime(goal_row["start_date"]).date()
+    end_date = pd.to_datetime(goal_row["end_date"]).date()
+    target_amount = float(goal_row["target_amount"])
+    start_amount = float(goal_row["start_amount"])
+
+    total_months = max(1, months_between(start_date, end_date))
+
+    start_ts = pd.Timestamp(start_date)
+    end_ts = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    period = tx[(tx["dt"] >= start_ts) & (tx["dt"] < end_ts) & (tx["status"] == "PAID")].copy()
+
+    income = float(period[period["kind"] == "INCOME"]["amount"].sum())
+    out_bank_cash = float(period[(period["kind"] == "EXPENSE") & (period["method"].isin(["BANK", "CASH"]))]["amount"].sum())
+    card_pay = float(period[(period["method"] == "CARD_PAYMENT")]["amount"].sum())
+    saved_so_far = income - out_bank_cash - card_pay
+
+    current_amount = start_amount + saved_so_far
+    remaining = max(0.0, target_amount - current_amount)
+    need_per_month = remaining / total_months if total_months else remaining
+    progress = 0.0 if target_amount <= 0 else min(1.0, max(0.0, current_amount / target_amount))
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_months": total_months,
+        "target_amount": target_amount,
+        "start_amount": start_amount,
+        "saved_so_far": saved_so_far,
+        "current_amount": current_amount,
+        "remaining": remaining,
+        "need_per_month": need_per_month,
+        "progress": progress
+    }
+
+
+@instr.medido("calc")
+def current_month_savings(tx: pd.DataFrame, ym: str) -> float:
+    start, end = month_range(ym)
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end) + pd.Timedelta(days=1)
+
+    month_paid = tx[(tx["dt"] >= start_ts) & (tx["dt"] < end_ts) & (tx["status"] == "PAID")].copy()
+    income = float(month_paid[month_paid["kind"] == "INCOME"]["amount"].sum())
+    out_bank_cash = float(month_paid[(month_paid["kind"] == "EXPENSE") & (month_paid["method"].isin(["BANK", "CASH"]))]["amount"].sum())
+    card_pay = float(month_paid[(month_paid["method"] == "CARD_PAYMENT")]["amount"].sum())
+    return income - out_bank_cash - card_pay
+
+
+def is_discretionary(category: str, rules_df: pd.DataFrame) -> bool:
+    cat = chave_categoria(category)
+    if not cat or rules_df.empty:
+        return False
+    hit = rules_df[rules_df["category"].map(chave_categoria) == cat]
+    if hit.empty:
+        return False
+    return hit.iloc[0]["class"] == "DISCRETIONARY"
+
+
+# =========================
+# Motor de metas (razão de economia)
+# =========================
+@instr.medido("calc")
+def savings_ledger(agg: pd.DataFrame) -> pd.DataFrame:
+    """
+    Economia por dia a partir de agregar_transactions (eixo caixa, PAID), na
+    mesma regra de current_month_savings: entradas - saídas em conta/dinheiro
+    - pagamentos de fatura. Colunas: savings e cum (acumulado), índice = dia.
+    """
+    a = agg[(agg["eixo"] == "caixa") & (agg["status"] == "PAID")]
+    sinal = (
+        (a["kind"] == "INCOME").astype(float)
+        - ((a["kind"] == "EXPENSE") & a["method"].isin(["BANK", "CASH"])).astype(float)
+        - (a["method"] == "CARD_PAYMENT").astype(float)
+    )
+    daily = (a["total"] * sinal).groupby(pd.to_datetime(a["dia"])).sum().sort_index()
+    return pd.DataFrame({"savings": daily, "cum": daily.cumsum()})
+
+
+def ledger_atual() -> pd.DataFrame:
+    from financas.pessoal.relatorios import agregado_atual
+
+    return memo("savings_ledger", lambda: savings_ledger(agregado_atual()))
+
+
+def saved_between(ledger: pd.DataFrame, start, end) -> float:
+    """Economia de start a end (inclusive) pelo acumulado: O(log dias)."""
+    if ledger.empty:
+        return 0.0
+    idx = ledger.index.values
+    cum = ledger["cum"].to_numpy()
+    hi = np.searchsorted(idx, np.datetime64(pd.Timestamp(end).normalize()), side="right")
+    lo = np.searchsorted(idx, np.datetime64(pd.Timestamp(start).normalize()), side="left")
+    return float((cum[hi - 1] if hi else 0.0) - (cum[lo - 1] if lo else 0.0))
+
+
+def month_savings(ledger: pd.DataFrame, ym: str) -> float:
+    start, end = month_range(ym)
+    return saved_between(ledger, start, end)
+
+
+def plan_from_ledger(goal_row: dict, ledger: pd.DataFrame) -> dict:
+    """Mesmo resultado de calc_long_goal_plan, sem tocar nas transações."""
+    start_date = pd.to_datetime(goal_row["start_date"]).date()
+    end_date = pd.to_datetime(goal_row["end_date"]).date()
+    target_amount = float(goal_row["target_amount"])
+    start_amount = float(goal_row["start_amount"])
+    total_months = max(1, months_between(start_date, end_date))
+
+    saved_so_far = saved_between(ledger, start_date, end_date)
+    current_amount = start_amount + saved_so_far
+    remaining = max(0.0, target_amount - current_amount)
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_months": total_months,
+        "target_amount": target_amount,
+        "start_amount": start_amount,
+        "saved_so_far": saved_so_far,
+        "current_amount": current_amount,
+        "remaining": remaining,
+        "need_per_month": remaining / total_months,
+        "progress": 0.0 if target_amount <= 0 else min(1.0, max(0.0, current_amount / target_amount)),
+    }
+
+
+@instr.medido("calc")
+def avaliar_metas(long_goals: pd.DataFrame = None, ledger: pd.DataFrame = None) -> list:
+    """Plano de cada meta por prazo ativa: [{"id", "name", **plano}]."""
+    long_goals = carregar_long_goals() if long_goals is None else long_goals
+    ledger = ledger_atual() if ledger is None else ledger
+    return [
+        {"id": int(g["id"]), "name": g["name"], **plan_from_ledger(g, ledger)}
+        for g in long_goals.to_dict("records")
+    ]
+
+
+@instr.medido("calc")
+def monthly_goals_history(months: list, goals: pd.DataFrame = None, ledger: pd.DataFrame = None) -> pd.DataFrame:
+    """Economia x meta mensal para cada (meta, mês): O(metas × meses)."""
+    goals = carregar_goals() if goals is None else goals
+    ledger = ledger_atual() if ledger is None else ledger
+    saved = {ym: month_savings(ledger, ym) for ym in months}
+    rows = [
+        {"goal_id": int(g["id"]), "name": g["name"], "month": ym, "target": float(g["monthly_target"]),
+         "saved": saved[ym], "hit": saved[ym] >= float(g["monthly_target"])}
+        for g in goals.to_dict("records") for ym in months
+    ]
+    return pd.DataFrame(rows, columns=["goal_id", "name", "month", "target", "saved", "hit"])
+
+
+def goal_alerts(ym: str) -> list:
+    """
+    Metas por prazo abaixo do ritmo no mês `ym` (economia do mês < necessário/mês).
+    Calculado uma vez por (mês, data_version): no formulário é só uma consulta ao cache.
+    """
+    def compute():
+        current = month_savings(ledger_atual(), ym)
+        return [
+            {**p, "month_savings": current, "gap": p["need_per_month"] - current}
+            for p in avaliar_metas()
+            if p["need_per_month"] > 0 and current < p["need_per_month"]
+        ]
+    return memo(("goal_alerts", ym), compute)
@@ -0,0 +1,107 @@
+"""
+Envelopes: orçamento mensal por categoria, com ou sem rollover.
+
+- Envelopes em `budgets` (chave normalizada da categoria, valor mensal,
+  rollover, mês de início). Um por categoria; remover só desativa.
+- O gasto vem de `budget_spend`, mantido por trigger a cada escrita em
+  transactions (gasto do mês e acumulado da categoria até o mês), por
+  category_id. Nada aqui lê os lançamentos: o saldo de um envelope são no
+  máximo três buscas pela chave (category_id, mês), com ou sem rollover.
+- Com rollover, sobra e estouro passam para o mês seguinte: disponível =
+  valor mensal x meses desde o início - gasto no período.
+"""
+from datetime import date
+
+import pandas as pd
+
+from financas.datas import mes
+from financas.pessoal.categorizacao import chave_categoria
+from financas.pessoal.db import conectar
+
+COLUNAS = ["category", "monthly_amount", "rollover", "start_month", "carryover", "available", "spent", "remaining", "pct"]
+
+_SALDOS = """
+    SELECT COALESCE(c.name, b.category), b.monthly_amount, b.rollover, b.start_month,
+           COALESCE((SELECT s.spent FROM budget_spend s WHERE s.category_id = c.id AND s.month = :ym), 0),
+           COALESCE((SELECT s.spent_cum FROM budget_spend s WHERE s.category_id = c.id AND s.month <= :ym
+                     ORDER BY s.month DESC LIMIT 1), 0),
+           COALESCE((SELECT s.spent_cum FROM budget_spend s WHERE s.category_id = c.id AND s.month < b.start_month
+                     ORDER BY s.month DESC LIMIT 1), 0)
+    FROM budgets b LEFT JOIN categories c ON c.key = b.category
+    WHERE b.active = 1 AND b.start_month <= :ym {filtro}
+    ORDER BY b.category
+"""
+
+
+def carregar_budgets() -> pd.DataFrame:
+    with conectar() as con:
+        return pd.read_sql_query("""
+            SELECT b.id, COALESCE(c.name, b.category) AS category, b.monthly_amount, b.rollover, b.start_month
+            FROM budgets b LEFT JOIN categories c ON c.key = b.category
+            WHERE b.active = 1
+            ORDER BY b.category
+        """, con)
+
+
+def salvar_budget(category: str, monthly_amount: float, rollover: bool = False, start_month: str = None):
+    """Cria/atualiza (e reativa) o envelope da categoria; start_month padrão: mês atual."""
+    key = chave_categoria(category)
+    if not key:
+        raise ValueError("Informe a categoria do envelope.")
+    start_month = mes(start_month or date.today().strftime("%Y-%m")).ym
+    with conectar() as con:
+        con.execute("""
+            INSERT INTO budgets (category, monthly_amount, rollover, start_month, active)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(category) DO UPDATE SET
+                monthly_amount = excluded.monthly_amount, rollover = excluded.rollover,
+                start_month = excluded.start_month, active = 1
+        """, (key, round(float(monthly_amount), 2), int(bool(rollover)), start_month))
+        con.commit()
+
+
+def remover_budget(category: str):
+    with conectar() as con:
+        con.execute("UPDATE budgets SET active=0 WHERE category=?", (chave_categoria(category),))
+        con.commit()
+
+
+def _envelope(row, ym: str) -> dict:
+    category, amount, rollover, start, spent, cum_ate, cum_antes = row
+    if rollover:
+        meses = mes(ym).indice - mes(start).indice + 1
+        remaining = amount * meses - (cum_ate - cum_antes)
+        carryover = remaining - (amount - spent)
+    else:
+        remaining, carryover = amount - spent, 0.0
+    available = amount + carryover
+    return {
+        "category": category,
+        "monthly_amount": amount,
+        "rollover": bool(rollover),
+        "start_month": start,
+        "carryover": round(carryover, 2),
+        "available": round(available, 2),
+        "spent": round(spent, 2),
+        "remaining": round(remaining, 2),
+        "pct": round(spent / available * 100, 1) if available > 0 else None,
+    }
+
+
+def budget_remaining(category: str, ym: str):
+    """Envelope da categoria no mês (ver COLUNAS) ou None se não há envelope ativo nesse mês."""
+    key = chave_categoria(category)
+    if not key:
+        return None
+    ym = mes(ym).ym
+    with conectar() as con:
+        row = con.execute(_SALDOS.format(filtro="AND b.category = :cat"), {"ym": ym, "cat": key}).fetchone()
+    return _envelope(row, ym) if row else None
+
+
+def budgets_mes(ym: str) -> pd.DataFrame:
+    """Todos os envelopes ativos no mês, um por linha (ver COLUNAS)."""
+    ym = mes(ym).ym
+    with conectar() as con:
+        rows = con.execute(_SALDOS.format(filtro=""), {"ym": ym}).fetchall()
+    return pd.DataFrame([_envelope(r, ym) for r in rows], columns=COLUNAS)
@@ -0,0 +1,206 @@
+"""
+Parcelamentos como planos (installment_plans) e o motor de cronograma.
+
+Cada compra parcelada é um plano; as parcelas são lançamentos CARD com
+plan_id (índice (plan_id, installment_no)). As funções daqui trabalham
+sobre as parcelas de todos os planos de uma vez, com os meses como
+inteiros (meses desde 1970-01), sem laço por plano:
+
+- installment_plans: resumo por plano (total, restante, próxima/última fatura)
+- installment_schedule: compromisso futuro por cartão e fatura
+- payoff_scenario: quitação antecipada de planos numa fatura, com desconto de juros
+- what_if: cronograma e limite com compras parceladas hipotéticas
+
+"Futuro" = faturas a partir de `as_of` (padrão: mês atual), inclusive.
+Gravar uma antecipação: pessoal.antecipar_plano.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.datas import mes, yms
+from financas.pessoal.loaders import carregar_installment_plans, carregar_transactions, memo
+from financas.pessoal.registro import registro_atual
+
+
+def _meses(s: pd.Series) -> np.ndarray:
+    return (s.str[:4].astype(int).to_numpy() - 1970) * 12 + s.str[5:7].astype(int).to_numpy() - 1
+
+
+def _as_of(as_of: str = None) -> str:
+    return as_of or date.today().strftime("%Y-%m")
+
+
+def _parcelas() -> pd.DataFrame:
+    """Parcelas de todos os planos: plan_id, card_id, installment_no, amount, status, m (mês da fatura)."""
+    def compute():
+        tx = carregar_transactions()
+        p = tx[tx["plan_id"].notna() & (tx["method"] == "CARD") & (tx["statement_month"] != "")]
+        p = p[["plan_id", "card_id", "installment_no", "amount", "status", "statement_month"]].copy()
+        p["plan_id"] = p["plan_id"].astype(np.int64)
+        p["card_id"] = p["card_id"].astype(np.int64)
+        p["m"] = _meses(p["statement_month"])
+        return p.sort_values(["plan_id", "m"], kind="mergesort").reset_index(drop=True)
+    return memo("parcelas", compute)
+
+
+def _cronograma(card_id, m, amount, coluna: str = "amount") -> pd.DataFrame:
+    """Soma por (cartão, mês) de arrays paralelos -> card_id, statement_month, <coluna>."""
+    df = pd.DataFrame({"card_id": card_id, "m": m, coluna: amount})
+    out = df.groupby(["card_id", "m"], as_index=False)[coluna].sum()
+    out[coluna] = out[coluna].round(2)
+    out.insert(1, "statement_month", yms(out["m"]))
+    return out.drop(columns="m")
+
+
+@instr.medido("calc")
+def installment_plans(as_of: str = None, card_id: int = None) -> pd.DataFrame:
+    """
+    Um registro por plano: plan_id, card_id, dt, description, category, n, total_amount,
+    remaining_n, remaining (parcelas em faturas >= as_of), next_month, last_month.
+    """
+    as_of = _as_of(as_of)
+
+    def compute():
+        p = _parcelas()
+        fut = p["m"].to_numpy() >= mes(as_of).indice
+        g = p.assign(fut_amount=np.where(fut, p["amount"], 0.0), fut_n=fut,
+                     fut_m=np.where(fut, p["m"], np.iinfo(np.int64).max)).groupby("plan_id")
+        out = g.agg(card_id=("card_id", "first"), remaining_n=("fut_n", "sum"), remaining=("fut_amount", "sum"),
+                    next_m=("fut_m", "min"), last_m=("m", "max"))
+        out["remaining"] = out["remaining"].round(2)
+        has_next = out["remaining_n"] > 0
+        out["next_month"] = ""
+        out.loc[has_next, "next_month"] = yms(out.loc[has_next, "next_m"])
+        out["last_month"] = yms(out["last_m"])
+        plans = carregar_installment_plans().set_index("id")[["dt", "description", "category", "n", "total_amount"]]
+        out = out.drop(columns=["next_m", "last_m"]).join(plans, how="inner")
+        out.index.name = "plan_id"
+        return out.reset_index()[["plan_id", "card_id", "dt", "description", "category", "n", "total_amount",
+                                  "remaining_n", "remaining", "next_month", "last_month"]]
+
+    out = memo(("installment_plans", as_of), compute)
+    return out[out["card_id"] == int(card_id)] if card_id is not None else out
+
+
+@instr.medido("calc")
+def installment_schedule(as_of: str = None) -> pd.DataFrame:
+    """Compromisso futuro: card_id, statement_month (>= as_of), amount, plans (planos com parcela na fatura)."""
+    as_of = _as_of(as_of)
+
+    def compute():
+        p = _parcelas()
+        fut = p[p["m"] >= mes(as_of).indice]
+        out = _cronograma(fut["card_id"], fut["m"], fut["amount"])
+        out["plans"] = fut.groupby(["card_id", "m"])["plan_id"].nunique().to_numpy()
+        return out
+
+    return memo(("installment_schedule", as_of), compute)
+
+
+def _valor_presente(amount: np.ndarray, k: np.ndarray, taxa_mes: float) -> np.ndarray:
+    return np.round(amount / (1 + float(taxa_mes) / 100) ** k, 2)
+
+
+@instr.medido("calc")
+def payoff_scenario(plan_ids: list = None, payoff_month: str = None, taxa_mes: float = 0.0,
+                    as_of: str = None) -> dict:
+    """
+    Simula quitar os planos (todos se plan_ids for None) na fatura `payoff_month` (padrão: as_of):
+    as parcelas de faturas posteriores vêm para ela, cada uma a valor presente pelos meses
+    antecipados. Mesma conta de pessoal.antecipar_plano, sem gravar nada.
+
+    Devolve {"antes", "depois"} (cronograma por cartão e fatura), "por_plano"
+    (plan_id, nominal, valor, economia) e os totais nominal/valor/economia.
+    """
+    as_of = _as_of(as_of)
+    pay = mes(payoff_month or as_of).indice
+    p = _parcelas()
+    p = p[p["m"] >= mes(as_of).indice]
+    if plan_ids is not None:
+        p = p[p["plan_id"].isin([int(i) for i in plan_ids])]
+
+    m = p["m"].to_numpy()
+    amount = p["amount"].to_numpy(dtype=float)
+    k = np.maximum(m - pay, 0)
+    valor = np.where(k > 0, _valor_presente(amount, k, taxa_mes), amount)
+    moved = k > 0
+
+    por_plano = pd.DataFrame({
+        "plan_id": p["plan_id"].to_numpy()[moved], "nominal": amount[moved], "valor": valor[moved],
+    }).groupby("plan_id", as_index=False).sum().round(2)
+    por_plano["economia"] = (por_plano["nominal"] - por_plano["valor"]).round(2)
+
+    nominal, pago = float(amount[moved].sum()), float(valor[moved].sum())
+    return {
+        "payoff_month": yms([pay])[0],
+        "taxa_mes": float(taxa_mes),
+        "antes": _cronograma(p["card_id"], m, amount),
+        "depois": _cronograma(p["card_id"], np.minimum(m, pay), valor),
+        "por_plano": por_plano,
+        "nominal": round(nominal, 2),
+        "valor": round(pago, 2),
+        "economia": round(nominal - pago, 2),
+    }
+
+
+@instr.medido("calc")
+def what_if(compras: list, as_of: str = None) -> dict:
+    """
+    Cronograma com compras parceladas hipotéticas somadas ao compromisso atual.
+    compras: [{"card_id", "amount", "n", "dt" (opcional, padrão hoje)}].
+
+    Devolve "schedule" (card_id, statement_month, atual, novo, total) e "credit"
+    ({card_id: {limit, available, available_after}}: o limite é tomado pelo valor total
+    da compra, não só pela parcela).
+    """
+    from financas.pessoal.cartoes import card_credit
+
+    as_of = _as_of(as_of)
+    reg = registro_atual()
+    c = pd.DataFrame(compras)
+    c["card_id"] = c["card_id"].astype(np.int64)
+    c["amount"] = c["amount"].astype(float)
+    c["n"] = c["n"].astype(np.int64)
+    if (c["n"] < 1).any():
+        raise ValueError("Número de parcelas deve ser >= 1.")
+    dts = pd.to_datetime(c["dt"] if "dt" in c else pd.Series([None] * len(c)), errors="coerce")
+    c["dt"] = dts.fillna(pd.Timestamp(date.today())).to_numpy(dtype="datetime64[D]")
+
+    first = np.empty(len(c), dtype=np.int64)
+    for cid, part in c.groupby("card_id"):
+        first[part.index] = reg.statement_months(int(cid), part["dt"].to_numpy()).astype(np.int64)
+
+    # parcelas: centavos da divisão na última (mesma regra de create_installments_on_card)
+    n = c["n"].to_numpy()
+    per = np.round(c["amount"].to_numpy() / n, 2)
+    rep = np.repeat(np.arange(len(c)), n)
+    no = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    valor = per[rep].copy()
+    last = no == n[rep] - 1
+    valor[last] = np.round(c["amount"].to_numpy() - per * (n - 1), 2)
+    m = first[rep] + no
+
+    novo = _cronograma(c["card_id"].to_numpy()[rep], m, valor, "novo")
+    novo = novo[novo["statement_month"] >= as_of]
+    atual = installment_schedule(as_of)[["card_id", "statement_month", "amount"]].rename(columns={"amount": "atual"})
+    sched = atual.merge(novo, on=["card_id", "statement_month"], how="outer").fillna({"atual": 0.0, "novo": 0.0})
+    sched["total"] = (sched["atual"] + sched["novo"]).round(2)
+    sched = sched.sort_values(["card_id", "statement_month"]).reset_index(drop=True)
+
+    credit = card_credit()
+    add = c.groupby("card_id")["amount"].sum()
+    return {
+        "schedule": sched,
+        "credit": {
+            int(cid): {
+                "limit": credit[int(cid)]["limit"],
+                "available": credit[int(cid)]["available"],
+                "available_after": None if credit[int(cid)]["available"] is None
+                else round(credit[int(cid)]["available"] - float(v), 2),
+            }
+            for cid, v in add.items() if int(cid) in credit
+        },
+    }
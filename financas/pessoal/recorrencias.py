@@ -0,0 +1,50 @@
+"""Geração dos lançamentos recorrentes de um mês."""
+from datetime import date
+
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.eventos import lote
+from financas.datas import month_range
+from financas.pessoal.db import add_transaction
+from financas.pessoal.loaders import carregar_transactions
+from financas.pessoal.registro import registro_atual
+
+
+@instr.medido("calc")
+def run_recurrences_for_month(target_ym: str):
+    reg = registro_atual()
+    if not reg.recurrences:
+        return 0
+
+    tx = carregar_transactions()
+    start, end = month_range(target_ym)
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end) + pd.Timedelta(days=1)  # exclusivo
+
+    existing_ids = set(
+        tx[(tx["dt"] >= start_ts) & (tx["dt"] < end_ts)]["recurrence_id"].dropna().astype(int).tolist()
+    )
+
+    created = 0
+    y, m = map(int, target_ym.split("-"))
+
+    with lote():
+        for r in reg.recurrences.values():
+            if not r.active or r.id in existing_ids:
+                continue
+
+            dt_ = date(y, m, r.day_of_month)
+            desc = r.description or r.name or "Recorrência"
+
+            if r.method in ["BANK", "CASH"]:
+                add_transaction(dt_, r.kind, r.amount, r.category, desc, "PAID", r.method,
+                                account_id=r.account_id or None, recurrence_id=r.id)
+                created += 1
+            elif r.card_id and r.card_id in reg.cards:
+                stmt = reg.statement_month(r.card_id, dt_)
+                add_transaction(dt_, "EXPENSE", r.amount, r.category, desc, "PAID", "CARD",
+                                card_id=r.card_id, statement_month=stmt, recurrence_id=r.id)
+                created += 1
+
+    return created
@@ -0,0 +1,166 @@
+"""
+Registro em memória das tabelas pequenas (contas, cartões, recorrências,
+regras de categoria) para consultas escalares sem pandas.
+
+Cada linha vira um objeto com __slots__, indexado por id num dict: achar o
+closing_day de um cartão ou o nome de uma conta é um acesso O(1), sem
+montar máscara booleana sobre o DataFrame. O registro é montado uma vez
+por data_version (pessoal.memo) a partir dos mesmos loaders.
+"""
+import math
+from datetime import date
+
+from financas.calendario import mes_da_fatura, meses_da_fatura, vencimento
+from financas.pessoal.categorizacao import chave_categoria
+from financas.pessoal.loaders import (
+    carregar_accounts, carregar_cards, carregar_category_rules, carregar_holidays, carregar_recurrences, memo
+)
+
+
+def _int(v):
+    """Inteiro ou None (NULL do SQLite chega como NaN nas colunas numéricas)."""
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    return int(v)
+
+
+def _float(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    return float(v)
+
+
+def _str(v) -> str:
+    return "" if v is None or (isinstance(v, float) and math.isnan(v)) else str(v)
+
+
+class Account:
+    __slots__ = ("id", "name", "type", "initial_balance")
+
+    def __init__(self, id: int, name: str, type: str, initial_balance: float):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.initial_balance = initial_balance
+
+    def __repr__(self):
+        return f"Account(id={self.id}, name={self.name!r}, type={self.type!r})"
+
+
+class Card:
+    __slots__ = ("id", "name", "closing_day", "due_day", "pay_account_id", "last4", "closing_adjust", "due_adjust",
+                 "credit_limit")
+
+    def __init__(self, id: int, name: str, closing_day: int, due_day: int, pay_account_id, last4: str,
+                 closing_adjust: str = "NONE", due_adjust: str = "NONE", credit_limit: float = None):
+        self.id = id
+        self.name = name
+        self.closing_day = closing_day
+        self.due_day = due_day
+        self.pay_account_id = pay_account_id
+        self.last4 = last4
+        self.closing_adjust = closing_adjust
+        self.due_adjust = due_adjust
+        self.credit_limit = credit_limit
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} •••• {self.last4 or '----'}"
+
+    def __repr__(self):
+        return f"Card(id={self.id}, name={self.name!r}, closing_day={self.closing_day})"
+
+
+class Recurrence:
+    __slots__ = ("id", "name", "kind", "amount", "category", "description", "method",
+                 "account_id", "card_id", "day_of_month", "active")
+
+    def __init__(self, id: int, name: str, kind: str, amount: float, category: str, description: str,
+                 method: str, account_id, card_id, day_of_month: int, active: bool):
+        self.id = id
+        self.name = name
+        self.kind = kind
+        self.amount = amount
+        self.category = category
+        self.description = description
+        self.method = method
+        self.account_id = account_id
+        self.card_id = card_id
+        self.day_of_month = day_of_month
+        self.active = active
+
+    def __repr__(self):
+        return f"Recurrence(id={self.id}, name={self.name!r}, method={self.method!r})"
+
+
+class Registro:
+    """Contas, cartões e recorrências por id; classe de cada categoria (minúsculas); feriados ('YYYY-MM-DD')."""
+    __slots__ = ("accounts", "cards", "recurrences", "category_class", "holidays", "account_names", "card_labels")
+
+    def __init__(self, accounts: dict, cards: dict, recurrences: dict, category_class: dict, holidays: tuple = ()):
+        self.accounts = accounts
+        self.cards = cards
+        self.recurrences = recurrences
+        self.category_class = category_class
+        self.holidays = holidays
+        self.account_names = {i: a.name for i, a in accounts.items()}
+        self.card_labels = {i: c.label for i, c in cards.items()}
+
+    def account(self, account_id) -> Account:
+        try:
+            return self.accounts[int(account_id)]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Conta {account_id} não encontrada.") from None
+
+    def card(self, card_id) -> Card:
+        try:
+            return self.cards[int(card_id)]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Cartão {card_id} não encontrado.") from None
+
+    def is_discretionary(self, category: str) -> bool:
+        return self.category_class.get(chave_categoria(category)) == "DISCRETIONARY"
+
+    def statement_month(self, card_id, dt_: date) -> str:
+        """Fatura ('YYYY-MM') de uma compra no cartão, pela regra de fechamento dele."""
+        c = self.card(card_id)
+        return mes_da_fatura(dt_, c.closing_day, c.closing_adjust, self.holidays)
+
+    def statement_months(self, card_id, datas):
+        """Versão vetorizada: array de datas -> array datetime64[M]."""
+        c = self.card(card_id)
+        return meses_da_fatura(datas, c.closing_day, c.closing_adjust, self.holidays)
+
+    def due_date(self, card_id, statement_month: str) -> date:
+        c = self.card(card_id)
+        return vencimento(statement_month, c.closing_day, c.due_day, c.due_adjust, self.holidays)
+
+
+def _build() -> Registro:
+    accounts = {
+        int(r["id"]): Account(int(r["id"]), _str(r["name"]), r["type"], float(r["initial_balance"] or 0))
+        for r in carregar_accounts().to_dict("records")
+    }
+    cards = {
+        int(r["id"]): Card(int(r["id"]), _str(r["name"]), int(r["closing_day"]), int(r["due_day"]),
+                           _int(r.get("pay_account_id")), _str(r.get("last4")),
+                           r.get("closing_adjust") or "NONE", r.get("due_adjust") or "NONE",
+                           _float(r.get("credit_limit")))
+        for r in carregar_cards().to_dict("records")
+    }
+    recurrences = {
+        int(r["id"]): Recurrence(int(r["id"]), _str(r["name"]), r["kind"], float(r["amount"]), _str(r["category"]),
+                                 _str(r["description"]), r["method"], _int(r["account_id"]), _int(r["card_id"]),
+                                 int(r["day_of_month"]), bool(r["active"]))
+        for r in carregar_recurrences().to_dict("records")
+    }
+    category_class = {}
+    for r in carregar_category_rules().to_dict("records"):
+        category_class.setdefault(chave_categoria(_str(r["category"])), r["class"])
+    holidays = tuple(carregar_holidays()["dt"].astype(str))
+    return Registro(accounts, cards, recurrences, category_class, holidays)
+
+
+def registro_atual() -> Registro:
+    """Registro do banco atual, remontado só quando data_version muda."""
+    return memo("registro", _build)
@@ -0,0 +1,78 @@
+"""Agregados por período (caixa x fatura) para Dashboard e relatórios."""
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.periodos import agregar_eixos, periodo_de, periodos_disponiveis, por_periodo, somar
+from financas.pessoal.loaders import carregar_cards, carregar_transactions, memo
+
+
+@instr.medido("calc")
+def agregar_transactions(tx: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agregado diário dos dois eixos de tempo numa passada:
+    - caixa: todas as linhas por dt
+    - fatura: só CARD, pelo statement_month (dia 1 do mês da fatura)
+    """
+    is_card = (tx["method"] == "CARD") & (tx["statement_month"] != "")
+    return agregar_eixos(
+        tx,
+        {
+            "caixa": tx["dt"],
+            "fatura": pd.to_datetime(tx["statement_month"].where(is_card), format="%Y-%m", errors="coerce"),
+        },
+        valor="amount",
+        chaves=("kind", "method", "status", "card_id"),
+    )
+
+
+def agregado_atual() -> pd.DataFrame:
+    """agregar_transactions do banco atual, calculado uma vez por data_version."""
+    return memo("agregar_transactions", lambda: agregar_transactions(carregar_transactions()))
+
+
+def agregado_mensal_atual() -> pd.DataFrame:
+    return memo("agregar_transactions_mes", lambda: por_periodo(agregado_atual(), "mes"))
+
+
+def metricas_mes(agg_m: pd.DataFrame, per, card_ids) -> dict:
+    """Métricas do Dashboard para o mês `per` (agregado já em por_periodo(..., "mes"))."""
+    income = somar(agg_m, "caixa", per, status="PAID", kind="INCOME")
+    expense_bank = somar(agg_m, "caixa", per, status="PAID", kind="EXPENSE", method=["BANK", "CASH"])
+    card_pay = somar(agg_m, "caixa", per, status="PAID", method="CARD_PAYMENT")
+    return {
+        "income": income,
+        "expense_bank": expense_bank,
+        "card_pay": card_pay,
+        "economy": income - expense_bank - card_pay,
+        "stmt_totals": {int(c): somar(agg_m, "fatura", per, card_id=c) for c in card_ids},
+    }
+
+
+def meses_disponiveis() -> list:
+    """Meses com lançamento (por dt ou por fatura), 'YYYY-MM' em ordem."""
+    return memo("meses_disponiveis", lambda: sorted(str(p) for p in periodos_disponiveis(agregado_mensal_atual())))
+
+
+def dashboard_mes(ym: str) -> dict:
+    """
+    Blocos do Dashboard que dependem só do mês: metricas_mes + uma linha por
+    cartão (nome, final, fatura, % da renda, limite/disponível). Cacheado por
+    (mês, data_version).
+    """
+    from financas.pessoal.cartoes import card_credit
+
+    def compute():
+        cards = carregar_cards()
+        credit = card_credit()
+        m = metricas_mes(agregado_mensal_atual(), periodo_de(ym, "mes"), cards["id"].tolist())
+        m["cards"] = [
+            {
+                "id": int(r.id), "name": r.name, "last4": getattr(r, "last4", "") or "----",
+                "total": m["stmt_totals"][int(r.id)],
+                "pct": m["stmt_totals"][int(r.id)] / m["income"] * 100 if m["income"] > 0 else None,
+                **credit.get(int(r.id), {}),
+            }
+            for r in cards.itertuples(index=False)
+        ]
+        return m
+    return memo(("dashboard_mes", ym), compute)
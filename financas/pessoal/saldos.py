@@ -0,0 +1,235 @@
+"""
+Saldos das contas: total atual, série diária, consulta "saldo em", extrato
+e fluxo de caixa.
+
+Tudo sai do diário (tabela journal, mantida por trigger): lançamentos de
+conta, pagamentos de fatura e as duas pernas de cada transferência já
+chegam como um movimento assinado por conta, com índice (account_id, dt).
+"""
+from datetime import date, timedelta
+
+import pandas as pd
+
+from financas import instrumentacao as instr
+from financas.datas import to_dt, ym_add
+from financas.pessoal.db import conectar, data_version
+from financas.pessoal.loaders import carregar_accounts, carregar_journal, memo
+from financas.pessoal.registro import registro_atual
+
+
+def account_movements(jr: pd.DataFrame = None) -> pd.DataFrame:
+    """Movimentos pagos do diário, um por linha: account_id, dt (dia), delta."""
+    jr = carregar_journal() if jr is None else jr
+    paid = jr[(jr["status"] == "PAID") & jr["dt"].notna()]
+    return pd.DataFrame({
+        "account_id": paid["account_id"].astype(int),
+        "dt": paid["dt"].dt.normalize(),
+        "delta": paid["amount"].astype(float),
+    })
+
+
+@instr.medido("calc")
+def daily_balance_series(accounts: pd.DataFrame, jr: pd.DataFrame = None, end: date = None) -> pd.DataFrame:
+    """Saldo de fim de dia por conta (índice = dia, colunas = account_id), via soma acumulada."""
+    init = pd.Series(accounts["initial_balance"].astype(float).to_numpy(),
+                     index=accounts["id"].astype(int).to_numpy())
+    mv = account_movements(jr)
+
+    end_ts = pd.Timestamp(end or date.today()).normalize()
+    if mv.empty:
+        days = pd.DatetimeIndex([end_ts])
+    else:
+        days = pd.date_range(min(mv["dt"].min(), end_ts), max(mv["dt"].max(), end_ts), freq="D")
+
+    daily = mv.groupby(["dt", "account_id"])["delta"].sum().unstack(fill_value=0.0)
+    daily = daily.reindex(index=days, columns=init.index, fill_value=0.0)
+    return daily.cumsum() + init
+
+
+def save_balance_checkpoints(series: pd.DataFrame, version: int = None, replace: bool = False) -> int:
+    """
+    Grava o saldo de fechamento de cada mês já encerrado que ainda não tem checkpoint
+    (replace=True: apaga os existentes antes). Com `version` (data_version de quando a
+    série foi calculada), só grava se o banco ainda está nela, conferido na mesma transação:
+    uma série de antes de outra escrita não vira checkpoint.
+    """
+    closes = series.groupby(series.index.to_period("M")).last() if not series.empty else series
+    closes = closes[closes.index < pd.Period(date.today(), "M")] if not closes.empty else closes
+    with conectar() as con:
+        con.execute("BEGIN IMMEDIATE")
+        if version is not None and con.execute("SELECT version FROM data_version WHERE id=1").fetchone()[0] != version:
+            con.rollback()
+            return 0
+        if replace:
+            con.execute("DELETE FROM balance_checkpoints")
+        existing = set(con.execute("SELECT account_id, month FROM balance_checkpoints").fetchall())
+        rows = [(int(acc), str(per), float(bal)) for (per, acc), bal in closes.stack().items()
+                if (int(acc), str(per)) not in existing] if not closes.empty else []
+        con.executemany("INSERT OR REPLACE INTO balance_checkpoints (account_id, month, balance) VALUES (?,?,?)", rows)
+        con.commit()
+    return len(rows)
+
+
+def rebuild_balance_checkpoints(accounts: pd.DataFrame = None, jr: pd.DataFrame = None, version: int = None) -> int:
+    """
+    Recria balance_checkpoints do zero a partir da série diária (job rebuild_balances e CLI).
+    `version`: data_version lida antes de carregar `jr` (sem `jr`, lida aqui); se houve escrita
+    depois dela, nada é gravado.
+    """
+    if jr is None:
+        version = data_version()
+    series = daily_balance_series(carregar_accounts() if accounts is None else accounts, jr)
+    return save_balance_checkpoints(series, version=version, replace=True)
+
+
+def _fill_checkpoints(account_id: int, upto: str, init: float) -> int:
+    """
+    Grava os checkpoints que faltam da conta até o mês `upto` (já encerrado), seguindo do
+    último que sobrou com a soma mensal do diário. Roda em BEGIN IMMEDIATE: uma escrita
+    concorrente espera e, se mexer na conta, o trigger apaga o que foi gravado aqui.
+    Devolve quantos meses gravou.
+    """
+    account_id = int(account_id)
+    with conectar() as con:
+        if con.execute("SELECT 1 FROM journal WHERE account_id=? AND dt < ? AND status='PAID' LIMIT 1",
+                       (account_id, f"{ym_add(upto, 1)}-01")).fetchone() is None:
+            return 0  # sem movimento até `upto`: o saldo é o inicial, sem checkpoint
+        con.execute("BEGIN IMMEDIATE")
+        ck = con.execute("""
+            SELECT month, balance FROM balance_checkpoints
+            WHERE account_id=? AND month <= ? ORDER BY month DESC LIMIT 1
+        """, (account_id, upto)).fetchone()
+        if ck:
+            first, base = ym_add(ck[0], 1), float(ck[1])
+        else:
+            first = con.execute("SELECT substr(MIN(dt), 1, 7) FROM journal WHERE account_id=? AND status='PAID'",
+                                (account_id,)).fetchone()[0]
+            base = float(init)
+        if first is None or first > upto:  # em dia (ou o movimento sumiu antes do BEGIN)
+            con.rollback()
+            return 0
+        sums = dict(con.execute("""
+            SELECT substr(dt, 1, 7), SUM(amount) FROM journal
+            WHERE account_id=? AND status='PAID' AND dt >= ? AND dt < ?
+            GROUP BY 1
+        """, (account_id, f"{first}-01", f"{ym_add(upto, 1)}-01")))
+        rows, month = [], first
+        while month <= upto:
+            base += float(sums.get(month, 0.0))
+            rows.append((account_id, month, base))
+            month = ym_add(month, 1)
+        con.executemany("INSERT OR REPLACE INTO balance_checkpoints (account_id, month, balance) VALUES (?,?,?)", rows)
+        con.commit()
+    return len(rows)
+
+
+@instr.medido("calc")
+def balance_as_of(account_id: int, as_of: date) -> float:
+    """
+    Saldo (pago) da conta ao fim do dia `as_of`: checkpoint do mês anterior + movimentos do mês.
+    Checkpoints que faltam (apagados por uma escrita retroativa) são regravados antes, uma vez.
+    Conta inexistente: ValueError.
+    """
+    init = registro_atual().account(account_id).initial_balance
+    ym = as_of.strftime("%Y-%m")
+    upto = min(ym_add(ym, -1), ym_add(date.today().strftime("%Y-%m"), -1))  # só meses encerrados
+    sql = """
+        SELECT month, balance FROM balance_checkpoints
+        WHERE account_id=? AND month < ?
+        ORDER BY month DESC LIMIT 1
+    """
+    with conectar() as con:
+        ck = con.execute(sql, (int(account_id), ym)).fetchone()
+    if (ck is None or ck[0] < upto) and _fill_checkpoints(account_id, upto, init):
+        with conectar() as con:
+            ck = con.execute(sql, (int(account_id), ym)).fetchone()
+
+    with conectar() as con:
+        if ck:
+            base = float(ck[1])
+            since = f"{ym_add(ck[0], 1)}-01"
+        else:
+            base = float(init)
+            since = "0000-01-01"
+        delta = con.execute("""
+            SELECT COALESCE(SUM(amount), 0) FROM journal
+            WHERE account_id=? AND dt >= ? AND dt <= ? AND status='PAID'
+        """, (int(account_id), since, as_of.isoformat())).fetchone()[0]
+
+    return base + float(delta)
+
+
+def _journal_sums(con, account_id=None) -> dict:
+    sql = "SELECT account_id, SUM(amount) FROM journal WHERE status='PAID'"
+    params = []
+    if account_id is not None:
+        sql += " AND account_id=?"
+        params.append(int(account_id))
+    return {int(a): float(v) for a, v in con.execute(sql + " GROUP BY account_id", params)}
+
+
+@instr.medido("calc")
+def calc_account_balance(account_id: int, accounts: pd.DataFrame = None) -> float:
+    """Saldo pago atual: saldo inicial + soma do diário da conta."""
+    if accounts is None:
+        init = registro_atual().account(account_id).initial_balance
+    else:
+        init = float(accounts.loc[accounts["id"] == account_id, "initial_balance"].iloc[0])
+    with conectar() as con:
+        return init + _journal_sums(con, account_id).get(int(account_id), 0.0)
+
+
+def saldos_atuais() -> dict:
+    """{account_id: saldo atual} de todas as contas (um GROUP BY no diário), uma vez por data_version."""
+    def compute():
+        with conectar() as con:
+            sums = _journal_sums(con)
+        return {int(a.id): float(a.initial_balance) + sums.get(int(a.id), 0.0)
+                for a in carregar_accounts().itertuples(index=False)}
+    return memo("saldos_atuais", compute)
+
+
+@instr.medido("calc")
+def account_statement(account_id: int, start: date, end: date) -> pd.DataFrame:
+    """
+    Extrato pago da conta no período: dt, entry, description, category, amount e balance
+    (saldo corrido a partir de balance_as_of na véspera de `start`).
+    """
+    with conectar() as con:
+        df = pd.read_sql_query("""
+            SELECT j.dt, j.entry, j.source, j.source_id, COALESCE(t.description, x.description, '') AS description,
+                   COALESCE(t.category, '') AS category, j.amount
+            FROM journal j
+            LEFT JOIN transactions t ON j.source = 'T' AND t.id = j.source_id
+            LEFT JOIN transfers x ON j.source = 'X' AND x.id = j.source_id
+            WHERE j.account_id=? AND j.dt >= ? AND j.dt <= ? AND j.status='PAID'
+            ORDER BY j.dt, j.source, j.source_id
+        """, con, params=(int(account_id), start.isoformat(), end.isoformat()))
+    opening = round(balance_as_of(account_id, start - timedelta(days=1)), 2)
+    df["dt"] = to_dt(df["dt"])
+    df["balance"] = (opening + df["amount"].cumsum()).round(2)
+    df.attrs["opening"] = opening
+    return df
+
+
+@instr.medido("calc")
+def cash_flow(start: date = None, end: date = None) -> pd.DataFrame:
+    """Fluxo de caixa pago por mês e conta: month, account_id, inflow, outflow, transfers (líquido), net."""
+    where, params = ["status='PAID'"], []
+    if start:
+        where.append("dt >= ?")
+        params.append(start.isoformat())
+    if end:
+        where.append("dt <= ?")
+        params.append(end.isoformat())
+    with conectar() as con:
+        df = pd.read_sql_query(f"""
+            SELECT substr(dt, 1, 7) AS month, account_id,
+                   SUM(CASE WHEN amount > 0 AND entry <> 'TRANSFER_IN' THEN amount ELSE 0 END) AS inflow,
+                   SUM(CASE WHEN amount < 0 AND entry <> 'TRANSFER_OUT' THEN -amount ELSE 0 END) AS outflow,
+                   SUM(CASE WHEN entry IN ('TRANSFER_IN', 'TRANSFER_OUT') THEN amount ELSE 0 END) AS transfers,
+                   SUM(amount) AS net
+            FROM journal WHERE {' AND '.join(where)}
+            GROUP BY month, account_id ORDER BY month, account_id
+        """, con, params=params)
+    return df.round({"inflow": 2, "outflow": 2, "transfers": 2, "net": 2})
@@ -0,0 +1,216 @@
+"""
+Multiusuário: um arquivo SQLite por usuário (tenant), pool de conexões e cache por tenant.
+
+- O tenant atual fica numa ContextVar: cada rerun do Streamlit (thread
+  própria), cada tarefa em segundo plano e cada request da API define o
+  seu com `set_tenant`, sem vazar para as outras.
+- `POOL` guarda conexões ociosas por arquivo; as menos usadas são
+  fechadas quando passam de MAX_IDLE_TOTAL ou ficam IDLE_TIMEOUT_S paradas.
+- `CACHE` tem uma partição por tenant (LRU de tenants); cada entrada
+  guarda a versão dos dados com que foi calculada e é recalculada quando
+  a versão muda (uma entrada por chave, sem acumular versões velhas).
+"""
+import functools
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+
+from financas import instrumentacao as instr
+
+TENANTS_DIR = Path("tenants")
+MAX_IDLE_TOTAL = 64
+MAX_IDLE_PER_DB = 4
+IDLE_TIMEOUT_S = 300
+MAX_TENANT_PARTITIONS = 256
+MAX_ITEMS_PER_PARTITION = 64
+
+_tenant = ContextVar("financas_tenant", default=None)
+
+
+def set_tenant(tenant_id):
+    """Define o tenant do contexto atual (None = banco padrão, modo single-user)."""
+    _tenant.set(str(tenant_id) if tenant_id else None)
+
+
+def tenant_atual():
+    return _tenant.get()
+
+
+def tenant_slug(tenant_id: str) -> str:
+    """Nome de pasta seguro para o tenant (ids esquisitos viram hash)."""
+    if re.fullmatch(r"[A-Za-z0-9_.-]{1,64}", tenant_id) and not tenant_id.startswith("."):
+        return tenant_id
+    return "t_" + hashlib.sha256(tenant_id.encode("utf-8")).hexdigest()[:24]
+
+
+def tenant_db_path(tenant_id: str, filename: str) -> str:
+    folder = TENANTS_DIR / tenant_slug(tenant_id)
+    folder.mkdir(parents=True, exist_ok=True)
+    return str(folder / filename)
+
+
+class ConnectionPool:
+    """Conexões ociosas por arquivo, com despejo LRU e por tempo parado."""
+
+    def __init__(self, max_idle_total=MAX_IDLE_TOTAL, max_idle_per_db=MAX_IDLE_PER_DB, idle_timeout=IDLE_TIMEOUT_S):
+        self.max_idle_total = max_idle_total
+        self.max_idle_per_db = max_idle_per_db
+        self.idle_timeout = idle_timeout
+        self._idle = OrderedDict()  # db -> [(con, last_used)], do menos para o mais recente
+        self._lock = threading.Lock()
+
+    def acquire(self, db: str) -> sqlite3.Connection:
+        with self._lock:
+            items = self._idle.get(db)
+            if items:
+                con, _ = items.pop()
+                if not items:
+                    del self._idle[db]
+                return con
+        return instr.conectar(db, check_same_thread=False, timeout=30)
+
+    def release(self, db: str, con: sqlite3.Connection):
+        con.row_factory = None
+        if con.in_transaction:
+            con.rollback()
+        to_close = []
+        with self._lock:
+            items = self._idle.setdefault(db, [])
+            items.append((con, time.monotonic()))
+            self._idle.move_to_end(db)
+            if len(items) > self.max_idle_per_db:
+                to_close.append(items.pop(0)[0])
+            to_close += self._evict_locked()
+        for c in to_close:
+            c.close()
+
+    def _evict_locked(self) -> list:
+        out = []
+        limit = time.monotonic() - self.idle_timeout
+        for db in list(self._idle):
+            keep = [(c, t) for c, t in self._idle[db] if t >= limit]
+            out += [c for c, t in self._idle[db] if t < limit]
+            if keep:
+                self._idle[db] = keep
+            else:
+                del self._idle[db]
+
+        total = sum(len(v) for v in self._idle.values())
+        while total > self.max_idle_total:
+            db, items = next(iter(self._idle.items()))  # arquivo usado há mais tempo
+            out.append(items.pop(0)[0])
+            total -= 1
+            if not items:
+                del self._idle[db]
+        return out
+
+    def close_all(self):
+        with self._lock:
+            items = [c for v in self._idle.values() for c, _ in v]
+            self._idle.clear()
+        for c in items:
+            c.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"dbs": len(self._idle), "idle": sum(len(v) for v in self._idle.values())}
+
+
+class PooledConnection:
+    """`with conectar() as con:` entrega a conexão crua (pandas aceita) e devolve ao pool no fim."""
+
+    def __init__(self, pool: ConnectionPool, db: str):
+        self.pool = pool
+        self.db = db
+        self.con = None
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.con = self.pool.acquire(self.db)
+        return self.con
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.con.commit()
+            else:
+                self.con.rollback()
+        finally:
+            self.pool.release(self.db, self.con)
+            self.con = None
+        return False
+
+
+class TenantCache:
+    """Uma partição LRU por tenant; tenants menos ativos são descartados inteiros."""
+
+    def __init__(self, max_tenants=MAX_TENANT_PARTITIONS, max_items=MAX_ITEMS_PER_PARTITION):
+        self.max_tenants = max_tenants
+        self.max_items = max_items
+        self._parts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, version, compute):
+        hit = self.peek(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        value = compute()
+        self.put(key, version, value)
+        return value
+
+    def peek(self, key):
+        """(versão, valor) guardados para `key` no tenant atual, qualquer que seja a versão; None se não há."""
+        tenant = tenant_atual() or ""
+        with self._lock:
+            part = self._parts.get(tenant)
+            if part is None:
+                return None
+            self._parts.move_to_end(tenant)
+            hit = part.get(key)
+            if hit is not None:
+                part.move_to_end(key)
+            return hit
+
+    def put(self, key, version, value):
+        tenant = tenant_atual() or ""
+        with self._lock:
+            part = self._parts.setdefault(tenant, OrderedDict())
+            self._parts.move_to_end(tenant)
+            part[key] = (version, value)
+            part.move_to_end(key)
+            while len(part) > self.max_items:
+                part.popitem(last=False)
+            while len(self._parts) > self.max_tenants:
+                self._parts.popitem(last=False)
+
+    def clear(self, tenant=None):
+        with self._lock:
+            if tenant is None:
+                self._parts.clear()
+            else:
+                self._parts.pop(str(tenant), None)
+
+
+POOL = ConnectionPool()
+CACHE = TenantCache()
+
+
+def cached_loader(db_atual, data_version):
+    """
+    Decorator de loader sem argumentos: guarda o DataFrame no CACHE por
+    (arquivo, loader), válido enquanto data_version() não muda. Devolve cópia
+    rasa, então colunas novas no chamador não contaminam o cache.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper():
+            version = data_version()
+            if version is None:
+                return fn()
+            return CACHE.get_or_compute((db_atual(), fn.__name__), version, fn).copy(deep=False)
+        return wrapper
+    return deco
@@ -1 +1,294 @@
-pip install streamlit pandas matplotlib
+"""
+Linha de comando do motor (cron/batch), sem Streamlit.
+
+Uso:
+    python finance.py recorrencias 2026-01 2026-06
+    python finance.py fechar-fatura 2026-05 [--cartao 1 --cartao 2] [--data 2026-06-10]
+    python finance.py resumo 2026-01 2026-12 [--formato tabela|csv|json]
+    python finance.py --app controle resumo 2026-01 2026-12
+    python finance.py exportar backups/2026-06
+    python finance.py reconstruir [--so diario --so checkpoints]
+    python finance.py --app controle reconstruir
+    python finance.py --app controle vencidos [--forcar]   (cron diário)
+    python finance.py anomalias   (cron: grava as anomalias dos meses desatualizados)
+
+Vários bancos de uma vez (um processo por arquivo, até --processos):
+    python finance.py --db a.db --db b.db resumo 2026-01
+    python finance.py --todos-tenants --processos 4 recorrencias 2026-07
+
+--app pessoal (padrão) usa finance_pessoal.db; --app controle usa finance.db
+(só resumo, exportar, reconstruir e vencidos).
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+APPS = {"pessoal": "finance_pessoal.db", "controle": "finance.db"}
+# Agregados mantidos por trigger (e os checkpoints de saldo) que `reconstruir` recria, na ordem
+AGREGADOS = {
+    "pessoal": ["diario", "cartoes", "envelopes", "checkpoints"],
+    "controle": ["pessoas"],
+}
+
+
+def meses(de: str, ate: str = None) -> list:
+    from financas.datas import ym_add
+
+    ate = ate or de
+    if ate < de:
+        raise ValueError(f"Intervalo invertido: {de} > {ate}")
+    out = [de]
+    while out[-1] < ate:
+        out.append(ym_add(out[-1], 1))
+    return out
+
+
+# =========================
+# Comandos (rodam dentro do processo de cada banco)
+# =========================
+def cmd_recorrencias(app, opts):
+    from financas import pessoal
+
+    return [{"mes": ym, "criados": pessoal.run_recurrences_for_month(ym)} for ym in meses(opts["de"], opts["ate"])]
+
+
+def cmd_fechar_fatura(app, opts):
+    from datetime import date
+
+    from financas import pessoal
+
+    ids = opts["cartao"] or [int(c) for c in pessoal.carregar_cards()["id"]]
+    pay_date = date.fromisoformat(opts["data"]) if opts["data"] else None
+    return [pessoal.close_card_statement(cid, opts["mes"], pay_date) for cid in ids]
+
+
+def cmd_resumo(app, opts):
+    from financas.periodos import periodo_de, por_periodo
+
+    if app == "controle":
+        from financas import controle
+
+        agg_m = por_periodo(controle.agregar_lancamentos(controle.carregar_df()), "mes")
+        return [{"mes": ym, **controle.resumo_periodo(agg_m, periodo_de(ym, "mes"))}
+                for ym in meses(opts["de"], opts["ate"])]
+
+    from financas import pessoal
+
+    ids = pessoal.carregar_cards()["id"].tolist()
+    agg_m = por_periodo(pessoal.agregar_transactions(pessoal.carregar_transactions()), "mes")
+    out = []
+    for ym in meses(opts["de"], opts["ate"]):
+        m = pessoal.metricas_mes(agg_m, periodo_de(ym, "mes"), ids)
+        stmt = m.pop("stmt_totals")
+        out.append({"mes": ym, **m, "faturas": sum(stmt.values())})
+    return out
+
+
+def cmd_exportar(app, opts, db):
+    import sqlite3
+
+    import pandas as pd
+
+    destino = Path(opts["destino"])
+    if opts["varios"]:
+        destino = destino / Path(db).parent.name / Path(db).stem
+    destino.mkdir(parents=True, exist_ok=True)
+
+    with sqlite3.connect(db) as con:
+        tabelas = [r[0] for r in con.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        for t in tabelas:
+            pd.read_sql_query(f'SELECT * FROM "{t}"', con).to_csv(destino / f"{t}.csv", index=False)
+        # cópia consistente mesmo com o app aberto (API de backup do SQLite)
+        with sqlite3.connect(destino / Path(db).name) as bkp:
+            con.backup(bkp)
+    return [{"destino": str(destino), "tabelas": len(tabelas)}]
+
+
+def cmd_vencidos(app, opts):
+    from datetime import date
+
+    from financas import controle
+
+    hoje = date.today().isoformat()
+    r = controle.rodar_agendador(hoje, forcar=opts["forcar"])
+    return [{"data": hoje, **r, "nao_vistos": len(controle.alertas_vencidos())}]
+
+
+def cmd_anomalias(app, opts):
+    from financas import pessoal
+
+    return [pessoal.atualizar_anomalias()]
+
+
+def cmd_reconstruir(app, opts):
+    alvos = opts["so"] or AGREGADOS[app]
+    fora = [a for a in alvos if a not in AGREGADOS[app]]
+    if fora:
+        raise ValueError(f"--so {', '.join(fora)} não existe para --app {app} (use: {', '.join(AGREGADOS[app])})")
+
+    if app == "controle":
+        from financas import controle
+
+        return [{"agregado": "pessoas", "linhas": controle.reconstruir_pessoas()}]
+
+    from financas import pessoal
+
+    fns = {"diario": pessoal.rebuild_journal, "cartoes": pessoal.rebuild_card_balances,
+           "envelopes": pessoal.rebuild_budget_spend}
+    out = []
+    with pessoal.conectar() as con:  # os mantidos por trigger numa transação só
+        for alvo in AGREGADOS[app]:
+            if alvo in alvos and alvo in fns:
+                out.append({"agregado": alvo, "linhas": fns[alvo](con)})
+    if "checkpoints" in alvos:  # saem do diário: por último
+        out.append({"agregado": "checkpoints", "linhas": pessoal.rebuild_balance_checkpoints()})
+    return out
+
+
+COMANDOS = {
+    "recorrencias": (cmd_recorrencias, ("pessoal",)),
+    "fechar-fatura": (cmd_fechar_fatura, ("pessoal",)),
+    "resumo": (cmd_resumo, ("pessoal", "controle")),
+    "exportar": (cmd_exportar, ("pessoal", "controle")),
+    "reconstruir": (cmd_reconstruir, ("pessoal", "controle")),
+    "vencidos": (cmd_vencidos, ("controle",)),
+    "anomalias": (cmd_anomalias, ("pessoal",)),
+}
+
+
+def executar(app: str, db: str, comando: str, opts: dict) -> dict:
+    """Roda um comando num banco (é o que cada processo do pool executa)."""
+    t0 = time.perf_counter()
+    if app == "controle":
+        from financas import controle
+
+        controle.usar_banco(db)
+        controle.criar_tabelas()
+    else:
+        from financas import pessoal
+
+        pessoal.usar_banco(db)
+        pessoal.ensure_schema()
+
+    fn = COMANDOS[comando][0]
+    linhas = fn(app, opts, db) if comando == "exportar" else fn(app, opts)
+    return {"db": db, "linhas": linhas, "segundos": time.perf_counter() - t0}
+
+
+# =========================
+# Saída
+# =========================
+def _fmt(v):
+    return f"{v:,.2f}" if isinstance(v, float) else str(v)
+
+
+def imprimir(resultados: list, formato: str):
+    if formato == "json":
+        print(json.dumps(resultados, ensure_ascii=False, default=str, indent=2))
+        return
+
+    import csv
+
+    varios = len(resultados) > 1
+    if formato == "csv":
+        cols = (["db"] if varios else []) + list(dict.fromkeys(k for r in resultados for ln in r["linhas"] for k in ln))
+        w = csv.DictWriter(sys.stdout, fieldnames=cols, extrasaction="ignore")
+        w.writeheader()
+        for r in resultados:
+            for ln in r["linhas"]:
+                w.writerow({"db": r["db"], **ln})
+        return
+
+    for r in resultados:
+        if varios:
+            print(f"== {r['db']} ({r['segundos']:.2f}s)")
+        if not r["linhas"]:
+            print("  (nada)")
+            continue
+        cols = list(dict.fromkeys(k for ln in r["linhas"] for k in ln))
+        larg = {c: max(len(c), *(len(_fmt(ln.get(c, ""))) for ln in r["linhas"])) for c in cols}
+        print("  ".join(c.ljust(larg[c]) for c in cols))
+        for ln in r["linhas"]:
+            print("  ".join(_fmt(ln.get(c, "")).rjust(larg[c]) if isinstance(ln.get(c), (int, float))
+                            else _fmt(ln.get(c, "")).ljust(larg[c]) for c in cols))
+
+
+def bancos(args) -> list:
+    dbs = list(args.db or [])
+    if args.todos_tenants:
+        from financas.tenants import TENANTS_DIR
+
+        dbs += sorted(str(p) for p in TENANTS_DIR.glob(f"*/{APPS[args.app]}"))
+    return dbs or [APPS[args.app]]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="finance.py", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--app", choices=list(APPS), default="pessoal")
+    ap.add_argument("--db", action="append", help="arquivo do banco (repita para vários)")
+    ap.add_argument("--todos-tenants", action="store_true", help="inclui todos os bancos em tenants/*/")
+    ap.add_argument("--processos", type=int, default=4, help="processos em paralelo quando há vários bancos")
+    ap.add_argument("--formato", choices=["tabela", "csv", "json"], default="tabela")
+    sub = ap.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("recorrencias", help="gera as recorrências de um intervalo de meses")
+    p.add_argument("de", help="YYYY-MM")
+    p.add_argument("ate", nargs="?", help="YYYY-MM (padrão: o mesmo mês)")
+
+    p = sub.add_parser("fechar-fatura", help="lança o pagamento do valor em aberto das faturas do mês")
+    p.add_argument("mes", help="mês da fatura, YYYY-MM")
+    p.add_argument("--cartao", type=int, action="append", help="id do cartão (padrão: todos)")
+    p.add_argument("--data", help="data do pagamento, YYYY-MM-DD (padrão: vencimento)")
+
+    p = sub.add_parser("resumo", help="resumo mensal (Dashboard / aba Resumo)")
+    p.add_argument("de", help="YYYY-MM")
+    p.add_argument("ate", nargs="?", help="YYYY-MM (padrão: o mesmo mês)")
+
+    p = sub.add_parser("exportar", help="CSV de cada tabela + cópia do banco")
+    p.add_argument("destino", help="pasta de destino")
+
+    p = sub.add_parser("reconstruir", help="recria do zero os agregados mantidos por trigger e os checkpoints de saldo")
+    p.add_argument("--so", action="append", choices=sorted({a for v in AGREGADOS.values() for a in v}),
+                   help="só este agregado (repita para vários; padrão: todos os do --app)")
+
+    p = sub.add_parser("vencidos", help="agendador diário: alerta os pendentes que venceram (--app controle)")
+    p.add_argument("--forcar", action="store_true", help="roda mesmo se já rodou hoje")
+
+    sub.add_parser("anomalias", help="grava as anomalias dos meses sem resultado ou desatualizados")
+
+    args = ap.parse_args(argv)
+    if args.app not in COMANDOS[args.comando][1]:
+        ap.error(f"'{args.comando}' não existe para --app {args.app}")
+
+    dbs = bancos(args)
+    faltando = [d for d in dbs if not Path(d).exists()]
+    if faltando:
+        ap.error(f"banco não encontrado: {', '.join(faltando)}")
+
+    opts = {k: v for k, v in vars(args).items() if k not in ("app", "db", "todos_tenants", "processos", "formato")}
+    opts["varios"] = len(dbs) > 1
+
+    try:
+        if len(dbs) == 1 or args.processos <= 1:
+            resultados = [executar(args.app, db, args.comando, opts) for db in dbs]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(args.processos, len(dbs))) as ex:
+                resultados = list(ex.map(executar, [args.app] * len(dbs), dbs,
+                                         [args.comando] * len(dbs), [opts] * len(dbs)))
+    except ValueError as e:
+        print(f"erro: {e}", file=sys.stderr)
+        return 1
+
+    imprimir(resultados, args.formato)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
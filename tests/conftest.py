@@ -0,0 +1,35 @@
+"""
+Fixtures: cada teste roda em bancos novos num diretório temporário (usar_banco),
+com os tenants também nele. O banco padrão e o tenant do contexto voltam ao fim.
+"""
+import pytest
+
+from financas import controle, pessoal, tenants
+from financas.controle import db as controle_db
+from financas.pessoal import db as pessoal_db
+
+
+@pytest.fixture(autouse=True)
+def _isolado(tmp_path, monkeypatch):
+    monkeypatch.setattr(pessoal_db, "DB", pessoal_db.DB)
+    monkeypatch.setattr(controle_db, "DB", controle_db.DB)
+    monkeypatch.setattr(tenants, "TENANTS_DIR", tmp_path / "tenants")
+    tenants.set_tenant(None)
+    yield
+    tenants.set_tenant(None)
+
+
+@pytest.fixture
+def banco_pessoal(tmp_path):
+    """finance_pessoal.db novo, com schema e a carga inicial (3 contas)."""
+    pessoal.usar_banco(tmp_path / "finance_pessoal.db")
+    pessoal.ensure_schema()
+    pessoal.seed_if_empty()
+    return pessoal_db.DB
+
+
+@pytest.fixture
+def banco_controle(tmp_path):
+    controle.usar_banco(tmp_path / "finance.db")
+    controle.criar_tabelas()
+    return controle_db.DB
@@ -0,0 +1,182 @@
+"""Agregados mantidos por trigger (diário, faturas, envelopes, log de mudanças) x reconstrução do zero."""
+from datetime import date
+
+import pytest
+
+from financas import pessoal
+from financas.pessoal import db
+
+
+def _linhas(sql):
+    with db.conectar() as con:
+        return sorted(tuple(round(v, 2) if isinstance(v, float) else v for v in r) for r in con.execute(sql))
+
+
+def _conferir(tabela, rebuild):
+    """Conteúdo da tabela mantida por trigger == o da reconstrução (desfeita no fim)."""
+    antes = _linhas(f"SELECT * FROM {tabela}")
+    with db.conectar() as con:
+        rebuild(con)
+        depois = sorted(tuple(round(v, 2) if isinstance(v, float) else v for v in r)
+                        for r in con.execute(f"SELECT * FROM {tabela}"))
+        con.rollback()
+    return antes, depois
+
+
+@pytest.fixture
+def movimentado(banco_pessoal):
+    """Escritas variadas: conta, dinheiro, cartão, parcelas, pagamento de fatura, transferências, edições."""
+    card = pessoal.add_card("Cartão", 5, 12, 1, "1234")
+    ids = [
+        pessoal.add_transaction(date(2025, 1, 3), "INCOME", 5000, "Salário", "salário", "PAID", "BANK", account_id=1),
+        pessoal.add_transaction(date(2025, 1, 8), "EXPENSE", 120.5, "Mercado", "supermercado", "PAID", "BANK", account_id=1),
+        pessoal.add_transaction(date(2025, 1, 9), "EXPENSE", 40, "mercado ", "padaria", "PENDING", "CASH", account_id=2),
+        pessoal.add_transaction(date(2025, 1, 10), "EXPENSE", 300, "Lazer", "show", "PAID", "CARD",
+                                card_id=card, statement_month="2025-02"),
+        pessoal.add_transaction(date(2025, 2, 12), "EXPENSE", 300, "", "fatura", "PAID", "CARD_PAYMENT",
+                                account_id=1, card_id=card, statement_month="2025-02"),
+        pessoal.add_transaction(date(2025, 2, 15), "EXPENSE", 80, "Transporte", "uber", "PAID", "BANK", account_id=1),
+    ]
+    pessoal.create_installments_on_card(date(2025, 1, 20), 900, 3, "Casa", "sofá", card, 5, "PAID")
+    pessoal.add_transfer(date(2025, 1, 25), 1000, 1, 3, "reserva", "PAID")
+    pessoal.add_transfer(date(2025, 2, 25), 200, 3, 2, "saque", "PENDING")
+
+    pessoal.set_transactions_status([ids[2]], "PAID")
+    pessoal.set_transactions_category([ids[5]], "Lazer")
+    pessoal.delete_transactions([ids[1]])
+    with db.conectar() as con:  # escrita por fora do motor, sem row_version
+        con.execute("UPDATE transactions SET amount = 95, dt = '2025-03-01' WHERE id = ?", (ids[5],))
+        con.execute("UPDATE transfers SET status = 'PAID' WHERE amount = 200")
+        con.commit()
+    return {"card": card, "ids": ids}
+
+
+def test_diario_igual_a_reconstrucao(movimentado):
+    antes, depois = _conferir("journal", db.rebuild_journal)
+    assert antes and antes == depois
+
+
+def test_faturas_iguais_a_reconstrucao(movimentado):
+    antes, depois = _conferir("card_statement_balances", db.rebuild_card_balances)
+    assert antes and antes == depois
+
+
+def test_envelopes_iguais_a_reconstrucao(movimentado):
+    antes, depois = _conferir("budget_spend", db.rebuild_budget_spend)
+    assert antes and antes == depois
+
+
+def _saldo_antigo(account_id, ate=None):
+    """Fórmula de antes do diário: lançamentos pagos da conta + transferências pagas."""
+    filtro = "" if ate is None else f" AND dt <= '{ate}'"
+    with db.conectar() as con:
+        inicial = con.execute("SELECT initial_balance FROM accounts WHERE id=?", (account_id,)).fetchone()[0]
+        tx = con.execute(f"""
+            SELECT COALESCE(SUM(CASE WHEN method IN ('BANK','CASH') AND kind='INCOME' THEN amount ELSE -amount END), 0)
+            FROM transactions
+            WHERE account_id=? AND status='PAID' AND method IN ('BANK','CASH','CARD_PAYMENT'){filtro}
+        """, (account_id,)).fetchone()[0]
+        saida = con.execute(f"SELECT COALESCE(SUM(amount), 0) FROM transfers WHERE from_account_id=? AND status='PAID'{filtro}",
+                            (account_id,)).fetchone()[0]
+        entrada = con.execute(f"SELECT COALESCE(SUM(amount), 0) FROM transfers WHERE to_account_id=? AND status='PAID'{filtro}",
+                              (account_id,)).fetchone()[0]
+    return round(inicial + tx - saida + entrada, 2)
+
+
+def test_saldos_do_diario_iguais_a_formula_antiga(movimentado):
+    saldos = pessoal.saldos_atuais()
+    for account_id in (1, 2, 3):
+        assert round(saldos[account_id], 2) == _saldo_antigo(account_id)
+        assert round(pessoal.calc_account_balance(account_id), 2) == _saldo_antigo(account_id)
+
+
+def test_saldo_em_com_checkpoints(movimentado):
+    assert pessoal.rebuild_balance_checkpoints() > 0
+    for account_id in (1, 2, 3):
+        for dia in ("2025-01-31", "2025-02-14", "2025-03-31"):
+            esperado = _saldo_antigo(account_id, ate=dia)
+            assert round(pessoal.balance_as_of(account_id, date.fromisoformat(dia)), 2) == esperado
+
+
+def test_checkpoints_so_caem_com_colunas_do_diario(movimentado):
+    pessoal.rebuild_balance_checkpoints()
+    n = len(_linhas("SELECT * FROM balance_checkpoints"))
+    tx_id = movimentado["ids"][0]
+    with db.conectar() as con:
+        con.execute("UPDATE transactions SET description = 'outro' WHERE id = ?", (tx_id,))
+        con.commit()
+    assert len(_linhas("SELECT * FROM balance_checkpoints")) == n
+    with db.conectar() as con:
+        con.execute("UPDATE transactions SET amount = amount + 1 WHERE id = ?", (tx_id,))
+        con.commit()
+    assert len(_linhas("SELECT * FROM balance_checkpoints")) < n
+
+
+def test_log_de_mudancas_uma_linha_com_valores_antigos(movimentado):
+    tx_id = movimentado["ids"][0]
+    seq = pessoal.last_change_seq()
+    with db.conectar() as con:
+        versao = con.execute("SELECT row_version FROM transactions WHERE id=?", (tx_id,)).fetchone()[0]
+        con.execute("UPDATE transactions SET dt = '2025-01-04', category = 'Renda' WHERE id = ?", (tx_id,))
+        con.commit()
+    mudancas = pessoal.changes_since(seq)
+    assert [(m["tx_id"], m["op"], m["row_version"], m["dt"], m["old_dt"]) for m in mudancas] == [
+        (tx_id, "U", versao + 1, "2025-01-04", "2025-01-03"),
+    ]
+    with db.conectar() as con:
+        assert con.execute("SELECT row_version FROM transactions WHERE id=?", (tx_id,)).fetchone()[0] == versao + 1
+
+
+def test_categoria_alterada_por_fora_volta_na_leitura(movimentado):
+    tx_id = movimentado["ids"][0]
+    with db.conectar() as con:
+        con.execute("UPDATE transactions SET category = 'Bônus' WHERE id = ?", (tx_id,))
+        con.commit()
+    tx = pessoal.carregar_transactions()
+    assert tx.loc[tx["id"] == tx_id, "category_id"].item() > 0
+    antes, depois = _conferir("budget_spend", db.rebuild_budget_spend)
+    assert antes == depois
+
+
+def _checkpoints(account_id):
+    return _linhas(f"SELECT month, balance FROM balance_checkpoints WHERE account_id = {account_id}")
+
+
+def test_escrita_retroativa_so_apaga_checkpoints_da_conta(movimentado):
+    pessoal.rebuild_balance_checkpoints()
+    conta2, conta3 = _checkpoints(2), _checkpoints(3)
+    pessoal.add_transaction(date(2025, 1, 2), "EXPENSE", 10, "Mercado", "retroativo", "PAID", "BANK", account_id=1)
+    assert _checkpoints(1) == [] and (_checkpoints(2), _checkpoints(3)) == (conta2, conta3)
+    pessoal.add_transfer(date(2025, 2, 1), 5, 3, 2, "retroativa", "PAID")
+    assert [m for m, _ in _checkpoints(2)] == [m for m, _ in _checkpoints(3)] == ["2025-01"]
+
+
+def test_saldo_em_regrava_checkpoints_que_faltam(movimentado):
+    pessoal.rebuild_balance_checkpoints()
+    pessoal.add_transaction(date(2025, 1, 2), "EXPENSE", 10, "Mercado", "retroativo", "PAID", "BANK", account_id=1)
+    assert round(pessoal.balance_as_of(1, date(2025, 3, 31)), 2) == _saldo_antigo(1, ate="2025-03-31")
+    regravados = _checkpoints(1)
+    assert [m for m, _ in regravados][:2] == ["2025-01", "2025-02"]
+    pessoal.rebuild_balance_checkpoints()
+    assert regravados == _checkpoints(1)[:len(regravados)]
+
+
+def test_saldo_inicial_invalida_checkpoints(movimentado):
+    for account_id in (1, 2):
+        pessoal.balance_as_of(account_id, date(2025, 3, 31))  # grava os checkpoints
+    with db.conectar() as con:
+        con.execute("UPDATE accounts SET initial_balance = 500 WHERE id = 1")
+        con.commit()
+    assert _checkpoints(1) == [] and _checkpoints(2)
+    assert round(pessoal.balance_as_of(1, date(2025, 2, 28)), 2) == _saldo_antigo(1, ate="2025-02-28")
+
+
+def test_saldo_em_conta_inexistente(movimentado):
+    with pytest.raises(ValueError, match="Conta 99"):
+        pessoal.balance_as_of(99, date(2025, 1, 31))
+
+
+def test_delta_sobre_leitura_vazia_mantem_centavos(banco_pessoal):
+    assert pessoal.carregar_transactions().empty  # cache com a tabela vazia
+    pessoal.add_transaction(date(2025, 1, 5), "EXPENSE", 10.55, "Mercado", "", "PAID", "BANK", account_id=1)
+    assert pessoal.carregar_transactions()["amount"].tolist() == [10.55]
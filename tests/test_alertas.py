@@ -0,0 +1,69 @@
+"""Alertas por mês: estado por mês (escrita em outro mês não força recálculo) e regras."""
+from datetime import date
+
+import pytest
+
+from financas import pessoal
+from financas.pessoal import alertas, db
+
+
+@pytest.fixture
+def avaliacoes(banco_pessoal, monkeypatch):
+    """Lista dos meses avaliados (evaluate_month) a partir daqui."""
+    feitos = []
+    original = alertas.evaluate_month
+
+    def contar(ym):
+        feitos.append(ym)
+        return original(ym)
+
+    monkeypatch.setattr(alertas, "evaluate_month", contar)
+    return feitos
+
+
+def _lancar(dia, kind, valor, categoria):
+    return pessoal.add_transaction(dia, kind, valor, categoria, "", "PAID", "BANK", account_id=1)
+
+
+def test_escrita_em_outro_mes_nao_recalcula(avaliacoes):
+    _lancar(date(2025, 1, 5), "INCOME", 1000, "Salário")
+    _lancar(date(2025, 1, 10), "EXPENSE", 200, "Delivery")
+    _lancar(date(2025, 2, 5), "INCOME", 1000, "Salário")
+    pessoal.alerts_for_month("2025-01")
+    avaliacoes.clear()
+
+    _lancar(date(2025, 2, 10), "EXPENSE", 50, "Bar")  # recalcula fevereiro na escrita
+    pessoal.salvar_feriado(date(2025, 3, 3), "Carnaval")  # fora das dependências
+    assert avaliacoes == ["2025-02"]
+    jan = pessoal.alerts_for_month("2025-01")
+    assert avaliacoes == ["2025-02"]
+    assert jan.set_index("target").at["Delivery", "level"] == "HIGH"  # 20% da renda (padrão: 15%)
+
+
+def test_escrita_por_fora_no_mes_recalcula_na_leitura(avaliacoes):
+    tx = _lancar(date(2025, 1, 10), "EXPENSE", 200, "Delivery")
+    _lancar(date(2025, 1, 5), "INCOME", 1000, "Salário")
+    avaliacoes.clear()
+    with db.conectar() as con:  # sem evento: o log de mudanças marca o mês
+        con.execute("UPDATE transactions SET amount = 50 WHERE id = ?", (tx,))
+        con.commit()
+    jan = pessoal.alerts_for_month("2025-01")
+    assert avaliacoes == ["2025-01"]
+    assert jan.set_index("target").at["Delivery", "level"] == "OK"
+
+
+def test_regra_nova_recalcula_mes_atual_na_escrita(avaliacoes):
+    hoje = date.today()
+    _lancar(hoje, "INCOME", 1000, "Salário")
+    _lancar(hoje, "EXPENSE", 120, "Delivery")
+    _lancar(date(2025, 1, 5), "INCOME", 1000, "Salário")
+    pessoal.alerts_for_month("2025-01")
+    avaliacoes.clear()
+
+    pessoal.salvar_alert_rule("CATEGORY", "Delivery", 5, 11)
+    assert avaliacoes == [hoje.strftime("%Y-%m")]
+    atual = pessoal.alerts_for_month(hoje.strftime("%Y-%m"))
+    assert avaliacoes == [hoje.strftime("%Y-%m")]
+    assert atual.set_index("target").at["Delivery", "level"] == "HIGH"
+    pessoal.alerts_for_month("2025-01")  # demais meses: na leitura, pela chave antiga
+    assert avaliacoes[1:] == ["2025-01"]
@@ -0,0 +1,83 @@
+"""Anomalias: picos, compras duplicadas e o estado por mês (janela de JANELA meses)."""
+import json
+from datetime import date
+
+import pytest
+
+import finance
+from financas import pessoal
+from financas.pessoal import anomalias, db
+
+
+@pytest.fixture
+def calculos(banco_pessoal, monkeypatch):
+    """Listas de meses calculados (detectar_anomalias) a partir daqui."""
+    feitos = []
+    original = anomalias.detectar_anomalias
+
+    def contar(months=None):
+        feitos.append(months)
+        return original(months)
+
+    monkeypatch.setattr(anomalias, "detectar_anomalias", contar)
+    return feitos
+
+
+def _gasto(dia, valor, categoria="Delivery", descricao="", **kw):
+    kw = kw or {"method": "BANK", "account_id": 1}
+    return pessoal.add_transaction(dia, "EXPENSE", valor, categoria, descricao, "PAID", **kw)
+
+
+@pytest.fixture
+def historico(calculos):
+    """Delivery de R$ 100 de jan a jun/2025 e R$ 500 em julho."""
+    for m in range(1, 7):
+        _gasto(date(2025, m, 10), 100)
+    _gasto(date(2025, 7, 10), 500)
+    calculos.clear()
+
+
+def test_pico_acima_da_mediana(historico):
+    jul = pessoal.anomalias_mes("2025-07")
+    assert jul[["kind", "category", "source", "value", "baseline"]].values.tolist() == [
+        ["SPIKE", "Delivery", "A1", 500.0, 100.0]
+    ]
+    assert pessoal.anomalias_mes("2025-06").empty
+
+
+def test_compra_duplicada_no_cartao(banco_pessoal):
+    card = pessoal.add_card("Cartão", 5, 12, 1, "1234")
+    kw = {"method": "CARD", "card_id": card, "statement_month": "2025-03"}
+    a = _gasto(date(2025, 2, 27), 80, "Mercado", "Padaria X", **kw)
+    b = _gasto(date(2025, 3, 1), 80, "Mercado", "padaria x ", **kw)
+    _gasto(date(2025, 3, 20), 80, "Mercado", "Padaria X", **kw)  # fora dos DIAS_DUPLICADA
+    mar = pessoal.anomalias_mes("2025-03")
+    assert mar[["kind", "tx_id", "ref_id"]].values.tolist() == [["DUPLICATE", b, a]]
+
+
+def test_escrita_recalcula_so_os_meses_da_janela(historico, calculos):
+    pessoal.anomalias_mes("2025-07")
+    calculos.clear()
+
+    _gasto(date(2026, 3, 10), 30)  # fora da janela de julho
+    assert calculos == [finance.meses("2026-03", "2026-09")]
+    assert pessoal.anomalias_mes("2025-07")["kind"].tolist() == ["SPIKE"]
+    assert len(calculos) == 1
+
+    _gasto(date(2025, 4, 20), 50)  # na janela: julho é recalculado na escrita
+    assert calculos[1] == finance.meses("2025-04", "2025-10")
+    assert pessoal.anomalias_mes("2025-07")["baseline"].tolist() == [100.0]
+    assert len(calculos) == 2
+
+
+def test_cli_atualiza_so_os_meses_pendentes(historico, capsys):
+    def rodar():
+        assert finance.main(["--formato", "json", "--db", str(db.DB), "anomalias"]) == 0
+        return json.loads(capsys.readouterr().out)[0]["linhas"][0]
+
+    assert rodar() == {"meses": 0, "anomalias": 0}  # as escritas já gravaram cada janela
+    with db.conectar() as con:  # sem evento: março e os meses com março na janela ficam para trás
+        con.execute("UPDATE transactions SET amount = 120 WHERE dt = '2025-03-10'")
+        con.commit()
+    assert rodar() == {"meses": 5, "anomalias": 1}  # mar..jul (o histórico vai até julho)
+    assert rodar() == {"meses": 0, "anomalias": 0}
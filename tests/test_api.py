@@ -0,0 +1,89 @@
+"""API HTTP: rotas de lançamentos, erros e um banco por token."""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from financas import api
+from financas.pessoal import db
+from financas.tenants import set_tenant
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    srv = api.criar_servidor(porta=0, tokens={"ta": "alice", "tb": "bob"}, silencioso=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _req(base, metodo, caminho, corpo=None, token="ta"):
+    req = urllib.request.Request(
+        base + caminho, method=metodo, data=None if corpo is None else json.dumps(corpo).encode(),
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"} if token else {},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=10) as r:
+            body = r.read()
+            return r.status, json.loads(body) if body else None
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+def _novo(base, **extra):
+    corpo = {"dt": "2025-01-10", "kind": "EXPENSE", "amount": 50, "method": "BANK", "account_id": 1,
+             "status": "PENDING", "category": "Mercado", **extra}
+    status, out = _req(base, "POST", "/transactions", corpo)
+    assert status == 201
+    return out["id"]
+
+
+def test_health_e_token(servidor):
+    assert _req(servidor, "GET", "/health")[0] == 200
+    assert _req(servidor, "GET", "/health", token=None)[0] == 401
+    assert _req(servidor, "GET", "/nada")[0] == 404
+
+
+def test_patch_status_e_categoria(servidor):
+    tx_id = _novo(servidor)
+    status, out = _req(servidor, "PATCH", f"/transactions/{tx_id}", {"status": "paid", "category": "Lazer"})
+    assert (status, out) == (200, {"id": tx_id, "status": "PAID", "category": "Lazer"})
+    _, lista = _req(servidor, "GET", "/transactions?month=2025-01")
+    linha = next(t for t in lista["transactions"] if t["id"] == tx_id)
+    assert (linha["status"], linha["category"]) == ("PAID", "Lazer")
+
+    assert _req(servidor, "PATCH", f"/transactions/{tx_id}", {"status": "X"})[0] == 400
+    assert _req(servidor, "PATCH", f"/transactions/{tx_id}", {"category": 5})[0] == 400
+    assert _req(servidor, "PATCH", f"/transactions/{tx_id}", {})[0] == 400
+    assert _req(servidor, "PATCH", "/transactions/999", {"status": "PAID"})[0] == 404
+
+
+def test_delete(servidor):
+    tx_id = _novo(servidor)
+    assert _req(servidor, "DELETE", f"/transactions/{tx_id}") == (204, None)
+    assert _req(servidor, "DELETE", f"/transactions/{tx_id}")[0] == 404
+
+
+def test_um_banco_por_token(servidor):
+    _novo(servidor)
+    assert len(_req(servidor, "GET", "/transactions?month=2025-01")[1]["transactions"]) == 1
+    assert _req(servidor, "GET", "/transactions?month=2025-01", token="tb")[1]["transactions"] == []
+    status, out = _req(servidor, "GET", "/controle/resumo?ano=2025&mes=1", token="tb")
+    assert status == 200 and out["previsto_receber"] == 0
+
+
+def test_patch_que_falha_nao_grava_nada(servidor, monkeypatch):
+    tx_id = _novo(servidor)
+
+    def falha(con, nomes):
+        raise RuntimeError("falhou no meio")
+
+    monkeypatch.setattr("financas.pessoal.categorizacao.ids_categorias", falha)
+    assert _req(servidor, "PATCH", f"/transactions/{tx_id}", {"status": "PAID", "category": "Lazer"})[0] == 500
+    set_tenant("alice")
+    with db.conectar() as con:
+        assert con.execute("SELECT status, category FROM transactions WHERE id=?", (tx_id,)).fetchone() == (
+            "PENDING", "Mercado")
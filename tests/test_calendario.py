@@ -0,0 +1,66 @@
+"""Calendário de faturas: fim de mês, dia útil (PREV/NEXT), feriados e vencimento."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from financas.calendario import AJUSTES, mes_da_fatura, meses_da_fatura, vencimento, vencimentos
+
+
+def _meses(datas, *regra):
+    return [str(m) for m in meses_da_fatura(np.array(datas, dtype="datetime64[D]"), *regra)]
+
+
+def test_dia_31_fecha_no_fim_do_mes():
+    assert _meses(["2025-02-28", "2025-03-01", "2024-02-29"], 31) == ["2025-02", "2025-03", "2024-02"]
+
+
+def test_ultimo_dia_util():
+    # 31/05/2025 é sábado: fecha na sexta 30
+    assert _meses(["2025-05-30", "2025-05-31"], 31, "PREV") == ["2025-05", "2025-06"]
+
+
+def test_next_pode_fechar_no_mes_seguinte():
+    # 05/10/2025 é domingo: fecha na segunda 06
+    assert _meses(["2025-10-06", "2025-10-07"], 5, "NEXT") == ["2025-10", "2025-11"]
+    # 31/05/2025 (sábado) fecha em 02/06: a compra de 01/06 ainda é da fatura de maio
+    assert _meses(["2025-06-01", "2025-06-02", "2025-06-03"], 31, "NEXT") == ["2025-05", "2025-05", "2025-06"]
+
+
+def test_feriado_conta_como_dia_nao_util():
+    # 21/04/2025 (segunda) é feriado: fecha na sexta 18
+    assert _meses(["2025-04-18", "2025-04-19"], 21, "PREV", ("2025-04-21",)) == ["2025-04", "2025-05"]
+    assert _meses(["2025-04-19"], 21, "PREV") == ["2025-04"]
+
+
+def test_nat_continua_nat():
+    out = meses_da_fatura(np.array(["2025-01-10", "NaT"], dtype="datetime64[D]"), 10)
+    assert str(out[0]) == "2025-01" and np.isnat(out[1])
+
+
+@pytest.mark.parametrize("ajuste", AJUSTES)
+@pytest.mark.parametrize("dia", [1, 5, 28, 30, 31])
+def test_escalar_igual_ao_vetorizado(dia, ajuste):
+    feriados = ("2025-01-01", "2025-04-21", "2025-12-25")
+    datas = [date(2024, 11, 1) + timedelta(days=i) for i in range(430)]
+    vet = _meses(datas, dia, ajuste, feriados)
+    assert [mes_da_fatura(d, dia, ajuste, feriados) for d in datas] == vet
+
+
+def test_vencimento_no_mes_ou_no_seguinte():
+    assert vencimento("2025-05", 5, 25) == date(2025, 5, 25)
+    assert vencimento("2025-05", 25, 5) == date(2025, 6, 5)
+    assert vencimento("2025-01", 20, 31) == date(2025, 1, 31)
+    # 05/10/2025 é domingo
+    assert vencimento("2025-09", 25, 5, "NEXT") == date(2025, 10, 6)
+    out = vencimentos(np.array(["2025-01", "2025-02"], dtype="datetime64[M]"), 31, 30, "PREV")
+    assert [d.item() for d in out] == [date(2025, 2, 28), date(2025, 3, 28)]
+
+
+def test_regra_invalida():
+    with pytest.raises(ValueError):
+        meses_da_fatura(["2025-01-01"], 0)
+    with pytest.raises(ValueError):
+        meses_da_fatura(["2025-01-01"], 10, "SEGUINTE")
+    with pytest.raises(ValueError):
+        vencimento("2025-01", 10, 32)
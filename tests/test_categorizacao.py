@@ -0,0 +1,71 @@
+"""Categorias normalizadas e o classificador por regras (um lançamento, lote e recategorizar)."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from financas import pessoal
+from financas.pessoal.categorizacao import Classificador, Regra, categorizar, chave_categoria
+
+
+def _classificador():
+    return Classificador([
+        Regra(1, "KEYWORD", "ifood, rappi", 10, "Delivery", kind="EXPENSE"),
+        Regra(2, "REGEX", r"^uber\b", 11, "Transporte", max_amount=100),
+        Regra(3, "KEYWORD", "padaria", 12, "Padaria"),
+    ])
+
+
+def test_chave_sem_acento_caixa_e_espacos():
+    assert chave_categoria("  Educação   Física ") == chave_categoria("educacao fisica") == "educacao fisica"
+
+
+def test_regra_invalida():
+    with pytest.raises(ValueError):
+        Regra(1, "REGEX", "(", 1, "X")
+    with pytest.raises(ValueError):
+        Regra(1, "KEYWORD", " , ", 1, "X")
+    with pytest.raises(ValueError):
+        Regra(1, "LIKE", "x", 1, "X")
+
+
+def test_um_e_lote_dao_o_mesmo_resultado():
+    clf = _classificador()
+    casos = [
+        ("IFOOD *Restaurante", 50.0, "EXPENSE", "Delivery"),
+        ("iFood estorno", 50.0, "INCOME", None),          # regra só para despesa
+        ("Uber trip", 30.0, "EXPENSE", "Transporte"),
+        ("Uber trip", 300.0, "EXPENSE", None),            # acima da faixa
+        ("Pão na Padária", None, "EXPENSE", "Padaria"),   # sem acento; sem valor, regra sem faixa casa
+        ("", 10.0, "EXPENSE", None),
+    ]
+    um = [clf.classificar_um(d, a, k) for d, a, k, _ in casos]
+    assert [r.category if r else None for r in um] == [c for *_, c in casos]
+    idx = clf.classificar([d for d, *_ in casos], [a if a is not None else float("nan") for _, a, *_ in casos],
+                          [k for _, _, k, _ in casos])
+    assert [clf.regras[i].category if i >= 0 else None for i in idx] == [c for *_, c in casos]
+
+
+def test_categorizar_preenche_so_as_vazias_e_unifica_grafias(banco_pessoal):
+    pessoal.salvar_regra_categoria("KEYWORD", "ifood", "Delivery")
+    df = pd.DataFrame({
+        "description": ["ifood", "ifood", "mercado"],
+        "amount": [10.0, 20.0, 30.0],
+        "kind": ["EXPENSE"] * 3,
+        "category": ["", "Lazer", " DELIVERY "],
+    })
+    out = categorizar(df)
+    assert out["category"].tolist() == ["Delivery", "Lazer", " DELIVERY "]
+    assert out["category_id"].iloc[0] == out["category_id"].iloc[2] != out["category_id"].iloc[1]
+
+
+def test_recategorizar_e_prioridade(banco_pessoal):
+    sem = pessoal.add_transaction(date(2025, 1, 3), "EXPENSE", 40, "", "Uber centro", "PAID", "BANK", account_id=1)
+    pessoal.salvar_regra_categoria("KEYWORD", "uber", "Transporte", priority=50)
+    pessoal.salvar_regra_categoria("KEYWORD", "centro", "Outros", priority=10)
+    digitado = pessoal.add_transaction(date(2025, 1, 4), "EXPENSE", 20, "", "uber centro", "PAID", "BANK", account_id=1)
+
+    assert pessoal.recategorizar() == 1
+    assert pessoal.recategorizar() == 0
+    tx = pessoal.carregar_transactions().set_index("id")
+    assert tx.at[sem, "category"] == tx.at[digitado, "category"] == "Outros"  # menor prioridade ganha
@@ -0,0 +1,62 @@
+"""finance.py: comandos de lote sobre um banco (--db), saída em JSON."""
+import json
+
+import pytest
+
+import finance
+from financas import controle, pessoal
+from financas.pessoal import db
+
+
+def _rodar(capsys, *argv):
+    assert finance.main(["--formato", "json", *argv]) == 0
+    return json.loads(capsys.readouterr().out)[0]["linhas"]
+
+
+@pytest.fixture
+def pessoal_db(banco_pessoal):
+    pessoal.add_card("Cartão", 5, 12, 1, "1234")
+    with db.conectar() as con:
+        con.execute("""
+            INSERT INTO recurrences (name, kind, amount, category, method, account_id, day_of_month)
+            VALUES ('Salário', 'INCOME', 3000, 'Salário', 'BANK', 1, 5)
+        """)
+        con.commit()
+    return str(banco_pessoal)
+
+
+def test_recorrencias_e_resumo(pessoal_db, capsys):
+    linhas = _rodar(capsys, "--db", pessoal_db, "recorrencias", "2025-01", "2025-03")
+    assert [ln["criados"] for ln in linhas] == [1, 1, 1]
+    assert _rodar(capsys, "--db", pessoal_db, "recorrencias", "2025-01")[0]["criados"] == 0
+    resumo = _rodar(capsys, "--db", pessoal_db, "resumo", "2025-01", "2025-02")
+    assert [ln["mes"] for ln in resumo] == ["2025-01", "2025-02"]
+
+
+def test_reconstruir_pessoal(pessoal_db, capsys):
+    _rodar(capsys, "--db", pessoal_db, "recorrencias", "2025-01", "2025-03")
+    with db.conectar() as con:
+        con.execute("DELETE FROM journal")
+        con.commit()
+    linhas = _rodar(capsys, "--db", pessoal_db, "reconstruir", "--so", "diario")
+    assert linhas == [{"agregado": "diario", "linhas": 3}]
+    assert pessoal.saldos_atuais()[1] == 9000
+    todos = _rodar(capsys, "--db", pessoal_db, "reconstruir")
+    assert [ln["agregado"] for ln in todos] == ["diario", "cartoes", "envelopes", "checkpoints"]
+
+
+def test_reconstruir_controle(banco_controle, capsys):
+    controle.inserir_lancamento("RECEBER", "Ana", "", "", 100, "2025-01-10")
+    with controle.conectar() as con:
+        con.execute("DELETE FROM pessoas_saldo")
+    linhas = _rodar(capsys, "--app", "controle", "--db", str(banco_controle), "reconstruir")
+    assert linhas == [{"agregado": "pessoas", "linhas": 1}]
+    assert controle.resumo_pessoa("Ana")["a_receber"] == 100
+    assert finance.main(["--app", "controle", "--db", str(banco_controle), "reconstruir", "--so", "diario"]) == 1
+
+
+def test_vencidos(banco_controle, capsys):
+    controle.inserir_lancamento("PAGAR", "Luz", "", "", 80, "2020-01-10")
+    linhas = _rodar(capsys, "--app", "controle", "--db", str(banco_controle), "vencidos")
+    assert (linhas[0]["executou"], linhas[0]["novos"]) == (True, 1)
+    assert _rodar(capsys, "--app", "controle", "--db", str(banco_controle), "vencidos")[0]["executou"] is False
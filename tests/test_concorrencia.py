@@ -0,0 +1,54 @@
+"""Edição concorrente no editor de lançamentos: row_version e VersionConflict."""
+from datetime import date
+
+import pytest
+
+from financas import pessoal
+from financas.pessoal import db
+
+
+def _versoes(ids):
+    with db.conectar() as con:
+        return dict(con.execute(
+            f"SELECT id, row_version FROM transactions WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall())
+
+
+@pytest.fixture
+def ids(banco_pessoal):
+    return [
+        pessoal.add_transaction(date(2025, 1, d), "EXPENSE", 10 * d, "Mercado", "compra", "PENDING", "BANK", account_id=1)
+        for d in (1, 2, 3)
+    ]
+
+
+def test_versao_lida_grava(ids):
+    assert pessoal.set_transactions_status(ids, "PAID", _versoes(ids)) == 3
+    assert set(_versoes(ids).values()) == {2}
+
+
+def test_versao_velha_nao_grava_nada(ids):
+    lidas = _versoes(ids)
+    pessoal.set_transactions_status([ids[1]], "PAID")  # outra sessão
+    with pytest.raises(db.VersionConflict) as e:
+        pessoal.set_transactions_status(ids, "PAID", lidas)
+    assert e.value.ids == [ids[1]]
+    with db.conectar() as con:
+        assert con.execute("SELECT COUNT(*) FROM transactions WHERE status='PAID'").fetchone()[0] == 1
+
+
+def test_escrita_por_fora_tambem_muda_a_versao(ids):
+    lidas = _versoes(ids)
+    with db.conectar() as con:
+        con.execute("UPDATE transactions SET description = 'editada' WHERE id = ?", (ids[0],))
+        con.commit()
+    with pytest.raises(db.VersionConflict):
+        pessoal.delete_transactions(ids, lidas)
+    assert len(_versoes(ids)) == 3
+
+
+def test_categoria_com_versao(ids):
+    lidas = _versoes(ids)
+    assert pessoal.set_transactions_category(ids[:2], "Lazer", lidas) == 2
+    with pytest.raises(db.VersionConflict):
+        pessoal.set_transactions_category(ids[:2], "Casa", lidas)
@@ -0,0 +1,86 @@
+"""app.py: liquidação, pagamentos parciais e o resumo por período."""
+import pytest
+
+from financas import controle
+from financas.periodos import periodo_de, por_periodo
+
+
+def _ids():
+    return sorted(controle.carregar_df()["id"].astype(int).tolist())  # ordem de inserção
+
+
+def _resumo(ym):
+    agg = por_periodo(controle.agregar_lancamentos(controle.carregar_df()), "mes")
+    return controle.resumo_periodo(agg, periodo_de(ym, "mes"))
+
+
+@pytest.fixture
+def lancamentos(banco_controle):
+    controle.inserir_lancamento("RECEBER", "Ana", "Aluguel", "jan", 100, "2025-01-10")
+    controle.inserir_lancamento("RECEBER", "Ana", "Aluguel", "jan", 200, "2025-01-20")
+    controle.inserir_lancamento("PAGAR", "Bruno", "Luz", "jan", 80, "2025-01-15")
+    return _ids()
+
+
+def test_pagar_parcial(lancamentos):
+    a = lancamentos[0]
+    out = controle.pagar_parcial(a, 30, "2025-01-12")
+    assert out == {"id": a, "valor_pago": 30.0, "em_aberto": 70.0, "status": "PENDENTE"}
+    out = controle.pagar_parcial(a, 70, "2025-01-13")
+    assert out["status"] == "PAGO" and out["em_aberto"] == 0.0
+    assert [(d, v) for _, d, v in controle.pagamentos_de(a)] == [("2025-01-12", 30.0), ("2025-01-13", 70.0)]
+    linha = controle.carregar_df().set_index("id").loc[a]
+    assert (linha["status"], linha["data_pagamento"], linha["valor_pago"]) == ("PAGO", "2025-01-13", 100.0)
+
+
+def test_pagar_parcial_recusa_valor_acima_do_aberto(lancamentos):
+    controle.pagar_parcial(lancamentos[0], 60, "2025-01-12")
+    with pytest.raises(ValueError):
+        controle.pagar_parcial(lancamentos[0], 40.01, "2025-01-13")
+    with pytest.raises(ValueError):
+        controle.pagar_parcial(lancamentos[0], 0, "2025-01-13")
+
+
+def test_liquidar_grava_o_que_falta(lancamentos):
+    controle.pagar_parcial(lancamentos[0], 50, "2025-01-15")
+    out = controle.liquidar("2025-02-05", pessoa="Ana")
+    assert out == {"ids": lancamentos[:2], "quantidade": 2, "total": 250.0}
+    df = controle.carregar_df().set_index("id")
+    assert (df.loc[lancamentos[:2], "status"] == "PAGO").all()
+    assert df.loc[lancamentos[0], "valor_pago"] == 100.0
+    assert df.loc[lancamentos[2], "status"] == "PENDENTE"
+    assert controle.liquidar("2025-02-05", pessoa="Ana")["quantidade"] == 0
+    with pytest.raises(ValueError):
+        controle.liquidar("2025-02-05")
+
+
+def test_resumo_com_pagamento_parcial(lancamentos):
+    controle.pagar_parcial(lancamentos[0], 50, "2025-01-15")
+    jan = _resumo("2025-01")
+    assert (jan["previsto_receber"], jan["pendente_receber"], jan["recebido"]) == (300.0, 250.0, 50.0)
+
+    controle.liquidar("2025-02-05", ids=lancamentos[:2])
+    jan, fev = _resumo("2025-01"), _resumo("2025-02")
+    assert (jan["pendente_receber"], jan["recebido"]) == (0.0, 50.0)
+    assert fev["recebido"] == 250.0
+    assert (jan["pendente_pagar"], jan["pago"]) == (80.0, 0.0)
+
+
+def test_razao_por_pessoa_igual_a_reconstrucao(lancamentos):
+    controle.pagar_parcial(lancamentos[0], 50, "2025-01-15")
+    controle.liquidar("2025-02-05", ids=[lancamentos[2]])
+    with controle.conectar() as con:
+        antes = sorted(con.execute("SELECT * FROM pessoas_saldo"))
+        controle.reconstruir_pessoas(con)
+        assert sorted(con.execute("SELECT * FROM pessoas_saldo")) == antes
+        con.rollback()
+
+
+def test_historico_igual_ao_resumo_de_cada_periodo(lancamentos):
+    controle.pagar_parcial(lancamentos[0], 50, "2025-01-15")
+    controle.liquidar("2025-02-05", ids=lancamentos[:2])
+    agg_p = por_periodo(controle.agregar_lancamentos(controle.carregar_df()), "mes")
+    hist = controle.resumo_periodos(agg_p).set_index("periodo")
+    assert list(hist.index) == [periodo_de("2025-01", "mes"), periodo_de("2025-02", "mes")]
+    for p, linha in hist.iterrows():
+        assert linha.to_dict() == controle.resumo_periodo(agg_p, p)
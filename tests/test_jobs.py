@@ -0,0 +1,90 @@
+"""Tarefas em segundo plano: retomada do checkpoint, cancelamento e dedupe."""
+import json
+import threading
+import time
+
+import pytest
+
+from financas import pessoal
+from financas.pessoal import db, jobs
+
+
+def _esperar(job_id, status=None, timeout=10):
+    """Espera a tarefa sair de QUEUED/RUNNING (ou chegar em `status`) e devolve a linha."""
+    fim = time.monotonic() + timeout
+    while time.monotonic() < fim:
+        job = next(j for j in pessoal.list_jobs() if j["id"] == job_id)
+        if (job["status"] == status) if status else job["status"] not in jobs.ACTIVE:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"tarefa {job_id} parada em {job['status']}")
+
+
+def _inserir_job(kind, params, status, checkpoint=None):
+    with db.conectar() as con:
+        cur = con.execute(
+            "INSERT INTO jobs (kind, params, status, checkpoint, created_at) VALUES (?,?,?,?, '2025-01-01T00:00:00')",
+            (kind, json.dumps(params), status, json.dumps(checkpoint) if checkpoint else None),
+        )
+        con.commit()
+        return int(cur.lastrowid)
+
+
+@pytest.fixture
+def bloqueante(banco_pessoal, monkeypatch):
+    """Tarefa que roda até ser cancelada (ou liberada pelo evento)."""
+    libera = threading.Event()
+
+    def handler(ctx):
+        while not libera.wait(0.01):
+            ctx.check_cancel()
+        return {"ok": True}
+
+    monkeypatch.setitem(jobs.HANDLERS, "teste_bloqueante", handler)
+    yield
+    libera.set()
+
+
+def test_retoma_do_checkpoint(banco_pessoal):
+    with db.conectar() as con:
+        con.execute("""
+            INSERT INTO recurrences (name, kind, amount, category, method, account_id, day_of_month)
+            VALUES ('Aluguel', 'EXPENSE', 1500, 'Moradia', 'BANK', 1, 5)
+        """)
+        con.commit()
+    # processo anterior parou depois do 1º mês (RUNNING com checkpoint)
+    job_id = _inserir_job("recurrences", {"months": ["2025-01", "2025-02", "2025-03"]}, "RUNNING",
+                          {"done": 1, "created": 1})
+    assert pessoal.resume_pending_jobs() == 1
+    job = _esperar(job_id)
+    assert job["status"] == "DONE" and json.loads(job["result"])["created"] == 3
+    meses = pessoal.carregar_transactions()["dt"].dt.strftime("%Y-%m").tolist()
+    assert sorted(meses) == ["2025-02", "2025-03"]
+
+
+def test_cancelar_em_execucao(bloqueante):
+    job_id = pessoal.submit_job("teste_bloqueante")
+    _esperar(job_id, "RUNNING")
+    pessoal.cancel_job(job_id)
+    assert _esperar(job_id)["status"] == "CANCELLED"
+
+
+def test_cancelar_na_fila(banco_pessoal):
+    job_id = _inserir_job("recurrences", {"months": ["2025-01"]}, "QUEUED")
+    pessoal.cancel_job(job_id)
+    assert _esperar(job_id)["status"] == "CANCELLED"
+    assert pessoal.resume_pending_jobs() == 0
+
+
+def test_dedupe_reaproveita_a_ativa(bloqueante):
+    a = pessoal.submit_job("teste_bloqueante", dedupe_key="x")
+    assert pessoal.submit_job("teste_bloqueante", dedupe_key="x") == a
+    pessoal.cancel_job(a)
+    _esperar(a)
+    assert pessoal.submit_job("teste_bloqueante", dedupe_key="x") != a
+
+
+def test_falha_fica_registrada(banco_pessoal):
+    job_id = pessoal.submit_job("import_csv", {"path": "/nao/existe.csv"})
+    job = _esperar(job_id)
+    assert job["status"] == "FAILED" and "traceback" in json.loads(job["result"])
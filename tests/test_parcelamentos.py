@@ -0,0 +1,60 @@
+"""Parcelamentos: plano e parcelas, cronograma e quitação antecipada (simulada e gravada)."""
+from datetime import date
+
+import pytest
+
+from financas import pessoal
+
+
+@pytest.fixture
+def plano(banco_pessoal):
+    """R$ 1.000 em 3x, comprado em 15/01/2025 num cartão que fecha dia 10 (faturas 02, 03 e 04/2025)."""
+    card = pessoal.add_card("Cartão", 10, 20, 1, "1234")
+    plan = pessoal.create_installments_on_card(date(2025, 1, 15), 1000, 3, "Casa", "Sofá", card, 10, "PENDING")
+    return card, plan
+
+
+def _parcelas(plan):
+    tx = pessoal.carregar_transactions()
+    p = tx[tx["plan_id"] == plan].sort_values("installment_no")
+    return list(zip(p["statement_month"], p["amount"]))
+
+
+def test_parcelas_uma_por_fatura_com_centavos_na_ultima(plano):
+    _, plan = plano
+    assert _parcelas(plan) == [("2025-02", 333.33), ("2025-03", 333.33), ("2025-04", 333.34)]
+
+
+def test_resumo_do_plano_e_cronograma(plano):
+    card, plan = plano
+    r = pessoal.installment_plans(as_of="2025-03").set_index("plan_id").loc[plan]
+    assert (r["remaining_n"], r["remaining"], r["next_month"], r["last_month"]) == (2, 666.67, "2025-03", "2025-04")
+    fim = pessoal.installment_plans(as_of="2025-05").set_index("plan_id").loc[plan]
+    assert (fim["remaining_n"], fim["remaining"], fim["next_month"]) == (0, 0.0, "")
+
+    sched = pessoal.installment_schedule(as_of="2025-03")
+    assert sched[["card_id", "statement_month", "amount", "plans"]].values.tolist() == [
+        [card, "2025-03", 333.33, 1], [card, "2025-04", 333.34, 1]
+    ]
+
+
+def test_simulacao_igual_a_antecipacao_gravada(plano):
+    _, plan = plano
+    sim = pessoal.payoff_scenario([plan], payoff_month="2025-02", taxa_mes=1.0, as_of="2025-02")
+    # 333,33 / 1,01 e 333,34 / 1,01²
+    assert sim["por_plano"].values.tolist() == [[plan, 666.67, 656.80, 9.87]]
+    assert (sim["nominal"], sim["valor"], sim["economia"]) == (666.67, 656.80, 9.87)
+    assert sim["depois"]["statement_month"].tolist() == ["2025-02"]
+
+    out = pessoal.antecipar_plano(plan, "2025-02", taxa_mes=1.0)
+    assert (out["parcelas"], out["nominal"], out["valor"], out["economia"]) == (2, 666.67, 656.80, 9.87)
+    assert _parcelas(plan) == [("2025-02", 333.33), ("2025-02", 330.03), ("2025-02", 326.77)]
+    depois = pessoal.payoff_scenario([plan], payoff_month="2025-02", as_of="2025-02")
+    assert depois["economia"] == 0.0 and depois["por_plano"].empty
+
+
+def test_sem_juros_so_muda_a_fatura(plano):
+    _, plan = plano
+    sim = pessoal.payoff_scenario(payoff_month="2025-03", as_of="2025-03")
+    assert (sim["nominal"], sim["valor"], sim["economia"]) == (333.34, 333.34, 0.0)
+    assert sim["antes"]["amount"].sum() == pytest.approx(sim["depois"]["amount"].sum())
@@ -0,0 +1,64 @@
+"""Um banco por tenant: escritas, loaders e cache de um tenant não aparecem no outro."""
+from datetime import date
+
+from financas import controle, pessoal
+from financas.tenants import set_tenant, tenant_db_path
+
+
+def _preparar(tenant):
+    set_tenant(tenant)
+    pessoal.ensure_schema()
+    pessoal.seed_if_empty()
+    controle.criar_tabelas()
+
+
+def test_arquivos_por_tenant(tmp_path):
+    set_tenant("alice")
+    assert pessoal.db_atual() == tenant_db_path("alice", "finance_pessoal.db")
+    assert controle.db_atual() == tenant_db_path("alice", "finance.db")
+    assert pessoal.db_atual().startswith(str(tmp_path / "tenants"))
+    set_tenant(None)
+    assert pessoal.db_atual() == pessoal.DB
+
+
+def test_pessoal_isolado():
+    for t in ("alice", "bob"):
+        _preparar(t)
+        assert pessoal.carregar_transactions().empty  # cache de cada um
+
+    set_tenant("alice")
+    pessoal.add_transaction(date(2025, 1, 5), "INCOME", 1000, "Salário", "salário", "PAID", "BANK", account_id=1)
+    assert len(pessoal.carregar_transactions()) == 1
+    assert pessoal.saldos_atuais()[1] == 1000
+
+    set_tenant("bob")
+    assert pessoal.carregar_transactions().empty
+    assert pessoal.saldos_atuais()[1] == 0
+
+
+def test_controle_isolado():
+    for t in ("alice", "bob"):
+        _preparar(t)
+        assert controle.carregar_df().empty
+
+    set_tenant("alice")
+    controle.inserir_lancamento("RECEBER", "Ana", "", "", 100, "2025-01-10")
+    controle.liquidar("2025-01-10", pessoa="Ana")
+    assert controle.carregar_df()["status"].tolist() == ["PAGO"]
+
+    set_tenant("bob")
+    assert controle.carregar_df().empty
+    assert controle.liquidar("2025-01-10", pessoa="Ana")["quantidade"] == 0
+
+
+def test_controle_reusa_conexoes_do_pool(banco_controle, monkeypatch):
+    from financas import instrumentacao
+    abertas = []
+    original = instrumentacao.conectar
+    monkeypatch.setattr(instrumentacao, "conectar", lambda db, **kw: abertas.append(db) or original(db, **kw))
+    for _ in range(5):
+        controle.data_version()
+        controle.carregar_df()
+    controle.inserir_lancamento("RECEBER", "Ana", "", "", 100, "2025-01-10")
+    controle.liquidar("2025-01-10", pessoa="Ana")
+    assert len(abertas) <= 1